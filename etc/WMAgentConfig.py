@@ -104,6 +104,7 @@ config.JobStateMachine.couchurl = couchURL
 config.JobStateMachine.couchDBName = jobDumpDBName
 config.JobStateMachine.jobSummaryDBName = jobSummaryDBName
 config.JobStateMachine.summaryStatsDBName = summaryStatsDBName
+config.JobStateMachine.asyncCouchWrites = False
 
 config.section_("ACDC")
 config.ACDC.couchurl = "https://cmsweb.cern.ch/couchdb"
@@ -120,6 +121,8 @@ config.BossAir.nCondorProcesses = 1
 config.BossAir.submitWMSMode = True
 config.BossAir.acctGroup = glideInAcctGroup
 config.BossAir.acctGroupUser = glideInAcctGroupUser
+config.BossAir.incrementalTracking = False
+config.BossAir.fullTrackInterval = 3600
 
 config.section_("CoreDatabase")
 config.CoreDatabase.connectUrl = databaseUrl
@@ -196,6 +199,8 @@ config.JobCreator.pollInterval = 120
 config.JobCreator.jobCacheDir = config.General.workDir + "/JobCache"
 config.JobCreator.defaultJobType = "Processing"
 config.JobCreator.workerThreads = 1
+# number of processes splitting subscriptions in parallel, 1 splits them in the component thread
+config.JobCreator.splitProcesses = 1
 # glidein restrictions used for resource estimation (per core)
 config.JobCreator.GlideInRestriction = {"MinWallTimeSecs": 1 * 60 * 60, "MaxWallTimeSecs": 45 * 60 * 60,   # pilot lifetime is usually 48h
                                         "MinRequestDiskKB": 1 * 1024 * 1024, "MaxRequestDiskKB": 20 * 1024 * 1024} # site limit is ~27GB
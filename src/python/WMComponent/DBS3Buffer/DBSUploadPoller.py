@@ -31,6 +31,7 @@ import logging
 import Queue
 import traceback
 import multiprocessing
+import collections
 
 from WMCore.DAOFactory import DAOFactory
 
@@ -80,12 +81,68 @@ def createDictionaryFromConfig(configSection):
     return final
 
 
-def uploadWorker(workInput, results, dbsUrl):
+def blockInDBS(dbsApi, name):
+    """
+    _blockInDBS_
+
+    Check if a block has made it into DBS
+    """
+    for blockResult in dbsApi.listBlocks(block_name = name):
+        if blockResult['block_name'] == name:
+            return True
+    return False
+
+
+def uploadBlock(dbsApi, name, block, nRetries = 0, retryWait = 0):
+    """
+    _uploadBlock_
+
+    Insert a block into DBS.  A failed insertion may still have reached
+    DBS, so DBS is asked for the block before trying again, which makes
+    the retries safe.  Returns the result for the poller.
+    """
+    for attempt in range(nRetries + 1):
+        try:
+            logging.debug("About to call insert block with block: %s", block)
+            dbsApi.insertBulkBlock(blockDump = block)
+            return {'name': name, 'success': "uploaded"}
+        except Exception as ex:
+            exString = str(ex)
+            if 'Block %s already exists' % name in exString:
+                # Then this is probably a duplicate
+                # Ignore this for now
+                logging.error("Had duplicate entry for block %s. Ignoring for now.", name)
+                logging.debug("Exception: %s", exString)
+                logging.debug("Traceback: %s", str(traceback.format_exc()))
+                return {'name': name, 'success': "uploaded"}
+
+            msg =  "Error trying to process block %s through DBS.\n" % name
+            msg += exString
+            logging.error(msg)
+            logging.error(str(traceback.format_exc()))
+
+        try:
+            if blockInDBS(dbsApi, name):
+                logging.info("Block %s was inserted despite the error", name)
+                return {'name': name, 'success': "uploaded"}
+        except Exception as ex:
+            # Can't tell whether the block got in, leave it to checkBlocks
+            logging.error("Error checking block %s in DBS: %s", name, str(ex))
+            return {'name': name, 'success': "check"}
+
+        if attempt < nRetries:
+            time.sleep(retryWait * 2 ** attempt)
+
+    logging.debug("block: %s \n", block)
+    return {'name': name, 'success': "error", 'error': msg}
+
+
+def uploadWorker(workInput, results, dbsUrl, nRetries = 0, retryWait = 0):
     """
     _uploadWorker_
 
     Put JSONized blocks in the workInput
-    Get confirmation in the output
+    Get confirmation in the output, along with the time spent in DBS
     """
 
     # Init DBS Stuff
@@ -111,36 +168,46 @@ def uploadWorker(workInput, results, dbsUrl):
         block = work.get('block', None)
 
         # Do stuff with DBS
-        try:
-            logging.debug("About to call insert block with block: %s", block)
-            dbsApi.insertBulkBlock(blockDump = block)
-            results.put({'name': name, 'success': "uploaded"})
-        except Exception as ex:
-            exString = str(ex)
-            if 'Block %s already exists' % name in exString:
-                # Then this is probably a duplicate
-                # Ignore this for now
-                logging.error("Had duplicate entry for block %s. Ignoring for now.", name)
-                logging.debug("Exception: %s", exString)
-                logging.debug("Traceback: %s", str(traceback.format_exc()))
-                results.put({'name': name, 'success': "uploaded"})
-            elif 'Proxy Error' in exString:
-                # This is probably a successfully inserton that went bad.
-                # Put it on the check list
-                msg = "Got a proxy error for block (%s)." % name
-                logging.error(msg)
-                logging.error(str(traceback.format_exc()))
-                results.put({'name': name, 'success': "check"})
-            else:
-                msg =  "Error trying to process block %s through DBS.\n" % name
-                msg += exString
-                logging.error(msg)
-                logging.error(str(traceback.format_exc()))
-                logging.debug("block: %s \n", block)
-                results.put({'name': name, 'success': "error", 'error': msg})
+        startTime = time.time()
+        result = uploadBlock(dbsApi, name, block, nRetries, retryWait)
+        result['time'] = time.time() - startTime
+        results.put(result)
 
     return
 
+
+class UploadWindow(object):
+    """
+    _UploadWindow_
+
+    Number of blocks that can be in the hands of DBS at the same time.
+    It starts at the number of upload processes, is halved whenever an
+    insertion fails or takes longer than the target latency, and grows
+    back by one block with every insertion that is fast enough.
+    """
+    def __init__(self, maxSize, targetLatency):
+        self.maxSize = max(1, maxSize)
+        self.size = self.maxSize
+        self.targetLatency = targetLatency
+        self.latency = None
+
+    def update(self, elapsed, success = True):
+        """
+        _update_
+
+        Account for the latency of one insertion
+        """
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency = 0.8 * self.latency + 0.2 * elapsed
+
+        if not success or elapsed > self.targetLatency:
+            self.size = max(1, self.size // 2)
+        elif self.size < self.maxSize:
+            self.size += 1
+        return
+
 class DBSUploadException(WMException):
     """
     Holds the exception info for
@@ -181,28 +248,34 @@ class DBSUploadPoller(BaseWorkerThread):
         self.nProc  = getattr(self.config.DBS3Upload, 'nProcesses', 4)
         self.wait   = getattr(self.config.DBS3Upload, 'dbsWaitTime', 2)
         self.nTries = getattr(self.config.DBS3Upload, 'dbsNTries', 300)
+        self.nRetries  = getattr(self.config.DBS3Upload, 'dbsRetries', 2)
+        self.retryWait = getattr(self.config.DBS3Upload, 'dbsRetryWait', 5)
+        self.recordBatch = getattr(self.config.DBS3Upload, 'recordBatchSize', 50)
         self.physicsGroup   = getattr(self.config.DBS3Upload, "physicsGroup", "NoGroup")
         self.datasetType    = getattr(self.config.DBS3Upload, "datasetType", "PRODUCTION")
         self.primaryDatasetType = getattr(self.config.DBS3Upload, "primaryDatasetType", "mc")
-        self.blockCount     = 0
         self.dbsApi = DbsApi(url = self.dbsUrl)
 
         # List of blocks currently in processing
         self.queuedBlocks = []
+        # Names of the blocks waiting for a slot in the upload window
+        self.blocksToUpload = collections.deque()
+        self.uploadWindow = UploadWindow(self.nProc,
+                                         getattr(self.config.DBS3Upload, 'dbsTargetLatency', 60))
 
         # Set up the pool of worker processes
         self.setupPool()
 
         # Setting up any cache objects
         self.blockCache = {}
+        # Names of the open blocks in the cache by (datasetpath, location)
+        self.openBlocks = {}
 
         self.filesToUpdate = []
 
         self.produceCopy = getattr(self.config.DBS3Upload, 'copyBlock', False)
         self.copyPath    = getattr(self.config.DBS3Upload, 'copyBlockPath',
                                    '/data/mnorman/block.json')
-        
-        self.timeoutWaiver = 1
 
         return
 
@@ -224,7 +297,9 @@ class DBSUploadPoller(BaseWorkerThread):
             p = multiprocessing.Process(target = uploadWorker,
                                         args = (self.workInput,
                                                 self.workResult,
-                                                self.dbsUrl))
+                                                self.dbsUrl,
+                                                self.nRetries,
+                                                self.retryWait))
             p.start()
             self.pool.append(p)
 
@@ -271,6 +346,11 @@ class DBSUploadPoller(BaseWorkerThread):
         self.pool = []
         self.workInput = None
         self.workResult = None
+        # Whatever was in flight is lost, it goes back to the upload list
+        # on the next cycle.  A block that made it into DBS anyway is
+        # recognised as already uploaded.
+        self.queuedBlocks = []
+        self.blocksToUpload = collections.deque()
         return
 
 
@@ -282,6 +362,7 @@ class DBSUploadPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        self.close()
 
 
     def algorithm(self, parameters = None):
@@ -295,6 +376,11 @@ class DBSUploadPoller(BaseWorkerThread):
         Then add new blocks in DBSBuffer
         Then add blocks to DBS
         Then mark blocks as done in DBSBuffer
+
+        The last two steps overlap: blocks are handed to the upload
+        processes as the upload window allows and recorded in DBSBuffer
+        as their results come back.  Blocks still in DBS at the end of
+        the cycle are picked up in the next one.
         """
         try:
             logging.info("Starting the DBSUpload Polling Cycle")
@@ -367,7 +453,7 @@ class DBSUploadPoller(BaseWorkerThread):
                 block.addFile(f, self.datasetType, self.primaryDatasetType)
 
             # Add to the cache
-            self.blockCache[blockInfo['block_name']] = block
+            self.addToBlockCache(block)
 
         return
 
@@ -423,7 +509,7 @@ class DBSUploadPoller(BaseWorkerThread):
                         if not self.isBlockOpen(newFile = newFile,
                                                 block = currentBlock):
                             # Then we have to close the block and get a new one
-                            currentBlock.setPendingAndCloseBlock()
+                            self.closeBlock(currentBlock)
                             readyBlocks.append(currentBlock)
                             currentBlock = self.getBlock(newFile = newFile,
                                                          location = location)
@@ -438,7 +524,7 @@ class DBSUploadPoller(BaseWorkerThread):
                     readyBlocks.append(currentBlock)
 
         for block in readyBlocks:
-            self.blockCache[block.getName()] = block
+            self.addToBlockCache(block)
 
         return
 
@@ -449,13 +535,73 @@ class DBSUploadPoller(BaseWorkerThread):
         Mark Open blocks as Pending if they have timed out or their workflows have completed
         """
         completedWorkflows = self.dbsUtil.getCompletedWorkflows()
-        for block in self.blockCache.values():
-            if block.status == "Open":
-                if ( block.getTime() > block.getMaxBlockTime() ) or any (key in completedWorkflows for key in block.workflows):
-                    block.setPendingAndCloseBlock()
+        for block in self.getOpenBlocks():
+            if ( block.getTime() > block.getMaxBlockTime() ) or any (key in completedWorkflows for key in block.workflows):
+                self.closeBlock(block)
+
+        return
+
+    def addToBlockCache(self, block):
+        """
+        _addToBlockCache_
+
+        Add a block to the cache, and to the open block index if it is open
+        """
+        blockname = block.getName()
+        self.blockCache[blockname] = block
+        if block.status == 'Open':
+            key = (block.getDatasetPath(), block.getLocation())
+            self.openBlocks.setdefault(key, set()).add(blockname)
+        return
+
+    def removeFromBlockCache(self, blockname):
+        """
+        _removeFromBlockCache_
 
+        Drop a block from the cache and from the open block index
+        """
+        block = self.blockCache.pop(blockname)
+        self.dropOpenBlock(block)
+        return
+
+    def dropOpenBlock(self, block):
+        """
+        _dropOpenBlock_
+
+        Remove a block from the open block index
+        """
+        key = (block.getDatasetPath(), block.getLocation())
+        names = self.openBlocks.get(key)
+        if names is not None:
+            names.discard(block.getName())
+            if not names:
+                del self.openBlocks[key]
         return
 
+    def closeBlock(self, block):
+        """
+        _closeBlock_
+
+        Mark a block as pending so that it gets uploaded
+        """
+        block.setPendingAndCloseBlock()
+        self.dropOpenBlock(block)
+        return
+
+    def getOpenBlocks(self):
+        """
+        _getOpenBlocks_
+
+        List the open blocks in the cache
+        """
+        openBlocks = []
+        for names in self.openBlocks.values():
+            for name in names:
+                block = self.blockCache[name]
+                if block.status == 'Open':
+                    openBlocks.append(block)
+        return openBlocks
+
     def isBlockOpen(self, newFile, block, doTime = False):
         """
         _isBlockOpen_
@@ -495,20 +641,23 @@ class DBSUploadPoller(BaseWorkerThread):
         """
         datasetpath = newFile["datasetPath"]
 
-        for block in self.blockCache.values():
-            if datasetpath == block.getDatasetPath() and location == block.getLocation():
-                if not self.isBlockOpen(newFile = newFile, block = block) and not skipOpenCheck:
-                    # Block isn't open anymore.  Mark it as pending so that it gets uploaded.
-                    block.setPendingAndCloseBlock()
-                else:
-                    return block
+        for blockname in list(self.openBlocks.get((datasetpath, location), [])):
+            block = self.blockCache[blockname]
+            if block.status != 'Open':
+                # Status changed outside of closeBlock, drop it from the index
+                self.dropOpenBlock(block)
+            elif not self.isBlockOpen(newFile = newFile, block = block) and not skipOpenCheck:
+                # Block isn't open anymore.  Mark it as pending so that it gets uploaded.
+                self.closeBlock(block)
+            else:
+                return block
 
         # A suitable open block does not exist.  Create a new one.
         blockname = "%s#%s" % (datasetpath, makeUUID())
         newBlock = DBSBufferBlock(name = blockname,
                                   location = location,
                                   datasetpath = datasetpath)
-        self.blockCache[blockname] = newBlock
+        self.addToBlockCache(newBlock)
         return newBlock
 
     def inputBlocks(self):
@@ -613,12 +762,33 @@ class DBSUploadPoller(BaseWorkerThread):
             else:
                 myThread.transaction.commit()
 
-        # Finally upload blocks to DBS.
+        # Finally queue the blocks for upload to DBS.
+        waitingBlocks = set(self.blocksToUpload)
         for block in createInDBS:
             if len(block.files) < 1:
                 # What are we doing?
                 logging.debug("Skipping empty block")
                 continue
+            if block.getName() not in waitingBlocks:
+                self.blocksToUpload.append(block.getName())
+
+        self.submitBlocks()
+
+        # And all work is in and we're done for now
+        return
+
+    def submitBlocks(self):
+        """
+        _submitBlocks_
+
+        Hand blocks waiting for upload to the upload processes until the
+        upload window is full.  Blocks are only converted to their DBS
+        form here, so at most a window of them is held encoded.
+        """
+        while self.blocksToUpload and len(self.queuedBlocks) < self.uploadWindow.size:
+            block = self.blockCache.get(self.blocksToUpload.popleft())
+            if block is None or block.status != 'Pending':
+                continue
             if block.getDataset() == None:
                 # Then we have to fix the dataset
                 dbsFile = block.files[0]
@@ -629,11 +799,10 @@ class DBSUploadPoller(BaseWorkerThread):
                                  prep_id = dbsFile.get('prep_id', None))
             logging.debug("Found block %s in blocks", block.getName())
             block.setPhysicsGroup(group = self.physicsGroup)
-            
+
             encodedBlock = block.convertToDBSBlock()
             logging.info("About to insert block %s", block.getName())
             self.workInput.put({'name': block.getName(), 'block': encodedBlock})
-            self.blockCount += 1
             if self.produceCopy:
                 import json
                 f = open(self.copyPath, 'w')
@@ -641,7 +810,6 @@ class DBSUploadPoller(BaseWorkerThread):
                 f.close()
             self.queuedBlocks.append(block.getName())
 
-        # And all work is in and we're done for now
         return
 
     def retrieveBlocks(self):
@@ -652,50 +820,37 @@ class DBSUploadPoller(BaseWorkerThread):
         in them.  What we do is get everything out of the result queue,
         and then update it in DBSBuffer.
 
-        To do this, the result queue needs to pass back the blockname
+        To do this, the result queue needs to pass back the blockname.
+        Every result frees a slot in the upload window for the next block,
+        and uploaded blocks are recorded in DBSBuffer in batches.  When no
+        result comes back for a while the cycle ends, the blocks still in
+        DBS are collected in the next cycle.
         """
-        myThread = threading.currentThread()
-
-        updateBlocksDAO = self.daoFactory(classname = "UpdateBlocks")
-        updateFilesDAO = self.daoFactory(classname = "UpdateFiles")
-
-        blocksToClose = []
+        loadedBlocks  = []
         emptyCount    = 0
-        while self.blockCount > 0:
+        while len(self.queuedBlocks) > 0:
             if emptyCount > self.nTries:
-                
-                # When timeoutWaiver is 0 raise error. 
-                # It could take long time to get upload data to DBS 
-                # if there are a lot of files are cumulated in the buffer.
-                # in first try but second try should be faster.
-                # timeoutWaiver is set as component variable - only resets when component restarted.
-                # The reason for that is only back log will occur when component is down 
-                # for a long time while other component still running and feeding the data to 
-                # dbsbuffer
-        
-                if self.timeoutWaiver == 0:
-                    msg = "Exceeded max number of waits while waiting for DBS to finish"
-                    raise DBSUploadException(msg)
-                else:
-                    self.timeoutWaiver = 0
-                    return
+                logging.warning("No answer from DBS for %i blocks, collecting them in the next cycle",
+                                len(self.queuedBlocks))
+                break
             try:
                 # Get stuff out of the queue with a ridiculously
                 # short wait time
-                blockresult = self.workResult.get(timeout = self.wait)
-                blocksToClose.append(blockresult)
-                self.blockCount -= 1
+                result = self.workResult.get(timeout = self.wait)
+                emptyCount = 0
                 logging.debug("Got a block to close")
             except Queue.Empty:
                 # This means the queue has no current results
-                time.sleep(2)
                 emptyCount += 1
+                if not all([proc.is_alive() for proc in self.pool]):
+                    logging.error("An upload process died, restarting the upload pool")
+                    self.close()
+                    break
                 continue
 
-        loadedBlocks = []
-        for result in blocksToClose:
             # Remove from list of work being processed
             self.queuedBlocks.remove(result.get('name'))
+            self.uploadWindow.update(result.get('time', 0), result["success"] != "error")
             if result["success"] == "uploaded":
                 block = self.blockCache.get(result.get('name'))
                 block.status = 'InDBS'
@@ -709,7 +864,46 @@ class DBSUploadPoller(BaseWorkerThread):
                 # Continue to the next block
                 # Block will remain in pending status until it is transferred
 
+            self.submitBlocks()
+            if len(loadedBlocks) >= self.recordBatch:
+                self.recordBlocks(loadedBlocks)
+                loadedBlocks = []
+
         if len(loadedBlocks) > 0:
+            self.recordBlocks(loadedBlocks)
+
+        if self.uploadWindow.latency is not None:
+            logging.info("DBS insertion latency %.1f seconds, upload window %i blocks",
+                         self.uploadWindow.latency, self.uploadWindow.size)
+
+        # And we're done
+        return
+
+    def recordBlocks(self, loadedBlocks):
+        """
+        _recordBlocks_
+
+        Mark blocks uploaded to DBS and their files as InDBS in DBSBuffer
+        and drop them from the cache
+        """
+        myThread = threading.currentThread()
+
+        updateBlocksDAO = self.daoFactory(classname = "UpdateBlocks")
+        updateFilesDAO = self.daoFactory(classname = "UpdateFiles")
+
+        try:
+            myThread.transaction.begin()
+            updateFilesDAO.execute(blocks = loadedBlocks, status = "InDBS",
+                                   conn = myThread.transaction.conn,
+                                   transaction = True)
+            updateBlocksDAO.execute(blocks = loadedBlocks,
+                                    conn = myThread.transaction.conn,
+                                    transaction = True)
+        except Exception as ex:
+            myThread.transaction.rollback()
+            # possible deadlock with PhEDExInjector, retry once after 10s
+            logging.warning("Oracle exception, possible deadlock due to race condition, retry after 10s sleep")
+            time.sleep(10)
             try:
                 myThread.transaction.begin()
                 updateFilesDAO.execute(blocks = loadedBlocks, status = "InDBS",
@@ -720,40 +914,21 @@ class DBSUploadPoller(BaseWorkerThread):
                                         transaction = True)
             except Exception as ex:
                 myThread.transaction.rollback()
-                # possible deadlock with PhEDExInjector, retry once after 10s
-                logging.warning("Oracle exception, possible deadlock due to race condition, retry after 10s sleep")
-                time.sleep(10)
-                try:
-                    myThread.transaction.begin()
-                    updateFilesDAO.execute(blocks = loadedBlocks, status = "InDBS",
-                                           conn = myThread.transaction.conn,
-                                           transaction = True)
-                    updateBlocksDAO.execute(blocks = loadedBlocks,
-                                            conn = myThread.transaction.conn,
-                                            transaction = True)
-                except Exception as ex:
-                    myThread.transaction.rollback()
-                    msg =  "Unhandled exception while finished closed blocks in DBSBuffer\n"
-                    msg += str(ex)
-                    logging.error(msg)
-                    logging.debug("Blocks for Update: %s\n", loadedBlocks)
-                    raise DBSUploadException(msg)
-                else:
-                    myThread.transaction.commit()
-
+                msg =  "Unhandled exception while finished closed blocks in DBSBuffer\n"
+                msg += str(ex)
+                logging.error(msg)
+                logging.debug("Blocks for Update: %s\n", loadedBlocks)
+                raise DBSUploadException(msg)
             else:
                 myThread.transaction.commit()
 
+        else:
+            myThread.transaction.commit()
+
         for block in loadedBlocks:
             # Clean things up
-            name = block.getName()
-            del self.blockCache[name]
-
-        # Clean up the pool so we don't have stuff waiting around
-        if len(self.pool) > 0:
-            self.close()
+            self.removeFromBlockCache(block.getName())
 
-        # And we're done
         return
 
     def checkBlocks(self):
@@ -814,8 +989,7 @@ class DBSUploadPoller(BaseWorkerThread):
 
         for block in blocksUploaded:
             # Clean things up
-            name = block.getName()
-            del self.blockCache[name]
+            self.removeFromBlockCache(block.getName())
 
         # Clean the check list
         self.blocksToCheck = []
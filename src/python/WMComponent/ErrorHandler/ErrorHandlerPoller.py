@@ -24,11 +24,18 @@ config.ErrorHandler.passExitCodes:  This should be a list of exitCodes that you
 immediately to the 'created' state, skipping cooloff.  It defaults to [].
 
 Note that failureExitCodes has precedence over passExitCodes.
+
+The decision is taken from the summary the JobAccountant writes next to the
+FWJR of a failed job.  The full FWJR is only loaded for jobs without one,
+in config.ErrorHandler.readFWJRProcesses worker processes when there are at
+least config.ErrorHandler.minParallelReports of them.
 """
 import os.path
 import threading
 import logging
 import traceback
+import Queue
+import multiprocessing
 from httplib import HTTPException
 
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
@@ -39,7 +46,7 @@ from WMCore.DAOFactory        import DAOFactory
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.ACDC.DataCollectionService  import DataCollectionService
 from WMCore.WMException                 import WMException
-from WMCore.FwkJobReport.Report         import Report
+from WMCore.FwkJobReport.Report         import loadReportSummary, loadSummaryFromReport
 from WMCore.Database.CouchUtils import CouchConnectionError
 
 
@@ -51,6 +58,31 @@ class ErrorHandlerException(WMException):
     pass
 
 
+def reportWorker(workInput, results):
+    """
+    _reportWorker_
+
+    Load the FWJRs of the jobs put in workInput and send back their
+    summaries, or the error hit loading them.
+    """
+    while True:
+        try:
+            work = workInput.get()
+        except (EOFError, IOError):
+            break
+
+        if work == 'STOP':
+            break
+
+        jobID, reportPath = work
+        try:
+            results.put((jobID, loadSummaryFromReport(reportPath), None))
+        except Exception as ex:
+            results.put((jobID, None, str(ex)))
+
+    return
+
+
 class ErrorHandlerPoller(BaseWorkerThread):
     """
     Polls for Error Conditions, handles them
@@ -80,6 +112,13 @@ class ErrorHandlerPoller(BaseWorkerThread):
         self.maxFailTime    = getattr(self.config.ErrorHandler, 'maxFailTime', 32 * 3600)
         self.readFWJR       = getattr(self.config.ErrorHandler, 'readFWJR', False)
         self.passCodes      = getattr(self.config.ErrorHandler, 'passExitCodes', [])
+        self.nProcesses     = getattr(self.config.ErrorHandler, 'readFWJRProcesses', 4)
+        self.minParallel    = getattr(self.config.ErrorHandler, 'minParallelReports', 50)
+        self.reportTimeout  = getattr(self.config.ErrorHandler, 'readFWJRTimeout', 300)
+
+        self.pool       = []
+        self.workInput  = None
+        self.workResult = None
 
         self.getJobs    = self.daoFactory(classname = "Jobs.GetAllJobs")
         self.idLoad     = self.daoFactory(classname = "Jobs.LoadFromIDWithType")
@@ -105,6 +144,112 @@ class ErrorHandlerPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        self.close()
+        self.changeState.flushCouch()
+
+    def setupPool(self):
+        """
+        _setupPool_
+
+        Start the processes loading full FWJRs
+        """
+        if len(self.pool) > 0:
+            return
+
+        self.workInput  = multiprocessing.Queue()
+        self.workResult = multiprocessing.Queue()
+        for _ in range(self.nProcesses):
+            p = multiprocessing.Process(target = reportWorker,
+                                        args = (self.workInput, self.workResult))
+            p.start()
+            self.pool.append(p)
+
+        return
+
+    def close(self, terminate = False):
+        """
+        _close_
+
+        Stop the processes loading full FWJRs
+        """
+        for proc in self.pool:
+            if terminate:
+                proc.terminate()
+            else:
+                self.workInput.put('STOP')
+        for proc in self.pool:
+            proc.join()
+        self.pool = []
+        self.workInput = None
+        self.workResult = None
+        return
+
+    def loadFullReports(self, jobList):
+        """
+        _loadFullReports_
+
+        Load the FWJRs of jobs without a report summary.  Return the summary
+        of each job by job id, None if the FWJR could not be loaded.
+        """
+        summaries = {}
+        if len(jobList) < max(self.minParallel, 1) or self.nProcesses < 2:
+            for job in jobList:
+                try:
+                    summaries[job['id']] = loadSummaryFromReport(job['fwjr_path'])
+                except Exception as ex:
+                    logging.warning("Exception while trying to load FWJR %s: %s", job['fwjr_path'], str(ex))
+                    summaries[job['id']] = None
+            return summaries
+
+        logging.info("Loading %i FWJRs in %i processes", len(jobList), self.nProcesses)
+        self.setupPool()
+        for job in jobList:
+            self.workInput.put((job['id'], job['fwjr_path']))
+
+        for _ in jobList:
+            try:
+                jobID, summary, error = self.workResult.get(timeout = self.reportTimeout)
+            except Queue.Empty:
+                logging.error("Timed out loading FWJRs, %i of them left unread",
+                              len(jobList) - len(summaries))
+                self.close(terminate = True)
+                break
+            if error is not None:
+                logging.warning("Exception while trying to load FWJR of job %i: %s", jobID, error)
+            summaries[jobID] = summary
+
+        return summaries
+
+    def triageJob(self, job, summary):
+        """
+        _triageJob_
+
+        Decide from a FWJR summary if a job goes to cooloff, is exhausted
+        or is retried right away.  Returns 'cooloff', 'exhaust' or 'pass'.
+        """
+        # First let's check the time conditions
+        startTime = summary['startTime']
+        stopTime = summary['stopTime']
+
+        if startTime is None or stopTime is None:
+            # We have no information to make a decision, keep going.
+            logging.debug("No start, stop times for steps for job %i" % job['id'])
+        elif stopTime - startTime > self.maxFailTime:
+            msg = "Job %i exhausted after running on node for %i seconds" % (job['id'], stopTime - startTime)
+            logging.debug(msg)
+            return 'exhaust'
+
+        exitCodes = summary['exitCodes']
+        if len([x for x in exitCodes if x in self.exitCodes]):
+            msg = "Job %i exhausted due to a bad exit code (%s)" % (job['id'], str(exitCodes))
+            logging.error(msg)
+            return 'exhaust'
+
+        if len([x for x in exitCodes if x in self.passCodes]):
+            msg = "Job %i restarted immediately due to an exit code (%s)" % (job['id'], str(exitCodes))
+            return 'pass'
+
+        return 'cooloff'
 
     def exhaustJobs(self, jobList):
         """
@@ -197,8 +342,10 @@ class ErrorHandlerPoller(BaseWorkerThread):
         cooloffJobs = []
         passJobs = []
         exhaustJobs = []
+        summaries = {}
+        jobsToTriage = []
+        jobsToLoad = []
         for job in jobList:
-            report     = Report()
             reportPath = job['fwjr_path']
             if reportPath is None:
                 logging.error("No FWJR in job %i, ErrorHandler can't process it.\n Passing it to cooloff." % job['id'])
@@ -208,42 +355,29 @@ class ErrorHandlerPoller(BaseWorkerThread):
                 logging.error("Failed to find FWJR for job %i in location %s.\n Passing it to cooloff." % (job['id'], reportPath))
                 cooloffJobs.append(job)
                 continue
-            try:
-                report.load(reportPath)
-                # First let's check the time conditions
-                times = report.getFirstStartLastStop()
-                startTime = None
-                stopTime = None
-                if times is not None:
-                    startTime = times['startTime']
-                    stopTime = times['stopTime']
-
-                if startTime is None or stopTime is None:
-                    # We have no information to make a decision, keep going.
-                    logging.debug("No start, stop times for steps for job %i" % job['id'])
-                elif stopTime - startTime > self.maxFailTime:
-                    msg = "Job %i exhausted after running on node for %i seconds" % (job['id'], stopTime - startTime)
-                    logging.debug(msg)
-                    exhaustJobs.append(job)
-                    continue
-
-                if len([x for x in report.getExitCodes() if x in self.exitCodes]):
-                    msg = "Job %i exhausted due to a bad exit code (%s)" % (job['id'], str(report.getExitCodes()))
-                    logging.error(msg)
-                    exhaustJobs.append(job)
-                    continue
-
-                if len([x for x in report.getExitCodes() if x in self.passCodes]):
-                    msg = "Job %i restarted immediately due to an exit code (%s)" % (job['id'], str(report.getExitCodes()))
-                    passJobs.append(job)
-                    continue
+            jobsToTriage.append(job)
+            summaries[job['id']] = loadReportSummary(reportPath)
+            if summaries[job['id']] is None:
+                jobsToLoad.append(job)
 
-                cooloffJobs.append(job)
+        if len(jobsToLoad) > 0:
+            summaries.update(self.loadFullReports(jobsToLoad))
 
+        for job in jobsToTriage:
+            summary = summaries.get(job['id'], None)
+            try:
+                decision = self.triageJob(job, summary)
             except Exception as ex:
                 logging.warning("Exception while trying to check jobs for failures!")
                 logging.warning(str(ex))
                 logging.warning("Ignoring and sending job to cooloff")
+                decision = 'cooloff'
+
+            if decision == 'exhaust':
+                exhaustJobs.append(job)
+            elif decision == 'pass':
+                passJobs.append(job)
+            else:
                 cooloffJobs.append(job)
 
         return cooloffJobs, passJobs, exhaustJobs
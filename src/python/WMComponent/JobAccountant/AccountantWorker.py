@@ -62,10 +62,10 @@ class AccountantWorker(WMConnectionBase):
                                         logger = myThread.logger,
                                         dbinterface = myThread.dbi)
 
-        self.getOutputMapAction      = self.daofactory(classname = "Jobs.GetOutputMap")
+        self.getOutputMapAction      = self.daofactory(classname = "Workflow.LoadOutput")
+        self.getJobContextAction     = self.daofactory(classname = "Jobs.LoadForAccountant")
         self.bulkAddToFilesetAction  = self.daofactory(classname = "Fileset.BulkAddByLFN")
         self.bulkParentageAction     = self.daofactory(classname = "Files.AddBulkParentage")
-        self.getJobTypeAction        = self.daofactory(classname = "Jobs.GetType")
         self.getParentInfoAction     = self.daofactory(classname = "Files.GetParentInfo")
         self.setParentageByJob       = self.daofactory(classname = "Files.SetParentageByJob")
         self.setParentageByMergeJob  = self.daofactory(classname = "Files.SetParentageByMergeJob")
@@ -132,6 +132,9 @@ class AccountantWorker(WMConnectionBase):
         self.dbsLocations      = set()
         self.workflowIDs       = collections.deque(maxlen = 1000)
         self.workflowPaths     = collections.deque(maxlen = 1000)
+        self.jobContexts       = {}
+        self.jobsWithMissingReport = set()
+        self.outputMaps        = {}
 
         self.phedex = PhEDEx()
         self.locLists = self.phedex.getNodeMap()
@@ -156,9 +159,50 @@ class AccountantWorker(WMConnectionBase):
         self.parentageBinds    = []
         self.parentageBindsForMerge = []
         self.jobsWithSkippedFiles = {}
+        self.jobContexts       = {}
+        # jobs whose report could not be loaded from their fwjr_path
+        self.jobsWithMissingReport = set()
         gc.collect()
         return
 
+    def loadJobContexts(self, jobIDs):
+        """
+        _loadJobContexts_
+
+        Load the job information, job types, masks and output fileset IDs
+        of a list of jobs in bulk, along with the output maps of their
+        workflows.  Output maps are kept across calls, for up to 1000
+        workflows.
+        """
+        jobIDs = [jobID for jobID in jobIDs if jobID not in self.jobContexts]
+        if len(jobIDs) == 0:
+            return
+
+        self.jobContexts.update(self.getJobContextAction.execute(jobID = jobIDs,
+                                                                 conn = self.getDBConn(),
+                                                                 transaction = self.existingTransaction()))
+
+        workflows = set([context["workflow"] for context in self.jobContexts.values()])
+        if len(self.outputMaps) + len(workflows) > 1000:
+            self.outputMaps = {}
+        workflows.difference_update(self.outputMaps.keys())
+        for workflow in workflows:
+            self.outputMaps[workflow] = self.getOutputMapAction.execute(workflow = workflow,
+                                                                        conn = self.getDBConn(),
+                                                                        transaction = self.existingTransaction())
+        return
+
+    def getJobContext(self, jobID):
+        """
+        _getJobContext_
+
+        Return the information loaded by loadJobContexts for a job, loading
+        it if needed.
+        """
+        if jobID not in self.jobContexts:
+            self.loadJobContexts([jobID])
+        return self.jobContexts[jobID]
+
     def loadJobReport(self, parameters):
         """
         _loadJobReport_
@@ -200,6 +244,26 @@ class AccountantWorker(WMConnectionBase):
 
         return jobReport
 
+    def saveReportSummary(self, jobReport, jobReportPath):
+        """
+        _saveReportSummary_
+
+        Write the summary of a failed job report next to it, so that the
+        ErrorHandler doesn't have to load the full report.  Only for reports
+        loaded from jobReportPath, not for the ones made up by
+        createMissingFWKJR.
+        """
+        if not jobReportPath:
+            return
+        jobReportPath = jobReportPath.replace("file://", "")
+        if not os.path.isfile(jobReportPath):
+            return
+        try:
+            jobReport.saveSummary(jobReportPath)
+        except Exception as ex:
+            logging.warning("Could not write the summary of jobReport %s: %s", jobReportPath, str(ex))
+        return
+
     def isTaskExistInFWJR(self, jobReport, jobStatus):
         """
         If taskName is not available in the FWJR, then tries to
@@ -234,6 +298,8 @@ class AccountantWorker(WMConnectionBase):
         returnList = []
         self.reset()
 
+        self.loadJobContexts([job["id"] for job in parameters])
+
         for job in parameters:
             logging.info("Handling %s" % job["fwjr_path"])
 
@@ -244,6 +310,9 @@ class AccountantWorker(WMConnectionBase):
             jobSuccess = self.handleJob(jobID = job["id"],
                                         fwkJobReport = fwkJobReport)
 
+            if not jobSuccess and job["id"] not in self.jobsWithMissingReport:
+                self.saveReportSummary(fwkJobReport, job["fwjr_path"])
+
             if self.returnJobReport:
                 returnList.append({'id': job["id"], 'jobSuccess': jobSuccess,
                                    'jobReport': fwkJobReport})
@@ -464,13 +533,9 @@ class AccountantWorker(WMConnectionBase):
         """
         jobSuccess = fwkJobReport.taskSuccessful()
 
-        outputMap = self.getOutputMapAction.execute(jobID = jobID,
-                                                    conn = self.getDBConn(),
-                                                    transaction = self.existingTransaction())
-
-        jobType = self.getJobTypeAction.execute(jobID = jobID,
-                                                conn = self.getDBConn(),
-                                                transaction = self.existingTransaction())
+        jobContext = self.getJobContext(jobID)
+        outputMap = self.outputMaps[jobContext["workflow"]]
+        jobType = jobContext["type"]
 
         if jobSuccess:
             fileList = fwkJobReport.getAllFiles()
@@ -539,9 +604,11 @@ class AccountantWorker(WMConnectionBase):
         if not skipLogCollect:
 
             wmbsJob = Job(id = jobID)
-            wmbsJob.load()
-            outputID = wmbsJob.loadOutputID()
-            wmbsJob.getMask()
+            for key in ["jobgroup", "name", "state", "state_time", "retry_count",
+                        "couch_record", "cache_dir", "location", "outcome", "fwjr_path"]:
+                wmbsJob[key] = jobContext[key]
+            outputID = jobContext["output_fileset"]
+            wmbsJob["mask"].loadMaskEntries(jobContext["masks"])
 
             wmbsJob["fwjr"] = fwkJobReport
 
@@ -636,6 +703,7 @@ class AccountantWorker(WMConnectionBase):
         Create a missing FWJR if the report can't be found by the code in the
         path location.
         """
+        self.jobsWithMissingReport.add(parameters["id"])
         report = Report()
         report.addError("cmsRun1", 84, errorCode, errorDescription)
         report.data.cmsRun1.status = "Failed"
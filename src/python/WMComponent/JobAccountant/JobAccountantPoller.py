@@ -52,6 +52,15 @@ class JobAccountantPoller(BaseWorkerThread):
         self.getJobsAction = daoFactory(classname = "Jobs.GetFWJRByState")
         return
 
+    def terminate(self, parameters = None):
+        """
+        _terminate_
+
+        Write the jobdump documents still queued before the component dies.
+        """
+        self.accountantWorker.stateChanger.flushCouch()
+        return
+
     def algorithm(self, parameters = None):
         """
         _algorithm_
@@ -111,6 +111,7 @@ class JobArchiverPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        self.changeState.flushCouch()
         return
 
     def algorithm(self, parameters=None):
@@ -19,9 +19,10 @@ import traceback
 
 from subprocess import Popen, PIPE
 from WMCore.DAOFactory        import DAOFactory
-from WMCore.WMSpec.WMWorkload               import WMWorkload, WMWorkloadHelper
+from WMCore.WMSpec.Persistency import loadCachedWorkload
 from WMCore.WMException import WMException
 from Utils.IterTools import grouper
+from WMComponent.JobCreator.SubmitIndex import listJobDirs
 
 
 def createDirectories(dirList):
@@ -89,8 +90,7 @@ def getMasterName(startDir, wmWorkload = None, workflow = None):
         logging.error(msg)
         raise CreateWorkAreaException(msg)
     else:
-        wmWorkload = WMWorkloadHelper(WMWorkload("workload"))
-        wmWorkload.load(workflow.spec)
+        wmWorkload = loadCachedWorkload(workflow.spec)
 
         workload = wmWorkload.name()
 
@@ -322,7 +322,7 @@ class CreateWorkArea:
             return 0
         if os.path.isdir(jobCollDir):
             #This should never happen
-            return len(os.listdir(jobCollDir))
+            return len(listJobDirs(jobCollDir))
         elif os.path.isfile(jobCollDir):
             #Well, you're screwed.  Some other file is in the way: IN A DIRECTORY YOU JUST CREATED.
             #Time to freak the hell out
@@ -7,10 +7,13 @@ __all__ = []
 
 import os
 import os.path
+import time
+import Queue
 import cPickle
 import logging
 import traceback
 import threading
+import multiprocessing
 
 from WMCore.WorkerThreads.BaseWorkerThread  import BaseWorkerThread
 from WMCore.DAOFactory                      import DAOFactory
@@ -19,11 +22,14 @@ from WMCore.WMException                     import WMException
 from WMCore.JobSplitting.Generators.GeneratorManager import GeneratorManager
 from WMCore.JobStateMachine.ChangeState     import ChangeState
 from WMComponent.JobCreator.CreateWorkArea  import CreateWorkArea
+from WMComponent.JobCreator.SubmitIndex     import saveSubmitIndex
 from WMCore.JobSplitting.SplitterFactory    import SplitterFactory
 from WMCore.WMBS.Subscription               import Subscription
 from WMCore.WMBS.Workflow                   import Workflow
-from WMCore.WMSpec.WMWorkload               import WMWorkload, WMWorkloadHelper
+from WMCore.WMSpec.Persistency             import loadCachedWorkload, specCacheSummary
 from WMCore.FwkJobReport.Report             import Report
+from WMCore.WMInit                          import WMInit
+from WMCore.Database.DBFactory              import DBFactory
 
 
 def retrieveWMSpec(workflow = None, wmWorkloadURL = None):
@@ -31,6 +37,7 @@ def retrieveWMSpec(workflow = None, wmWorkloadURL = None):
     _retrieveWMSpec_
 
     Given a subscription, this function loads the WMSpec associated with that workload
+    through the process wide spec cache, the workload must not be modified.
     """
     if not wmWorkloadURL and workflow:
         wmWorkloadURL = workflow.spec
@@ -39,10 +46,7 @@ def retrieveWMSpec(workflow = None, wmWorkloadURL = None):
         logging.error("WMWorkloadURL %s is empty" % (wmWorkloadURL))
         return None
 
-    wmWorkload = WMWorkloadHelper(WMWorkload("workload"))
-    wmWorkload.load(wmWorkloadURL)
-
-    return wmWorkload
+    return loadCachedWorkload(wmWorkloadURL)
 
 
 def retrieveJobSplitParams(wmWorkload, task):
@@ -224,6 +228,9 @@ def creatorProcess(work, jobCacheDir):
                     inputDatasetLocations = inputDatasetLocations,
                     allowOpportunistic = allowOpportunistic)
 
+        # and the compact version of the jobs for the JobSubmitter
+        saveSubmitIndex(wmbsJobGroup.jobs)
+
     except Exception as ex:
         # Register as failure; move on
         msg =  "Exception in processing wmbsJobGroup %i\n" % wmbsJobGroup.id
@@ -331,6 +338,77 @@ def creatorProcess(work, jobCacheDir):
 
 
 
+# Database objects inherited by a splitting process from its parent
+_inheritedConnections = []
+
+
+def connectSplittingProcess(config):
+    """
+    _connectSplittingProcess_
+
+    Give a forked splitting process database connections of its own.  The
+    engines, pooled connections and transaction inherited from the parent
+    share their sockets with it, and closing or garbage collecting them
+    here would roll back or close the connections of the parent.  They are
+    kept referenced and unused for the life of the process instead, which
+    ends with os._exit without finalizing them.
+    """
+    myThread = threading.currentThread()
+    _inheritedConnections.append((getattr(myThread, "transaction", None),
+                                  getattr(myThread, "dbi", None),
+                                  getattr(myThread, "dbFactory", None),
+                                  DBFactory._engineMap.values()))
+    DBFactory._engineMap.clear()
+    myThread.transaction = None
+    myThread.dialect = None
+
+    connectUrl = config.CoreDatabase.connectUrl
+    WMInit().setDatabaseConnection(dbConfig = connectUrl,
+                                   dialect = connectUrl.split(":", 1)[0],
+                                   socketLoc = getattr(config.CoreDatabase, "socket", None))
+    return
+
+
+def splittingWorker(input, results, config):
+    """
+    _splittingWorker_
+
+    Process of the parallel splitting mode.  It opens its own database
+    connection and splits the lists of subscriptions it receives with a
+    JobCreatorPoller of its own, putting one result per subscription.
+    """
+    myThread = threading.currentThread()
+    connectSplittingProcess(config)
+    poller = JobCreatorPoller(config)
+
+    while True:
+        try:
+            work = input.get()
+        except (EOFError, IOError) as ex:
+            logging.error("Hit EOF/IO in getting new work, stopping splitting process: %s" % str(ex))
+            break
+
+        if work == 'STOP':
+            break
+
+        for subscriptionID in work:
+            startTime = time.time()
+            try:
+                jobsCreated = poller.processSubscription(subscriptionID)
+                results.put({'subscription': subscriptionID, 'success': True,
+                             'jobs': jobsCreated, 'time': time.time() - startTime})
+            except Exception as ex:
+                if getattr(myThread.transaction, 'transaction', None) is not None:
+                    myThread.transaction.rollback()
+                msg = "%s\n%s" % (str(ex), traceback.format_exc())
+                logging.error("Failed to create jobs for subscription %i: %s" % (subscriptionID, msg))
+                results.put({'subscription': subscriptionID, 'success': False,
+                             'error': str(ex), 'time': time.time() - startTime})
+        poller.changeState.flushCouch()
+
+    return
+
+
 class JobCreatorException(WMException):
     """
     _JobCreatorException_
@@ -378,6 +456,13 @@ class JobCreatorPoller(BaseWorkerThread):
         self.agentNumber    = int(getattr(config.Agent, 'agentNumber', 0))
         self.glideinLimits  = getattr(config.JobCreator, 'GlideInRestriction', None)
 
+        # Parallel splitting, in processes with their own database connection
+        self.splitProcesses = int(getattr(config.JobCreator, 'splitProcesses', 1))
+        self.splitTimeout   = getattr(config.JobCreator, 'splitTimeout', 60)
+        self.splitPool      = []
+        self.splitInput     = None
+        self.splitResult    = None
+
         # initialize the alert framework (if available - config.Alert present)
         #    self.sendAlert will be then be available
         self.initAlerts(compName = "JobCreator")
@@ -414,6 +499,14 @@ class JobCreatorPoller(BaseWorkerThread):
                       % (self.jobCacheDir)
                 raise JobCreatorException (msg)
 
+    def heartbeatState(self):
+        """
+        _heartbeatState_
+
+        Report the spec cache counters in the heartbeat.
+        """
+        return "%s, %s" % (BaseWorkerThread.heartbeatState(self), specCacheSummary())
+
 
     def algorithm(self, parameters = None):
         """
@@ -451,6 +544,8 @@ class JobCreatorPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        self.stopSplittingPool()
+        self.changeState.flushCouch()
 
 
     def pollSubscriptions(self):
@@ -459,204 +554,336 @@ class JobCreatorPoller(BaseWorkerThread):
 
         """
         logging.info("Beginning JobCreator.pollSubscriptions() cycle.")
-        myThread = threading.currentThread()
 
         #First, get list of Subscriptions
         subscriptions    = self.subscriptionList.execute()
 
+        if self.splitProcesses > 1:
+            self.splitInParallel(subscriptions)
+            return
+
         # Okay, now we have a list of subscriptions
+        for subscriptionID in subscriptions:
+            startTime = time.time()
+            jobsCreated = self.processSubscription(subscriptionID)
+            logging.info("Created %i jobs for subscription %i in %.2f seconds" % (jobsCreated, subscriptionID,
+                                                                                  time.time() - startTime))
+        return
+
+    def startSplittingPool(self):
+        """
+        _startSplittingPool_
+
+        Start the splitting processes if they are not running.
+        """
+        if self.splitPool:
+            return
+
+        # Fork without an open transaction or idle pooled connections for
+        # the splitting processes to inherit
+        myThread = threading.currentThread()
+        if getattr(myThread, 'transaction', None) is not None:
+            myThread.transaction.commit()
+        myThread.dbi.engine.dispose()
+
+        logging.info("Starting %i JobCreator splitting processes" % self.splitProcesses)
+        self.splitInput  = multiprocessing.Queue()
+        self.splitResult = multiprocessing.Queue()
+        for _ in range(self.splitProcesses):
+            p = multiprocessing.Process(target = splittingWorker,
+                                        args = (self.splitInput, self.splitResult, self.config))
+            p.start()
+            self.splitPool.append(p)
+        return
+
+    def stopSplittingPool(self):
+        """
+        _stopSplittingPool_
+
+        Stop the splitting processes.
+        """
+        if not self.splitPool:
+            return
+
+        for _ in self.splitPool:
+            self.splitInput.put('STOP')
+        for p in self.splitPool:
+            p.join(self.splitTimeout)
+            if p.is_alive():
+                p.terminate()
+        self.splitPool = []
+        self.splitInput.close()
+        self.splitResult.close()
+        return
+
+    def splitInParallel(self, subscriptions):
+        """
+        _splitInParallel_
+
+        Hand the subscriptions to the splitting processes, one workflow at a
+        time so that the subscriptions of a workflow are split one after the
+        other and keep a consistent job numbering.  Wait for all of them to
+        be done and report the time each one took.
+        """
+        byWorkflow = {}
         for subscriptionID in subscriptions:
             wmbsSubscription = Subscription(id = subscriptionID)
             try:
                 wmbsSubscription.load()
             except IndexError:
-                # This happens when the subscription no longer exists
-                # i.e., someone executed a kill() function on the database
-                # while the JobCreator was in cycle
-                # Ignore this subscription
                 msg = "JobCreator cannot load subscription %i" % subscriptionID
                 logging.error(msg)
                 self.sendAlert(6, msg = msg)
                 continue
+            byWorkflow.setdefault(wmbsSubscription["workflow"].id, []).append(subscriptionID)
+
+        if not byWorkflow:
+            return
+
+        self.startSplittingPool()
+        startTime = time.time()
+        pending = 0
+        for subscriptionIDs in byWorkflow.values():
+            self.splitInput.put(subscriptionIDs)
+            pending += len(subscriptionIDs)
 
-            workflow         = Workflow(id = wmbsSubscription["workflow"].id)
-            workflow.load()
-            wmbsSubscription['workflow'] = workflow
-            wmWorkload       = retrieveWMSpec(workflow = workflow)
-
-            if not workflow.task or not wmWorkload:
-                # Then we have a problem
-                # We NEED a sandbox
-                # Abort this subscription!
-                # But do NOT fail
-                # We have no way of marking a subscription as bad per se
-                # We'll have to just keep skipping it
-                msg = "Have no task for workflow %i\n" % (workflow.id)
-                msg += "Aborting Subscription %i" % (subscriptionID)
+        jobsCreated = 0
+        failures = []
+        while pending > 0:
+            try:
+                result = self.splitResult.get(timeout = self.splitTimeout)
+            except Queue.Empty:
+                if all([p.is_alive() for p in self.splitPool]):
+                    continue
+                self.stopSplittingPool()
+                msg = "A JobCreator splitting process died with %i subscriptions pending" % pending
                 logging.error(msg)
-                self.sendAlert(1, msg = msg)
-                continue
+                self.sendAlert(6, msg = msg)
+                raise JobCreatorException(msg)
 
-            logging.debug("Have loaded subscription %i with workflow %i\n" % (subscriptionID, workflow.id))
+            pending -= 1
+            if result['success']:
+                jobsCreated += result['jobs']
+                logging.info("Created %i jobs for subscription %i in %.2f seconds" % (result['jobs'],
+                                                                                      result['subscription'],
+                                                                                      result['time']))
+            else:
+                failures.append(result)
+
+        logging.info("Created %i jobs for %i workflows in %.2f seconds with %i processes" % (jobsCreated,
+                                                                                             len(byWorkflow),
+                                                                                             time.time() - startTime,
+                                                                                             self.splitProcesses))
+        if failures:
+            msg = "Failed to create jobs for %i subscriptions:\n" % len(failures)
+            for result in failures:
+                msg += "Subscription %i: %s\n" % (result['subscription'], result['error'])
+            logging.error(msg)
+            raise JobCreatorException(msg)
+        return
 
-            # retrieve information from the workload to propagate down to the job configuration
-            allowOpport =  wmWorkload.getAllowOpportunistic()
+    def processSubscription(self, subscriptionID):
+        """
+        _processSubscription_
 
-            # Set task object
-            wmTask = wmWorkload.getTaskByPath(workflow.task)
+        Split a subscription, create the work areas of the new jobs and move
+        them to created.  Return the number of jobs created.
+        """
+        myThread = threading.currentThread()
+        jobsCreated = 0
 
-            # Get generators
-            # If you fail to load the generators, pass on the job
+        wmbsSubscription = Subscription(id = subscriptionID)
+        try:
+            wmbsSubscription.load()
+        except IndexError:
+            # This happens when the subscription no longer exists
+            # i.e., someone executed a kill() function on the database
+            # while the JobCreator was in cycle
+            # Ignore this subscription
+            msg = "JobCreator cannot load subscription %i" % subscriptionID
+            logging.error(msg)
+            self.sendAlert(6, msg = msg)
+            return 0
+
+        workflow         = Workflow(id = wmbsSubscription["workflow"].id)
+        workflow.load()
+        wmbsSubscription['workflow'] = workflow
+        wmWorkload       = retrieveWMSpec(workflow = workflow)
+
+        if not workflow.task or not wmWorkload:
+            # Then we have a problem
+            # We NEED a sandbox
+            # Abort this subscription!
+            # But do NOT fail
+            # We have no way of marking a subscription as bad per se
+            # We'll have to just keep skipping it
+            msg = "Have no task for workflow %i\n" % (workflow.id)
+            msg += "Aborting Subscription %i" % (subscriptionID)
+            logging.error(msg)
+            self.sendAlert(1, msg = msg)
+            return 0
+
+        logging.debug("Have loaded subscription %i with workflow %i\n" % (subscriptionID, workflow.id))
+
+        # retrieve information from the workload to propagate down to the job configuration
+        allowOpport =  wmWorkload.getAllowOpportunistic()
+
+        # Set task object
+        wmTask = wmWorkload.getTaskByPath(workflow.task)
+
+        # Get generators
+        # If you fail to load the generators, pass on the job
+        try:
+            if hasattr(wmTask.data, 'generators'):
+                manager    = GeneratorManager(wmTask)
+                seederList = manager.getGeneratorList()
+            else:
+                seederList = []
+        except Exception as ex:
+            msg =  "Had failure loading generators for subscription %i\n" % (subscriptionID)
+            msg += "Exception: %s\n" % str(ex)
+            msg += "Passing over this error.  It will reoccur next interation!\n"
+            msg += "Please check or remove this subscription!\n"
+            logging.error(msg)
+            self.sendAlert(6, msg = msg)
+            return 0
+
+        logging.debug("Going to call wmbsJobFactory for sub %i with limit %i" % (subscriptionID, self.limit))
+
+        splitParams = retrieveJobSplitParams(wmWorkload, workflow.task)
+        logging.debug("Split Params: %s" % splitParams)
+
+        # My hope is that the job factory is smart enough only to split un-split jobs
+        splitterFactory = SplitterFactory(splitParams.get('algo_package', "WMCore.JobSplitting"))
+        wmbsJobFactory = splitterFactory(package = "WMCore.WMBS",
+                                         subscription = wmbsSubscription,
+                                         generators=seederList,
+                                         limit = self.limit)
+
+        # Turn on the jobFactory
+        wmbsJobFactory.open()
+
+        # Create a function to hold it
+        jobSplittingFunction = runSplitter(jobFactory = wmbsJobFactory,
+                                           splitParams = splitParams)
+
+        # Now we get to find out how many jobs there are.
+        jobNumber = self.countJobs.execute(workflow = workflow.id,
+                                           conn = myThread.transaction.conn,
+                                           transaction = True)
+        jobNumber += splitParams.get('initial_lfn_counter', 0)
+        logging.debug("Have %i jobs for workflow %s already in database." % (jobNumber, workflow.name))
+
+        continueSubscription = True
+        while continueSubscription:
+            # This loop runs over the jobFactory,
+            # using yield statements and a pre-existing proxy to
+            # generate and process new jobs
+
+            # First we need the jobs.
+            myThread.transaction.begin()
+            try:
+                wmbsJobGroups = next(jobSplittingFunction)
+                logging.info("Retrieved %i jobGroups from jobSplitter" % (len(wmbsJobGroups)))
+            except StopIteration:
+                # If you receive a stopIteration, we're done
+                logging.info("Completed iteration over subscription %i" % (subscriptionID))
+                continueSubscription = False
+                myThread.transaction.commit()
+                break
+
+            # If we have no jobGroups, we're done
+            if len(wmbsJobGroups) == 0:
+                logging.info("Found end in iteration over subscription %i" % (subscriptionID))
+                continueSubscription = False
+                myThread.transaction.commit()
+                break
+
+
+            # Assemble a dict of all the info
+            processDict = {'workflow': workflow,
+                           'wmWorkload': wmWorkload, 'wmTaskName': wmTask.getPathName(),
+                           'jobNumber': jobNumber, 'sandbox': wmTask.data.input.sandbox,
+                           'owner': wmWorkload.getOwner().get('name', None),
+                           'ownerDN': wmWorkload.getOwner().get('dn', None),
+                           'ownerGroup': wmWorkload.getOwner().get('vogroup', ''),
+                           'ownerRole': wmWorkload.getOwner().get('vorole', ''),
+                           'numberOfCores': 1,
+                           'inputDataset': wmTask.getInputDatasetPath()}
+            try:
+                maxCores = 1
+                stepNames = wmTask.listAllStepNames()
+                for stepName in stepNames:
+                    sh = wmTask.getStep(stepName)
+                    maxCores = max(maxCores, sh.getNumberOfCores())
+                processDict.update({'numberOfCores' : maxCores})
+            except AttributeError:
+                logging.info("Failed to read multicore settings from task %s" % wmTask.getPathName())
+
+            tempSubscription = Subscription(id = wmbsSubscription['id'])
+
+            # if we have glideinWMS constraints, then adapt all jobs
+            if self.glideinLimits:
+                capResourceEstimates(wmbsJobGroups, processDict['numberOfCores'], self.glideinLimits) 
+
+            nameDictList = []
+            for wmbsJobGroup in wmbsJobGroups:
+                # For each jobGroup, put a dictionary
+                # together and run it with creatorProcess
+                jobsInGroup = len(wmbsJobGroup.jobs)
+                wmbsJobGroup.subscription = tempSubscription
+                tempDict = {}
+                tempDict.update(processDict)
+                tempDict['jobGroup']  = wmbsJobGroup
+                tempDict['swVersion'] = wmTask.getSwVersion()
+                tempDict['scramArch'] = wmTask.getScramArch()
+                tempDict['jobNumber'] = jobNumber
+                tempDict['agentNumber'] = self.agentNumber
+                tempDict['inputDatasetLocations'] = wmbsJobGroup.getLocationsForJobs()
+                tempDict['allowOpportunistic'] = allowOpport
+
+                jobGroup = creatorProcess(work = tempDict,
+                                          jobCacheDir = self.jobCacheDir)
+                jobNumber += jobsInGroup
+                jobsCreated += jobsInGroup
+
+                # Set jobCache for group
+                for job in jobGroup.jobs:
+                    nameDictList.append({'jobid':job['id'],
+                                         'cacheDir':job['cache_dir']})
+                    job["user"] = wmWorkload.getOwner()["name"]
+                    job["group"] = wmWorkload.getOwner()["group"]
+            # Set the caches in the database
             try:
-                if hasattr(wmTask.data, 'generators'):
-                    manager    = GeneratorManager(wmTask)
-                    seederList = manager.getGeneratorList()
-                else:
-                    seederList = []
+                if len(nameDictList) > 0:
+                    self.setBulkCache.execute(jobDictList = nameDictList,
+                                              conn = myThread.transaction.conn,
+                                              transaction = True)
+            except WMException:
+                raise
             except Exception as ex:
-                msg =  "Had failure loading generators for subscription %i\n" % (subscriptionID)
-                msg += "Exception: %s\n" % str(ex)
-                msg += "Passing over this error.  It will reoccur next interation!\n"
-                msg += "Please check or remove this subscription!\n"
+                msg =  "Unknown exception while setting the bulk cache:\n"
+                msg += str(ex)
                 logging.error(msg)
                 self.sendAlert(6, msg = msg)
-                continue
+                logging.debug("Error while setting bulkCache with following values: %s\n" % nameDictList)
+                raise JobCreatorException(msg)
 
-            logging.debug("Going to call wmbsJobFactory for sub %i with limit %i" % (subscriptionID, self.limit))
-
-            splitParams = retrieveJobSplitParams(wmWorkload, workflow.task)
-            logging.debug("Split Params: %s" % splitParams)
-
-            # My hope is that the job factory is smart enough only to split un-split jobs
-            splitterFactory = SplitterFactory(splitParams.get('algo_package', "WMCore.JobSplitting"))
-            wmbsJobFactory = splitterFactory(package = "WMCore.WMBS",
-                                             subscription = wmbsSubscription,
-                                             generators=seederList,
-                                             limit = self.limit)
-
-            # Turn on the jobFactory
-            wmbsJobFactory.open()
-
-            # Create a function to hold it
-            jobSplittingFunction = runSplitter(jobFactory = wmbsJobFactory,
-                                               splitParams = splitParams)
-
-            # Now we get to find out how many jobs there are.
-            jobNumber = self.countJobs.execute(workflow = workflow.id,
-                                               conn = myThread.transaction.conn,
-                                               transaction = True)
-            jobNumber += splitParams.get('initial_lfn_counter', 0)
-            logging.debug("Have %i jobs for workflow %s already in database." % (jobNumber, workflow.name))
-
-            continueSubscription = True
-            while continueSubscription:
-                # This loop runs over the jobFactory,
-                # using yield statements and a pre-existing proxy to
-                # generate and process new jobs
-
-                # First we need the jobs.
-                myThread.transaction.begin()
-                try:
-                    wmbsJobGroups = next(jobSplittingFunction)
-                    logging.info("Retrieved %i jobGroups from jobSplitter" % (len(wmbsJobGroups)))
-                except StopIteration:
-                    # If you receive a stopIteration, we're done
-                    logging.info("Completed iteration over subscription %i" % (subscriptionID))
-                    continueSubscription = False
-                    myThread.transaction.commit()
-                    break
-
-                # If we have no jobGroups, we're done
-                if len(wmbsJobGroups) == 0:
-                    logging.info("Found end in iteration over subscription %i" % (subscriptionID))
-                    continueSubscription = False
-                    myThread.transaction.commit()
-                    break
-
-
-                # Assemble a dict of all the info
-                processDict = {'workflow': workflow,
-                               'wmWorkload': wmWorkload, 'wmTaskName': wmTask.getPathName(),
-                               'jobNumber': jobNumber, 'sandbox': wmTask.data.input.sandbox,
-                               'owner': wmWorkload.getOwner().get('name', None),
-                               'ownerDN': wmWorkload.getOwner().get('dn', None),
-                               'ownerGroup': wmWorkload.getOwner().get('vogroup', ''),
-                               'ownerRole': wmWorkload.getOwner().get('vorole', ''),
-                               'numberOfCores': 1,
-                               'inputDataset': wmTask.getInputDatasetPath()}
-                try:
-                    maxCores = 1
-                    stepNames = wmTask.listAllStepNames()
-                    for stepName in stepNames:
-                        sh = wmTask.getStep(stepName)
-                        maxCores = max(maxCores, sh.getNumberOfCores())
-                    processDict.update({'numberOfCores' : maxCores})
-                except AttributeError:
-                    logging.info("Failed to read multicore settings from task %s" % wmTask.getPathName())
-
-                tempSubscription = Subscription(id = wmbsSubscription['id'])
-
-                # if we have glideinWMS constraints, then adapt all jobs
-                if self.glideinLimits:
-                    capResourceEstimates(wmbsJobGroups, processDict['numberOfCores'], self.glideinLimits) 
-
-                nameDictList = []
-                for wmbsJobGroup in wmbsJobGroups:
-                    # For each jobGroup, put a dictionary
-                    # together and run it with creatorProcess
-                    jobsInGroup = len(wmbsJobGroup.jobs)
-                    wmbsJobGroup.subscription = tempSubscription
-                    tempDict = {}
-                    tempDict.update(processDict)
-                    tempDict['jobGroup']  = wmbsJobGroup
-                    tempDict['swVersion'] = wmTask.getSwVersion()
-                    tempDict['scramArch'] = wmTask.getScramArch()
-                    tempDict['jobNumber'] = jobNumber
-                    tempDict['agentNumber'] = self.agentNumber
-                    tempDict['inputDatasetLocations'] = wmbsJobGroup.getLocationsForJobs()
-                    tempDict['allowOpportunistic'] = allowOpport
-
-                    jobGroup = creatorProcess(work = tempDict,
-                                              jobCacheDir = self.jobCacheDir)
-                    jobNumber += jobsInGroup
-
-                    # Set jobCache for group
-                    for job in jobGroup.jobs:
-                        nameDictList.append({'jobid':job['id'],
-                                             'cacheDir':job['cache_dir']})
-                        job["user"] = wmWorkload.getOwner()["name"]
-                        job["group"] = wmWorkload.getOwner()["group"]
-                # Set the caches in the database
-                try:
-                    if len(nameDictList) > 0:
-                        self.setBulkCache.execute(jobDictList = nameDictList,
-                                                  conn = myThread.transaction.conn,
-                                                  transaction = True)
-                except WMException:
-                    raise
-                except Exception as ex:
-                    msg =  "Unknown exception while setting the bulk cache:\n"
-                    msg += str(ex)
-                    logging.error(msg)
-                    self.sendAlert(6, msg = msg)
-                    logging.debug("Error while setting bulkCache with following values: %s\n" % nameDictList)
-                    raise JobCreatorException(msg)
-
-                # Advance the jobGroup in changeState
-                for wmbsJobGroup in wmbsJobGroups:
-                    self.advanceJobGroup(wmbsJobGroup = wmbsJobGroup)
-
-                # Now end the transaction so that everything is wrapped
-                # in a single rollback
-                myThread.transaction.commit()
+            # Advance the jobGroup in changeState
+            for wmbsJobGroup in wmbsJobGroups:
+                self.advanceJobGroup(wmbsJobGroup = wmbsJobGroup)
 
+            # Now end the transaction so that everything is wrapped
+            # in a single rollback
+            myThread.transaction.commit()
 
-            # END: While loop over jobFactory
 
-            # Close the jobFactory
-            wmbsJobFactory.close()
+        # END: While loop over jobFactory
 
-        return
+        # Close the jobFactory
+        wmbsJobFactory.close()
+
+        return jobsCreated
 
 
 # This is the code for the multiprocessing based queue retrieval system
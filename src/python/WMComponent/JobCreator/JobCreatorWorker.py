@@ -45,7 +45,7 @@ import cPickle
 from WMCore.DAOFactory                      import DAOFactory
 from WMCore.JobSplitting.SplitterFactory    import SplitterFactory
 from WMCore.WMBS.Subscription               import Subscription
-from WMCore.WMSpec.WMWorkload               import WMWorkload, WMWorkloadHelper
+from WMCore.WMSpec.Persistency             import loadCachedWorkload
 
 
 from WMCore.WMSpec.Seeders.SeederManager                import SeederManager
@@ -91,6 +91,7 @@ def retrieveWMSpec(subscription):
     _retrieveWMSpec_
 
     Given a subscription, this function loads the WMSpec associated with that workload
+    through the process wide spec cache, the workload must not be modified.
     """
     workflow = subscription['workflow']
     wmWorkloadURL = workflow.spec
@@ -99,10 +100,7 @@ def retrieveWMSpec(subscription):
         logging.error("WMWorkloadURL %s is empty" % (wmWorkloadURL))
         return None
 
-    wmWorkload = WMWorkloadHelper(WMWorkload("workload"))
-    wmWorkload.load(wmWorkloadURL)
-
-    return wmWorkload
+    return loadCachedWorkload(wmWorkloadURL)
 
 
 def retrieveJobSplitParams(wmWorkload, task):
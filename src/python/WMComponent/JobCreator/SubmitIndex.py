@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+_SubmitIndex_
+
+Compact index of the job information needed by the JobSubmitter.
+
+Next to the job.pkl of every job the JobCreator appends a small record
+with the submission relevant fields to an index file in the job collection
+directory, so the JobSubmitter can load them for a thousand jobs at once
+instead of unpickling every full job object.  job.pkl is still written
+and used to build the job packages shipped to the worker nodes.  The
+JobSubmitter prunes the records of the jobs that leave the created state,
+submitted, failed or killed, and removes the index once all its jobs are
+gone.
+
+Only the job_* entries of a job collection directory are jobs.
+"""
+
+import os
+import cPickle
+import logging
+from collections import defaultdict
+
+SUBMIT_INDEX = "submitIndex.pkl"
+
+
+def listJobDirs(directory):
+    """
+    _listJobDirs_
+
+    The job directories in a job collection directory, leaving out the
+    submit index.
+    """
+    return [x for x in os.listdir(directory) if x.startswith("job_")]
+
+
+def jobSubmitInfo(job):
+    """
+    _jobSubmitInfo_
+
+    Extract the fields needed at submission time from a job object.
+    The number of cores can be overridden by the job baggage.
+    """
+    numberOfCores = job.get('numberOfCores', 1)
+    if numberOfCores == 1:
+        baggage = job.getBaggage()
+        numberOfCores = getattr(baggage, "numberOfCores", 1)
+
+    return {'name': job['name'],
+            'workflow': job.get('workflow', None),
+            'possiblePSN': list(job.get('possiblePSN', [])),
+            'sandbox': job.get('sandbox', None),
+            'ownerDN': job.get('ownerDN', None),
+            'ownerGroup': job.get('ownerGroup', ''),
+            'ownerRole': job.get('ownerRole', ''),
+            'scramArch': job.get('scramArch', None),
+            'swVersion': job.get('swVersion', None),
+            'proxyPath': job.get('proxyPath', None),
+            'estimatedJobTime': job.get('estimatedJobTime', None),
+            'estimatedDiskUsage': job.get('estimatedDiskUsage', None),
+            'estimatedMemoryUsage': job.get('estimatedMemoryUsage', None),
+            'numberOfCores': numberOfCores,
+            'inputDataset': job.get('inputDataset', None),
+            'inputDatasetLocations': job.get('inputDatasetLocations', None),
+            'allowOpportunistic': job.get('allowOpportunistic', False)}
+
+
+def saveSubmitIndex(jobs):
+    """
+    _saveSubmitIndex_
+
+    Append the submit information of the jobs to the index of their job
+    collection directories, one pickle per call and directory.
+    """
+    records = defaultdict(dict)
+    for job in jobs:
+        records[os.path.dirname(job['cache_dir'])][job['id']] = jobSubmitInfo(job)
+
+    for directory, jobRecords in records.items():
+        with open(os.path.join(directory, SUBMIT_INDEX), 'ab') as indexFile:
+            cPickle.dump(jobRecords, indexFile, cPickle.HIGHEST_PROTOCOL)
+    return
+
+
+def loadSubmitIndex(directory):
+    """
+    _loadSubmitIndex_
+
+    Load all the records of a job collection directory in a dictionary
+    keyed by job id.  A missing or truncated index only returns what
+    could be read; callers fall back to job.pkl for the missing jobs.
+    """
+    records = {}
+    indexPath = os.path.join(directory, SUBMIT_INDEX)
+    if not os.path.isfile(indexPath):
+        return records
+
+    with open(indexPath, 'rb') as indexFile:
+        while True:
+            try:
+                records.update(cPickle.load(indexFile))
+            except EOFError:
+                break
+            except Exception as ex:
+                logging.warning("Could not read the whole submit index %s: %s", indexPath, str(ex))
+                break
+    return records
+
+
+def pruneSubmitIndex(jobs):
+    """
+    _pruneSubmitIndex_
+
+    Drop the records of the jobs from the index of their job collection
+    directories, removing the indexes left empty.  The index is replaced,
+    not rewritten in place, so readers never see a partial index; jobs
+    appended meanwhile are read from their job.pkl.
+    """
+    jobIDs = defaultdict(set)
+    for job in jobs:
+        jobIDs[os.path.dirname(job['cache_dir'])].add(job['id'])
+
+    for directory, prunedIDs in jobIDs.items():
+        pruneSubmitIndexRecords(directory, prunedIDs)
+    return
+
+
+def pruneSubmitIndexRecords(directory, jobIDs):
+    """
+    _pruneSubmitIndexRecords_
+
+    Drop the records of the job ids from the index of a job collection
+    directory, see pruneSubmitIndex.
+    """
+    indexPath = os.path.join(directory, SUBMIT_INDEX)
+    if not os.path.isfile(indexPath):
+        return
+    records = loadSubmitIndex(directory)
+    if not any(jobID in records for jobID in jobIDs):
+        return
+    for jobID in jobIDs:
+        records.pop(jobID, None)
+    try:
+        if records:
+            tmpPath = indexPath + ".tmp"
+            with open(tmpPath, 'wb') as indexFile:
+                cPickle.dump(records, indexFile, cPickle.HIGHEST_PROTOCOL)
+            os.rename(tmpPath, indexPath)
+        else:
+            os.remove(indexPath)
+    except (IOError, OSError) as ex:
+        logging.warning("Could not prune the submit index %s: %s", indexPath, str(ex))
+    return
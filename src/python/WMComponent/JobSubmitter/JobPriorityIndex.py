@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+_JobPriorityIndex_
+
+Index of the jobs cached by the JobSubmitter, used to find the next job
+to submit without scanning the whole cache.
+"""
+
+import heapq
+import itertools
+
+
+class JobPriorityIndex(object):
+    """
+    _JobPriorityIndex_
+
+    Jobs are kept in one heap per (site, task type) pair they can run at,
+    ordered by highest priority first and then by oldest timestamp.  The
+    index is persistent across polling cycles: jobs are added and removed
+    as the cache is refreshed, and a job leaving the index only leaves
+    stale heap entries behind that are skipped lazily and compacted away
+    once they outnumber the live ones.
+    """
+    def __init__(self):
+        self.jobs = {}
+        self.queues = {}
+        self.serial = itertools.count()
+        self.nEntries = 0
+        self.nStale = 0
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __contains__(self, jobID):
+        return jobID in self.jobs
+
+    def addJob(self, jobID, priority, timestamp, jobType, possibleSites):
+        """
+        _addJob_
+
+        Add a job to the index, replacing it if it was already there.
+        """
+        if jobID in self.jobs:
+            self.removeJob(jobID)
+
+        entry = (-priority, timestamp, jobID, next(self.serial))
+        self.jobs[jobID] = {'entry': entry, 'type': jobType,
+                            'possibleSites': possibleSites}
+        for siteName in possibleSites:
+            heapq.heappush(self.queues.setdefault((siteName, jobType), []), entry)
+        self.nEntries += len(possibleSites)
+        return
+
+    def removeJob(self, jobID):
+        """
+        _removeJob_
+
+        Remove a job from the index, return its information or None if the
+        job was not indexed.
+        """
+        jobInfo = self.jobs.pop(jobID, None)
+        if jobInfo is not None:
+            self.nStale += len(jobInfo['possibleSites'])
+        return jobInfo
+
+    def getJob(self, jobID):
+        """
+        _getJob_
+
+        Return the type and possible sites of an indexed job.
+        """
+        return self.jobs[jobID]
+
+    def isLive(self, entry):
+        """
+        _isLive_
+
+        Check whether a heap entry still belongs to an indexed job.
+        """
+        jobInfo = self.jobs.get(entry[2])
+        return jobInfo is not None and jobInfo['entry'] == entry
+
+    def compact(self, force=False):
+        """
+        _compact_
+
+        Drop the stale entries from all the heaps, if they are more than
+        the live ones (or always if force is set).
+        """
+        if not force and (self.nStale < 1000 or self.nStale * 2 < self.nEntries):
+            return
+
+        for key in self.queues.keys():
+            queue = [x for x in self.queues[key] if self.isLive(x)]
+            if queue:
+                heapq.heapify(queue)
+                self.queues[key] = queue
+            else:
+                del self.queues[key]
+        self.nEntries = sum([len(x) for x in self.queues.values()])
+        self.nStale = 0
+        return
+
+    def iterJobs(self, hasFreeSlots):
+        """
+        _iterJobs_
+
+        Yield the IDs of the jobs that can run at a (site, task type) pair
+        for which hasFreeSlots(siteName, jobType) is True, from the highest
+        to the lowest priority and oldest first.  The caller is expected
+        to remove each yielded job from the index (or otherwise consume
+        the slot) before asking for the next one.  Pairs are checked again
+        every time they are looked at, a pair found full is not looked at
+        again for the rest of the iteration.
+        """
+        heads = []
+        for key, queue in self.queues.items():
+            if queue and hasFreeSlots(*key):
+                heads.append((queue[0], key))
+        heapq.heapify(heads)
+
+        # entries popped for jobs still in the index are put back at the end
+        popped = []
+        try:
+            while heads:
+                entry, key = heapq.heappop(heads)
+                if not hasFreeSlots(*key):
+                    continue
+
+                queue = self.queues[key]
+                if queue and queue[0] == entry:
+                    heapq.heappop(queue)
+                    popped.append((entry, key))
+                    if self.isLive(entry):
+                        yield entry[2]
+
+                if queue:
+                    heapq.heappush(heads, (queue[0], key))
+        finally:
+            for entry, key in popped:
+                if self.isLive(entry):
+                    heapq.heappush(self.queues[key], entry)
+                else:
+                    self.nEntries -= 1
+                    self.nStale -= 1
+        return
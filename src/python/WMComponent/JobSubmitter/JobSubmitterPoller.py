@@ -13,7 +13,6 @@ import logging
 import threading
 import os.path
 import cPickle
-from operator import itemgetter
 
 from WMCore.DAOFactory        import DAOFactory
 from WMCore.WMExceptions      import WM_JOB_ERROR_CODES
@@ -25,6 +24,9 @@ from WMCore.DataStructs.JobPackage            import JobPackage
 from WMCore.FwkJobReport.Report               import Report
 from WMCore.WMException                       import WMException
 from WMCore.BossAir.BossAirAPI                import BossAirAPI
+from WMComponent.JobSubmitter.JobPriorityIndex import JobPriorityIndex
+from WMComponent.JobCreator.SubmitIndex        import jobSubmitInfo, loadSubmitIndex, pruneSubmitIndex, \
+                                               pruneSubmitIndexRecords
 
 
 class JobSubmitterPollerException(WMException):
@@ -67,7 +69,7 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         # Additions for caching-based JobSubmitter
         self.cachedJobIDs = set()
-        self.cachedJobs = {}
+        self.cachedJobs = JobPriorityIndex()
         self.jobDataCache = {}
         self.jobsToPackage = {}
         self.sandboxPackage = {}
@@ -208,65 +210,53 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         Query WMBS for all jobs in the 'created' state.  For all jobs returned
         from the query, check if they already exist in the cache.  If they
-        don't, unpickle them and combine their site white and black list with
-        the list of locations they can run at.  Add them to the cache.
-
-        Each entry in the cache is a tuple with five items:
-          - WMBS Job ID
-          - Retry count
-          - Batch ID
-          - Path to sanbox
-          - Path to cache directory
+        don't, load their submit information from the JobCreator submit index
+        and combine their site white and black list with the list of locations
+        they can run at.  Add them to the cache.
+
+        The full job objects are only unpickled and put in job packages when
+        the jobs are assigned to a site in assignJobLocations.
         """
         badJobs = dict([(x, []) for x in range(71101, 71105)])
         dbJobs = set()
+        newJobs = []
 
         logging.info("Refreshing priority cache with currently %i jobs", len(self.cachedJobIDs))
 
         if self.cacheRefreshSize == -1 or len(self.cachedJobIDs) < self.cacheRefreshSize or \
            self.refreshPollingCount >= self.skipRefreshCount:
-            newJobs = self.listJobsAction.execute()
+            # stream the rows and only keep the ones not cached yet, the
+            # connection is released before any submit index or job is read
+            jobRows = self.listJobsAction.execute(stream=True)
+            try:
+                for newJob in jobRows:
+                    dbJobs.add(newJob['id'])
+                    if newJob['id'] not in self.cachedJobIDs:
+                        newJobs.append(newJob)
+            finally:
+                jobRows.close()
             self.refreshPollingCount = 0
-            logging.info("Found %s new jobs to be submitted.", len(newJobs))
         else:
             self.refreshPollingCount += 1
-            newJobs = []
             dbJobs = self.cachedJobIDs
             logging.info("Skipping cache update to be submitted. (%s job in cache)" % len(dbJobs))
         
         logging.info("Determining possible sites for new jobs...")
         jobCount = 0
+        submitIndexes = {}
         for newJob in newJobs:
             jobID = newJob['id']
-            dbJobs.add(jobID)
-            if jobID in self.cachedJobIDs:
-                continue
-
             jobCount += 1
             if jobCount % 5000 == 0:
-                logging.info("Processed %d/%d new jobs.", jobCount, len(newJobs))
+                logging.info("Processed %d new jobs.", jobCount)
 
-            pickledJobPath = os.path.join(newJob["cache_dir"], "job.pkl")
-
-            if not os.path.isfile(pickledJobPath):
-                # Then we have a problem - there's no file
-                logging.error("Could not find pickled jobObject %s", pickledJobPath)
+            submitInfo = self.loadSubmitInfo(newJob, submitIndexes)
+            if submitInfo is None:
                 badJobs[71103].append(newJob)
                 continue
-            try:
-                jobHandle = open(pickledJobPath, "r")
-                loadedJob = cPickle.load(jobHandle)
-                jobHandle.close()
-            except Exception as ex:
-                msg = "Error while loading pickled job object %s\n" % pickledJobPath
-                msg += str(ex)
-                logging.error(msg)
-                raise JobSubmitterPollerException(msg)
-
-            loadedJob['retry_count'] = newJob['retry_count']
 
             # figure out possible locations for job
-            possibleLocations = loadedJob["possiblePSN"]
+            possibleLocations = submitInfo["possiblePSN"]
 
             # Create another set of locations that may change when a site goes white/black listed
             # Does not care about the non_draining or aborted sites, they may change and that is the point
@@ -276,7 +266,7 @@ class JobSubmitterPoller(BaseWorkerThread):
             # now check for sites in drain and adjust the possible locations
             # also check if there is at least one site left to run the job
             if len(possibleLocations) == 0:
-                newJob['name'] = loadedJob['name']
+                newJob['name'] = submitInfo['name']
                 badJobs[71101].append(newJob)
                 continue
             else:
@@ -284,7 +274,7 @@ class JobSubmitterPoller(BaseWorkerThread):
                 if nonAbortSites: # if there is at least a non aborted/down site then run there, otherwise fail the job
                     possibleLocations = nonAbortSites
                 else:
-                    newJob['name'] = loadedJob['name']
+                    newJob['name'] = submitInfo['name']
                     newJob['possibleLocations'] = possibleLocations
                     badJobs[71102].append(newJob)
                     continue
@@ -297,7 +287,7 @@ class JobSubmitterPoller(BaseWorkerThread):
                 if nonDrainingSites: # if >1 viable non-draining site remove draining ones
                     possibleLocations = nonDrainingSites
                 else:
-                    newJob['name'] = loadedJob['name']
+                    newJob['name'] = submitInfo['name']
                     newJob['possibleLocations'] = possibleLocations
                     badJobs[71104].append(newJob)
                     continue
@@ -305,24 +295,14 @@ class JobSubmitterPoller(BaseWorkerThread):
             # locations clear of abort and draining sites
             newJob['possibleLocations'] = possibleLocations
 
-            batchDir = self.addJobsToPackage(loadedJob)
             self.cachedJobIDs.add(jobID)
 
             # calculate the final job priority such that we can order cached jobs by prio
             jobPrio = self.taskTypePrioMap.get(newJob['type'], 0) + newJob['wf_priority']
-            if jobPrio not in self.cachedJobs:
-                self.cachedJobs[jobPrio] = {}
-
-            # now add basic information keyed by the jobid
-            self.cachedJobs[jobPrio][jobID] = newJob
 
-            # allow job baggage to override numberOfCores
-            #       => used for repacking to get more slots/disk
-            numberOfCores = loadedJob.get('numberOfCores', 1)
-            if numberOfCores == 1:
-                baggage = loadedJob.getBaggage()
-                numberOfCores = getattr(baggage, "numberOfCores", 1)
-            loadedJob['numberOfCores'] = numberOfCores
+            # and index the job under every site/task type it can run at
+            self.cachedJobs.addJob(jobID, jobPrio, newJob['timestamp'],
+                                   newJob['type'], possibleLocations)
 
             # check if job should be submitted as highIO job
             highIOjob = False
@@ -341,54 +321,115 @@ class JobSubmitterPoller(BaseWorkerThread):
                        'highIOjob': highIOjob,
                        'taskPriority': None,                                # update from the thresholds
                        'custom': {'location': None},                        # update later
-                       'packageDir': batchDir,
-                       'sandbox': loadedJob["sandbox"],                     # remove before submit
-                       'userdn': loadedJob.get("ownerDN", None),
-                       'usergroup': loadedJob.get("ownerGroup", ''),
-                       'userrole': loadedJob.get("ownerRole", ''),
+                       'packageDir': None,                                  # set when assigned
+                       'sandbox': submitInfo["sandbox"],                     # remove before submit
+                       'userdn': submitInfo.get("ownerDN", None),
+                       'usergroup': submitInfo.get("ownerGroup", ''),
+                       'userrole': submitInfo.get("ownerRole", ''),
                        'possibleSites': frozenset(possibleLocations),       # abort and drain sites filtered out
                        'potentialSites': frozenset(potentialLocations),     # original list of sites
-                       'scramArch': loadedJob.get("scramArch", None),
-                       'swVersion': loadedJob.get("swVersion", None),
-                       'name': loadedJob["name"],
-                       'proxyPath': loadedJob.get("proxyPath", None),
-                       'estimatedJobTime': loadedJob.get("estimatedJobTime", None),
-                       'estimatedDiskUsage': loadedJob.get("estimatedDiskUsage", None),
-                       'estimatedMemoryUsage': loadedJob.get("estimatedMemoryUsage", None),
-                       'numberOfCores': loadedJob.get("numberOfCores", 1),  # may update it later
-                       'inputDataset': loadedJob.get('inputDataset', None),
-                       'inputDatasetLocations': loadedJob.get('inputDatasetLocations', None),
-                       'allowOpportunistic': loadedJob.get('allowOpportunistic', False)}
+                       'scramArch': submitInfo.get("scramArch", None),
+                       'swVersion': submitInfo.get("swVersion", None),
+                       'name': submitInfo["name"],
+                       'proxyPath': submitInfo.get("proxyPath", None),
+                       'estimatedJobTime': submitInfo.get("estimatedJobTime", None),
+                       'estimatedDiskUsage': submitInfo.get("estimatedDiskUsage", None),
+                       'estimatedMemoryUsage': submitInfo.get("estimatedMemoryUsage", None),
+                       'numberOfCores': submitInfo["numberOfCores"],         # includes baggage override
+                       'inputDataset': submitInfo.get('inputDataset', None),
+                       'inputDatasetLocations': submitInfo.get('inputDatasetLocations', None),
+                       'allowOpportunistic': submitInfo.get('allowOpportunistic', False)}
 
             self.jobDataCache[jobID] = jobInfo
 
+        logging.info("Found %d new jobs to be submitted.", jobCount)
+
         # Register failures in submission
         for errorCode in badJobs:
             if badJobs[errorCode]:
                 logging.debug("The following jobs could not be submitted: %s, error code : %d", badJobs, errorCode)
                 self._handleSubmitFailedJobs(badJobs[errorCode], errorCode)
 
-        # If there are any leftover jobs, we want to get rid of them.
-        self.flushJobPackages()
-
         # We need to remove any jobs from the cache that were not returned in
         # the last call to the database.
         jobIDsToPurge = self.cachedJobIDs - dbJobs
         self.cachedJobIDs -= jobIDsToPurge
 
+        purgedJobs = []
+        for jobid in jobIDsToPurge:
+            jobInfo = self.jobDataCache.pop(jobid, None)
+            if jobInfo is not None:
+                purgedJobs.append(jobInfo)
+            self.cachedJobs.removeJob(jobid)
+
+        # the purged jobs were killed, and the indexes loaded above may still
+        # have records of jobs that left the created state before they were
+        # ever cached.  Jobs created after the listing have higher ids and
+        # are kept.
+        pruneSubmitIndex(purgedJobs)
+        if dbJobs:
+            maxJobID = max(dbJobs)
+            for collectionDir, records in submitIndexes.items():
+                staleIDs = [x for x in records if x not in dbJobs and x < maxJobID]
+                if staleIDs:
+                    pruneSubmitIndexRecords(collectionDir, staleIDs)
+
+        # drop the index entries left behind by purged and submitted jobs
+        self.cachedJobs.compact()
+
         if len(jobIDsToPurge) == 0:
             return
 
-        for jobid in jobIDsToPurge:
-            self.jobDataCache.pop(jobid, None)
-            for jobPrio in self.cachedJobs:
-                if self.cachedJobs[jobPrio].pop(jobid, None):
-                    # then the jobid was found, go to the next one
-                    break
-
         logging.info("Done pruning killed jobs, moving on to submit.")
         return
 
+    def loadJob(self, cacheDir):
+        """
+        _loadJob_
+
+        Unpickle the job object from its cache directory, return None if
+        there is no job.pkl there.
+        """
+        pickledJobPath = os.path.join(cacheDir, "job.pkl")
+
+        if not os.path.isfile(pickledJobPath):
+            # Then we have a problem - there's no file
+            logging.error("Could not find pickled jobObject %s", pickledJobPath)
+            return None
+        try:
+            jobHandle = open(pickledJobPath, "r")
+            loadedJob = cPickle.load(jobHandle)
+            jobHandle.close()
+        except Exception as ex:
+            msg = "Error while loading pickled job object %s\n" % pickledJobPath
+            msg += str(ex)
+            logging.error(msg)
+            raise JobSubmitterPollerException(msg)
+
+        return loadedJob
+
+    def loadSubmitInfo(self, newJob, submitIndexes):
+        """
+        _loadSubmitInfo_
+
+        Get the submission information of a new job from the submit index
+        written by the JobCreator in its job collection directory, loading
+        each index once per cache refresh.  Fall back to the job.pkl for jobs
+        not in the index.  Return None if the job can't be found at all.
+        """
+        collectionDir = os.path.dirname(newJob["cache_dir"])
+        if collectionDir not in submitIndexes:
+            submitIndexes[collectionDir] = loadSubmitIndex(collectionDir)
+
+        submitInfo = submitIndexes[collectionDir].get(newJob["id"])
+        if submitInfo is None:
+            loadedJob = self.loadJob(newJob["cache_dir"])
+            if loadedJob is None:
+                return None
+            submitInfo = jobSubmitInfo(loadedJob)
+
+        return submitInfo
+
     def _handleSubmitFailedJobs(self, badJobs, exitCode):
         """
         __handleSubmitFailedJobs_
@@ -415,6 +456,7 @@ class JobSubmitterPoller(BaseWorkerThread):
                 logging.error("Failed to write FWJR for submit failed job %d, message: %s", job['id'], str(ioer))
         self.changeState.propagate(badJobs, "submitfailed", "created")
         self.setFWJRPathAction.execute(binds=fwjrBinds)
+        pruneSubmitIndex(badJobs)
         return
 
     def getThresholds(self):
@@ -451,7 +493,7 @@ class JobSubmitterPoller(BaseWorkerThread):
         if newDrainSites != self.drainSites or  newAbortSites != self.abortSites:
             logging.info("Draining or Aborted sites have changed, the cache will be rebuilt.")
             self.cachedJobIDs = set()
-            self.cachedJobs = {}
+            self.cachedJobs = JobPriorityIndex()
             self.jobDataCache = {}
 
         self.currentRcThresholds = rcThresholds
@@ -460,110 +502,117 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         return
 
+    def hasFreeSlots(self, siteName, jobType):
+        """
+        _hasFreeSlots_
+
+        Check the site and task thresholds for a free slot for a job of
+        jobType at siteName.
+        """
+        if siteName not in self.currentRcThresholds:
+            logging.warn("Have a job for %s which is not in the resource control", siteName)
+            return False
+
+        try:
+            totalPendingSlots = self.currentRcThresholds[siteName]["total_pending_slots"]
+            totalPendingJobs = self.currentRcThresholds[siteName]["total_pending_jobs"]
+            totalRunningSlots = self.currentRcThresholds[siteName]["total_running_slots"]
+            totalRunningJobs = self.currentRcThresholds[siteName]["total_running_jobs"]
+
+            taskPendingSlots = self.currentRcThresholds[siteName]['thresholds'][jobType]["pending_slots"]
+            taskPendingJobs = self.currentRcThresholds[siteName]['thresholds'][jobType]["task_pending_jobs"]
+            taskRunningSlots = self.currentRcThresholds[siteName]['thresholds'][jobType]["max_slots"]
+            taskRunningJobs = self.currentRcThresholds[siteName]['thresholds'][jobType]["task_running_jobs"]
+        except KeyError as ex:
+            msg = "Invalid key for site %s and job type %s\n" % (siteName, jobType)
+            msg += str(ex)
+            logging.error(msg)
+            return False
+
+        # check if site has free pending slots AND free pending task slots
+        if totalPendingJobs >= totalPendingSlots or taskPendingJobs >= taskPendingSlots:
+            logging.debug("Found a job for %s which has no free pending slots", siteName)
+            return False
+        # check if site overall thresholds have free slots
+        if totalPendingJobs + totalRunningJobs >= totalPendingSlots + totalRunningSlots:
+            logging.debug("Found a job for %s which has no free overall slots", siteName)
+            return False
+        # finally, check whether task has free overall slots
+        if taskPendingJobs + taskRunningJobs >= taskPendingSlots + taskRunningSlots:
+            logging.debug("Found a job for %s which has no free task slots", siteName)
+            return False
+
+        return True
+
     def assignJobLocations(self):
         """
         _assignJobLocations_
 
-        Loop through the submit thresholds and pull sites out of the job cache
-        as we discover open slots.  This will return a list of tuple where each
-        tuple will have six elements:
-          - WMBS Job ID
-          - Retry count
-          - Batch ID
-          - Path to sanbox
-          - Path to cache directory
-          - SE name of the site to run at
+        Pull jobs out of the job cache, from the highest to the lowest
+        priority and the elder first, only looking at the site/task type
+        combinations that still have open slots.  Each job goes to the first
+        of its possible sites with free slots.  This will return a dictionary
+        of job lists keyed by job package, each job with the site to run at
+        in job['custom']['location'].
         """
         jobsToSubmit = {}
-        jobsToUncache = []
         jobsCount = 0
-        exitLoop = False
+        badJobs = []
 
-        # iterate over jobs from the highest to the lowest prio
-        for jobPrio in sorted(self.cachedJobs, reverse=True):
+        for jobid in self.cachedJobs.iterJobs(self.hasFreeSlots):
+            jobInfo = self.cachedJobs.getJob(jobid)
+            jobType = jobInfo['type']
 
-            # then we're completely done and have our basket full of jobs to submit
-            if exitLoop:
-                break
+            for siteName in jobInfo['possibleSites']:
+                if not self.hasFreeSlots(siteName, jobType):
+                    continue
 
-            # start eating through the elder jobs first
-            for job in sorted(self.cachedJobs[jobPrio].values(), key=itemgetter('timestamp')):
-                jobid = job['id']
-                jobType = job['type']
-                possibleSites = job['possibleLocations']
-
-                # now look for sites with free pending slots
-                for siteName in possibleSites:
-                    if siteName not in self.currentRcThresholds:
-                        logging.warn("Have a job for %s which is not in the resource control", siteName)
-                        continue
-
-                    try:
-                        totalPendingSlots = self.currentRcThresholds[siteName]["total_pending_slots"]
-                        totalPendingJobs = self.currentRcThresholds[siteName]["total_pending_jobs"]
-                        totalRunningSlots = self.currentRcThresholds[siteName]["total_running_slots"]
-                        totalRunningJobs = self.currentRcThresholds[siteName]["total_running_jobs"]
-
-                        taskPendingSlots = self.currentRcThresholds[siteName]['thresholds'][jobType]["pending_slots"]
-                        taskPendingJobs = self.currentRcThresholds[siteName]['thresholds'][jobType]["task_pending_jobs"]
-                        taskRunningSlots = self.currentRcThresholds[siteName]['thresholds'][jobType]["max_slots"]
-                        taskRunningJobs = self.currentRcThresholds[siteName]['thresholds'][jobType]["task_running_jobs"]
-                        taskPriority = self.currentRcThresholds[siteName]['thresholds'][jobType]["priority"]
-                    except KeyError as ex:
-                        msg = "Invalid key for site %s and job type %s\n" % (siteName, jobType)
-                        msg += str(ex)
-                        logging.error(msg)
-                        continue
-
-                    # check if site has free pending slots AND free pending task slots
-                    if totalPendingJobs >= totalPendingSlots or taskPendingJobs >= taskPendingSlots:
-                        logging.debug("Found a job for %s which has no free pending slots", siteName)
-                        continue
-                    # check if site overall thresholds have free slots
-                    if totalPendingJobs + totalRunningJobs >= totalPendingSlots + totalRunningSlots:
-                        logging.debug("Found a job for %s which has no free overall slots", siteName)
-                        continue
-                    # finally, check whether task has free overall slots
-                    if taskPendingJobs + taskRunningJobs >= taskPendingSlots + taskRunningSlots:
-                        logging.debug("Found a job for %s which has no free task slots", siteName)
-                        continue
-
-                    # otherwise, update the site/task thresholds and the component job counter
-                    self.currentRcThresholds[siteName]["total_pending_jobs"] += 1
-                    self.currentRcThresholds[siteName]['thresholds'][jobType]["task_pending_jobs"] += 1
-                    jobsCount += 1
-
-                    # load (and remove) the job dictionary object from jobDataCache
-                    cachedJob = self.jobDataCache.pop(jobid)
-                    jobsToUncache.append((jobPrio, jobid))
-
-                    # Sort jobs by jobPackage
-                    package = cachedJob['packageDir']
-                    if package not in jobsToSubmit.keys():
-                        jobsToSubmit[package] = []
-
-                    # Add the sandbox to a global list
-                    self.sandboxPackage[package] = cachedJob.pop('sandbox')
-
-                    # Now update the job dictionary object
-                    cachedJob['custom'] = {'location': siteName}
-                    cachedJob['taskPriority'] = taskPriority
-
-                    # Get this job in place to be submitted by the plugin
-                    jobsToSubmit[package].append(cachedJob)
-
-                    # found a site to submit this job, so go to the next job
-                    break
+                # load (and remove) the job dictionary object from all the caches
+                cachedJob = self.jobDataCache.pop(jobid)
+                self.cachedJobs.removeJob(jobid)
+                self.cachedJobIDs.remove(jobid)
 
-                # set the flag and get out of the job iteration
-                if jobsCount >= self.maxJobsPerPoll:
-                    exitLoop = True
+                # only now load the full job object, to put it in a job package
+                loadedJob = self.loadJob(cachedJob['cache_dir'])
+                if loadedJob is None:
+                    badJobs.append(cachedJob)
                     break
+                loadedJob['retry_count'] = cachedJob['retry_count']
+                cachedJob['packageDir'] = self.addJobsToPackage(loadedJob)
+
+                # update the site/task thresholds and the component job counter
+                taskThresholds = self.currentRcThresholds[siteName]['thresholds'][jobType]
+                self.currentRcThresholds[siteName]["total_pending_jobs"] += 1
+                taskThresholds["task_pending_jobs"] += 1
+                jobsCount += 1
+
+                # Sort jobs by jobPackage
+                package = cachedJob['packageDir']
+                if package not in jobsToSubmit:
+                    jobsToSubmit[package] = []
+
+                # Add the sandbox to a global list
+                self.sandboxPackage[package] = cachedJob.pop('sandbox')
 
-        # jobs that are going to be submitted must be removed from all caches
-        for prio, jobid in jobsToUncache:
-            self.cachedJobs[prio].pop(jobid)
-            self.cachedJobIDs.remove(jobid)
+                # Now update the job dictionary object
+                cachedJob['custom'] = {'location': siteName}
+                cachedJob['taskPriority'] = taskThresholds["priority"]
+
+                # Get this job in place to be submitted by the plugin
+                jobsToSubmit[package].append(cachedJob)
+
+                # found a site to submit this job, so go to the next job
+                break
+
+            # then we're completely done and have our basket full of jobs to submit
+            if jobsCount >= self.maxJobsPerPoll:
+                break
+
+        # If there are any leftover jobs, we want to get rid of them.
+        self.flushJobPackages()
+
+        if badJobs:
+            self._handleSubmitFailedJobs(badJobs, 71103)
 
         logging.info("Have %s packages to submit.", len(jobsToSubmit))
         logging.info("Done assigning site locations.")
@@ -621,6 +670,9 @@ class JobSubmitterPoller(BaseWorkerThread):
         myThread.transaction.commit()
         logging.info("Transaction cycle successfully completed.")
 
+        # the submitted jobs left the created state, drop them from the index
+        pruneSubmitIndex(jobList)
+
         return
 
 
@@ -680,3 +732,4 @@ class JobSubmitterPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        self.changeState.flushCouch()
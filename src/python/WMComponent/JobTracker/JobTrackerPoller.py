@@ -67,6 +67,7 @@ class JobTrackerPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        self.changeState.flushCouch()
         return
 
     def algorithm(self, parameters=None):
@@ -147,6 +147,7 @@ class RetryManagerPoller(BaseWorkerThread):
         """
         logging.debug("Terminating. doing one more pass before we die")
         self.algorithm(params)
+        self.changeState.flushCouch()
 
 
     def algorithm(self, parameters = None):
@@ -33,6 +33,7 @@ from WMCore.BossAir.Plugins.gLitePlugin          import getDefaultDelegation
 from WMCore.Credential.Proxy                     import Proxy
 from WMComponent.JobCreator.CreateWorkArea       import getMasterName
 from WMComponent.JobCreator.JobCreatorPoller     import retrieveWMSpec
+from WMCore.WMSpec.Persistency                   import specCacheSummary
 from WMCore.Services.RequestManager.RequestManager import RequestManager
 from WMCore.Services.ReqMgr.ReqMgr               import ReqMgr
 from WMCore.Services.RequestDB.RequestDBWriter   import RequestDBWriter
@@ -240,6 +241,14 @@ class CleanCouchPoller(BaseWorkerThread):
         logging.debug("Using url %s/%s for job" % (jobDBurl, jobDBName))
         logging.debug("Writing to  %s/%s for workloadSummary" % (sanitizeURL(workDBurl)['url'], workDBName))
 
+    def heartbeatState(self):
+        """
+        _heartbeatState_
+
+        Report the spec cache counters in the heartbeat.
+        """
+        return "Running, %s" % specCacheSummary()
+
     def algorithm(self, parameters=None):
         """
         Get information from wmbs, workqueue and local couch.
@@ -655,10 +664,10 @@ class CleanCouchPoller(BaseWorkerThread):
         # Get a list of failed job IDs
         # Make sure you get it for ALL tasks in the spec
         for taskName in spec.listAllTaskPathNames():
-            failedTmp = self.jobsdatabase.loadView("JobDump", "failedJobsByWorkflowName",
+            failedTmp = self.jobsdatabase.iterView("JobDump", "failedJobsByWorkflowName",
                                                    options = {"startkey": [workflowName, taskName],
                                                               "endkey": [workflowName, taskName],
-                                                              "stale" : "update_after"})['rows']
+                                                              "stale" : "update_after"})
             for entry in failedTmp:
                 failedJobs.append(entry['value'])
 
@@ -879,10 +888,10 @@ class CleanCouchPoller(BaseWorkerThread):
 
         The couch performance stuff is convoluted enough I think I want to handle it separately.
         """
-        perf = self.fwjrdatabase.loadView("FWJRDump", "performanceByWorkflowName",
+        perf = self.fwjrdatabase.iterView("FWJRDump", "performanceByWorkflowName",
                                           options = {"startkey": [workflowName],
                                                      "endkey": [workflowName],
-                                                     "stale" : "update_after"})['rows']
+                                                     "stale" : "update_after"})
                                                      
         failedJobs = self.getFailedJobs(workflowName)
 
@@ -1004,10 +1013,10 @@ class CleanCouchPoller(BaseWorkerThread):
 
     def getFailedJobs(self, workflowName):
         # We want ALL the jobs, and I'm sorry, CouchDB doesn't support wildcards, above-than-absurd values will do:
-        errorView = self.fwjrdatabase.loadView("FWJRDump", "errorsByWorkflowName",
+        errorView = self.fwjrdatabase.iterView("FWJRDump", "errorsByWorkflowName",
                                           options = {"startkey": [workflowName, 0, 0],
                                                      "endkey": [workflowName, 999999999, 999999],
-                                                     "stale" : "update_after"})['rows']
+                                                     "stale" : "update_after"})
         failedJobs = []
         for row in errorView:
             jobId = row['value']['jobid']
@@ -43,6 +43,7 @@ from WMCore import WMLogging
 from WMCore.WorkerThreads.WorkerThreadManager import WorkerThreadManager
 from WMCore.Agent.ConfigDBMap import ConfigDBMap
 from WMCore.Agent.HeartbeatAPI import HeartbeatAPI
+from WMCore.JobStateMachine.JobDumpWriter import stopJobDumpWriters
 
 class HarnessException(WMException):
     """
@@ -359,6 +360,12 @@ class Harness:
             # We may not have a thread manager
             pass
 
+        # Write the jobdump documents the workers still have queued
+        stopTimeout = getattr(getattr(self.config, "JobStateMachine", None),
+                              "couchStopTimeout", 300)
+        logging.info(">>>Stopping jobdump writers")
+        stopJobDumpWriters(stopTimeout)
+
         if(wait):
             logging.info(">>>Shut down of component "+\
             "while waiting for threads to finish")
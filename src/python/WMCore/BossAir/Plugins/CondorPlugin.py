@@ -21,6 +21,7 @@ import subprocess
 import multiprocessing
 import glob
 import shlex
+import tempfile
 
 import WMCore.Algorithms.BasicAlgos as BasicAlgos
 
@@ -34,6 +35,32 @@ from WMCore.Algorithms                 import SubprocessAlgos
 
 GROUP_NAME_RE = re.compile("^[a-zA-Z0-9_]+_([A-Z]+)-")
 
+# one (key:value) statement of the condor_q -format output
+CLASSAD_ATTR_RE = re.compile(r"\((\w+):([^:)]*)")
+
+def parseClassAds(stream, chunkSize = 1048576):
+    """
+    _parseClassAds_
+
+    Parse the condor_q -format output built by CondorPlugin.getClassAds
+    from a file-like object, reading it in chunks so that the whole output
+    is never held in memory.  Yield one dictionary of attributes per job,
+    empty for anything that doesn't look like a classAd.
+    """
+    leftover = ''
+    while True:
+        chunk = stream.read(chunkSize)
+        if not chunk:
+            break
+        classAds = (leftover + chunk).split(':::')
+        leftover = classAds.pop()
+        for classAd in classAds:
+            yield dict(CLASSAD_ATTR_RE.findall(classAd))
+
+    if leftover:
+        yield dict(CLASSAD_ATTR_RE.findall(leftover))
+    return
+
 def submitWorker(input, results, timeout = None):
     """
     _outputWorker_
@@ -195,6 +222,14 @@ class CondorPlugin(BasePlugin):
         self.defaultTaskPriority = getattr(config.BossAir, 'defaultTaskPriority', 0)
         self.maxTaskPriority     = getattr(config.BossAir, 'maxTaskPriority', 1e7)
 
+        # Incremental tracking: between full polls of the schedd, only ask
+        # for the jobs that entered their current status since the last poll
+        self.incrementalTracking = getattr(config.BossAir, 'incrementalTracking', False)
+        self.fullTrackInterval   = getattr(config.BossAir, 'fullTrackInterval', 3600)
+        self.trackTimeMargin     = getattr(config.BossAir, 'trackTimeMargin', 120)
+        self.trackWatermark      = None
+        self.lastFullTrack       = 0
+
         # Required for global pool accounting
         self.acctGroup = getattr(config.BossAir, 'acctGroup', "production")
         self.acctGroupUser = getattr(config.BossAir, 'acctGroupUser', "cmsdataops")
@@ -549,6 +584,11 @@ class CondorPlugin(BasePlugin):
         First, the total number of jobs still running
         Second, the jobs that need to be changed
         Third, the jobs that need to be completed
+
+        With incrementalTracking only the jobs that changed status since the
+        previous poll are asked to condor, the other jobs keep their state.
+        Jobs that left the queue are only found by the full polls done
+        every fullTrackInterval seconds.
         """
 
         changeList   = []
@@ -556,16 +596,32 @@ class CondorPlugin(BasePlugin):
         runningList  = []
         noInfoFlag   = False
 
-        # Get the job
-        jobInfo = self.getClassAds()
+        # Get the job, only the ones that changed if tracking incrementally
+        pollTime = int(time.time())
+        fullPoll = not self.incrementalTracking or self.trackWatermark is None or \
+                   pollTime - self.lastFullTrack >= self.fullTrackInterval
+        if fullPoll:
+            jobInfo = self.getClassAds()
+        else:
+            jobInfo = self.getClassAds(since = self.trackWatermark)
         if jobInfo == None:
             return runningList, changeList, completeList
-        if len(jobInfo.keys()) == 0:
-            noInfoFlag = True
 
+        # leave a margin for jobs changing state while condor_q runs
+        self.trackWatermark = pollTime - self.trackTimeMargin
+        if fullPoll:
+            self.lastFullTrack = pollTime
+            if len(jobInfo) == 0:
+                noInfoFlag = True
+
+        stateMap = CondorPlugin.stateMap()
         for job in jobs:
             # Now go over the jobs from WMBS and see what we have
-            if not job['jobid'] in jobInfo.keys():
+            if job['jobid'] not in jobInfo and not fullPoll:
+                # The job didn't change state, it keeps the one in the database
+                job['globalState'] = stateMap.get(job['status'], 'Error')
+                runningList.append(job)
+            elif job['jobid'] not in jobInfo:
                 # Two options here, either put in removed, or not
                 # Only cycle through Removed if condor_q is sending
                 # us no information
@@ -611,7 +667,7 @@ class CondorPlugin(BasePlugin):
                     logging.info("Job in unknown state %i" % jobStatus)
 
                 # Get the global state
-                job['globalState'] = CondorPlugin.stateMap()[statName]
+                job['globalState'] = stateMap[statName]
 
                 if statName != job['status']:
                     # Then the status has changed
@@ -1079,17 +1135,23 @@ class CondorPlugin(BasePlugin):
             self.locationDict[jobSite] = siteInfo[0].get('ce_name', None)
         return self.locationDict[jobSite]
 
-    def getClassAds(self):
+    def getClassAds(self, since = None):
         """
         _getClassAds_
 
-        Grab classAds from condor_q using xml parsing
+        Grab classAds from condor_q, parsing its output while it is
+        being read, and return them in a dictionary keyed by WMAgent_JobID.
+        With since, only get the jobs that entered their current status
+        at or after that time.
         """
 
         jobInfo = {}
 
         command = ['condor_q', '-constraint', 'WMAgent_JobID =!= UNDEFINED',
-                   '-constraint', 'WMAgent_AgentName == \"%s\"' % (self.agent),
+                   '-constraint', 'WMAgent_AgentName == \"%s\"' % (self.agent)]
+        if since is not None:
+            command.extend(['-constraint', 'EnteredCurrentStatus >= %i' % since])
+        command.extend([
                    '-format', '(JobStatus:\%s)  ', 'JobStatus',
                    '-format', '(stateTime:\%s)  ', 'EnteredCurrentStatus',
                    '-format', '(runningTime:\%s)  ', 'JobStartDate',
@@ -1097,45 +1159,33 @@ class CondorPlugin(BasePlugin):
                    '-format', '(DESIRED_Sites:\%s)  ', 'DESIRED_Sites',
                    '-format', '(ExtDESIRED_Sites:\%s)  ', 'ExtDESIRED_Sites',
                    '-format', '(runningCMSSite:\%s)  ', 'MATCH_EXP_JOBGLIDEIN_CMSSite',
-                   '-format', '(WMAgentID:\%d):::',  'WMAgent_JobID']
+                   '-format', '(WMAgentID:\%d):::',  'WMAgent_JobID'])
 
-        pipe = subprocess.Popen(command, stdout = subprocess.PIPE, stderr = subprocess.PIPE, shell = False)
-        stdout, _ = pipe.communicate()
-        classAdsRaw = stdout.split(':::')
+        # stderr goes to a file, nobody reads it while stdout is streamed
+        errorFile = tempfile.TemporaryFile()
+        pipe = subprocess.Popen(command, stdout = subprocess.PIPE, stderr = errorFile, shell = False)
 
-        if not pipe.returncode == 0:
-            # Then things have gotten bad - condor_q is not responding
-            logging.error("condor_q returned non-zero value %s" % str(pipe.returncode))
-            logging.error("Skipping classAd processing this round")
-            return None
-
-        if classAdsRaw == '':
-            # We have no jobs
-            return jobInfo
-
-        for ad in classAdsRaw:
-            # There should be one for every job
-            if not re.search("\(", ad):
+        for classAd in parseClassAds(pipe.stdout):
+            if not classAd:
                 # There is no ad.
                 # Don't know what happened here
                 continue
-            statements = ad.split('(')
-            tmpDict = {}
-            for statement in statements:
-                # One for each value
-                if not re.search(':', statement):
-                    # Then we have an empty statement
-                    continue
-                key = str(statement.split(':')[0])
-                value = statement.split(':')[1].split(')')[0]
-                tmpDict[key] = value
-            if not 'WMAgentID' in tmpDict.keys():
+            if 'WMAgentID' not in classAd:
                 # Then we have an invalid job somehow
                 logging.error("Invalid job discovered in condor_q")
-                logging.error(tmpDict)
+                logging.error(classAd)
                 continue
-            else:
-                jobInfo[int(tmpDict['WMAgentID'])] = tmpDict
+            jobInfo[int(classAd['WMAgentID'])] = classAd
+
+        pipe.wait()
+        if not pipe.returncode == 0:
+            # Then things have gotten bad - condor_q is not responding
+            errorFile.seek(0)
+            logging.error("condor_q returned non-zero value %s: %s" % (str(pipe.returncode), errorFile.read()))
+            logging.error("Skipping classAd processing this round")
+            errorFile.close()
+            return None
+        errorFile.close()
 
         logging.info("Retrieved %i classAds" % len(jobInfo))
 
@@ -55,17 +55,46 @@ class File(WMObject, dict):
             msg = "addRun argument must be of type WMCore.DataStructs.Run"
             raise RuntimeError(msg)
 
-        addFlag = False
-        for runMember in self['runs']:
-            if runMember.run ==  run.run:
-                # this rely on Run object overwrite __add__ to update self
-                runMember + run
-                addFlag = True
-
-        if not addFlag:
+        runIndex = self._getRunIndex()
+        runMember = runIndex.get(run.run, None)
+        if runMember is not None:
+            # this rely on Run object overwrite __add__ to update self
+            runMember + run
+        else:
             self['runs'].add(run)
+            runIndex[run.run] = run
+            self._runIndexSize = len(self['runs'])
         return
 
+    def _getRunIndex(self):
+        """
+        _getRunIndex_
+
+        Return the runs of the file keyed by run number.  The index is
+        rebuilt when the runs set is replaced or changed directly.
+        """
+        runIndex = self.__dict__.get('_runIndex', None)
+        if runIndex is None or self._runIndexOf is not self['runs'] or \
+               self._runIndexSize != len(self['runs']):
+            runIndex = {}
+            for runMember in self['runs']:
+                runIndex[runMember.run] = runMember
+            self._runIndex = runIndex
+            self._runIndexOf = self['runs']
+            self._runIndexSize = len(self['runs'])
+        return runIndex
+
+    def __getstate__(self):
+        """
+        _getstate_
+
+        Leave the run index out of pickles and copies.
+        """
+        state = dict(self.__dict__)
+        for key in ('_runIndex', '_runIndexOf', '_runIndexSize'):
+            state.pop(key, None)
+        return state
+
     def load(self):
         """
         A DataStructs file has nothing to load from, other implementations will
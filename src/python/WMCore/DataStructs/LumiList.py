@@ -13,12 +13,13 @@ This code began life in COMP/CRAB/python/LumiList.py
 """
 
 
-import copy
 import itertools
 import json
 import re
 import urllib2
 
+from WMCore.DataStructs.RunLumiRanges import RunLumiRanges
+
 class LumiList(object):
     """
     Deal with lists of lumis in several different forms:
@@ -54,6 +55,7 @@ class LumiList(object):
         """
         self.compactList = {}
         self.duplicates = {}
+        self._ranges = {}
         if filename:
             self.filename = filename
             jsonFile = open(self.filename,'r')
@@ -145,80 +147,29 @@ class LumiList(object):
                     newLumis.append(lumi)
             self.compactList[run] = newLumis
 
+    def _getRanges(self, openEnded = False):
+        """
+        Return the compactList as a RunLumiRanges, built on first use.
+        openEnded treats an upper bound of 0 as the end of the run.
+        """
+        if openEnded not in self._ranges:
+            self._ranges[openEnded] = RunLumiRanges(self.compactList, openEnded = openEnded)
+        return self._ranges[openEnded]
+
+
     def __sub__(self, other): # Things from self not in other
-        result = {}
-        for run in sorted(self.compactList.keys()):
-            alumis = sorted(self.compactList[run])
-            blumis = sorted(other.compactList.get(run, []))
-            alist = []                    # verified part
-            for alumi in alumis:
-                tmplist = [alumi[0], alumi[1]] # may be part
-                for blumi in blumis:
-                    if blumi[0] <= tmplist[0] and blumi[1] >= tmplist[1]: # blumi has all of alumi
-                        tmplist = []
-                        break # blumi is has all of alumi
-                    if blumi[0] > tmplist[0] and blumi[1] < tmplist[1]: # blumi is part of alumi
-                        alist.append([tmplist[0], blumi[0]-1])
-                        tmplist = [blumi[1]+1, tmplist[1]]
-                    elif blumi[0] <= tmplist[0] and blumi[1] < tmplist[1] and blumi[1]>=tmplist[0]: # overlaps start
-                        tmplist = [blumi[1]+1, tmplist[1]]
-                    elif blumi[0] > tmplist[0] and blumi[1] >= tmplist[1] and blumi[0]<=tmplist[1]: # overlaps end
-                        alist.append([tmplist[0], blumi[0]-1])
-                        tmplist = []
-                        break
-                if tmplist:
-                    alist.append(tmplist)
-            result[run] = alist
-
-        return LumiList(compactList = result)
+        result = RunLumiRanges(self.compactList) - RunLumiRanges(other.compactList)
+        return LumiList(compactList = result.getCompactList())
 
 
     def __and__(self, other): # Things in both
-        result = {}
-        aruns = set(self.compactList.keys())
-        bruns = set(other.compactList.keys())
-        for run in aruns & bruns:
-            lumiList = []                    # List for this run
-            unique = []                    # List for this run
-            for alumi in self.compactList[run]:
-                for blumi in other.compactList[run]:
-                    if blumi[0] <= alumi[0] and blumi[1] >= alumi[1]: # blumi has all of alumi
-                        lumiList.append(alumi)
-                    if blumi[0] > alumi[0] and blumi[1] < alumi[1]: # blumi is part of alumi
-                        lumiList.append(blumi)
-                    elif blumi[0] <= alumi[0] and blumi[1] < alumi[1] and blumi[1] >= alumi[0]: # overlaps start
-                        lumiList.append([alumi[0], blumi[1]])
-                    elif blumi[0] > alumi[0] and blumi[1] >= alumi[1] and blumi[0] <= alumi[1]: # overlaps end
-                        lumiList.append([blumi[0], alumi[1]])
-
-
-            if lumiList:
-                unique = [lumiList[0]]
-            for pair in lumiList[1:]:
-                if pair[0] == unique[-1][1]+1:
-                    unique[-1][1] = copy.deepcopy(pair[1])
-                else:
-                    unique.append(copy.deepcopy(pair))
-
-            result[run] = unique
-        return LumiList(compactList = result)
+        result = RunLumiRanges(self.compactList) & RunLumiRanges(other.compactList)
+        return LumiList(compactList = result.getCompactList())
 
 
     def __or__(self, other):
-        result = {}
-        aruns = self.compactList.keys()
-        bruns = other.compactList.keys()
-        runs = set(aruns + bruns)
-        for run in runs:
-            overlap = sorted(self.compactList.get(run, []) + other.compactList.get(run, []))
-            unique = [overlap[0]]
-            for pair in overlap[1:]:
-                if pair[0] >= unique[-1][0] and pair[0] <= unique[-1][1]+1 and pair[1] > unique[-1][1]:
-                    unique[-1][1] = copy.deepcopy(pair[1])
-                elif pair[0] > unique[-1][1]:
-                    unique.append(copy.deepcopy(pair))
-            result[run] = unique
-        return LumiList(compactList = result)
+        result = RunLumiRanges(self.compactList) | RunLumiRanges(other.compactList)
+        return LumiList(compactList = result.getCompactList())
 
 
     def __add__(self, other):
@@ -235,13 +186,11 @@ class LumiList(object):
         lumilist is of the simple form
         [(run1,lumi1),(run1,lumi2),(run2,lumi1)]
         """
+        ranges = self._getRanges()
         filteredList = []
         for (run, lumi) in lumiList:
-            runsInLumi = self.compactList.get(str(run), [[0, -1]])
-            for (first, last) in runsInLumi:
-                if lumi >= first and lumi <= last:
-                    filteredList.append((run, lumi))
-                    break
+            if ranges.contains(run, lumi):
+                filteredList.append((run, lumi))
         return filteredList
 
 
@@ -349,6 +298,7 @@ class LumiList(object):
             run = str(run)
             if run in self.compactList:
                 del self.compactList[run]
+        self._ranges = {}
 
         return
 
@@ -364,6 +314,7 @@ class LumiList(object):
 
         for run in runsToDelete:
             del self.compactList[run]
+        self._ranges = {}
 
         return
 
@@ -385,21 +336,12 @@ class LumiList(object):
                 run         = run[0]
             except:
                 raise RuntimeError("Improper format for run '%s'" % run)
-        lumiRangeList = self.compactList.get( str(run) )
-        if not lumiRangeList:
-            # the run isn't there, so no need to look any further
-            return False
-        for lumiRange in lumiRangeList:
-            # we want to make this as found if either the lumiSection
-            # is inside the range OR if the lumi section is greater
-            # than or equal to the lower bound of the lumi range and
-            # the upper bound is 0 (which means extends to the end of
-            # the run)
-            if lumiRange[0] <= lumiSection and \
-               (0 == lumiRange[1] or lumiSection <= lumiRange[1]):
-                # got it
-                return True
-        return False
+        # we want to make this as found if either the lumiSection
+        # is inside the range OR if the lumi section is greater
+        # than or equal to the lower bound of the lumi range and
+        # the upper bound is 0 (which means extends to the end of
+        # the run)
+        return self._getRanges(openEnded = True).contains(run, lumiSection)
 
 
     def __contains__ (self, runTuple):
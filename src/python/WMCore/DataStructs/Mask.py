@@ -11,6 +11,7 @@ job in two ways:
 """
 
 from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.RunLumiRanges import mergeRanges, rangesContain
 
 class Mask(dict):
     """
@@ -31,6 +32,15 @@ class Mask(dict):
         self.setdefault("LastRun", None)
         self.setdefault("runAndLumis", {})
 
+    def __getstate__(self):
+        """
+        _getstate_
+
+        Leave the lumi range cache out of pickles and copies.
+        """
+        state = dict(self.__dict__)
+        state.pop('_lumiRanges', None)
+        return state
 
     def setMaxAndSkipEvents(self, maxEvents, skipEvents):
         """
@@ -173,16 +183,25 @@ class Mask(dict):
             # ALWAYS TRUE
             return True
 
-        if not run in self['runAndLumis'].keys():
+        if not run in self['runAndLumis']:
             return False
 
-        for pair in self['runAndLumis'][run]:
-            # Go through each max and min pair
-            if pair[0] <= lumi and pair[1] >= lumi:
-                # Then the lumi is bracketed
-                return True
+        return rangesContain(self._getLumiRanges(run), lumi)
 
-        return False
+    def _getLumiRanges(self, run):
+        """
+        _getLumiRanges_
+
+        Merged lumi ranges of a run in the mask.  They are kept until the
+        list of pairs for the run is replaced or grows.
+        """
+        pairs = self['runAndLumis'][run]
+        cache = self.__dict__.setdefault('_lumiRanges', {})
+        cached = cache.get(run, None)
+        if cached is None or cached[0] is not pairs or cached[1] != len(pairs):
+            cached = (pairs, len(pairs), mergeRanges(pairs))
+            cache[run] = cached
+        return cached[2]
 
 
     def filterRunLumisByMask(self, runs):
@@ -210,15 +229,10 @@ class Mask(dict):
 
         newRuns = set()
         for runNumber in filteredRuns:
-            maskLumis = set()
-            for pair in self["runAndLumis"][runNumber]:
-                if pair[0] == pair[1]:
-                    maskLumis.add(pair[0])
-                else:
-                    maskLumis = maskLumis.union(range(pair[0], pair[1] + 1, 1))
-
-            filteredLumis = set(runDict[runNumber].lumis).intersection(maskLumis)
+            lumiRanges = self._getLumiRanges(runNumber)
+            filteredLumis = [lumi for lumi in sorted(set(runDict[runNumber].lumis))
+                             if rangesContain(lumiRanges, lumi)]
             if len(filteredLumis) > 0:
-                newRuns.add(Run(runNumber, *list(filteredLumis)))
+                newRuns.add(Run(runNumber, *filteredLumis))
 
         return newRuns
@@ -17,6 +17,10 @@ class Run(WMObject):
 
     Run container, is a list of lumi sections
 
+    A set of the lumis is kept next to the list to merge runs without
+    scanning the list.  It is rebuilt when the list is replaced or changes
+    length behind its back, and it is not pickled.
+
     """
     def __init__(self, runNumber = None, *newLumis):
         WMObject.__init__(self)
@@ -65,9 +69,38 @@ class Run(WMObject):
 
         #newRun = Run(self.run, *self)
         #[ newRun.append(x) for x in rhs if x not in newRun ]
-        [ self.lumis.append(x) for x in rhs.lumis if x not in self.lumis ]
+        lumiSet = self._getLumiSet()
+        for lumi in rhs.lumis:
+            if lumi not in lumiSet:
+                lumiSet.add(lumi)
+                self.lumis.append(lumi)
+        self._lumiSetSize = len(self.lumis)
 
         return self
+
+    def _getLumiSet(self):
+        """
+        _getLumiSet_
+
+        Return the set of lumis, rebuilding it if the lumi list changed.
+        """
+        lumiSet = self.__dict__.get("_lumiSet", None)
+        if lumiSet is None or self._lumiSetOf is not self.lumis or \
+               self._lumiSetSize != len(self.lumis):
+            lumiSet = set(self.lumis)
+            self._lumiSet = lumiSet
+            self._lumiSetOf = self.lumis
+            self._lumiSetSize = len(self.lumis)
+        return lumiSet
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for key in ("_lumiSet", "_lumiSetOf", "_lumiSetSize"):
+            state.pop(key, None)
+        return state
+
+    def __contains__(self, lumi):
+        return lumi in self._getLumiSet()
     def __iter__(self):
         return self.lumis.__iter__()
 
@@ -78,8 +111,10 @@ class Run(WMObject):
     def __getitem__(self,key):
         return self.lumis.__getitem__(key)
     def __setitem__(self,key,value):
+        self._lumiSet = None
         return self.lumis.__setitem__(key,value)
     def __delitem__(self,key):
+        self._lumiSet = None
         return self.lumis.__delitem__(key)
 
     def __eq__(self, rhs):
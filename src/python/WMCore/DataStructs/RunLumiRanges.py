@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+"""
+_RunLumiRanges_
+
+Sorted run/lumi range engine shared by LumiList, Mask and the lumi based
+job splitters.
+
+The lumi ranges of each run are kept merged (no overlapping or adjacent
+ranges) in two integer arrays, one with the first and one with the last
+lumi of every range.  Membership is a bisect on the first lumis, and the
+set operations walk both sides once.
+"""
+
+from array import array
+from bisect import bisect_right
+
+# Upper bound for lumi ranges open to the end of the run
+MAX_LUMI = 0xFFFFFFF
+
+
+def _mergeSorted(lumiRanges, openEnded = False):
+    """
+    _mergeSorted_
+
+    Merge (first, last) pairs sorted by first lumi into the first and last
+    lumi arrays.
+    """
+    starts = []
+    ends = []
+    lastEnd = None
+    for first, last in lumiRanges:
+        if openEnded and last == 0:
+            last = MAX_LUMI
+        if last < first:
+            continue
+        if lastEnd is not None and first <= lastEnd + 1:
+            if last > lastEnd:
+                lastEnd = ends[-1] = last
+        else:
+            starts.append(first)
+            ends.append(last)
+            lastEnd = last
+    return array('l', starts), array('l', ends)
+
+
+def mergeRanges(lumiRanges, openEnded = False):
+    """
+    _mergeRanges_
+
+    Sort and merge a list of [first, last] lumi ranges into the first and
+    last lumi arrays.  Ranges ending before they start are dropped, unless
+    openEnded is set, in which case a last lumi of 0 means the range goes
+    to the end of the run.
+    """
+    return _mergeSorted(sorted(lumiRanges), openEnded)
+
+
+def unionRanges(aRanges, bRanges):
+    """
+    _unionRanges_
+
+    Lumis in either of two merged (starts, ends) pairs.  Sorting the two
+    sorted sequences together is a single linear merge.
+    """
+    return _mergeSorted(sorted(zip(aRanges[0], aRanges[1]) + zip(bRanges[0], bRanges[1])))
+
+
+def intersectRanges(aRanges, bRanges):
+    """
+    _intersectRanges_
+
+    Lumis in both of two merged (starts, ends) pairs.
+    """
+    aStarts, aEnds = aRanges
+    bStarts, bEnds = bRanges
+    starts = []
+    ends = []
+    i = j = 0
+    nA = len(aStarts)
+    nB = len(bStarts)
+    while i < nA and j < nB:
+        aStart = aStarts[i]
+        aEnd = aEnds[i]
+        bStart = bStarts[j]
+        bEnd = bEnds[j]
+        first = aStart if aStart > bStart else bStart
+        if aEnd < bEnd:
+            last = aEnd
+            i += 1
+        else:
+            last = bEnd
+            j += 1
+        if first <= last:
+            starts.append(first)
+            ends.append(last)
+    return array('l', starts), array('l', ends)
+
+
+def subtractRanges(aRanges, bRanges):
+    """
+    _subtractRanges_
+
+    Lumis of the first merged (starts, ends) pair not in the second one.
+    """
+    aStarts, aEnds = aRanges
+    bStarts, bEnds = bRanges
+    starts = []
+    ends = []
+    j = 0
+    nB = len(bStarts)
+    for first, last in zip(aStarts, aEnds):
+        while j < nB and bEnds[j] < first:
+            j += 1
+        k = j
+        while k < nB and bStarts[k] <= last:
+            if bStarts[k] > first:
+                starts.append(first)
+                ends.append(bStarts[k] - 1)
+            if bEnds[k] >= first:
+                first = bEnds[k] + 1
+            if first > last:
+                break
+            k += 1
+        if first <= last:
+            starts.append(first)
+            ends.append(last)
+    return array('l', starts), array('l', ends)
+
+
+def rangesContain(lumiRanges, lumi):
+    """
+    _rangesContain_
+
+    Check if a lumi is in a merged (starts, ends) pair.
+    """
+    starts, ends = lumiRanges
+    i = bisect_right(starts, lumi) - 1
+    return i >= 0 and lumi <= ends[i]
+
+
+class RunLumiRanges(object):
+    """
+    _RunLumiRanges_
+
+    Merged lumi ranges for a set of runs, keyed by integer run number.  A
+    run can be present without any lumi in it, which is what an empty list
+    of ranges in a compact list means to the splitters.
+    """
+    def __init__(self, compactList = None, openEnded = False):
+        self.runs = {}
+        if compactList:
+            for run, lumiRanges in compactList.items():
+                self.addRun(run, lumiRanges, openEnded)
+        return
+
+    def addRun(self, run, lumiRanges, openEnded = False):
+        """
+        _addRun_
+
+        Add lumi ranges, [[first, last], ...], to a run.
+        """
+        run = int(run)
+        newRanges = mergeRanges(lumiRanges, openEnded)
+        if run in self.runs:
+            newRanges = unionRanges(self.runs[run], newRanges)
+        self.runs[run] = newRanges
+        return
+
+    def __len__(self):
+        return len(self.runs)
+
+    def hasRun(self, run):
+        """
+        _hasRun_
+
+        Check if the run is present, with or without lumis.
+        """
+        return int(run) in self.runs
+
+    def getRuns(self):
+        """
+        _getRuns_
+
+        Sorted list of run numbers.
+        """
+        return sorted(self.runs.keys())
+
+    def getRanges(self, run):
+        """
+        _getRanges_
+
+        The merged (starts, ends) arrays of a run, None for an unknown run.
+        """
+        return self.runs.get(int(run), None)
+
+    def contains(self, run, lumi):
+        """
+        _contains_
+
+        Check if the run/lumi pair is in the ranges.
+        """
+        lumiRanges = self.runs.get(int(run), None)
+        if lumiRanges is None:
+            return False
+        return rangesContain(lumiRanges, lumi)
+
+    def filterLumis(self, run, lumis):
+        """
+        _filterLumis_
+
+        Return the lumis of a run that are in the ranges, in the given order.
+        """
+        lumiRanges = self.runs.get(int(run), None)
+        if lumiRanges is None:
+            return []
+        starts, ends = lumiRanges
+        filtered = []
+        for lumi in lumis:
+            i = bisect_right(starts, lumi) - 1
+            if i >= 0 and lumi <= ends[i]:
+                filtered.append(lumi)
+        return filtered
+
+    def countLumis(self):
+        """
+        _countLumis_
+
+        Number of lumis in all runs.
+        """
+        total = 0
+        for starts, ends in self.runs.values():
+            total += sum(ends) - sum(starts) + len(starts)
+        return total
+
+    def getCompactList(self):
+        """
+        _getCompactList_
+
+        Return the ranges as a LumiList compact list, {'run': [[first, last], ...]},
+        leaving out runs without lumis.
+        """
+        compactList = {}
+        for run, (starts, ends) in self.runs.items():
+            if starts:
+                compactList[str(run)] = [[first, last] for first, last in zip(starts, ends)]
+        return compactList
+
+    def _combine(self, other, operation, runs):
+        result = RunLumiRanges()
+        empty = (array('l'), array('l'))
+        for run in runs:
+            lumiRanges = operation(self.runs.get(run, empty), other.runs.get(run, empty))
+            if lumiRanges[0]:
+                result.runs[run] = lumiRanges
+        return result
+
+    def __or__(self, other):
+        return self._combine(other, unionRanges, set(self.runs) | set(other.runs))
+
+    def __and__(self, other):
+        return self._combine(other, intersectRanges, set(self.runs) & set(other.runs))
+
+    def __sub__(self, other):
+        return self._combine(other, subtractRanges, self.runs.keys())
@@ -17,11 +17,13 @@ import hashlib
 import base64
 import logging
 import traceback
-from httplib import HTTPException
+from httplib import HTTPException, HTTPConnection, HTTPSConnection
 from datetime import datetime
+from json import JSONDecoder
 
 from WMCore.Services.Requests import JSONRequests
 from WMCore.Lexicon import replaceToSantizeURL
+from WMCore.Wrappers.JsonWrapper.JSONThunker import JSONThunker
 
 
 def check_name(dbname):
@@ -37,6 +39,69 @@ def check_server_url(srvurl):
         raise ValueError('You must include http(s):// in your servers address')
 
 
+_WHITESPACE = re.compile(r'\s*')
+
+
+def iterJSONRows(stream, key='rows', chunkSize=65536):
+    """
+    _iterJSONRows_
+
+    Iterate over the elements of the array under key in the JSON object read
+    from a file-like stream, e.g. the rows of a view, decoding one element at
+    a time so that only a chunk of the stream and a row are held in memory.
+    If key is None the stream holds the array itself, e.g. a list output.
+    """
+    decoder = JSONDecoder()
+    if key is None:
+        start = re.compile(r'\A\s*\[')
+    else:
+        start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+
+    buff = ''
+    eof = False
+    match = None
+    while match is None:
+        match = start.search(buff)
+        if match is None:
+            if eof:
+                raise ValueError("No '%s' array in the JSON stream: %s" % (key, buff[:100]))
+            chunk = stream.read(chunkSize)
+            eof = not chunk
+            buff += chunk
+    pos = match.end()
+
+    while True:
+        pos = _WHITESPACE.match(buff, pos).end()
+        if pos < len(buff):
+            char = buff[pos]
+            if char == ']':
+                return
+            if char == ',':
+                pos += 1
+                continue
+            try:
+                row, end = decoder.raw_decode(buff, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # a row is only complete once what follows it is read, e.g. a
+                # number cut at the end of a chunk
+                after = _WHITESPACE.match(buff, end).end()
+                if after < len(buff) and buff[after] in ',]':
+                    pos = end
+                    yield row
+                    continue
+                if eof:
+                    raise ValueError("Expected ',' or ']' after a row in the '%s' array" % key)
+        elif eof:
+            raise ValueError("JSON stream ended inside the '%s' array" % key)
+        chunk = stream.read(chunkSize)
+        eof = not chunk
+        buff = buff[pos:] + chunk
+        pos = 0
+
+
 class Document(dict):
     """
     Document class is the instantiation of one document in the CouchDB
@@ -124,6 +189,59 @@ class CouchDBRequests(JSONRequests):
 
         return result
 
+    def streamRows(self, uri, data=None, verb='GET', key='rows', decode=True):
+        """
+        _streamRows_
+
+        Iterate over the rows of the JSON response of a request as they
+        arrive, see iterJSONRows, instead of reading and decoding the whole
+        response.  The rows are unthunked like decode does unless decode is
+        False.  Failed statuses raise like makeRequest does.
+        """
+        components = self['endpoint_components']
+        if components.scheme == 'https':
+            ckey, cert = None, None
+            try:
+                ckey, cert = self.getKeyCert()
+            except Exception as ex:
+                self['logger'].info('No certificate or key found, authentication may fail')
+                self['logger'].debug(str(ex))
+            conn = HTTPSConnection(components.hostname, components.port, key_file=ckey,
+                                   cert_file=cert, timeout=self['timeout'])
+        else:
+            conn = HTTPConnection(components.hostname, components.port, timeout=self['timeout'])
+
+        headers = {"Content-type": self['content_type'],
+                   "User-agent": "WMCore.Services.Requests/v001",
+                   "Accept": self['accept_type'],
+                   "Cache-Control": "no-cache"}
+        headers.update(self.additionalHeaders)
+        body = None
+        if data is not None:
+            body = self.encode(data)
+
+        try:
+            conn.request(verb, components.path.rstrip('/') + uri, body, headers)
+            response = conn.getresponse()
+            if response.status >= 400:
+                e = HTTPException()
+                setattr(e, 'url', uri)
+                setattr(e, 'result', response.read())
+                setattr(e, 'status', response.status)
+                setattr(e, 'reason', response.reason)
+                try:
+                    raise e
+                except HTTPException:
+                    self.checkForCouchError(e.status, e.reason, data, e.result)
+
+            thunker = JSONThunker()
+            for row in iterJSONRows(response, key):
+                if decode:
+                    row = thunker.unthunk(row)
+                yield row
+        finally:
+            conn.close()
+
     def checkForCouchError(self, status, reason, data=None, result=None):
         """
         _checkForCouchError_
@@ -437,6 +555,28 @@ class Database(CouchDBRequests):
         self.last_seq = data['last_seq']
         return data
 
+    def iterChanges(self, since=-1, options={}, batchSize=1000):
+        """
+        Iterate over the changes since sequence number, streaming them in
+        batches of batchSize changes; self.last_seq follows the changes read.
+        If the since is negative use self.last_seq.  The options are passed
+        as they are, e.g. {'include_docs': 'true'}.
+        """
+        if since < 0:
+            since = self.last_seq
+        while True:
+            query = dict(options)
+            query.update({'since': since, 'limit': batchSize})
+            nChanges = 0
+            for change in self.streamRows('/%s/_changes?%s' % (self.name, urllib.urlencode(query)),
+                                          key='results'):
+                nChanges += 1
+                since = change['seq']
+                self.last_seq = since
+                yield change
+            if nChanges < batchSize:
+                return
+
     def purge(self, data):
         return self.post('/%s/_purge' % self.name, data)
 
@@ -466,14 +606,7 @@ class Database(CouchDBRequests):
 
         more info: http://wiki.apache.org/couchdb/HTTP_view_API
         """
-        encodedOptions = {}
-        for k, v in options.iteritems():
-            # We can't encode the stale option, as it will be converted to '"ok"'
-            # which couch barfs on.
-            if k == "stale":
-                encodedOptions[k] = v
-            else:
-                encodedOptions[k] = self.encode(v)
+        encodedOptions = self._encodeViewOptions(options)
 
         if len(keys):
             if encodedOptions:
@@ -492,6 +625,110 @@ class Database(CouchDBRequests):
         else:
             return retval
 
+    def _encodeViewOptions(self, options):
+        """
+        _encodeViewOptions_
+
+        JSON encode the view query options, except stale.
+        """
+        encodedOptions = {}
+        for k, v in options.iteritems():
+            # We can't encode the stale option, as it will be converted to '"ok"'
+            # which couch barfs on.
+            if k == "stale":
+                encodedOptions[k] = v
+            else:
+                encodedOptions[k] = self.encode(v)
+        return encodedOptions
+
+    def _iterRows(self, uri, options, keys, batchSize):
+        """
+        _iterRows_
+
+        Stream the rows of a view or of _all_docs.  Without keys the rows are
+        read in pages of batchSize rows, each page starting after the last
+        row of the previous one (startkey, startkey_docid and skip), so that
+        no request has to walk over the rows already read, and any limit and
+        skip options apply to the rows overall.
+        """
+        options = dict(options)
+        if len(keys):
+            uri = '%s?%s' % (uri, urllib.urlencode(self._encodeViewOptions(options)))
+            for row in self.streamRows(uri, {'keys': keys}, 'POST'):
+                yield row
+            return
+
+        if 'key' in options:
+            options['startkey'] = options['endkey'] = options.pop('key')
+        limit = options.pop('limit', None)
+        while limit is None or limit > 0:
+            pageSize = batchSize if limit is None else min(batchSize, limit)
+            options['limit'] = pageSize
+            query = urllib.urlencode(self._encodeViewOptions(options))
+            nRows = 0
+            lastRow = None
+            for row in self.streamRows('%s?%s' % (uri, query)):
+                nRows += 1
+                rowKey = (row['key'], row.get('id', None))
+                if rowKey == lastRow:
+                    same += 1
+                else:
+                    lastRow, same = rowKey, 1
+                yield row
+            if nRows < pageSize:
+                return
+            if limit is not None:
+                limit -= nRows
+
+            if nRows == same:
+                # the rows are all the same, we can't tell how many of them
+                # came before the page, go on from where the page started
+                options['skip'] = options.get('skip', 0) + nRows
+                continue
+            # restart after the last row and its duplicates
+            options['skip'] = same
+            options['startkey'] = lastRow[0]
+            options.pop('startkey_docid', None)
+            if lastRow[1] is not None:
+                options['startkey_docid'] = lastRow[1]
+
+    def iterView(self, design, view, options={}, keys=[], batchSize=10000):
+        """
+        _iterView_
+
+        Iterate over the rows of a view, taking the same options and keys as
+        loadView, streaming them as they are read instead of loading the
+        whole view, in pages of batchSize rows when there are no keys.
+        """
+        return self._iterRows('/%s/_design/%s/_view/%s' % (self.name, design, view),
+                              options, keys, batchSize)
+
+    def iterAllDocs(self, options={}, keys=[], batchSize=10000):
+        """
+        _iterAllDocs_
+
+        Iterate over the rows of allDocs, like iterView does for a view.
+        """
+        return self._iterRows('/%s/_all_docs' % self.name, options, keys, batchSize)
+
+    def iterList(self, design, list, view, options={}, keys=[]):
+        """
+        _iterList_
+
+        Iterate over the elements of the JSON array a list function returns,
+        decoding them as they are read, like json.loads does for the output of
+        loadList.  List outputs can't be paged, the list is read in a single
+        request.
+        """
+        encodedOptions = {}
+        for k, v in options.iteritems():
+            encodedOptions[k] = self.encode(v)
+        uri = '/%s/_design/%s/_list/%s/%s?%s' % (self.name, design, list, view,
+                                                 urllib.urlencode(encodedOptions))
+        if len(keys):
+            return self.streamRows(uri, {'keys': keys}, 'POST', key=None, decode=False)
+        return self.streamRows(uri, key=None, decode=False)
+
     def loadList(self, design, list, view, options={}, keys=[]):
         """
         Load data from a list function. This returns data that hasn't been
@@ -12,6 +12,7 @@ Core Database APIs
 from WMCore.DataStructs.WMObject import WMObject
 from WMCore.Database.ResultSet import ResultSet
 from copy import copy
+import re
 import WMCore.WMLogging
 
 from sqlalchemy.dialects.oracle.cx_oracle import OracleDialect_cx_oracle
@@ -128,6 +129,62 @@ class DBInterface(WMObject):
         result = connection.execute(s, b)
         return self.makelist(result)
 
+    def buildInList(self, sqlstmt, bindName, nValues):
+        """
+        _buildInList_
+
+        Rewrite the single "= :bindName" condition of a select into an
+        "IN (:bindName_0, ..., :bindName_n)" list with nValues binds.
+        Only a bare "=" is rewritten, comparisons like "<= :bindName" are
+        left alone.  Raise if the statement doesn't use bindName in exactly
+        one bare "=" condition and nowhere else.
+        """
+        pattern = re.compile(r"(?<![<>!])\s*=\s*:%s\b" % re.escape(bindName), re.IGNORECASE)
+        uses = re.findall(r":%s\b" % re.escape(bindName), sqlstmt, re.IGNORECASE)
+        if len(pattern.findall(sqlstmt)) != 1 or len(uses) != 1:
+            raise Exception("DBInterface.buildInList: can't build an IN list for %s, "
+                            "it must be used in a single '= :%s' condition:\n%s" %
+                            (bindName, bindName, sqlstmt))
+
+        inList = ", ".join([":%s_%d" % (bindName, i) for i in range(nValues)])
+        return pattern.sub(lambda x: " IN (%s)" % inList, sqlstmt)
+
+    def processBulkSelect(self, sqlstmt, bindName, values, binds=None,
+                          conn=None, transaction=False, returnCursor=False):
+        """
+        _processBulkSelect_
+
+        Run a select that has a single "column = :bindName" condition for
+        many values of bindName.  Instead of one execution per value (which
+        is what processData does for a select with a list of binds) the
+        condition is rewritten into IN lists of up to maxBindsPerQuery
+        values, so only len(values) / maxBindsPerQuery queries are issued.
+        Values are de-duplicated and rows come back in no particular order,
+        so the select should return the bind column if the caller needs to
+        map rows back to the input values.  binds holds any other bind
+        variables of the statement, common to all values.
+
+        Raises if the statement can't be rewritten, see buildInList.
+        """
+        binds = binds or {}
+        values = list(set(values))
+        if len(values) == 0:
+            return []
+
+        sqlList = []
+        bindList = []
+        for start in range(0, len(values), self.maxBindsPerQuery):
+            chunk = values[start:start + self.maxBindsPerQuery]
+            bind = copy(binds)
+            for i, value in enumerate(chunk):
+                bind["%s_%d" % (bindName, i)] = value
+            sqlList.append(self.buildInList(sqlstmt, bindName, len(chunk)))
+            bindList.append(bind)
+
+        return self.processData(sqlList, bindList, conn=conn,
+                                transaction=transaction,
+                                returnCursor=returnCursor)
+
     def connection(self):
         """
         Return a connection to the engine (from the connection pool)
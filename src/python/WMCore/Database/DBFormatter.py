@@ -11,6 +11,7 @@ interactions.
 import datetime
 import time
 import types 
+from collections import namedtuple
 
 from WMCore.DataStructs.WMObject import WMObject
 
@@ -128,6 +129,85 @@ class DBFormatter(WMObject):
         return result
 
 
+    def cursorKeys(self, cursor):
+        """
+        _cursorKeys_
+
+        Return the lower cased column names of a cursor (ResultProxy),
+        regardless of the SQLAlchemy version providing them as an
+        attribute or a method.
+        """
+        if type(cursor.keys) == types.MethodType:
+            keys = cursor.keys()
+        else:
+            keys = cursor.keys
+        return [str(x).lower() for x in keys]
+
+    def formatIter(self, cursors, size=1000, rowType="dict"):
+        """
+        _formatIter_
+
+        Generator over the rows of a list of already executed cursors
+        (as returned by processData with returnCursor=True).  Rows are
+        pulled from the cursor with fetchmany in chunks of size, so the
+        result is never materialised in memory.  Column names are resolved
+        once per cursor and rows are yielded as:
+          dict       - same output as formatDict
+          tuple      - plain tuples, in the column order of the query
+          namedtuple - tuples with attribute access by column name
+
+        Cursors are closed when exhausted.
+        """
+        if rowType not in ("dict", "tuple", "namedtuple"):
+            raise ValueError("Unknown row type for formatIter: %s" % rowType)
+
+        for cursor in self.makelist(cursors):
+            if cursor.closed or not cursor.returns_rows:
+                continue
+            keys = self.cursorKeys(cursor)
+            rowClass = None
+            if rowType == "namedtuple":
+                rowClass = namedtuple("Row", keys, rename=True)
+            try:
+                while True:
+                    rows = cursor.fetchmany(size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        values = [str(x) if type(x) == unicode else x for x in row]
+                        if rowType == "dict":
+                            yield dict(zip(keys, values))
+                        elif rowType == "tuple":
+                            yield tuple(values)
+                        else:
+                            yield rowClass._make(values)
+            finally:
+                if not cursor.closed:
+                    cursor.close()
+
+    def executeIter(self, binds=None, conn=None, transaction=False,
+                    size=1000, rowType="dict"):
+        """
+        _executeIter_
+
+        Run self.sql with the given binds and stream the result through
+        formatIter.  If no connection is passed in, one is taken from the
+        pool and held until the generator is exhausted or closed.
+        """
+        connection = conn
+        if connection is None:
+            connection = self.dbi.connection()
+            transaction = True
+        try:
+            cursors = self.dbi.processData(self.sql, binds or {}, conn=connection,
+                                           transaction=transaction,
+                                           returnCursor=True)
+            for row in self.formatIter(cursors, size=size, rowType=rowType):
+                yield row
+        finally:
+            if conn is None:
+                connection.close()
+
     def getBinds(self, **kwargs):
         binds = {}
         for i in kwargs.keys():
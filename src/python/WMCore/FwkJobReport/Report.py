@@ -8,7 +8,9 @@ Framework job report object.
 """
 from __future__ import print_function
 
+import os
 import re
+import json
 import cPickle
 import logging
 import sys
@@ -34,6 +36,40 @@ class FwkJobReportException(WMException):
     """
     pass
 
+def getSummaryPath(reportPath):
+    """
+    _getSummaryPath_
+
+    Path of the summary written next to a pickled FWJR
+    """
+    return "%s.summary.json" % os.path.splitext(reportPath)[0]
+
+def loadReportSummary(reportPath):
+    """
+    _loadReportSummary_
+
+    Load the summary of a pickled FWJR, see Report.getSummary.  Return None
+    if there is no summary, or if it is older than the report.
+    """
+    summaryPath = getSummaryPath(reportPath)
+    try:
+        if os.path.getmtime(summaryPath) < os.path.getmtime(reportPath):
+            return None
+        with open(summaryPath, 'r') as handle:
+            return json.load(handle)
+    except (OSError, IOError, ValueError):
+        return None
+
+def loadSummaryFromReport(reportPath):
+    """
+    _loadSummaryFromReport_
+
+    Load a pickled FWJR and return its summary
+    """
+    report = Report()
+    report.load(reportPath)
+    return report.getSummary()
+
 def checkFileForCompletion(filee):
     """
     _checkFileForCompletion_
@@ -691,6 +727,35 @@ class Report:
         self.persist(filename)
         return
 
+    def getSummary(self):
+        """
+        _getSummary_
+
+        The part of the report needed to triage a failed job: the exit
+        codes, the first start and last stop time, the site and the status
+        of every step.
+        """
+        times = self.getFirstStartLastStop() or {}
+        steps = {}
+        for stepName in self.listSteps():
+            steps[stepName] = getattr(self.retrieveStep(stepName), 'status', None)
+
+        return {'exitCodes': sorted(self.getExitCodes()),
+                'startTime': times.get('startTime', None),
+                'stopTime': times.get('stopTime', None),
+                'siteName': self.getSiteName(),
+                'steps': steps}
+
+    def saveSummary(self, filename):
+        """
+        _saveSummary_
+
+        Write the summary of the report next to the report saved in filename
+        """
+        with open(getSummaryPath(filename), 'w') as handle:
+            json.dump(self.getSummary(), handle)
+        return
+
     def getOutputModule(self, step, outputModule):
         """
         _getOutputModule_
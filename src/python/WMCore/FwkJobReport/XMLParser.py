@@ -3,531 +3,437 @@
 _XMLParser_
 
 Read the raw XML output from the cmsRun executable.
+
+The report is filled straight from the expat events, see ReportBuilder,
+and parseReports parses many reports in a pool of processes.
 """
 from __future__ import print_function
 
 
 
 
-import os
 import re
 import logging
+import multiprocessing
 import xml.parsers.expat
 
 from WMCore.FwkJobReport import Report
 from WMCore.DataStructs.Run import Run
-from WMCore.Algorithms.ParseXMLFile import Node, xmlFileToNode, coroutine
-
-def reportBuilder(nodeStruct, report, target):
-    """
-    _reportBuilder_
 
-    Driver for coroutine pipe for building reports from the Node
-    structure.
+# storage statistics kept from the StorageStatistics performance summary
+goodStorageStatistics = re.compile('|'.join(['(?:%s)' % x for x in
+                                             ['Timing-([a-z]{4})-read(v?)-totalMegabytes',
+                                              'Timing-([a-z]{4})-write(v?)-totalMegabytes',
+                                              'Timing-([a-z]{4})-read(v?)-totalMsecs',
+                                              'Timing-([a-z]{4})-read(v?)-numOperations',
+                                              'Timing-([a-z]{4})-write(v?)-numOperations',
+                                              'Timing-([a-z]{4})-read(v?)-maxMsecs',
+                                              'Timing-tstoragefile-readActual-numOperations',
+                                              'Timing-tstoragefile-read-numOperations',
+                                              'Timing-tstoragefile-readViaCache-numSuccessfulOperations',
+                                              'Timing-tstoragefile-read-totalMsecs',
+                                              'Timing-tstoragefile-write-totalMsecs']]))
+readOperations = re.compile('Timing-([a-z]{4})-read(v?)-numOperations')
+writeOperations = re.compile('Timing-([a-z]{4})-write(v?)-numOperations')
+
+# memory statistics kept, and the name they're kept under
+goodMemoryStatistics = {'PeakValueRss': 'PeakValueRss',
+                        'PeakValueVsize': 'PeakValueVsize',
+                        # need to remove - chars from name as it buggers up downtstream code
+                        'LargestRssEvent-h-PSS': 'PeakValuePss'}
+
+
+def addStorageStatistics(report, storageValues):
     """
-    for node in nodeStruct.children:
-        target.send((report, node))
-
-@coroutine
-def reportDispatcher(targets):
-    """
-    _reportDispatcher_
-
-    Top level routine for dispatching the parts of the job report to the
-    handlers.
-    """
-    while True:
-        report, node = (yield)
-        if node.name != "FrameworkJobReport":
-            print("Not Handling: ", node.name)
-            #TODO: throw
-            continue
-
-        for subnode in node.children:
-            if subnode.name == "File":
-                targets['File'].send( (report, subnode) )
-            elif subnode.name == "InputFile":
-                targets['InputFile'].send( (report, subnode) )
-            elif subnode.name == "AnalysisFile":
-                targets['AnalysisFile'].send( (report, subnode) )
-            elif subnode.name == "PerformanceReport":
-                targets['PerformanceReport'].send( (report, subnode))
-            elif subnode.name == "FrameworkError":
-                targets['FrameworkError'].send( (report, subnode) )
-            elif subnode.name == "SkippedFile":
-                targets['SkippedFile'].send( (report, subnode) )
-            elif subnode.name == "FallbackAttempt":
-                targets['FallbackAttempt'].send( (report, subnode) )
-            elif subnode.name == "SkippedEvent":
-                targets['SkippedEvent'].send( (report, subnode) )
-            else:
-                setattr(report.report.parameters, subnode.name, subnode.text)
-
-@coroutine
-def fileHandler(targets):
-    """
-    _fileHandler_
-
-    coroutine to create files and handle sub data in the appropriate
-    dispatchers
+    _addStorageStatistics_
 
+    Add the storage performance figures computed from the statistics of the
+    Storage report, {name: value} in report order, to the storage section.
     """
-    while True:
-        report, node = (yield)
-        moduleName = None
-        moduleNode = [ x for x in node.children if x.name == "ModuleLabel"][0]
-        moduleName = moduleNode.text
-
-        moduleRef = report.addOutputModule(moduleName)
-        fileRef = report.addOutputFile(moduleName)
-        fileAttrs = {}
-        for subnode in node.children:
-            if subnode.name == "Inputs":
-                targets['Inputs'].send( (fileRef, subnode) )
-            elif subnode.name == "Runs":
-                targets['Runs'].send( (fileRef, subnode) )
-            elif subnode.name == "Branches":
-                targets['Branches'].send( (fileRef, subnode) )
-            else:
-                fileAttrs[subnode.name] = subnode.text
-
-        Report.addAttributesToFile(fileRef, lfn = fileAttrs["LFN"],
-                                   pfn = fileAttrs["PFN"], catalog = fileAttrs["Catalog"],
-                                   module_label = fileAttrs["ModuleLabel"],
-                                   guid = fileAttrs["GUID"],
-                                   ouput_module_class = fileAttrs["OutputModuleClass"],
-                                   events = int(fileAttrs["TotalEvents"]),
-                                   branch_hash = fileAttrs["BranchHash"])
-
-        [fileRef]
-
-@coroutine
-def inputFileHandler(targets):
+    writeMethod = None
+    readMethod  = None
+    # Figure out read method
+    for key in storageValues.keys():
+        if readOperations.match(key):
+            if storageValues[key] != 0.0:
+                # This is the reader
+                readMethod = key.split('-')[1]
+                break
+    # Figure out the write method
+    for key in storageValues.keys():
+        if writeOperations.match(key):
+            if storageValues[key] != 0.0:
+                # This is the reader
+                writeMethod = key.split('-')[1]
+                break
+
+    # Then assemble the information
+    # Calculate the values
+    logging.debug("ReadMethod: %s" % readMethod)
+    logging.debug("WriteMethod: %s" % writeMethod)
+    try:
+        readTotalMB = storageValues.get("Timing-%s-read-totalMegabytes" % readMethod, 0) \
+                      + storageValues.get("Timing-%s-readv-totalMegabytes" % readMethod, 0)
+        readMSecs   = (storageValues.get("Timing-%s-read-totalMsecs" % readMethod, 0)\
+                       + storageValues.get("Timing-%s-readv-totalMsecs" % readMethod, 0))
+        totalReads  = storageValues.get("Timing-%s-read-numOperations" % readMethod, 0) \
+                      + storageValues.get("Timing-%s-readv-numOperations" % readMethod, 0)
+        readMaxMSec = max(storageValues.get("Timing-%s-read-maxMsecs" % readMethod, 0),
+                          storageValues.get("Timing-%s-readv-maxMsecs" % readMethod, 0))
+        readPercOps = storageValues.get("Timing-tstoragefile-readActual-numOperations", 0)/\
+                      storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        readCachOps = storageValues.get("Timing-tstoragefile-readViaCache-numSuccessfulOperations", 0)/\
+                      storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        readTotalT  = 1000 * storageValues.get("Timing-tstoragefile-read-totalMSecs", 0)
+        readNOps    = storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        writeTime   = storageValues.get("Timing-tstoragefile-write-totalMsecs", 0) * 1000
+        writeTotMB  = storageValues.get("Timing-%s-write-totalMegabytes" % writeMethod, 0) \
+                      + storageValues.get("Timing-%s-writev-totalMegabytes" % writeMethod, 0)
+
+        if readMSecs > 0:
+            readMBSec = readTotalMB/readMSecs
+        else:
+            readMBSec = 0
+        if totalReads > 0:
+            readAveragekB = 1024* readTotalMB/totalReads
+        else:
+            readAveragekB = 0
+
+
+        # Attach them to the report
+        setattr(report, 'readTotalMB', readTotalMB)
+        setattr(report, 'readMBSec', readMBSec)
+        setattr(report, 'readAveragekB', readAveragekB)
+        setattr(report, 'readMaxMSec', readMaxMSec)
+        setattr(report, 'readPercentageOps', readPercOps)
+        setattr(report, 'readTotalSecs', readTotalT)
+        setattr(report, 'readNumOps', readNOps)
+        setattr(report, 'writeTotalSecs', writeTime)
+        setattr(report, 'writeTotalMB', writeTotMB)
+        setattr(report, 'readCachePercentageOps', readCachOps)
+    except ZeroDivisionError:
+        logging.error("Tried to divide by zero doing storage statistics report parsing.")
+        logging.error("Either you aren't reading and writing data, or you aren't reporting it.")
+        logging.error("Not adding any storage performance info to report.")
+
+
+class ReportBuilder(object):
     """
-    _inputFileHandler_
+    _ReportBuilder_
 
-    coroutine to create input files in the report and dispatch
-    sub data down the pipeline
+    expat handlers collecting the sections of a framework job report while
+    the XML is parsed, without building a node structure of the document.
 
+    Only what a section needs is kept: the attributes, runs and inputs of
+    a File or InputFile, the name and value of the performance statistics
+    we want and so on.  The text of an element is the stripped character
+    data after its last child element.  fillReport adds the sections to
+    the report, in document order, once the whole document is parsed, so
+    a corrupt report leaves the Report untouched.
     """
-    while True:
-        report, node = (yield)
-        moduleName = None
-        moduleNode = [ x for x in node.children if x.name == "ModuleLabel"][0]
-        moduleName = moduleNode.text
-
-        moduleRef = report.addInputSource(moduleName)
-        fileRef = report.addInputFile(moduleName)
-        fileAttrs = {}
-        for subnode in node.children:
-            if subnode.name == "Runs":
-                targets['Runs'].send( (fileRef, subnode) )
-            elif subnode.name == "Branches":
-                targets['Branches'].send( (fileRef, subnode) )
+    def __init__(self, report):
+        self.report = report
+        self.path = []
+        self.charCache = []
+        self.handled = False
+        self.section = None
+        self.sections = []
+
+    def startElement(self, name, attrs):
+        self.charCache = []
+        self.path.append(name)
+        depth = len(self.path)
+        if depth == 1:
+            self.handled = (name == "FrameworkJobReport")
+            if not self.handled:
+                print("Not Handling: ", name)
+                #TODO: throw
+        elif not self.handled:
+            return
+        elif depth == 2:
+            self.section = {'name': name, 'attrs': attrs}
+            if name in ("File", "InputFile"):
+                # file attributes, and the Inputs and Runs in order
+                self.section['fileAttrs'] = {}
+                self.section['parts'] = []
+            elif name == "AnalysisFile":
+                self.section['filename'] = None
+                self.section['attrs'] = {}
+            elif name == "PerformanceReport":
+                # [(metric, [(statistic name, value)])]
+                self.section['summaries'] = []
+        elif self.path[1] in ("File", "InputFile"):
+            self.startFilePart(name, attrs, depth)
+        elif self.path[1] == "AnalysisFile":
+            if depth == 3 and name != "FileName":
+                self.section['attrs'][name] = attrs.get('Value', None)
+        elif self.path[1] == "PerformanceReport":
+            if depth == 3:
+                self.section['summaries'].append((attrs.get('Metric', None), []))
+            elif depth == 4:
+                self.section['summaries'][-1][1].append((attrs['Name'], attrs.get('Value', None)))
+
+    def characters(self, data):
+        self.charCache.append(data)
+
+    def endElement(self, name):
+        text = ''.join(self.charCache).strip()
+        self.charCache = []
+        depth = len(self.path)
+        self.path.pop()
+        if not self.handled or depth == 1:
+            return
+        if depth == 2:
+            self.section['text'] = text
+            self.sections.append(self.section)
+            self.section = None
+        elif self.path[1] in ("File", "InputFile"):
+            self.endFilePart(name, text, depth)
+        elif self.path[1] == "AnalysisFile":
+            if depth == 3 and name == "FileName":
+                self.section['filename'] = text
+
+    def startFilePart(self, name, attrs, depth):
+        """
+        _startFilePart_
+
+        Collect the Runs and, for output files, the Inputs of a file.
+        Given the following XML:
+          <Runs>
+          <Run ID="122023">
+            <LumiSection ID="215"/>
+            <LumiSection ID="216"/>
+          </Run>
+          </Runs>
+          <Inputs>
+            <Input>
+              <LFN>/path/to/some/lfn.root</LFN>
+              <PFN>/some/pfn/info/path/to/some/lfn.root</PFN>
+            </Input>
+          </Inputs>
+        keep a WMCore.DataStructs.Run object per run and the LFN and PFN of
+        each input.  Branches are not kept, we dont need these anyways.
+        """
+        part = self.path[2]
+        if part == "Runs":
+            if depth == 3:
+                self.section['parts'].append(("Runs", []))
+            elif depth == 4:
+                self.section['run'] = attrs.get("ID", None) if name == "Run" else None
+                self.section['lumis'] = []
+            elif depth == 5 and self.section['run'] is not None and "ID" in attrs:
+                self.section['lumis'].append(int(attrs['ID']))
+        elif part == "Inputs" and self.path[1] == "File":
+            if depth == 3:
+                self.section['parts'].append(("Inputs", []))
+            elif depth == 4:
+                self.section['parts'][-1][1].append({})
+
+    def endFilePart(self, name, text, depth):
+        """
+        _endFilePart_
+
+        Keep the file attributes and complete the runs and inputs
+        """
+        if depth == 3:
+            if name == "Runs" or name == "Branches" or (name == "Inputs" and self.path[1] == "File"):
+                return
+            self.section['fileAttrs'][name] = text
+        elif self.path[2] == "Runs":
+            if depth == 4 and self.section['run'] is not None:
+                runInfo = Run(runNumber = self.section['run'])
+                runInfo.lumis.extend(self.section['lumis'])
+                self.section['parts'][-1][1].append(runInfo)
+        elif self.path[2] == "Inputs" and self.path[1] == "File":
+            if depth == 5:
+                self.section['parts'][-1][1][-1][name] = text
+
+    def fillReport(self):
+        """
+        _fillReport_
+
+        Add the sections collected to the report
+        """
+        report = self.report
+        for section in self.sections:
+            name = section['name']
+            attrs = section['attrs']
+            if name == "File" or name == "InputFile":
+                self.addFile(section)
+            elif name == "AnalysisFile":
+                report.addAnalysisFile(section['filename'], **attrs)
+            elif name == "PerformanceReport":
+                self.addPerformance(section['summaries'])
+            elif name == "FrameworkError":
+                excepcode = attrs.get("ExitStatus", 8001)
+                exceptype = attrs.get("Type", "CMSException")
+
+                # There should be atmost one step in the report at this point in time.
+                if len(report.listSteps()) == 0:
+                    report.addError("unknownStep", excepcode, exceptype, section['text'])
+                else:
+                    report.addError(report.listSteps()[0], excepcode, exceptype, section['text'])
+            elif name == "SkippedFile":
+                report.addSkippedFile(attrs.get("Lfn", None), attrs.get("Pfn", None))
+            elif name == "FallbackAttempt":
+                report.addFallbackFile(attrs.get("Lfn", None), attrs.get("Pfn", None))
+            elif name == "SkippedEvent":
+                run = attrs.get("Run", None)
+                event = attrs.get("Event", None)
+                if run == None: continue
+                if event == None: continue
+                report.addSkippedEvent(run, event)
             else:
-                fileAttrs[subnode.name] = subnode.text
-
-        Report.addAttributesToFile(fileRef, lfn = fileAttrs["LFN"],
-                                   pfn = fileAttrs["PFN"], catalog = fileAttrs["Catalog"],
-                                   module_label = fileAttrs["ModuleLabel"],
-                                   guid = fileAttrs["GUID"], input_type = fileAttrs["InputType"],
-                                   input_source_class = fileAttrs["InputSourceClass"],
-                                   events = int(fileAttrs["EventsRead"]))
-
-        [fileRef]
-
-@coroutine
-def analysisFileHandler(targets):
-    """
-    _analysisFileHandler_
-
-    handle analysis file entries in the report
+                setattr(report.report.parameters, name, section['text'])
+        self.sections = []
+        return
+
+    def addFile(self, section):
+        """
+        _addFile_
+
+        Create an output or input file in the report, with its inputs, runs
+        and attributes
+        """
+        fileAttrs = section['fileAttrs']
+        moduleName = fileAttrs["ModuleLabel"]
+        if section['name'] == "File":
+            self.report.addOutputModule(moduleName)
+            fileRef = self.report.addOutputFile(moduleName)
+        else:
+            self.report.addInputSource(moduleName)
+            fileRef = self.report.addInputFile(moduleName)
 
-    """
-    while True:
-        report, node = (yield)
-        filename = None
-        attrs = {}
-        for subnode in node.children:
-            if subnode.name == "FileName":
-                filename = subnode.text
+        for partName, values in section['parts']:
+            if partName == "Inputs":
+                for data in values:
+                    Report.addInputToFile(fileRef, data["LFN"], data['PFN'])
             else:
-                attrs[subnode.name] = subnode.attrs.get('Value', None)
-
-        report.addAnalysisFile(filename, **attrs)
-
-
-@coroutine
-def errorHandler():
-    """
-    _errorHandler_
-
-    Handle FrameworkError reports.
-    """
-    while True:
-        report, node = (yield)
-        excepcode = node.attrs.get("ExitStatus", 8001)
-        exceptype = node.attrs.get("Type", "CMSException")
-
-        # There should be atmost one step in the report at this point in time.
-        if len(report.listSteps()) == 0:
-            report.addError("unknownStep", excepcode, exceptype, node.text)
+                for runInfo in values:
+                    Report.addRunInfoToFile(fileRef, runInfo)
+
+        if section['name'] == "File":
+            Report.addAttributesToFile(fileRef, lfn = fileAttrs["LFN"],
+                                       pfn = fileAttrs["PFN"], catalog = fileAttrs["Catalog"],
+                                       module_label = fileAttrs["ModuleLabel"],
+                                       guid = fileAttrs["GUID"],
+                                       ouput_module_class = fileAttrs["OutputModuleClass"],
+                                       events = int(fileAttrs["TotalEvents"]),
+                                       branch_hash = fileAttrs["BranchHash"])
         else:
-            report.addError(report.listSteps()[0], excepcode, exceptype, node.text)
-
-@coroutine
-def skippedFileHandler():
-    while True:
-        report, node = (yield)
-        lfn = node.attrs.get("Lfn", None)
-        pfn = node.attrs.get("Pfn", None)
-        report.addSkippedFile(lfn, pfn)
-
-@coroutine
-def fallbackAttemptHandler():
-    while True:
-        report, node = (yield)
-        lfn = node.attrs.get("Lfn", None)
-        pfn = node.attrs.get("Pfn", None)
-        report.addFallbackFile(lfn, pfn)
-
-@coroutine
-def skippedEventHandler():
-    while True:
-        report, node = (yield)
-        run = node.attrs.get("Run", None)
-        event = node.attrs.get("Event", None)
-        if run == None: continue
-        if event == None: continue
-        report.addSkippedEvent(run, event)
-
-@coroutine
-def runHandler():
-    """
-    _runHandler_
-
-    Sink to add run information to a file.  Given the following XML:
-      <Runs>
-      <Run ID="122023">
-        <LumiSection ID="215"/>
-        <LumiSection ID="216"/>
-      </Run>
-      <Run ID="122024">
-        <LumiSection ID="1"/>
-        <LumiSection ID="2"/>
-      </Run>
-      </Runs>
-
-    Create a WMCore.DataStructs.Run object for each run and call the
-    addRunInfoToFile() function to add the run information to the file
-    section.
-    """
-    while True:
-        fileSection, node = (yield)
-        for subnode in node.children:
-            if subnode.name == "Run":
-                runId = subnode.attrs.get("ID", None)
-                if runId == None: continue
-
-                lumis = [ int(lumi.attrs['ID'])
-                          for lumi in subnode.children
-                          if "ID" in lumi.attrs]
-
-                runInfo = Run(runNumber = runId)
-                runInfo.lumis.extend(lumis)
-
-                Report.addRunInfoToFile(fileSection, runInfo)
-
-@coroutine
-def branchHandler():
-    """
-    _branchHandler_
-
-    Sink to pack branch information into a file.  Given the following XML:
-      <Branches>
-        <Branch>Branch Name 1</Branch>
-        <Branch>Branch Name 2</Branch>
-      </Branches>
-
-    Create a list containing all the branch names as use the
-    addBranchNamesToFile method to add them to the fileSection.
-
-    Nulled out, we dont need these anyways...
-
-    """
-    while True:
-        fileSection, node = (yield)
-        pass
-        #branches = [ subnode.text for subnode in node.children
-        #             if subnode.name == "Branch" ]
-        #Report.addBranchNamesToFile(fileSection, branches)
-
-@coroutine
-def inputAssocHandler():
-    """
-    _inputAssocHandler_
-
-    Sink to handle output:input association information.  Given the following
-    XML:
-      <Input>
-        <LFN>/path/to/some/lfn.root</LFN>
-        <PFN>/some/pfn/info/path/to/some/lfn.root</PFN>
-      </Input>
-
-    Extract the LFN and call the addInputToFile() function to associate input to
-    output in the FWJR.
-    """
-    while True:
-        fileSection, node = (yield)
-        for inputnode in node.children:
-            data = {}
-            [ data.__setitem__(subnode.name, subnode.text)
-              for subnode in inputnode.children]
-            Report.addInputToFile(fileSection, data["LFN"], data['PFN'])
-
-@coroutine
-def perfRepHandler(targets):
-    """
-    _perfRepHandler_
-
-    handle performance report subsections
-
-    """
-    while True:
-        report, node = (yield)
-        perfRep = report.report.performance
+            Report.addAttributesToFile(fileRef, lfn = fileAttrs["LFN"],
+                                       pfn = fileAttrs["PFN"], catalog = fileAttrs["Catalog"],
+                                       module_label = fileAttrs["ModuleLabel"],
+                                       guid = fileAttrs["GUID"], input_type = fileAttrs["InputType"],
+                                       input_source_class = fileAttrs["InputSourceClass"],
+                                       events = int(fileAttrs["EventsRead"]))
+        return
+
+    def addPerformance(self, summaries):
+        """
+        _addPerformance_
+
+        Pack the performance summaries into the performance section: Timing
+        into cpu, the memory statistics we want into memory, the storage
+        figures computed from the StorageStatistics into storage and the
+        other metrics into summaries.
+        """
+        perfRep = self.report.report.performance
         perfRep.section_("summaries")
         perfRep.section_("cpu")
         perfRep.section_("memory")
         perfRep.section_("storage")
-        for subnode in node.children:
-            metric = subnode.attrs.get('Metric', None)
+        for metric, statistics in summaries:
             if metric == "Timing":
-                targets['CPU'].send( (perfRep.cpu, subnode) )
+                for statName, value in statistics:
+                    setattr(perfRep.cpu, statName, value)
             elif metric == "SystemMemory" or metric == "ApplicationMemory":
-                targets['Memory'].send( (perfRep.memory, subnode) )
+                for statName, value in statistics:
+                    if statName in goodMemoryStatistics:
+                        setattr(perfRep.memory, goodMemoryStatistics[statName], value)
             elif metric == "StorageStatistics":
-                targets['Storage'].send( (perfRep.storage, subnode) )
-            else:
-                targets['PerformanceSummary'].send( (perfRep.summaries,
-                                                     subnode) )
+                logging.debug("Preparing to parse storage statistics")
+                storageValues = {}
+                for statName, value in statistics:
+                    if goodStorageStatistics.match(statName):
+                        storageValues[statName] = float(value)
+                addStorageStatistics(perfRep.storage, storageValues)
+            elif metric != None:
+                # Add performance section if it doesn't exist
+                if not hasattr(perfRep.summaries, metric):
+                    perfRep.summaries.section_(metric)
+                summRep = getattr(perfRep.summaries, metric)
+                for statName, value in statistics:
+                    setattr(summRep, statName, value)
+        return
 
 
-
-@coroutine
-def perfSummaryHandler():
+def xmlToJobReport(reportInstance, xmlFile):
     """
-    _perfSummaryHandler_
+    _xmlToJobReport_
 
-    Sink to handle performance summaries
+    parse the XML file and insert the information into the
+    Report instance provided
 
     """
-    while True:
-        report, node = (yield)
-        summary = node.attrs.get('Metric', None)
-        if summary == None: continue
-        # Add performance section if it doesn't exist
-        if not hasattr(report, summary):
-            report.section_(summary)
-        summRep = getattr(report, summary)
-
-        for subnode in node.children:
-            setattr(summRep, subnode.attrs['Name'],
-                    subnode.attrs['Value'])
-
-
-@coroutine
-def perfCPUHandler():
-    """
-    _perfCPUHandler_
+    builder = ReportBuilder(reportInstance)
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.returns_unicode = False
+    parser.StartElementHandler = builder.startElement
+    parser.EndElementHandler = builder.endElement
+    parser.CharacterDataHandler = builder.characters
+    with open(xmlFile, 'r') as handle:
+        parser.ParseFile(handle)
+    builder.fillReport()
+    return
 
-    sink that packs CPU reports into the job report
 
+def parseReportData(args):
     """
-    while True:
-        report, node = (yield)
-        for subnode in node.children:
-            setattr(report, subnode.attrs['Name'], subnode.attrs['Value'])
+    _parseReportData_
 
-@coroutine
-def perfMemHandler():
+    Parse a framework job report XML file into a new Report for the step,
+    returning the report data and the parsing error if there's one.
     """
-    _perfMemHandler_
-
-    Pack memory performance reports into the report
-    """
-    # Make a list of performance info we actually want
-    goodStatistics = ['PeakValueRss', 'PeakValueVsize', 'LargestRssEvent-h-PSS']
-
-    while True:
-        report, node = (yield)
-        for prop in node.children:
-            if prop.attrs['Name'] in goodStatistics:
-                if prop.attrs['Name'] == 'LargestRssEvent-h-PSS':
-                    # need to remove - chars from name as it buggers up downtstream code
-                    setattr(report, 'PeakValuePss', prop.attrs['Value'])
-                else:
-                    setattr(report, prop.attrs['Name'], prop.attrs['Value'])
-
-def checkRegEx(regexp, candidate):
-    if re.compile(regexp).match(candidate) == None:
-        return False
-    return True
+    xmlFile, stepName = args
+    report = Report.Report(stepName)
+    error = None
+    try:
+        report.parse(xmlFile, stepName)
+    except Report.FwkJobReportException as ex:
+        error = str(ex)
+    return report.data, error
 
 
-@coroutine
-def perfStoreHandler():
+def parseReports(xmlFiles, stepName="cmsRun1", processes=None):
     """
-    _perfStoreHandler_
+    _parseReports_
 
-    Handle the information from the Storage report
+    Parse many framework job report XML files in a pool of processes, by
+    default one per CPU.  Returns a (Report, error) per file, in order, the
+    error being None for the files parsed.  The reports of the files that
+    failed have the error added like Report.parse does.
     """
+    tasks = [(xmlFile, stepName) for xmlFile in xmlFiles]
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(tasks))
 
-    # Make a list of performance info we actually want
-    goodStatistics = ['Timing-([a-z]{4})-read(v?)-totalMegabytes',
-                      'Timing-([a-z]{4})-write(v?)-totalMegabytes',
-                      'Timing-([a-z]{4})-read(v?)-totalMsecs',
-                      'Timing-([a-z]{4})-read(v?)-numOperations',
-                      'Timing-([a-z]{4})-write(v?)-numOperations',
-                      'Timing-([a-z]{4})-read(v?)-maxMsecs',
-                      'Timing-tstoragefile-readActual-numOperations',
-                      'Timing-tstoragefile-read-numOperations',
-                      'Timing-tstoragefile-readViaCache-numSuccessfulOperations',
-                      'Timing-tstoragefile-read-numOperations',
-                      'Timing-tstoragefile-read-totalMsecs',
-                      'Timing-tstoragefile-write-totalMsecs',
-                      ]
-
-    while True:
-        report, node = (yield)
-        logging.debug("Preparing to parse storage statistics")
-        storageValues = {}
-        for prop in node.children:
-            name = prop.attrs['Name']
-            for statName in goodStatistics:
-                if checkRegEx(statName, name):
-                    storageValues[name] = float(prop.attrs['Value'])
-                    #setattr(report, name, prop.attrs['Value'])
-
-        writeMethod = None
-        readMethod  = None
-        # Figure out read method
-        for key in storageValues.keys():
-            if checkRegEx('Timing-([a-z]{4})-read(v?)-numOperations', key):
-                if storageValues[key] != 0.0:
-                    # This is the reader
-                    readMethod = key.split('-')[1]
-                    break
-        # Figure out the write method
-        for key in storageValues.keys():
-            if checkRegEx('Timing-([a-z]{4})-write(v?)-numOperations', key):
-                if storageValues[key] != 0.0:
-                    # This is the reader
-                    writeMethod = key.split('-')[1]
-                    break
-
-        # Then assemble the information
-        # Calculate the values
-        logging.debug("ReadMethod: %s" % readMethod)
-        logging.debug("WriteMethod: %s" % writeMethod)
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
         try:
-            readTotalMB = storageValues.get("Timing-%s-read-totalMegabytes" % readMethod, 0) \
-                          + storageValues.get("Timing-%s-readv-totalMegabytes" % readMethod, 0)
-            readMSecs   = (storageValues.get("Timing-%s-read-totalMsecs" % readMethod, 0)\
-                           + storageValues.get("Timing-%s-readv-totalMsecs" % readMethod, 0))
-            totalReads  = storageValues.get("Timing-%s-read-numOperations" % readMethod, 0) \
-                          + storageValues.get("Timing-%s-readv-numOperations" % readMethod, 0)
-            readMaxMSec = max(storageValues.get("Timing-%s-read-maxMsecs" % readMethod, 0),
-                              storageValues.get("Timing-%s-readv-maxMsecs" % readMethod, 0))
-            readPercOps = storageValues.get("Timing-tstoragefile-readActual-numOperations", 0)/\
-                          storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            readCachOps = storageValues.get("Timing-tstoragefile-readViaCache-numSuccessfulOperations", 0)/\
-                          storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            readTotalT  = 1000 * storageValues.get("Timing-tstoragefile-read-totalMSecs", 0)
-            readNOps    = storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            writeTime   = storageValues.get("Timing-tstoragefile-write-totalMsecs", 0) * 1000
-            writeTotMB  = storageValues.get("Timing-%s-write-totalMegabytes" % writeMethod, 0) \
-                          + storageValues.get("Timing-%s-writev-totalMegabytes" % writeMethod, 0)
-
-            if readMSecs > 0:
-                readMBSec = readTotalMB/readMSecs
-            else:
-                readMBSec = 0
-            if totalReads > 0:
-                readAveragekB = 1024* readTotalMB/totalReads
-            else:
-                readAveragekB = 0
-
-
-            # Attach them to the report
-            setattr(report, 'readTotalMB', readTotalMB)
-            setattr(report, 'readMBSec', readMBSec)
-            setattr(report, 'readAveragekB', readAveragekB)
-            setattr(report, 'readMaxMSec', readMaxMSec)
-            setattr(report, 'readPercentageOps', readPercOps)
-            setattr(report, 'readTotalSecs', readTotalT)
-            setattr(report, 'readNumOps', readNOps)
-            setattr(report, 'writeTotalSecs', writeTime)
-            setattr(report, 'writeTotalMB', writeTotMB)
-            setattr(report, 'readCachePercentageOps', readCachOps)
-        except ZeroDivisionError:
-            logging.error("Tried to divide by zero doing storage statistics report parsing.")
-            logging.error("Either you aren't reading and writing data, or you aren't reporting it.")
-            logging.error("Not adding any storage performance info to report.")
-
-
-
-
-
-
-
-
-
-def xmlToJobReport(reportInstance, xmlFile):
-    """
-    _xmlToJobReport_
-
-    parse the XML file and insert the information into the
-    Report instance provided
-
-    """
-    # read XML, build node structure
-    node = xmlFileToNode(xmlFile)
-
-    #  //
-    # // Set up coroutine pipeline
-    #//
-    fileDispatchers = {
-        "Runs" : runHandler(),
-        "Branches" : branchHandler(),
-        "Inputs" : inputAssocHandler(),
-        }
-
-    perfRepDispatchers = {
-        "PerformanceSummary" : perfSummaryHandler(),
-        "CPU" : perfCPUHandler(),
-        "Memory" : perfMemHandler(),
-        "Storage": perfStoreHandler(),
-        }
-
-    dispatchers  = {
-        "File" : fileHandler(fileDispatchers),
-        "InputFile": inputFileHandler(fileDispatchers),
-        "PerformanceReport" : perfRepHandler(perfRepDispatchers),
-        "AnalysisFile" : analysisFileHandler(fileDispatchers),
-        "FrameworkError" : errorHandler(),
-        "SkippedFile" : skippedFileHandler(),
-        "FallbackAttempt" : fallbackAttemptHandler(),
-        "SkippedEvent" : skippedEventHandler(),
-        }
-
-    #  //
-    # // Feed pipeline with node structure and report result instance
-    #//
-    reportBuilder(
-        node, reportInstance,
-        reportDispatcher(dispatchers)
-        )
-
-    return
-childrenMatching = lambda node, nname: [x for x in node.children if x.name == nname]
+            results = pool.map(parseReportData, tasks, chunksize = max(1, len(tasks) // (4 * processes)))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [parseReportData(task) for task in tasks]
+
+    reports = []
+    for data, error in results:
+        report = Report.Report()
+        report.data = data
+        report.report = getattr(data, stepName)
+        reports.append((report, error))
+    return reports
@@ -19,7 +19,7 @@ import math
 
 from WMCore.DataStructs.Run         import Run
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.JobSplitting.LumiBased  import isGoodLumi, isGoodRun, LumiChecker
+from WMCore.JobSplitting.LumiBased  import isGoodLumi, isGoodRun, buildGoodRunRanges, LumiChecker
 from WMCore.WMBS.File               import File
 from WMCore.WMSpec.WMTask           import buildLumiMask
 
@@ -95,6 +95,9 @@ class EventAwareLumiBased(JobFactory):
                     logging.error(msg)
                     return
 
+        if goodRunList:
+            goodRunList = buildGoodRunRanges(goodRunList)
+
         lDict = self.sortByLocation()
         locationDict = {}
 
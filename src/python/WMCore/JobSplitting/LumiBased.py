@@ -16,6 +16,7 @@ import threading
 import traceback
 
 from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.RunLumiRanges import RunLumiRanges
 
 from WMCore.JobSplitting.JobFactory import JobFactory
 from WMCore.WMBS.File               import File
@@ -31,6 +32,9 @@ def isGoodLumi(goodRunList, run, lumi):
     if goodRunList == None or goodRunList == {}:
         return True
 
+    if isinstance(goodRunList, RunLumiRanges):
+        return goodRunList.contains(run, lumi)
+
     if not isGoodRun(goodRunList = goodRunList, run = run):
         return False
 
@@ -53,12 +57,34 @@ def isGoodRun(goodRunList, run):
     if goodRunList == None or goodRunList == {}:
         return True
 
-    if str(run) in goodRunList.keys():
+    if isinstance(goodRunList, RunLumiRanges):
+        return goodRunList.hasRun(run)
+
+    if str(run) in goodRunList:
         # @e can find a run
         return True
 
     return False
 
+def buildGoodRunRanges(goodRunList):
+    """
+    _buildGoodRunRanges_
+
+    Index a goodRunList, {'run': [[firstLumi, lastLumi], ...]}, for
+    isGoodRun and isGoodLumi.  Invalid ranges are dropped, the same lumis
+    fail as with the plain dictionary.
+    """
+    ranges = RunLumiRanges()
+    for run, runRanges in goodRunList.items():
+        validRanges = []
+        for runRange in runRanges:
+            if len(runRange) == 2:
+                validRanges.append(runRange)
+            else:
+                logging.error("Invalid run range %s for run %s!  Ignoring it!" % (runRange, run))
+        ranges.addRun(run, validRanges)
+    return ranges
+
 class LumiChecker:
     """ Simple utility class that helps correcting dataset that have lumis split across jobs:
 
@@ -203,6 +229,9 @@ class LumiBased(JobFactory):
                     logging.error(msg)
                     return
 
+        if goodRunList:
+            goodRunList = buildGoodRunRanges(goodRunList)
+
         lDict = self.sortByLocation()
         locationDict = {}
 
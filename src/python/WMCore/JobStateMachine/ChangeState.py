@@ -94,6 +94,15 @@ class ChangeState(WMObject, WMConnectionBase):
         self.updateLocationDAO = self.daofactory("Jobs.UpdateLocation")
 
         self.maxUploadedInputFiles = getattr(self.config.JobStateMachine, 'maxFWJRInputFiles', 1000)
+
+        # Write the jobs and fwjrs documents from the background thread of the process
+        self.jobDumpWriter = None
+        if getattr(self.config.JobStateMachine, 'asyncCouchWrites', False):
+            from WMCore.JobStateMachine.JobDumpWriter import getJobDumpWriter
+            self.jobDumpWriter = getJobDumpWriter(self.config.JobStateMachine.couchurl, self.dbname,
+                                                  maxQueueSize = getattr(self.config.JobStateMachine, 'couchQueueSize', 100000),
+                                                  batchSize = getattr(self.config.JobStateMachine, 'couchBatchSize', 1000),
+                                                  flushInterval = getattr(self.config.JobStateMachine, 'couchFlushInterval', 10))
         return
 
     def _connectDatabases(self):
@@ -264,7 +273,15 @@ class ChangeState(WMObject, WMConnectionBase):
 
                 couchRecordsToUpdate.append({"jobid": job["id"],
                                              "couchid": jobDocument["_id"]})
-                self.jobsdatabase.queue(jobDocument, callback = discardConflictingDocument)
+                if self.jobDumpWriter:
+                    self.jobDumpWriter.queueJob(jobDocument)
+                else:
+                    self.jobsdatabase.queue(jobDocument, callback = discardConflictingDocument)
+            elif self.jobDumpWriter:
+                self.jobDumpWriter.queueTransition(couchDocID, {"oldstate": oldstate,
+                                                                "newstate": newstate,
+                                                                "location": jobLocation,
+                                                                "timestamp": timestamp})
             else:
                 # We send a PUT request to the stateTransition update handler.
                 # Couch expects the parameters to be passed as arguments to in
@@ -337,7 +354,10 @@ class ChangeState(WMObject, WMConnectionBase):
                                 "archivestatus": archStatus,
                                 "fwjr": jsonFWJR,
                                 "type": "fwjr"}
-                self.fwjrdatabase.queue(fwjrDocument, timestamp = True, callback = discardConflictingDocument)
+                if self.jobDumpWriter:
+                    self.jobDumpWriter.queueFWJR(self.fwjrdatabase.timestamp(fwjrDocument, True))
+                else:
+                    self.fwjrdatabase.queue(fwjrDocument, timestamp = True, callback = discardConflictingDocument)
                 
                 updateSummaryDB(self.statsumdatabase, job)
 
@@ -427,11 +447,25 @@ class ChangeState(WMObject, WMConnectionBase):
                                      conn = self.getDBConn(),
                                      transaction = self.existingTransaction())
 
-        self.jobsdatabase.commit(callback = discardConflictingDocument)
-        self.fwjrdatabase.commit(callback = discardConflictingDocument)
+        if not self.jobDumpWriter:
+            self.jobsdatabase.commit(callback = discardConflictingDocument)
+            self.fwjrdatabase.commit(callback = discardConflictingDocument)
         self.jsumdatabase.commit()
         return
 
+    def flushCouch(self, timeout = None):
+        """
+        _flushCouch_
+
+        Wait for the jobdump documents still queued for the background
+        writer to be written, if writing asynchronously.  The writer is
+        shared, so this also flushes the other ChangeState instances of
+        the process.
+        """
+        if self.jobDumpWriter:
+            return self.jobDumpWriter.flush(timeout)
+        return True
+
     def persist(self, jobs, newstate, oldstate):
         """
         _persist_
@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+"""
+_JobDumpWriter_
+
+Background writer for the jobdump couch databases.
+
+ChangeState hands the job documents, state transitions and FWJR documents
+to the writer, which posts them in batches through _bulk_docs from its own
+thread, so a state transition only waits for the SQL part.  State
+transitions of existing job documents are applied to the documents loaded
+in bulk instead of calling the stateTransition update handler once per job.
+
+There is one writer per process and jobdump, shared by all the ChangeState
+instances; the components flush it when they terminate and the Harness
+stops it on shutdown so nothing queued is lost.  Its queue depth and failed
+flushes are reported in the worker heartbeats.
+"""
+
+import time
+import Queue
+import logging
+import threading
+import traceback
+
+from WMCore.Database.CMSCouch import CouchServer, CouchNotFoundError, CouchError
+from WMCore.JobStateMachine.ChangeState import discardConflictingDocument
+
+
+def addStateTransition(doc, transition):
+    """
+    _addStateTransition_
+
+    Append a transition to the states of a job document, the same way the
+    JobDump stateTransition update handler does.
+    """
+    states = doc.setdefault("states", {})
+    maxKey = 0
+    for key in states.keys():
+        maxKey = max(maxKey, int(key))
+    states[str(maxKey + 1)] = transition
+    return doc
+
+
+def mergeStates(doc, current):
+    """
+    _mergeStates_
+
+    Add the transitions of the job document already in couch to the states
+    of the one about to be written, renumbered in timestamp order.
+    """
+    states = doc.get("states", {})
+    transitions = [states[key] for key in sorted(states.keys(), key = int)]
+    currentStates = current.get("states", {})
+    for key in sorted(currentStates.keys(), key = int):
+        if currentStates[key] not in transitions:
+            transitions.append(currentStates[key])
+    transitions.sort(key = lambda x: int(x["timestamp"]))
+    doc["states"] = dict([(str(i), x) for i, x in enumerate(transitions)])
+    return doc
+
+
+def mergeConflictingJobDocument(couchDbInstance, data, result, retries = 3):
+    """
+    _mergeConflictingJobDocument_
+
+    Conflict callback for new job documents.  The document may already have
+    been created by a transition written from another process, so instead
+    of replacing it the states of the current revision are merged into the
+    new document before it is written again.
+    """
+    conflictingId = result["id"]
+    doc = None
+    for queuedDoc in data["docs"]:
+        if queuedDoc["_id"] == conflictingId:
+            doc = queuedDoc
+            break
+    if doc is None:
+        return result
+
+    retval = result
+    try:
+        for _ in range(retries):
+            try:
+                current = couchDbInstance.document(conflictingId)
+            except CouchNotFoundError:
+                doc.pop("_rev", None)
+            else:
+                mergeStates(doc, current)
+                doc["_rev"] = current["_rev"]
+            retval = couchDbInstance.commitOne(doc)
+            if not retval or retval[0].get("error", None) != "conflict":
+                break
+    except CouchError as ex:
+        logging.error("Couldn't merge the states of job document %s: %s" % (conflictingId, str(ex)))
+    return retval
+
+
+class JobDumpWriter(threading.Thread):
+    """
+    _JobDumpWriter_
+
+    Thread writing the jobdump documents queued by ChangeState.  The queue is
+    bounded, callers block when the writer falls behind by more than
+    maxQueueSize documents.  Queued documents are written once batchSize of
+    them are pending or flushInterval seconds after the oldest one was
+    queued, whatever comes first.
+    """
+    def __init__(self, couchURL, dbname, maxQueueSize = 100000,
+                 batchSize = 1000, flushInterval = 10):
+        threading.Thread.__init__(self, name = "JobDumpWriter")
+        self.daemon = True
+
+        self.couchURL = couchURL
+        self.dbname = dbname
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.queue = Queue.Queue(maxQueueSize)
+
+        self.jobsdatabase = None
+        self.fwjrdatabase = None
+
+        self.jobDocs = []
+        self.transitions = []
+        self.fwjrDocs = []
+        self.oldestPending = None
+
+        self.metrics = {"flushes": 0, "failedFlushes": 0, "docsWritten": 0,
+                        "lastFlushTime": 0.0, "maxFlushTime": 0.0,
+                        "totalFlushTime": 0.0}
+        self.metricsLock = threading.Lock()
+        return
+
+    def connectDatabases(self):
+        """
+        _connectDatabases_
+
+        Open the writer own connections to the jobs and fwjrs databases.
+        """
+        if self.jobsdatabase is None or self.fwjrdatabase is None:
+            couchdb = CouchServer(self.couchURL)
+            self.jobsdatabase = couchdb.connectDatabase("%s/jobs" % self.dbname, size = self.batchSize)
+            self.fwjrdatabase = couchdb.connectDatabase("%s/fwjrs" % self.dbname, size = self.batchSize)
+        return
+
+    def queueJob(self, jobDocument):
+        """
+        _queueJob_
+
+        Queue a new job document.
+        """
+        self.queue.put(("job", jobDocument))
+        return
+
+    def queueTransition(self, couchID, transition):
+        """
+        _queueTransition_
+
+        Queue a state transition for an existing job document.
+        """
+        self.queue.put(("transition", (couchID, transition)))
+        return
+
+    def queueFWJR(self, fwjrDocument):
+        """
+        _queueFWJR_
+
+        Queue a FWJR document.
+        """
+        self.queue.put(("fwjr", fwjrDocument))
+        return
+
+    def flush(self, timeout = None):
+        """
+        _flush_
+
+        Wait until everything queued before the call has been written.
+        Return False if that did not happen within timeout seconds.
+        """
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        done.wait(timeout)
+        return done.isSet()
+
+    def stop(self, timeout = None):
+        """
+        _stop_
+
+        Write everything queued and stop the thread, waiting at most
+        timeout seconds.  Return False if the thread is still running.
+        """
+        try:
+            self.queue.put(("stop", None), True, timeout)
+        except Queue.Full:
+            pass
+        else:
+            self.join(timeout)
+        if self.isAlive():
+            logging.warning("JobDumpWriter for %s did not stop, dropping %i queued documents" %
+                            (self.dbname, self.queue.qsize() + self.nPending()))
+            return False
+        return True
+
+    def getMetrics(self):
+        """
+        _getMetrics_
+
+        Return the queue depth and the flush statistics.
+        """
+        with self.metricsLock:
+            metrics = dict(self.metrics)
+        metrics["queueDepth"] = self.queue.qsize()
+        metrics["pending"] = self.nPending()
+        if metrics["flushes"]:
+            metrics["avgFlushTime"] = metrics["totalFlushTime"] / metrics["flushes"]
+        else:
+            metrics["avgFlushTime"] = 0.0
+        return metrics
+
+    def nPending(self):
+        """
+        _nPending_
+
+        Number of documents taken from the queue and not written yet.
+        """
+        return len(self.jobDocs) + len(self.transitions) + len(self.fwjrDocs)
+
+    def run(self):
+        """
+        _run_
+
+        Take the documents from the queue and write them in batches.
+        """
+        while True:
+            if self.oldestPending is None:
+                timeout = None
+            else:
+                timeout = max(0, self.oldestPending + self.flushInterval - time.time())
+
+            try:
+                if timeout is None:
+                    kind, item = self.queue.get()
+                else:
+                    kind, item = self.queue.get(True, timeout)
+            except Queue.Empty:
+                self.writePending()
+                continue
+
+            if kind == "flush":
+                self.writePending()
+                item.set()
+                continue
+            elif kind == "stop":
+                self.writePending()
+                break
+
+            if kind == "job":
+                self.jobDocs.append(item)
+            elif kind == "transition":
+                self.transitions.append(item)
+            elif kind == "fwjr":
+                self.fwjrDocs.append(item)
+            if self.oldestPending is None:
+                self.oldestPending = time.time()
+
+            if self.nPending() >= self.batchSize:
+                self.writePending()
+        return
+
+    def writePending(self):
+        """
+        _writePending_
+
+        Write the pending documents.  New job documents go first so the
+        transitions queued after them find them.  A failed batch is logged
+        and dropped, like the synchronous writes in ChangeState.
+        """
+        if self.nPending() == 0:
+            self.oldestPending = None
+            return
+
+        nDocs = self.nPending()
+        startTime = time.time()
+        try:
+            self.connectDatabases()
+            if self.jobDocs:
+                for jobDocument in self.jobDocs:
+                    self.jobsdatabase.queue(jobDocument, callback = mergeConflictingJobDocument)
+                self.jobsdatabase.commit(callback = mergeConflictingJobDocument)
+            if self.transitions:
+                self.writeTransitions(self.transitions)
+            if self.fwjrDocs:
+                for fwjrDocument in self.fwjrDocs:
+                    self.fwjrdatabase.queue(fwjrDocument, callback = discardConflictingDocument)
+                self.fwjrdatabase.commit(callback = discardConflictingDocument)
+            failed = False
+        except Exception as ex:
+            logging.error("Error writing %i documents to the jobdump: %s" % (nDocs, str(ex)))
+            logging.error(traceback.format_exc())
+            self.jobsdatabase = None
+            self.fwjrdatabase = None
+            failed = True
+
+        flushTime = time.time() - startTime
+        with self.metricsLock:
+            if failed:
+                self.metrics["failedFlushes"] += 1
+            else:
+                self.metrics["flushes"] += 1
+                self.metrics["docsWritten"] += nDocs
+                self.metrics["lastFlushTime"] = flushTime
+                self.metrics["maxFlushTime"] = max(self.metrics["maxFlushTime"], flushTime)
+                self.metrics["totalFlushTime"] += flushTime
+        logging.debug("Wrote %i jobdump documents in %.2f s, %i still queued" % (nDocs, flushTime,
+                                                                                  self.queue.qsize()))
+
+        self.jobDocs = []
+        self.transitions = []
+        self.fwjrDocs = []
+        self.oldestPending = None
+        return
+
+    def writeTransitions(self, transitions):
+        """
+        _writeTransitions_
+
+        Load the job documents in bulk, append their transitions and post
+        them back.  Documents changed by someone else in the meantime get
+        their transitions through the stateTransition update handler.
+        """
+        byDocument = {}
+        for couchID, transition in transitions:
+            byDocument.setdefault(couchID, []).append(transition)
+
+        def retryTransitions(couchDbInstance, data, result):
+            return self.updateTransitions(result["id"], byDocument[result["id"]])
+
+        couchIDs = byDocument.keys()
+        for i in range(0, len(couchIDs), self.batchSize):
+            keys = couchIDs[i:i + self.batchSize]
+            result = self.jobsdatabase.allDocs(options = {"include_docs": True}, keys = keys)
+            for row in result["rows"]:
+                doc = row.get("doc", None)
+                if doc is None:
+                    doc = {"_id": row["key"], "states": {}}
+                for transition in byDocument[row["key"]]:
+                    addStateTransition(doc, transition)
+                self.jobsdatabase.queue(doc)
+            self.jobsdatabase.commit(callback = retryTransitions)
+        return
+
+    def updateTransitions(self, couchID, transitions):
+        """
+        _updateTransitions_
+
+        Apply transitions one by one through the update handler.
+        """
+        retval = None
+        for transition in transitions:
+            updateUri = "/" + self.jobsdatabase.name + "/_design/JobDump/_update/stateTransition/" + couchID
+            updateUri += "?oldstate=%s&newstate=%s&location=%s&timestamp=%s" % (transition["oldstate"],
+                                                                                transition["newstate"],
+                                                                                transition["location"],
+                                                                                transition["timestamp"])
+            retval = self.jobsdatabase.makeRequest(uri = updateUri, type = "PUT", decode = False)
+        return retval
+
+
+
+_writersLock = threading.Lock()
+_writers = {}
+
+
+def getJobDumpWriter(couchURL, dbname, **options):
+    """
+    _getJobDumpWriter_
+
+    The running writer of the process for a jobdump, started on first use
+    with the given JobDumpWriter options.
+    """
+    key = (couchURL, dbname)
+    with _writersLock:
+        writer = _writers.get(key, None)
+        if writer is None or not writer.isAlive():
+            writer = JobDumpWriter(couchURL, dbname, **options)
+            writer.start()
+            _writers[key] = writer
+    return writer
+
+
+def stopJobDumpWriters(timeout = None):
+    """
+    _stopJobDumpWriters_
+
+    Write everything queued and stop all the writers of the process,
+    waiting at most timeout seconds for each of them.
+    """
+    with _writersLock:
+        writers = _writers.values()
+        _writers.clear()
+    for writer in writers:
+        writer.stop(timeout)
+    return
+
+
+def jobDumpWriterSummary():
+    """
+    _jobDumpWriterSummary_
+
+    One line summary of the writers of the process, for heartbeats.  None
+    if there are no writers.
+    """
+    with _writersLock:
+        writers = _writers.values()
+    if not writers:
+        return None
+
+    summary = {"queued": 0, "failedFlushes": 0, "docsWritten": 0}
+    for writer in writers:
+        metrics = writer.getMetrics()
+        summary["queued"] += metrics["queueDepth"] + metrics["pending"]
+        summary["failedFlushes"] += metrics["failedFlushes"]
+        summary["docsWritten"] += metrics["docsWritten"]
+    return "jobdump %(queued)i queued, %(docsWritten)i written, %(failedFlushes)i failed flushes" % summary
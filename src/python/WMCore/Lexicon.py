@@ -44,6 +44,31 @@ userProcDSParts = {
 
 STORE_RESULTS_LFN = '/store/results/%(physics_group)s/%(era)s/%(primDS)s/%(tier)s/%(secondary)s' % lfnParts
 
+# LFN patterns, tried in this order by lfn()
+LFN_RE = '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root'
+LFN_LUSTRE_RE = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root'
+USER_LFN_RE = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(secondary)s/%(version)s/%(counter)s/%(root)s' % lfnParts
+USER_SUBDIR_LFN_RE = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/(%(subdir)s/)+%(root)s' % lfnParts
+TIER0_LFN_RE = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s(/%(counter)s)?/%(root)s' % lfnParts
+OLD_TIER0_LFN_RE = '/store/data/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s/%(root)s' % lfnParts
+STORE_MC_LFN_RE = '/store/mc/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)(/([a-zA-Z0-9\-_]+))*/([a-zA-Z0-9\-_]+).root'
+LHE_LFN_RE = '/store/lhe/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}'
+# This is for future lhe LFN structure. Need to be tested.
+LHE_DATASET_LFN_RE = '/store/lhe/%(primDS)s/%(secondary)s/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}' % lfnParts
+STORE_RESULTS2_LFN_RE = '/store/results/%(physics_group)s/%(primDS)s/%(secondary)s/%(primDS)s/%(tier)s/%(secondary)s/%(counter)s/%(root)s' % lfnParts
+STORE_RESULTS_LFN_RE = "%s/%s" % (STORE_RESULTS_LFN, '%(counter)s/%(root)s' % lfnParts)
+
+LFN_REGEXPS = [LFN_RE, LFN_LUSTRE_RE, USER_LFN_RE, USER_SUBDIR_LFN_RE, TIER0_LFN_RE,
+               OLD_TIER0_LFN_RE, STORE_MC_LFN_RE, LHE_LFN_RE, LHE_DATASET_LFN_RE,
+               STORE_RESULTS2_LFN_RE, STORE_RESULTS_LFN_RE]
+
+# LFN base patterns, tried in this order by lfnBase()
+LFNBASE_REGEXPS = ['/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)',
+                   '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}',
+                   '/(store)/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(secondary)s/%(version)s' % lfnParts,
+                   '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s' % lfnParts,
+                   STORE_RESULTS_LFN]
+
 
 def DBSUser(candidate):
     """
@@ -279,74 +304,10 @@ def lfn(candidate):
 
     Add for LHE files: /data/lhe/...
     """
-    regexp1 = '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root'
-    regexp2 = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root'
-    regexp3 = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(secondary)s/%(version)s/%(counter)s/%(root)s' % lfnParts
-    regexp4 = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/(%(subdir)s/)+%(root)s' % lfnParts
-
-    oldStyleTier0LFN = '/store/data/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s/%(root)s' % lfnParts
-    tier0LFN = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s(/%(counter)s)?/%(root)s' % lfnParts
-
-    storeMcLFN = '/store/mc/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)(/([a-zA-Z0-9\-_]+))*/([a-zA-Z0-9\-_]+).root'
-
-    storeResults2LFN = '/store/results/%(physics_group)s/%(primDS)s/%(secondary)s/%(primDS)s/%(tier)s/%(secondary)s/%(counter)s/%(root)s' % lfnParts
-
-    storeResultRootPart = '%(counter)s/%(root)s' % lfnParts
-    storeResultsLFN = "%s/%s" % (STORE_RESULTS_LFN, storeResultRootPart)
-
-    lheLFN1 = '/store/lhe/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}'
-    # This is for future lhe LFN structure. Need to be tested.
-    lheLFN2 = '/store/lhe/%(primDS)s/%(secondary)s/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}' % lfnParts
-
-    try:
-        return check(regexp1, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp2, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp3, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp4, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(tier0LFN, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(oldStyleTier0LFN, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(storeMcLFN, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(lheLFN1, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(lheLFN2, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(storeResults2LFN, candidate)
-    except AssertionError:
-        return check(storeResultsLFN, candidate)
+    for regexp in LFN_REGEXPS:
+        if compiledRegexp(regexp).match(candidate) is not None:
+            return True
+    return check(LFN_REGEXPS[-1], candidate)
 
 
 def lfnBase(candidate):
@@ -354,31 +315,10 @@ def lfnBase(candidate):
     As lfn above, but for doing the lfnBase
     i.e., for use in spec generation and parsing
     """
-    regexp1 = '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)'
-    regexp2 = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}'
-    regexp3 = '/(store)/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(secondary)s/%(version)s' % lfnParts
-
-    tier0LFN = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s' % lfnParts
-
-    try:
-        return check(regexp1, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp2, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp3, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(tier0LFN, candidate)
-    except AssertionError:
-        return check(STORE_RESULTS_LFN, candidate)
+    for regexp in LFNBASE_REGEXPS:
+        if compiledRegexp(regexp).match(candidate) is not None:
+            return True
+    return check(LFNBASE_REGEXPS[-1], candidate)
 
 
 def userLfn(candidate):
@@ -430,11 +370,55 @@ def check(regexp, candidate, maxLength=None):
     if maxLength != None:
         assert len(candidate) <= maxLength, \
             "%s is longer then max length (%s) allowed" % (candidate, maxLength)
-    assert re.compile(regexp).match(candidate) != None, \
+    assert compiledRegexp(regexp).match(candidate) != None, \
         "'%s' does not match regular expression %s" % (candidate, regexp)
     return True
 
 
+def compiledRegexp(regexp):
+    """
+    _compiledRegexp_
+
+    Return the compiled regular expression, compiling it only the first
+    time it is asked for.  The re module cache is too small for all the
+    patterns used by the validators.
+    """
+    try:
+        return _compiledRegexps[regexp]
+    except KeyError:
+        if len(_compiledRegexps) >= _MAX_COMPILED_REGEXPS:
+            _compiledRegexps.clear()
+        compiled = re.compile(regexp)
+        _compiledRegexps[regexp] = compiled
+        return compiled
+
+
+def checkMany(validator, candidates):
+    """
+    _checkMany_
+
+    Validate all the candidates with one of the validators above, raise
+    an AssertionError for the first one that is not valid.  The validators
+    that only match regular expressions are applied without calling them
+    for every candidate.
+    """
+    regexps = _validatorRegexps.get(validator, None)
+    if regexps is None:
+        for candidate in candidates:
+            validator(candidate)
+        return True
+
+    matchers = [compiledRegexp(x).match for x in regexps]
+    for candidate in candidates:
+        for matcher in matchers:
+            if matcher(candidate) is not None:
+                break
+        else:
+            # let the validator raise its usual error
+            validator(candidate)
+    return True
+
+
 def parseLFN(candidate):
     """
     _parseLFN_
@@ -607,3 +591,22 @@ def primaryDatasetType(candidate):
         return True
     # to sync with the check() exception when it doesn't match
     raise AssertionError("Invalid primary dataset type : %s should be 'mc' or 'data' or 'test'" % candidate)
+
+
+# compiled patterns, see compiledRegexp
+_MAX_COMPILED_REGEXPS = 1000
+_compiledRegexps = {}
+
+# the validators that only check a candidate against some patterns
+_validatorRegexps = {
+    searchdataset: [SEARCHDATASET_RE],
+    dataset: [DATASET_RE],
+    lfn: LFN_REGEXPS,
+    lfnBase: LFNBASE_REGEXPS,
+}
+
+for _regexp in [SEARCHDATASET_RE, DATASET_RE, PROCDATASET_RE, USERPROCDATASET_RE,
+                PRIMARY_DS['re'], PROCESSED_DS['re'], TIER['re'], BLOCK_STR['re']] + \
+               LFN_REGEXPS + LFNBASE_REGEXPS:
+    compiledRegexp(_regexp)
+del _regexp
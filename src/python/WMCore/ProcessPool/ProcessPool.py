@@ -15,12 +15,14 @@ import threading
 import traceback
 import cPickle
 
+from collections import deque
+
 from logging.handlers import RotatingFileHandler
 
 from WMCore.WMFactory import WMFactory
 from WMCore.WMInit import WMInit
 
-from WMCore.Services.Requests import JSONRequests
+from WMCore.ProcessPool.Serializers import SERIALIZERS
 
 from WMCore.Agent.HeartbeatAPI import HeartbeatAPI
 
@@ -61,7 +63,7 @@ class ProcessPoolWorker:
 class ProcessPool:
     def __init__(self, slaveClassName, totalSlaves, componentDir,
                  config, namespace='WMComponent', inPort='5555',
-                 outPort='5558'):
+                 outPort='5558', serializer='json'):
         """
         __init__
 
@@ -75,13 +77,21 @@ class ProcessPool:
         parameters.  It is not passed to the slave class.  The slaveInit
         parameter will be serialized and passed to the slave class's
         constructor.
+
+        The serializer is the name of the encoding used for the work and
+        the results, json (default) or pickle.
         """
         self.enqueueIndex = 0
         self.dequeueIndex = 0
         self.runningWork = 0
+        self.receivedWork = deque()
 
-        # Use the Services.Requests JSONizer, which handles __to_json__ calls
-        self.jsonHandler = JSONRequests()
+        if serializer not in SERIALIZERS:
+            msg = "Unknown ProcessPool serializer: %s" % serializer
+            logging.error(msg)
+            raise ProcessPoolException(msg)
+        self.serializerName = serializer
+        self.serializer = SERIALIZERS[serializer]()
 
         # heartbeat should be registered at this point
         if getattr(config.Agent, "useHeartbeat", True):
@@ -158,7 +168,8 @@ class ProcessPool:
         outPort = self.outPort
 
         slaveArgs = [self.versionString, __file__, self.slaveClassName, inPort,
-                     outPort, self.configPath, self.componentDir, self.namespace]
+                     outPort, self.configPath, self.componentDir, self.namespace,
+                     self.serializerName]
 
         count = 0
         while totalSlaves > 0:
@@ -183,7 +194,7 @@ class ProcessPool:
         """
         __del__
 
-        Kill all the workers processes by sending them an invalid JSON object.
+        Kill all the workers processes by sending them a STOP message.
         This will cause them to shut down.
         """
         self.close()
@@ -201,7 +212,7 @@ class ProcessPool:
         """
         for i in range(self.nSlaves):
             try:
-                encodedWork = self.jsonHandler.encode('STOP')
+                encodedWork = self.serializer.encode('STOP')
                 self.sender.send(encodedWork)
             except Exception as ex:
                 # Might be already failed.  Nothing you can
@@ -235,14 +246,16 @@ class ProcessPool:
         self.workers = []
         return
 
-    def enqueue(self, work, list=False):
+    def enqueue(self, work, list=False, batchSize=1):
         """
         __enqeue__
 
         Assign work to the workers processes.  The work parameters must be a
-        list where each item in the list can be serialized into JSON.
+        list where each item in the list can be serialized.
 
-        If list is True, the entire list is sent as one piece of work
+        If list is True, the entire list is sent as one piece of work.
+        Otherwise batchSize items are sent per message, as the frames of a
+        multipart message, each still being a separate piece of work.
         """
         if len(self.workers) < 1:
             # Someone's shut down the system
@@ -251,12 +264,12 @@ class ProcessPool:
             raise ProcessPoolException(msg)
 
         if not list:
-            for w in work:
-                encodedWork = self.jsonHandler.encode(w)
-                self.sender.send(encodedWork)
-                self.runningWork += 1
+            for i in range(0, len(work), batchSize):
+                frames = [self.serializer.encode(w) for w in work[i:i + batchSize]]
+                self.sender.send_multipart(frames, copy=False)
+                self.runningWork += len(frames)
         else:
-            encodedWork = self.jsonHandler.encode(work)
+            encodedWork = self.serializer.encode(work)
             self.sender.send(encodedWork)
             self.runningWork += 1
 
@@ -279,8 +292,11 @@ class ProcessPool:
 
         while totalItems > 0:
             try:
-                output = self.sink.recv()
-                decode = self.jsonHandler.decode(output)
+                if not self.receivedWork:
+                    # slaves send all the results of a message at once
+                    self.receivedWork.extend(self.sink.recv_multipart())
+                output = self.receivedWork.popleft()
+                decode = self.serializer.decode(output)
                 if isinstance(decode, dict) and decode.get('type', None) == 'ERROR':
                     # Then we had some kind of error
                     msg = decode.get('msg', 'Unknown Error in ProcessPool')
@@ -307,6 +323,7 @@ class ProcessPool:
         """
 
         self.close()
+        self.receivedWork.clear()
         self.createSlaves()
         return
 
@@ -360,7 +377,8 @@ if __name__ == "__main__":
     in through stdin as a JSON object.
 
     Input variables:
-    className, input port, output port, path to pickled config, component dir, namespace
+    className, input port, output port, path to pickled config, component dir, namespace,
+    serializer
     """
 
     # Get variables passed in
@@ -370,6 +388,10 @@ if __name__ == "__main__":
     configPath = sys.argv[4]
     componentDir = sys.argv[5]
     namespace = sys.argv[6]
+    if len(sys.argv) > 7:
+        serializerName = sys.argv[7]
+    else:
+        serializerName = 'json'
 
     # Set up logging
     setupLogging(componentDir)
@@ -397,59 +419,66 @@ if __name__ == "__main__":
     wmInit = WMInit()
     setupDB(config, wmInit)
 
-    # Create JSON handler
-    jsonHandler = JSONRequests()
+    # Create the serializer
+    serializer = SERIALIZERS[serializerName]()
 
     wmFactory = WMFactory(name="slaveFactory", namespace=namespace)
     slaveClass = wmFactory.loadObject(classname=slaveClassName, args=config)
 
     logging.info("Have slave class")
 
-    while (True):
-        encodedInput = receiver.recv()
+    stop = False
+    while not stop:
+        encodedInputs = receiver.recv_multipart()
 
         try:
-            input = jsonHandler.decode(encodedInput)
+            inputs = [serializer.decode(x) for x in encodedInputs]
         except Exception as ex:
             logging.error("Error decoding: %s" % str(ex))
             break
 
-        if input == "STOP":
-            break
-
-        try:
-            logging.error(input)
-            output = slaveClass(input)
-        except Exception as ex:
-            crashMessage = "Slave process crashed with exception: " + str(ex)
-            crashMessage += "\nStacktrace:\n"
-
-            stackTrace = traceback.format_tb(sys.exc_info()[2], None)
-            for stackFrame in stackTrace:
-                crashMessage += stackFrame
+        outputs = []
+        for input in inputs:
+            if input == "STOP":
+                stop = True
+                break
 
-            logging.error(crashMessage)
             try:
-                output = {'type': 'ERROR', 'msg': crashMessage}
-                encodedOutput = jsonHandler.encode(output)
-                sender.send(encodedOutput)
-                logging.error("Sent error message and now breaking")
-                break
+                logging.debug(input)
+                output = slaveClass(input)
             except Exception as ex:
-                logging.error("Failed to send error message")
-                logging.error(str(ex))
-                del jsonHandler
-                sys.exit(1)
-
-        if output != None:
-            if isinstance(output, list):
-                for item in output:
-                    encodedOutput = jsonHandler.encode(item)
+                crashMessage = "Slave process crashed with exception: " + str(ex)
+                crashMessage += "\nStacktrace:\n"
+
+                stackTrace = traceback.format_tb(sys.exc_info()[2], None)
+                for stackFrame in stackTrace:
+                    crashMessage += stackFrame
+
+                logging.error(crashMessage)
+                try:
+                    output = {'type': 'ERROR', 'msg': crashMessage}
+                    encodedOutput = serializer.encode(output)
                     sender.send(encodedOutput)
-            else:
-                encodedOutput = jsonHandler.encode(output)
-                sender.send(encodedOutput)
+                    logging.error("Sent error message and now breaking")
+                    stop = True
+                    outputs = []
+                    break
+                except Exception as ex:
+                    logging.error("Failed to send error message")
+                    logging.error(str(ex))
+                    del serializer
+                    sys.exit(1)
+
+            if output != None:
+                if isinstance(output, list):
+                    outputs.extend(output)
+                else:
+                    outputs.append(output)
+
+        # Send the results of the whole message at once
+        if outputs:
+            sender.send_multipart([serializer.encode(x) for x in outputs], copy=False)
 
     logging.info("Process with PID %s finished" % (os.getpid()))
-    del jsonHandler
+    del serializer
     sys.exit(0)
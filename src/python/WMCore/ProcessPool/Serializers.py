@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+_Serializers_
+
+Encoding of the work and the results exchanged by the ProcessPool and its
+slaves.  The pool passes the serializer name to the slaves on the command
+line, so both ends always use the same one.
+"""
+
+import cPickle
+
+from WMCore.Services.Requests import JSONRequests
+
+
+class JSONSerializer(object):
+    """
+    _JSONSerializer_
+
+    JSON through the Services.Requests JSONizer, which handles __to_json__
+    calls.  Strings come back as unicode.
+    """
+    name = "json"
+
+    def __init__(self):
+        self.jsonHandler = JSONRequests()
+
+    def encode(self, data):
+        return self.jsonHandler.encode(data)
+
+    def decode(self, data):
+        return self.jsonHandler.decode(data)
+
+
+class PickleSerializer(object):
+    """
+    _PickleSerializer_
+
+    Binary pickle protocol 2, much cheaper than JSON for large dictionaries
+    and lists.  Everything sent must be picklable, objects holding database
+    connections (e.g. WMBS objects with a daofactory) are not.
+    """
+    name = "pickle"
+
+    def encode(self, data):
+        return cPickle.dumps(data, cPickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data):
+        return cPickle.loads(data)
+
+
+SERIALIZERS = {JSONSerializer.name: JSONSerializer,
+               PickleSerializer.name: PickleSerializer}
@@ -159,6 +159,26 @@ class RequestDBReader(object):
     def getDBInstance(self):
         return self.couchDB
 
+    def getRequestChanges(self, statusList, since=-1):
+        """
+        Requests changed since the sequence number, from the last one read
+        when negative.
+        Returns the {request name: request doc} of the requests in one of the
+        statuses, and the names of the other changed or deleted requests.
+        """
+        requestInfo = {}
+        others = set()
+        for change in self.couchDB.iterChanges(since, {"include_docs": "true"}):
+            doc = change.get("doc", None)
+            if change.get("deleted", False) or not doc or doc.get("RequestStatus", None) not in statusList:
+                requestInfo.pop(change["id"], None)
+                others.add(change["id"])
+            else:
+                self._filterCouchInfo(doc)
+                requestInfo[change["id"]] = doc
+                others.discard(change["id"])
+        return requestInfo, list(others)
+
     def getRequestByNames(self, requestNames, detail=True):
         if len(requestNames) == 0:
             return {}
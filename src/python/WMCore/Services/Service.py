@@ -46,13 +46,26 @@ httplib2 cache  |   yes    |   yes    |    no    |     no     |
 service cache   |    no    |   yes    |   yes    |     no     |
 ----------------+----------+----------+----------+------------+
 result          |  cached  |  cached  |  cached  | not cached |
+
+On top of these, getCachedData keeps the decoded result in a process wide
+in memory LRU cache (see MemoryCache), keyed like the cache file.  Results
+younger than the cache duration are served from memory.  Older ones are
+revalidated through refreshCache, and only decoded again if the response
+changed.  With backgroundrefresh set, the default, stale results are still
+served while a background thread revalidates them, as long as they are
+younger than maxcachereuse.  The objects handed out are shared and must be
+treated as read only.
 """
 
+import copy
 import datetime
+import hashlib
 import json
 import logging
 import os
+import threading
 import time
+from collections import OrderedDict
 from cStringIO import StringIO
 from httplib import HTTPException
 
@@ -90,6 +103,133 @@ def cache_expired(cache, delta = 0):
     return False
 
 
+class MemoryCache(object):
+    """
+    _MemoryCache_
+
+    Process wide LRU cache of decoded service results.
+
+    Entries are keyed by service, verb, input data hash and cache file name,
+    and hold the digest and size of the raw response, the time it was last
+    validated and the decoded result.  The cache is bounded by the total
+    size of the raw responses and by the number of entries.
+    """
+    def __init__(self, maxSize = 128 * 1024 * 1024, maxEntries = 1000):
+        self.maxSize = maxSize
+        self.maxEntries = maxEntries
+        self.lock = threading.Lock()
+        self.clear()
+        return
+
+    def clear(self):
+        """
+        _clear_
+
+        Drop all the cached results and reset the counters.
+        """
+        with self.lock:
+            self.entries = OrderedDict()
+            self.refreshing = set()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+        return
+
+    def get(self, key):
+        """
+        _get_
+
+        Return the (digest, size, validated, result) entry of a key, or None.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries[key] = entry
+            self.hits += 1
+            return entry
+
+    def put(self, key, digest, size, result):
+        """
+        _put_
+
+        Cache a result validated now, evicting the least recently used ones
+        when over the bounds.
+        """
+        with self.lock:
+            oldEntry = self.entries.pop(key, None)
+            if oldEntry is not None:
+                self.size -= oldEntry[1]
+            if size <= self.maxSize:
+                self.entries[key] = (digest, size, time.time(), result)
+                self.size += size
+            while self.entries and (self.size > self.maxSize or
+                                    len(self.entries) > self.maxEntries):
+                _, oldEntry = self.entries.popitem(last = False)
+                self.size -= oldEntry[1]
+                self.evictions += 1
+        return
+
+    def invalidate(self, key):
+        """
+        _invalidate_
+
+        Drop a result from the cache.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+        return
+
+    def startRefresh(self, key):
+        """
+        _startRefresh_
+
+        Claim the background refresh of a key, False if one is running.
+        """
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def endRefresh(self, key):
+        """
+        _endRefresh_
+
+        Release the background refresh of a key.
+        """
+        with self.lock:
+            self.refreshing.discard(key)
+        return
+
+    def getStats(self):
+        """
+        _getStats_
+
+        Return the hit/miss counters and the cache occupancy.
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "entries": len(self.entries),
+                    "size": self.size}
+
+
+_memoryCache = MemoryCache()
+
+
+def getMemoryCache():
+    """
+    _getMemoryCache_
+
+    Return the process wide cache of decoded service results.
+    """
+    return _memoryCache
+
+
 class Service(dict):
 
     def __init__(self, cfg_dict = None):
@@ -107,6 +247,7 @@ class Service(dict):
         self.setdefault("inputdata", {})
         self.setdefault("cacheduration", 0.5)
         self.setdefault("maxcachereuse", 24.0)
+        self.setdefault("backgroundrefresh", True)
         self.supportVerbList = ('GET', 'POST', 'PUT', 'DELETE')
         # this value should be only set when whole service class uses
         # the same verb ('GET', 'POST', 'PUT', 'DELETE')
@@ -128,7 +269,11 @@ class Service(dict):
             requests = JSONRequests
         else:
             requests = Requests
-        # Instantiate a Request
+        # Instantiate a Request, the class and config are kept for the
+        # background refreshes, see _refresher
+        self.requestsClass = requests
+        self.requestsConfig = cfg_dict
+        self.refreshThread = None
         try:
             self["requests"] = requests(cfg_dict['endpoint'], cfg_dict)
         except WMException as ex:
@@ -229,13 +374,14 @@ class Service(dict):
 
     def clearCache(self, cachefile, inputdata = {}, verb = 'GET'):
         """
-        Delete the cache file and the httplib2 cache.
+        Delete the cache file, the httplib2 cache and the memory cache entry.
         """
+        verb = self._verbCheck(verb)
+        _memoryCache.invalidate(self._memoryCacheKey(cachefile, verb, inputdata))
         if not self['cachepath'] or not cachefile:
             # nothing to clear
             return
 
-        verb = self._verbCheck(verb)
         os.system("/bin/rm -f %s/*" % self['requests']['req_cache_path'])
         cachefile = self.cacheFileName(cachefile, verb, inputdata)
         try:
@@ -244,6 +390,83 @@ class Service(dict):
         except OSError: # File doesn't exist
             return
 
+    def _memoryCacheKey(self, cachefile, verb, inputdata):
+        """
+        Key of a query in the memory cache, made of the same parts as the
+        cache file name.
+        """
+        hash_ = self._makeHash(inputdata or self['inputdata'], 0)
+        return (self['endpoint'], hash_, verb, cachefile)
+
+    def getCachedData(self, cachefile, url='', inputdata = None, decoder = json.loads,
+                      encoder = True, verb = 'GET', contentType = None, incoming_headers = None):
+        """
+        Return the decoded result of a query through the memory cache.
+        decoder turns the response text into the result; the result is
+        shared with other callers, so it must not be modified.
+        """
+        inputdata = inputdata or {}
+        verb = self._verbCheck(verb)
+        key = self._memoryCacheKey(cachefile, verb, inputdata)
+        query = (cachefile, url, inputdata, decoder, encoder, verb, contentType, incoming_headers)
+
+        entry = _memoryCache.get(key)
+        if entry is not None:
+            age = time.time() - entry[2]
+            if age < (self['cacheduration'] or 0) * 3600:
+                return entry[3]
+            if self['backgroundrefresh'] and age < self['maxcachereuse'] * 3600:
+                if _memoryCache.startRefresh(key):
+                    self.refreshThread = threading.Thread(target = self._backgroundRefresh,
+                                                          args = (key, entry, query))
+                    self.refreshThread.daemon = True
+                    self.refreshThread.start()
+                return entry[3]
+        return self._loadCachedData(key, entry, *query)
+
+    def _loadCachedData(self, key, entry, cachefile, url, inputdata, decoder, encoder,
+                        verb, contentType, incoming_headers):
+        """
+        Revalidate a query through refreshCache, and decode the response
+        only if it's not the one in the memory cache.
+        """
+        f = self.refreshCache(cachefile, url, inputdata, encoder = encoder, verb = verb,
+                              contentType = contentType, incoming_headers = incoming_headers)
+        text = f.read()
+        f.close()
+        digest = hashlib.sha1(text).hexdigest()
+        if entry is not None and entry[0] == digest:
+            result = entry[3]
+        else:
+            result = decoder(text)
+        _memoryCache.put(key, digest, len(text), result)
+        return result
+
+    def _refresher(self):
+        """
+        A copy of this service with a Requests instance of its own, so a
+        background refresh doesn't share the httplib2 connection of the
+        callers, which isn't thread safe.
+        """
+        refresher = copy.copy(self)
+        refresher['requests'] = self.requestsClass(self['endpoint'], self.requestsConfig)
+        refresher['requests']['logger'] = self['logger']
+        return refresher
+
+    def _backgroundRefresh(self, key, entry, query):
+        """
+        Revalidate a stale query in the background, through a Requests
+        instance of its own.  On failure the stale result stays in the
+        memory cache until maxcachereuse.
+        """
+        try:
+            self._refresher()._loadCachedData(key, entry, *query)
+        except Exception as ex:
+            self['logger'].warning("Background refresh of %s failed: %s" % (query[0], str(ex)))
+        finally:
+            _memoryCache.endRefresh(key)
+        return
+
     def getData(self, cachefile, url, inputdata = {}, incoming_headers = {},
                 encoder = True, decoder = True,
                 verb = 'GET', contentType = None, force_refresh = False):
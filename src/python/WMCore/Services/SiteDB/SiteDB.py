@@ -6,6 +6,7 @@ API for dealing with interpreting information from SiteDB
 
 """
 from WMCore.Services.SiteDB.SiteDBAPI import SiteDBAPI
+from WMCore.Services.SiteDB.SiteDBMappings import SiteDBMappings, getSiteDBMappings
 from WMCore.Services.EmulatorSwitch import emulatorHook
 
 import re
@@ -57,6 +58,24 @@ class SiteDBJSON(SiteDBAPI):
             mapping = [item['phedex_name'] for item in mapping if item['psn_name'] == psn]
         return mapping
 
+    def _loadMappings(self):
+        """
+        Load the PNN/PSN and SE/CE mappings from SiteDB, with an instance
+        of its own, so a background refresh doesn't share this one's
+        connection.
+        """
+        sitedb = self.__class__(self.serviceConfig)
+        return SiteDBMappings(sitedb._dataProcessing(), sitedb._sitenames(),
+                              sitedb._siteresources())
+
+    def _mappings(self):
+        """
+        Returns the process wide SiteDBMappings for this SiteDB endpoint,
+        refreshed in the background every cacheduration hours.
+        """
+        return getSiteDBMappings(self['endpoint'], self._loadMappings,
+                                 (self['cacheduration'] or 0) * 3600, self['logger'])
+
     def dnUserName(self, dn):
         """
         Convert DN to Hypernews name. Clear cache between trys
@@ -168,45 +187,21 @@ class SiteDBJSON(SiteDBAPI):
         Convert SE name to the CMS Site they belong to,
         this is not a 1-to-1 relation but 1-to-many, return a list of cms site alias
         """
-        try:
-            siteresources = filter(lambda x: x['fqdn'] == ce, self._siteresources())
-        except IndexError:
-            return None
-        siteNames = []
-        for resource in siteresources:
-            siteNames.extend(self._sitenames(sitename=resource['site_name']))
-        cmsname = filter(lambda x: x['type'] == 'cms', siteNames)
-        return [x['alias'] for x in cmsname]
+        return self._mappings().hostToAliases(ce, 'cms')
 
     def seToCMSName(self, se):
         """
         Convert SE name to the CMS Site they belong to,
         this is not a 1-to-1 relation but 1-to-many, return a list of cms site alias
         """
-        try:
-            siteresources = filter(lambda x: x['fqdn'] == se, self._siteresources())
-        except IndexError:
-            return None
-        siteNames = []
-        for resource in siteresources:
-            siteNames.extend(self._sitenames(sitename=resource['site_name']))
-        cmsname = filter(lambda x: x['type'] == 'cms', siteNames)
-        return [x['alias'] for x in cmsname]
+        return self._mappings().hostToAliases(se, 'cms')
 
     def seToPNNs(self, se):
         """
         Convert SE name to the PNN they belong to,
         this is not a 1-to-1 relation but 1-to-many, return a list of pnns
         """
-        try:
-            siteresources = filter(lambda x: x['fqdn'] == se, self._siteresources())
-        except IndexError:
-            return None
-        siteNames = []
-        for resource in siteresources:
-            siteNames.extend(self._sitenames(sitename=resource['site_name']))
-        pnns = filter(lambda x: x['type'] == 'phedex', siteNames)
-        return [x['alias'] for x in pnns]
+        return self._mappings().hostToAliases(se, 'phedex')
 
 
     def cmsNametoPhEDExNode(self, cmsName):
@@ -227,26 +222,21 @@ class SiteDBJSON(SiteDBAPI):
         """
         Convert PhEDEx node name to Processing Site Name(s)
         """
-        return self._dataProcessing(pnn=pnn)
+        return list(self._mappings().pnnToPSNs.get(pnn, []))
 
     def PSNtoPNN(self, psn):
         """
         Convert Processing Site Name to PhEDEx Node Name(s)
         """
-        return self._dataProcessing(psn=psn)
+        return list(self._mappings().psnToPNNs.get(psn, []))
 
     def PNNstoPSNs(self, pnns):
         """
         Convert list of PhEDEx node names to Processing Site Name(s)
         """
         psns = set()
-        for pnn in pnns:
-            if pnn == "T0_CH_CERN_Export" or pnn.endswith("_MSS") or pnn.endswith("_Buffer"):
-                continue
-            psn_list = self.PNNtoPSN(pnn)
+        for psn_list in self.PNNstoPSNsMap(pnns).values():
             psns.update(psn_list)
-            if not psn_list:
-                self["logger"].warning("No PSNs for PNN: %s" % pnn)
         return list(psns)
 
     def PSNstoPNNs(self, psns):
@@ -254,23 +244,48 @@ class SiteDBJSON(SiteDBAPI):
         Convert list of Processing Site Names to PhEDEx Node Names
         """
         pnns = set()
-        for psn in psns:
-            pnn_list = self.PSNtoPNN(psn)
-            if not pnn_list:
-                self["logger"].warning("No PNNs for PSN: %s" % psn)
+        for pnn_list in self.PSNstoPNNsMap(psns).values():
             pnns.update(pnn_list)
         return list(pnns)
 
+    def PNNstoPSNsMap(self, pnns):
+        """
+        Convert list of PhEDEx node names to a dict of the Processing Site
+        Names of each of them. Export, MSS and Buffer nodes map to nothing.
+        """
+        pnnToPSNs = self._mappings().pnnToPSNs
+        mapping = {}
+        for pnn in set(pnns):
+            if pnn == "T0_CH_CERN_Export" or pnn.endswith("_MSS") or pnn.endswith("_Buffer"):
+                mapping[pnn] = []
+                continue
+            mapping[pnn] = list(pnnToPSNs.get(pnn, []))
+            if not mapping[pnn]:
+                self["logger"].warning("No PSNs for PNN: %s" % pnn)
+        return mapping
+
+    def PSNstoPNNsMap(self, psns):
+        """
+        Convert list of Processing Site Names to a dict of the PhEDEx Node
+        Names of each of them
+        """
+        psnToPNNs = self._mappings().psnToPNNs
+        mapping = {}
+        for psn in set(psns):
+            mapping[psn] = list(psnToPNNs.get(psn, []))
+            if not mapping[psn]:
+                self["logger"].warning("No PNNs for PSN: %s" % psn)
+        return mapping
+
     def PSNtoPNNMap(self, psn_pattern=''):
         if not isinstance(psn_pattern, str):
             raise TypeError('psn_pattern arg must be of type str')
 
         mapping = {}
         psn_pattern = re.compile(psn_pattern)  # .replace('*', '.*').replace('%', '.*'))
-        for entry in self._dataProcessing():
-            if not psn_pattern.match(entry['psn_name']):
-                continue
-            mapping.setdefault(entry['psn_name'], set()).add(entry['phedex_name'])
+        for psn, pnns in self._mappings().psnToPNNs.items():
+            if psn_pattern.match(psn):
+                mapping[psn] = set(pnns)
         return mapping
     #TODO remove this when all DBS origin_site_name is converted to PNN
     def checkAndConvertSENameToPNN(self, seNameOrPNN):
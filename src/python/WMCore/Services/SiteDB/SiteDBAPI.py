@@ -32,6 +32,8 @@ class SiteDBAPI(Service):
     def __init__(self, config={}):
         config = dict(config)
         config['endpoint'] = "https://cmsweb.cern.ch/sitedb/data/prod/"
+        # kept to make more instances with the same settings
+        self.serviceConfig = dict(config)
         Service.__init__(self, config)
 
     def getJSON(self, callname, filename='result.json', clearCache=False, verb='GET', data={}):
@@ -44,7 +46,6 @@ class SiteDBAPI(Service):
         TODO: Probably want to move this up into Service
         """
 
-        result = ''
         if clearCache:
             self.clearCache(cachefile=filename, inputdata=data, verb=verb)
         try:
@@ -52,18 +53,14 @@ class SiteDBAPI(Service):
             # Default is text/html which will return xml instead
             # Add accept-encoding to gzip,identity to overwrite httplib default gzip,deflate,
             # which is not working properly with cmsweb
-            f = self.refreshCache(cachefile=filename, url=callname, inputdata=data,
-                                  verb=verb, contentType='application/json',
-                                  incoming_headers={'Accept': 'application/json',
-                                                    'accept-encoding': 'gzip,identity'})
-            result = f.read()
-            f.close()
+            # The results are shared through the memory cache, don't modify them
+            return self.getCachedData(filename, url=callname, inputdata=data,
+                                      decoder=lambda result: unflattenJSON(json.loads(result)),
+                                      verb=verb, contentType='application/json',
+                                      incoming_headers={'Accept': 'application/json',
+                                                        'accept-encoding': 'gzip,identity'})
         except IOError:
             raise RuntimeError("URL not available: %s" % callname)
-        try:
-            results = json.loads(result)
-            results = unflattenJSON(results)
-            return results
         except SyntaxError:
             self.clearCache(filename, inputdata=data, verb=verb)
             raise SyntaxError("Problem parsing data. Cachefile cleared. Retrying may work")
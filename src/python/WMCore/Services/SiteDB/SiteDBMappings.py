@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+_SiteDBMappings_
+
+Indexed site name mappings built from the SiteDB data-processing,
+site-names and site-resources calls, kept in memory for the whole process.
+
+The mappings of a SiteDB instance are loaded on first use, which blocks
+the callers for that instance only.  Once they are older than their time
+to live they are still handed out while a background thread loads new
+ones, so a refresh never blocks anybody.  If that load fails the old
+mappings are kept, and the refresh is tried again after another time to
+live.
+"""
+
+import logging
+import threading
+import time
+
+
+class SiteDBMappings(object):
+    """
+    _SiteDBMappings_
+
+    Dictionaries for the PNN <-> PSN conversions and for the SE/CE host to
+    site aliases conversions.  The lists keep the order and duplicates of the
+    SiteDB records, like the filters over them did.
+    """
+    def __init__(self, dataProcessing, siteNames, siteResources):
+        self.pnnToPSNs = {}
+        self.psnToPNNs = {}
+        for item in dataProcessing:
+            self.pnnToPSNs.setdefault(item['phedex_name'], []).append(item['psn_name'])
+            self.psnToPNNs.setdefault(item['psn_name'], []).append(item['phedex_name'])
+
+        # site name -> {alias type: [aliases]}
+        self.siteAliases = {}
+        for item in siteNames:
+            aliases = self.siteAliases.setdefault(item['site_name'], {})
+            aliases.setdefault(item['type'], []).append(item['alias'])
+
+        # SE or CE host -> [site names]
+        self.hostSites = {}
+        for item in siteResources:
+            self.hostSites.setdefault(item['fqdn'], []).append(item['site_name'])
+        return
+
+    def hostToAliases(self, host, aliasType):
+        """
+        _hostToAliases_
+
+        Aliases of the given type, 'cms' or 'phedex', of the sites a SE or CE
+        host belongs to.
+        """
+        aliases = []
+        for siteName in self.hostSites.get(host, []):
+            aliases.extend(self.siteAliases.get(siteName, {}).get(aliasType, []))
+        return aliases
+
+
+_lock = threading.Lock()
+_mappings = {}
+_refreshing = set()
+# key -> Event set once the first load of the key is over
+_loading = {}
+
+
+def _refresh(key, loader, logger):
+    """
+    _refresh_
+
+    Load new mappings for a key in the background.
+    """
+    try:
+        mappings = loader()
+    except Exception as ex:
+        logger.warning("Failed to refresh the SiteDB mappings, keeping the old ones: %s" % str(ex))
+        mappings = None
+    with _lock:
+        if mappings is not None:
+            _mappings[key] = (mappings, time.time())
+        elif key in _mappings:
+            _mappings[key] = (_mappings[key][0], time.time())
+        _refreshing.discard(key)
+    return
+
+
+def _load(key, loader, done):
+    """
+    _load_
+
+    First load of the mappings of a key, by the caller, outside the lock.
+    done is set when it's over, successful or not.
+    """
+    try:
+        mappings = loader()
+        with _lock:
+            _mappings[key] = (mappings, time.time())
+    finally:
+        with _lock:
+            del _loading[key]
+        done.set()
+    return mappings
+
+
+def getSiteDBMappings(key, loader, ttl, logger=None):
+    """
+    _getSiteDBMappings_
+
+    The SiteDBMappings cached for a key, usually the SiteDB endpoint.  The
+    loader builds new mappings; it is called right away when there are
+    none yet, and in a background thread when the cached ones are older
+    than ttl seconds.  Only one caller loads the first mappings of a key,
+    the others for that key wait for it, without holding up other keys.
+    If that load fails the waiters try loading themselves.
+    """
+    logger = logger or logging
+    while True:
+        with _lock:
+            cached = _mappings.get(key, None)
+            if cached is not None:
+                mappings, loadTime = cached
+                if time.time() - loadTime < ttl or key in _refreshing:
+                    return mappings
+                _refreshing.add(key)
+                break
+            done = _loading.get(key, None)
+            if done is None:
+                done = threading.Event()
+                _loading[key] = done
+                loading = True
+            else:
+                loading = False
+        if loading:
+            return _load(key, loader, done)
+        done.wait()
+
+    thread = threading.Thread(target=_refresh, args=(key, loader, logger))
+    thread.daemon = True
+    thread.start()
+    return mappings
+
+
+def clearSiteDBMappings():
+    """
+    _clearSiteDBMappings_
+
+    Drop all cached mappings, so they're loaded again on next use.
+    """
+    with _lock:
+        _mappings.clear()
+    return
@@ -307,6 +307,36 @@ class WMStatsReader(object):
     def getT0ActiveData(self, jobInfoFlag = False):
         
         return self.getRequestByStatus(WMStatsReader.T0_ACTIVE_STATUS, jobInfoFlag)
+
+    def resetChangesSequence(self):
+        """
+        Start the next getActiveDataChanges from the current state of the
+        request and wmstats databases, call it before reading the data the
+        changes are applied to.
+        """
+        self.reqDB.couchDB.last_seq = self.reqDB.couchDB.info()["update_seq"]
+        self.couchDB.last_seq = self.couchDB.info()["update_seq"]
+
+    def getActiveDataChanges(self, statusList):
+        """
+        Changes since the last call, or since resetChangesSequence, to the
+        active data getRequestByStatus(statusList, jobInfoFlag=True) gives.
+        Returns the {request name: request doc} of the new or changed requests
+        in one of the statuses, the names of the other changed requests and the
+        new agent_request documents.  Nothing is consumed if reading fails.
+        """
+        lastSeqs = (self.reqDB.couchDB.last_seq, self.couchDB.last_seq)
+        try:
+            requestInfo, removed = self.reqDB.getRequestChanges(statusList)
+            agentDocs = []
+            for change in self.couchDB.iterChanges(options = {"include_docs": "true"}):
+                doc = change.get("doc", None)
+                if doc and doc.get("type", None) == "agent_request":
+                    agentDocs.append(doc)
+        except Exception:
+            self.reqDB.couchDB.last_seq, self.couchDB.last_seq = lastSeqs
+            raise
+        return requestInfo, removed, agentDocs
     
     def getRequestByStatus(self, statusList, jobInfoFlag = False, limit = None, skip = None, 
                            legacyFormat = False):
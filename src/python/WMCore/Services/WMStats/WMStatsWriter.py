@@ -216,7 +216,7 @@ class WMStatsWriter(WMStatsReader):
         """
         view = "allWorkflows"
         options = {"key": requestName, "reduce": False}
-        docs = self.couchDB.loadView(self.couchapp, view, options = options)['rows']
+        docs = self.couchDB.iterView(self.couchapp, view, options = options)
    
         for j in docs:
             doc = {}
@@ -63,6 +63,7 @@ class RequestHandler(object):
         self.connecttimeout = config.get('connecttimeout', 30)
         self.followlocation = config.get('followlocation', 1)
         self.maxredirs = config.get('maxredirs', 5)
+        self.maxinflight = config.get('maxinflight', 10)
         self.logger = logger if logger else logging.getLogger()
 
     def encode_params(self, params, verb, doseq):
@@ -225,40 +226,119 @@ class RequestHandler(object):
         return header
 
     def multirequest(self, url, parray, headers=None,
-                ckey=None, cert=None, verbose=None):
-        """Fetch data for given set of parameters"""
+                ckey=None, cert=None, verbose=None, capath=None, maxinflight=None):
+        """
+        Fetch data for given set of parameters concurrently.
+
+        Up to maxinflight requests (config maxinflight, 10 by default) are
+        driven at the same time by a CurlMulti object.  Curl handles are
+        reused from one request to the next, so connections, DNS and SSL
+        sessions are reused as well.  Data is yielded as requests complete,
+        every dict being updated with the parameters of its request.  A
+        failed request yields a dict with an 'error' key and its parameters
+        instead, and doesn't affect the other requests.
+        """
+        if  not maxinflight:
+            maxinflight = self.maxinflight
+        share = pycurl.CurlShare()
+        share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+        share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
         multi = pycurl.CurlMulti()
-        for params in parray:
-            curl = pycurl.Curl()
-            bbuf, hbuf = \
-                self.set_opts(curl, url, params, headers, ckey, cert, verbose)
-            multi.add_handle(curl)
+        free = []
+        for _ in range(maxinflight):
+            free.append(pycurl.Curl())
+        active = {}
+        pending = iter(parray)
+        try:
             while True:
-                ret, num_handles = multi.perform()
-                if  ret != pycurl.E_CALL_MULTI_PERFORM:
+                # fill the free handles with new requests
+                while free:
+                    try:
+                        params = next(pending)
+                    except StopIteration:
+                        break
+                    curl = free.pop()
+                    # reset clears all the options, the share included
+                    curl.reset()
+                    curl.setopt(pycurl.SHARE, share)
+                    bbuf, hbuf = self.set_opts(curl, url, params, headers,
+                                               ckey, cert, capath, verbose)
+                    active[curl] = (params, bbuf, hbuf)
+                    multi.add_handle(curl)
+                if  not active:
                     break
-            while num_handles:
-                ret = multi.select(1.0)
-                if  ret == -1:
-                    continue
+
                 while True:
-                    ret, num_handles = multi.perform()
+                    ret, _ = multi.perform()
                     if  ret != pycurl.E_CALL_MULTI_PERFORM:
                         break
-            dummyNumq, response, dummyErr = multi.info_read()
-            for dummyCobj in response:
-                data = json.loads(bbuf.getvalue())
-                if  isinstance(data, dict):
-                    data.update(params)
-                    yield data
-                if  isinstance(data, list):
-                    for item in data:
-                        if  isinstance(item, dict):
-                            item.update(params)
-                            yield item
-                        else:
-                            err = 'Unsupported data format: data=%s, type=%s'\
-                                % (item, type(item))
-                            raise Exception(err)
-                bbuf.flush()
-                hbuf.flush()
+
+                finished = []
+                while True:
+                    numq, oklist, errlist = multi.info_read()
+                    finished.extend([(curl, None) for curl in oklist])
+                    finished.extend([(curl, errmsg) for curl, _, errmsg in errlist])
+                    if  not numq:
+                        break
+                if  not finished:
+                    # libcurl may have nothing to select on while it resolves
+                    # or connects, so don't wait longer than it asks for
+                    timeout = multi.timeout()
+                    if  timeout < 0 or timeout > 1000:
+                        timeout = 1000
+                    multi.select(timeout / 1000.0)
+                    continue
+
+                results = []
+                for curl, error in finished:
+                    multi.remove_handle(curl)
+                    params, bbuf, hbuf = active.pop(curl)
+                    status = curl.getinfo(pycurl.HTTP_CODE)
+                    results.extend(self.multi_response(url, params, status,
+                                                       bbuf.getvalue(), error))
+                    bbuf.close()
+                    hbuf.close()
+                    free.append(curl)
+                for item in results:
+                    yield item
+        finally:
+            for curl in active.keys():
+                multi.remove_handle(curl)
+            for curl in free + active.keys():
+                curl.close()
+            multi.close()
+            share.close()
+
+    def multi_response(self, url, params, status, body, error=None):
+        """
+        Turn the response of one of the multirequest requests into the list
+        of dicts to yield.
+        """
+        if  error:
+            msg = 'url=%s, error=%s' % (url, error)
+        elif status >= 300:
+            msg = 'url=%s, code=%s' % (url, status)
+        else:
+            try:
+                data = json.loads(body)
+            except ValueError as exc:
+                data = None
+                msg = 'url=%s, unable to load JSON data, %s' % (url, str(exc))
+            if  isinstance(data, dict):
+                data = [data]
+            if  isinstance(data, list):
+                items = []
+                for item in data:
+                    if  isinstance(item, dict):
+                        item.update(params)
+                        items.append(item)
+                    else:
+                        err = 'Unsupported data format: data=%s, type=%s'\
+                            % (item, type(item))
+                        items.append(dict(params, error=err))
+                return items
+            if  data is not None:
+                msg = 'Unsupported data format: data=%s, type=%s'\
+                    % (data, type(data))
+        self.logger.error(msg)
+        return [dict(params, error=msg)]
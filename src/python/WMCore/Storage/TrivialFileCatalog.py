@@ -34,6 +34,64 @@ from WMCore.Algorithms.ParseXMLFile import Node, xmlFileToNode
 
 _TFCArgSplit = re.compile("\?protocol=")
 
+_RegexSpecialChars = ".^$*+?{}[]\\|()"
+
+
+def literalPrefix(pattern):
+    """
+    _literalPrefix_
+
+    Find the literal text a path must start with to match a path-match
+    pattern.  Return a tuple (slashes, prefix) where slashes tells whether
+    the pattern starts with one or more slashes (/+) before the prefix, or
+    None if nothing can be told about the path from the pattern.
+    """
+    if '|' in pattern:
+        return None
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+
+    slashes = False
+    if pattern.startswith('/+'):
+        slashes = True
+        pattern = pattern[2:]
+
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                prefix.append(pattern[i + 1])
+                i += 2
+                continue
+            break
+        elif char in "*?{":
+            # the previous character is optional
+            if prefix:
+                prefix.pop()
+            break
+        elif char in _RegexSpecialChars:
+            break
+        prefix.append(char)
+        i += 1
+
+    prefix = "".join(prefix)
+    if slashes and prefix.startswith('/'):
+        prefix = ""
+    if not slashes and not prefix:
+        return None
+    return (slashes, prefix)
+
+
+def pathToken(path):
+    """
+    _pathToken_
+
+    First component of a path, ignoring the leading slashes.
+    """
+    return path.lstrip('/').split('/', 1)[0]
+
 
 class TrivialFileCatalog(dict):
     """
@@ -49,6 +107,13 @@ class TrivialFileCatalog(dict):
         self['pfn-to-lfn'] = []
         self.preferredProtocol = None # attribute for preferred protocol
 
+        # compiled rules and resolved paths, see _compileRules
+        self.cacheSize = 10000
+        self._rules = {}
+        self._rulesCount = (0, 0)
+        self._matchCache = {}
+        self._oldMatchCache = {}
+
 
     def addMapping(self, protocol, match, result,
               chain = None, mapping_type = 'lfn-to-pfn'):
@@ -65,6 +130,66 @@ class TrivialFileCatalog(dict):
         entry.setdefault("result", result)
         entry.setdefault("chain", chain)
         self[mapping_type].append(entry)
+        self._rules = {}
+        self._matchCache = {}
+        self._oldMatchCache = {}
+
+
+    def _compileRules(self, style, protocol):
+        """
+        _compileRules_
+
+        Precompute the rules of a protocol in a mapping style.  Every rule
+        gets the literal prefix a path needs for its path-match to match
+        and rules with a whole first path component in their prefix are
+        indexed by it, so only the rules that could match a path are tried.
+        Chained rules are tried on the result of their chain and are
+        never skipped, those starting with .* only need to be tried at the
+        start of it.
+        """
+        rules = []
+        index = {}
+        unindexed = []
+        for mapping in self[style]:
+            if mapping['protocol'] != protocol:
+                continue
+            pattern = mapping['path-match-expr'].pattern
+            prefix = None
+            if mapping['chain'] is None:
+                prefix = literalPrefix(pattern)
+            anchored = pattern.startswith(('^', '.*', '(.*'))
+            position = len(rules)
+            rules.append((mapping['path-match-expr'], mapping['result'], mapping['chain'],
+                          prefix, anchored))
+
+            if prefix is not None and '/' in prefix[1].lstrip('/'):
+                index.setdefault(pathToken(prefix[1]), []).append(position)
+            else:
+                unindexed.append(position)
+
+        compiled = {'rules': rules, 'index': index,
+                    'unindexed': unindexed, 'candidates': {}}
+        self._rules[(style, protocol)] = compiled
+        return compiled
+
+
+    def _candidateRules(self, style, protocol, path):
+        """
+        _candidateRules_
+
+        Return the rules that could match the path, in the TFC order.
+        """
+        compiled = self._rules.get((style, protocol))
+        if compiled is None:
+            compiled = self._compileRules(style, protocol)
+
+        token = pathToken(path)
+        candidates = compiled['candidates'].get(token)
+        if candidates is None:
+            positions = sorted(compiled['index'].get(token, []) + compiled['unindexed'])
+            candidates = [compiled['rules'][x] for x in positions]
+            compiled['candidates'][token] = candidates
+        return candidates
 
 
     def _doMatch(self, protocol, path, style, caller):
@@ -73,31 +198,90 @@ class TrivialFileCatalog(dict):
         caller is the method from there this method was called, it's used
         for resolving chained rules
 
+        The last cacheSize results are kept.
+
         Return None if no match
 
         """
-        for mapping in self[style]:
-            if mapping['protocol'] != protocol:
-                continue
-            if mapping['path-match-expr'].match(path) or mapping["chain"] != None:
-                if mapping["chain"] != None:
-                    oldpath = path
-                    path = caller(mapping["chain"], path)
-                    if not path:
-                        continue
-                splitList = []
-                if len(mapping['path-match-expr'].split(path, 1)) > 1 :
-                    for split in range(len(mapping['path-match-expr'].split(path, 1))):
-                        s = mapping['path-match-expr'].split(path, 1)[split]
-                        if s:
-                            splitList.append(s)
+        rulesCount = (len(self['lfn-to-pfn']), len(self['pfn-to-lfn']))
+        if rulesCount != self._rulesCount:
+            # mappings were added without addMapping
+            self._rules = {}
+            self._matchCache = {}
+            self._oldMatchCache = {}
+            self._rulesCount = rulesCount
+
+        key = (style, protocol, path)
+        if key in self._matchCache:
+            return self._matchCache[key]
+        if key in self._oldMatchCache:
+            result = self._oldMatchCache[key]
+        else:
+            result = self._resolve(protocol, path, style, caller)
+
+        # two generations: results not used since the cache last filled up
+        # are dropped when it fills up again
+        if len(self._matchCache) >= self.cacheSize:
+            self._oldMatchCache = self._matchCache
+            self._matchCache = {}
+        self._matchCache[key] = result
+        return result
+
+
+    def _resolve(self, protocol, path, style, caller):
+        """
+        _resolve_
+
+        Apply the first rule matching the path.  The pieces of the path
+        split by the path-match (the text before the match, the groups and
+        the text after it) that are not empty replace $1, $2... in the
+        result.
+
+        Return None if no match
+
+        """
+        chainResults = {}
+        for regex, result, chain, prefix, anchored in self._candidateRules(style, protocol, path):
+            if chain is not None:
+                if chain not in chainResults:
+                    chainResults[chain] = caller(chain, path)
+                target = chainResults[chain]
+                if not target:
+                    continue
+                if anchored and '\n' not in target:
+                    # the leftmost match would start at 0 anyway
+                    match = regex.match(target)
                 else:
-                    path = oldpath
+                    match = regex.search(target)
+            else:
+                if prefix is not None:
+                    slashes, literal = prefix
+                    if slashes:
+                        if not path.startswith('/') or not path.lstrip('/').startswith(literal):
+                            continue
+                    elif not path.startswith(literal):
+                        continue
+                target = path
+                match = regex.match(target)
+            if match is None:
+                continue
+
+            if match.end() > match.start():
+                pieces = [target[:match.start()]]
+                pieces.extend(match.groups())
+                pieces.append(target[match.end():])
+            else:
+                # split skips empty matches, let it find the next one
+                pieces = regex.split(target, 1)
+                if len(pieces) < 2:
                     continue
-                result = mapping['result']
-                for split in range(len(splitList)):
-                    result = result.replace("$" + str(split + 1), splitList[split])
-                return result
+
+            position = 1
+            for piece in pieces:
+                if piece:
+                    result = result.replace("$%i" % position, piece)
+                    position += 1
+            return result
 
         return None
 
@@ -130,6 +130,16 @@ class Mask(WMBSBase, WMMask):
 
         self.commitTransaction(existingTransaction)
 
+        self.loadMaskEntries(jobMask)
+        return
+
+    def loadMaskEntries(self, jobMask):
+        """
+        _loadMaskEntries_
+
+        Combine the mask entries of a job, as returned by Masks.Load, into
+        this mask.
+        """
         # Now we get a bit weird.
         # We assemble things into a list
         # NOTE: Right now this will totally break down if you have multiple mask entries
@@ -18,13 +18,6 @@ class GetBulkRunLumi(DBFormatter):
                WHERE flr.fileid = :id
     """
 
-    def getBinds(self, files = None):
-        binds = []
-        files = self.dbi.makelist(files)
-        for f in files:
-            binds.append({'id': f['id']})
-        return binds
-
     def format(self, result):
         "Return a list of Run/Lumi Set"
 
@@ -43,8 +36,8 @@ class GetBulkRunLumi(DBFormatter):
         return finalResult
 
     def execute(self, files = None, conn = None, transaction = False):
-        binds = self.getBinds(files)
+        fileIDs = [x['id'] for x in self.dbi.makelist(files)]
 
-        result = self.dbi.processData(self.sql, binds,
-                         conn = conn, transaction = transaction)
+        result = self.dbi.processBulkSelect(self.sql, 'id', fileIDs,
+                                            conn = conn, transaction = transaction)
         return self.format(result)
@@ -42,11 +42,7 @@ class GetLocationBulk(DBFormatter):
             # Nothing to do
             return
 
-        binds = []
-        for fid in files:
-            binds.append({'id': fid})
-
-        result = self.dbi.processData(self.sql, binds,
-                         conn = conn, transaction = transaction)
+        result = self.dbi.processBulkSelect(self.sql, 'id', files,
+                                            conn = conn, transaction = transaction)
 
         return self.format(self.formatDict(result))
@@ -33,7 +33,16 @@ class ListForSubmitter(DBFormatter):
                  wmbs_subscription.workflow = wmbs_workflow.id
              WHERE wmbs_job_state.name = 'created'"""
 
-    def execute(self, conn = None, transaction = False):
+    def execute(self, conn = None, transaction = False, stream = False):
+        """
+        _execute_
+
+        With stream set, return a generator over the job dictionaries
+        instead of building the whole list in memory.
+        """
+        if stream:
+            return self.executeIter(conn = conn, transaction = transaction)
+
         result = self.dbi.processData(self.sql, conn = conn,
                                       transaction = transaction)
         return self.formatDict(result)
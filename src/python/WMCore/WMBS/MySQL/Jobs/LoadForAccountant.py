@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+_LoadForAccountant_
+
+MySQL implementation of Jobs.LoadForAccountant
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class LoadForAccountant(DBFormatter):
+    """
+    _LoadForAccountant_
+
+    Load everything the JobAccountant needs to know about a list of jobs:
+    the job meta data, the subscription type and workflow, the jobgroup
+    output fileset and the job masks.
+    """
+    sql = """SELECT wmbs_job.id, wmbs_job.jobgroup, wmbs_job.name AS name,
+                    wmbs_job_state.name AS state, wmbs_job.state_time,
+                    wmbs_job.retry_count, wmbs_job.couch_record, wmbs_job.cache_dir,
+                    wmbs_location.site_name AS location, wmbs_job.outcome AS bool_outcome,
+                    wmbs_job.fwjr_path AS fwjr_path, wmbs_sub_types.name AS type,
+                    wmbs_subscription.workflow AS workflow,
+                    wmbs_jobgroup.output AS output_fileset
+             FROM wmbs_job
+               INNER JOIN wmbs_jobgroup ON
+                 wmbs_job.jobgroup = wmbs_jobgroup.id
+               INNER JOIN wmbs_subscription ON
+                 wmbs_jobgroup.subscription = wmbs_subscription.id
+               INNER JOIN wmbs_sub_types ON
+                 wmbs_subscription.subtype = wmbs_sub_types.id
+               LEFT OUTER JOIN wmbs_location ON
+                 wmbs_job.location = wmbs_location.id
+               LEFT OUTER JOIN wmbs_job_state ON
+                 wmbs_job.state = wmbs_job_state.id
+             WHERE wmbs_job.id = :jobid"""
+
+    maskSQL = """SELECT DISTINCT job, FirstEvent, LastEvent, FirstLumi, LastLumi,
+                        FirstRun, LastRun FROM wmbs_job_mask WHERE job = :jobid"""
+
+    def execute(self, jobID, conn = None, transaction = False):
+        """
+        _execute_
+
+        Load a list of job IDs, return a dictionary of job information keyed
+        by job ID.  Masks are returned in the format of Masks.Load.  The jobs
+        and the masks are each selected with IN lists, see processBulkSelect.
+        """
+        if len(jobID) == 0:
+            return {}
+
+        result = self.dbi.processBulkSelect(self.sql, "jobid", jobID,
+                                            conn = conn, transaction = transaction)
+
+        jobs = {}
+        for entry in self.formatDict(result):
+            if entry["bool_outcome"] == 0:
+                entry["outcome"] = "failure"
+            else:
+                entry["outcome"] = "success"
+            del entry["bool_outcome"]
+            entry["masks"] = []
+            jobs[entry["id"]] = entry
+
+        result = self.dbi.processBulkSelect(self.maskSQL, "jobid", jobID,
+                                            conn = conn, transaction = transaction)
+
+        for entry in self.formatDict(result):
+            jobs[entry["job"]]["masks"].append({'FirstEvent': entry['firstevent'],
+                                                'LastEvent': entry['lastevent'],
+                                                'FirstLumi': entry['firstlumi'],
+                                                'LastLumi': entry['lastlumi'],
+                                                'FirstRun': entry['firstrun'],
+                                                'LastRun': entry['lastrun']})
+
+        return jobs
@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+"""
+_LoadForAccountant_
+
+Oracle implementation of Jobs.LoadForAccountant
+"""
+
+from WMCore.WMBS.MySQL.Jobs.LoadForAccountant import LoadForAccountant as MySQLLoadForAccountant
+
+class LoadForAccountant(MySQLLoadForAccountant):
+    pass
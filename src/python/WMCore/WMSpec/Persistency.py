@@ -14,7 +14,10 @@ from __future__ import print_function
 
 
 import cPickle
+import os
+import threading
 import urllib2
+from collections import OrderedDict
 from urllib2 import urlopen, Request
 from urlparse import urlparse
 import json
@@ -132,3 +135,127 @@ class PersistencyHelper:
             return
         doc = database.delete_doc(id)
         return
+
+
+class SpecCache(object):
+    """
+    _SpecCache_
+
+    Process wide LRU cache of workloads loaded from local spec files.
+
+    Entries are keyed by the spec path and dropped when the file mtime or
+    size changes.  The cache is bounded by the total size of the cached spec
+    files and by the number of entries.  The same WMWorkloadHelper is handed
+    to every caller, so it must be treated as read only; use
+    WMWorkloadHelper.load directly to get a private copy to modify.
+    """
+    def __init__(self, maxSize = 256 * 1024 * 1024, maxEntries = 1000):
+        self.maxSize = maxSize
+        self.maxEntries = maxEntries
+        self.lock = threading.Lock()
+        self.clear()
+        return
+
+    def clear(self):
+        """
+        _clear_
+
+        Drop all the cached workloads and reset the counters.
+        """
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        return
+
+    def load(self, filename):
+        """
+        _load_
+
+        Return the workload in a spec file, from the cache if the file did
+        not change since it was cached.
+        """
+        stat = os.stat(filename)
+        key = os.path.abspath(filename)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                if entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+                    self.entries[key] = entry
+                    self.hits += 1
+                    return entry[2]
+                self.size -= entry[1]
+            self.misses += 1
+
+        from WMCore.WMSpec.WMWorkload import WMWorkload, WMWorkloadHelper
+        workload = WMWorkloadHelper(WMWorkload("workload"))
+        workload.load(filename)
+
+        with self.lock:
+            oldEntry = self.entries.pop(key, None)
+            if oldEntry is not None:
+                self.size -= oldEntry[1]
+            if stat.st_size <= self.maxSize:
+                self.entries[key] = (stat.st_mtime, stat.st_size, workload)
+                self.size += stat.st_size
+            while self.entries and (self.size > self.maxSize or
+                                    len(self.entries) > self.maxEntries):
+                _, oldEntry = self.entries.popitem(last = False)
+                self.size -= oldEntry[1]
+                self.evictions += 1
+        return workload
+
+    def invalidate(self, filename):
+        """
+        _invalidate_
+
+        Drop a spec from the cache.
+        """
+        with self.lock:
+            entry = self.entries.pop(os.path.abspath(filename), None)
+            if entry is not None:
+                self.size -= entry[1]
+        return
+
+    def getStats(self):
+        """
+        _getStats_
+
+        Return the hit/miss counters and the cache occupancy.
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "entries": len(self.entries),
+                    "size": self.size}
+
+
+_specCache = SpecCache()
+
+
+def getSpecCache():
+    """
+    _getSpecCache_
+
+    Return the process wide spec cache.
+    """
+    return _specCache
+
+
+def loadCachedWorkload(filename):
+    """
+    _loadCachedWorkload_
+
+    Load a read only workload through the process wide spec cache.
+    """
+    return _specCache.load(filename)
+
+
+def specCacheSummary():
+    """
+    _specCacheSummary_
+
+    One line summary of the spec cache counters, for logs and heartbeats.
+    """
+    stats = _specCache.getStats()
+    return "spec cache %(hits)i hits, %(misses)i misses, %(entries)i specs" % stats
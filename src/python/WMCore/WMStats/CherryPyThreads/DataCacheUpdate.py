@@ -7,27 +7,44 @@ from WMCore.Services.WMStats.WMStatsReader import WMStatsReader
 
 class DataCacheUpdate(CherryPyPeriodicTask):
 
+    reqdbCouchApp = "ReqMgr"
+    activeStatus = WMStatsReader.ACTIVE_STATUS
+
     def __init__(self, rest, config):
 
+        self.wmstatsDB = None
+        # the changes feed keeps the DataCache up to date, the whole active
+        # data is only read again every full_resync_duration seconds
+        DataCache.setDuration(getattr(config, "full_resync_duration", 3600))
         CherryPyPeriodicTask.__init__(self, config)
 
     def setConcurrentTasks(self, config):
         """
         sets the list of functions which
         """
-        self.concurrentTasks = [{'func': self.gatherActiveDataStats, 'duration': 300}]
+        self.concurrentTasks = [{'func': self.gatherActiveDataStats,
+                                 'duration': getattr(config, "changes_duration", 60)}]
 
     def gatherActiveDataStats(self, config):
         """
-        gather active data statistics
+        gather active data statistics: all of them when the DataCache is
+        expired, otherwise the changes since the last update
         """
         try:
+            if self.wmstatsDB is None:
+                self.wmstatsDB = WMStatsReader(config.wmstats_url, reqdbURL=config.reqmgrdb_url,
+                                               reqdbCouchApp=self.reqdbCouchApp)
             if DataCache.islatestJobDataExpired():
-                wmstatsDB = WMStatsReader(config.wmstats_url, reqdbURL=config.reqmgrdb_url, 
-                                          reqdbCouchApp="ReqMgr")
-                jobData = wmstatsDB.getActiveData(jobInfoFlag = True)
+                self.wmstatsDB.resetChangesSequence()
+                jobData = self.wmstatsDB.getRequestByStatus(self.activeStatus, jobInfoFlag = True)
                 DataCache.setlatestJobData(jobData)
                 self.logger.info("DataCache is updated: %s" % len(jobData))
+            else:
+                requestInfo, removed, agentDocs = self.wmstatsDB.getActiveDataChanges(self.activeStatus)
+                DataCache.updateRequests(requestInfo, removed)
+                DataCache.updateAgentJobInfo(agentDocs)
+                self.logger.info("DataCache is updated with changes: %s requests, %s agent reports"
+                                 % (len(requestInfo) + len(removed), len(agentDocs)))
         except Exception as ex:
             self.logger.error(str(ex))
-        return
\ No newline at end of file
+        return
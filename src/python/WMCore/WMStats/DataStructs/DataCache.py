@@ -1,3 +1,4 @@
+import threading
 import time
 
 class DataCache(object):
@@ -6,7 +7,13 @@ class DataCache(object):
     # from each server. 
     _duration = 300 # 5 minitues
     _lastedActiveDataFromAgent = {};
-    
+    # request fields with an index: {index name: request doc field}
+    _indexedFields = {"status": "RequestStatus", "team": "Teams", "campaign": "Campaign"}
+    # the data and its indexes are replaced, never modified in place, so the
+    # readers can use what they got without holding the lock
+    _index = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def getDuration():
         return DataCache._duration;
@@ -25,8 +32,18 @@ class DataCache(object):
 
     @staticmethod
     def setlatestJobData(jobData):
-        DataCache._lastedActiveDataFromAgent["time"] = int(time.time())
-        DataCache._lastedActiveDataFromAgent["data"] = jobData
+        """
+        Replace the whole data, e.g. with a full resync
+        """
+        index = {}
+        for name in DataCache._indexedFields:
+            index[name] = {}
+        for requestName, requestInfo in jobData.iteritems():
+            DataCache._addToIndex(index, requestName, requestInfo)
+        with DataCache._lock:
+            DataCache._lastedActiveDataFromAgent["time"] = int(time.time())
+            DataCache._lastedActiveDataFromAgent["data"] = jobData
+            DataCache._index = index
 
 
     @staticmethod
@@ -38,3 +55,126 @@ class DataCache(object):
             return True
         return False
 
+    @staticmethod
+    def _indexValues(requestInfo, field):
+        value = requestInfo.get(field, None)
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return value
+        return [value]
+
+    @staticmethod
+    def _addToIndex(index, requestName, requestInfo):
+        for name, field in DataCache._indexedFields.items():
+            for value in DataCache._indexValues(requestInfo, field):
+                index[name].setdefault(value, set()).add(requestName)
+
+    @staticmethod
+    def updateRequests(requests, removed=[]):
+        """
+        Apply request deltas: requests is {request name: request doc} of the
+        new or changed requests, which keep the AgentJobInfo they had, and
+        removed the names of the requests to drop.
+        """
+        with DataCache._lock:
+            if not DataCache._lastedActiveDataFromAgent:
+                return
+            data = dict(DataCache._lastedActiveDataFromAgent["data"])
+            index = dict(DataCache._index)
+            copied = set()
+
+            def indexSet(name, value):
+                # copy the index sets on first change
+                if name not in copied:
+                    index[name] = dict(index[name])
+                    copied.add(name)
+                if (name, value) not in copied:
+                    index[name][value] = set(index[name].get(value, set()))
+                    copied.add((name, value))
+                return index[name][value]
+
+            def dropFromIndex(requestName):
+                for name, field in DataCache._indexedFields.items():
+                    for value in DataCache._indexValues(data[requestName], field):
+                        indexSet(name, value).discard(requestName)
+                        if not index[name][value]:
+                            del index[name][value]
+                            copied.discard((name, value))
+
+            for requestName in removed:
+                if requestName in data:
+                    dropFromIndex(requestName)
+                    del data[requestName]
+
+            for requestName, requestInfo in requests.iteritems():
+                if requestName in data:
+                    dropFromIndex(requestName)
+                    if "AgentJobInfo" in data[requestName] and "AgentJobInfo" not in requestInfo:
+                        requestInfo = dict(requestInfo)
+                        requestInfo["AgentJobInfo"] = data[requestName]["AgentJobInfo"]
+                data[requestName] = requestInfo
+                for name, field in DataCache._indexedFields.items():
+                    for value in DataCache._indexValues(requestInfo, field):
+                        indexSet(name, value).add(requestName)
+
+            DataCache._lastedActiveDataFromAgent["data"] = data
+            DataCache._index = index
+
+    @staticmethod
+    def updateAgentJobInfo(agentDocs):
+        """
+        Apply the agent_request documents uploaded by the agents, keeping
+        the latest one of each agent for the requests in the cache.
+        """
+        with DataCache._lock:
+            if not DataCache._lastedActiveDataFromAgent:
+                return
+            data = None
+            for doc in agentDocs:
+                requestName = doc["workflow"]
+                current = (data or DataCache._lastedActiveDataFromAgent["data"]).get(requestName, None)
+                if current is None:
+                    continue
+                jobInfo = current.get("AgentJobInfo", {})
+                latest = jobInfo.get(doc["agent_url"], None)
+                if latest and latest.get("timestamp", 0) > doc.get("timestamp", 0):
+                    continue
+                if data is None:
+                    data = dict(DataCache._lastedActiveDataFromAgent["data"])
+                current = dict(current)
+                current["AgentJobInfo"] = dict(jobInfo)
+                current["AgentJobInfo"][doc["agent_url"]] = doc
+                data[requestName] = current
+            if data is not None:
+                DataCache._lastedActiveDataFromAgent["data"] = data
+
+    @staticmethod
+    def filterData(**filters):
+        """
+        Requests matching all the filters, e.g. status="running" or
+        team=["production", "relval"], looked up in the indexes.
+        A filter with a list matches any of its values.
+        """
+        with DataCache._lock:
+            if not DataCache._lastedActiveDataFromAgent:
+                return {}
+            data = DataCache._lastedActiveDataFromAgent["data"]
+            index = DataCache._index
+
+        requestNames = None
+        for name, values in filters.items():
+            if name not in index:
+                raise ValueError("No index on %s, only on %s" % (name, index.keys()))
+            if not isinstance(values, list):
+                values = [values]
+            matched = set()
+            for value in values:
+                matched.update(index[name].get(value, set()))
+            if requestNames is None:
+                requestNames = matched
+            else:
+                requestNames &= matched
+        if requestNames is None:
+            return data
+        return dict((requestName, data[requestName]) for requestName in requestNames)
@@ -18,12 +18,23 @@ class ActiveRequestJobInfo(RESTEntity):
         RESTEntity.__init__(self, app, api, config, mount)  
         
     def validate(self, apiobj, method, api, param, safe):
+        # optional filters, a value or a list of values each
+        for prop in ["status", "team", "campaign"]:
+            safe.kwargs[prop] = param.kwargs.get(prop, None)
+            if prop in param.kwargs:
+                del param.kwargs[prop]
         return            
 
     
     @restcall(formats = [('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
     @tools.expires(secs=-1)
-    def get(self):
+    def get(self, status, team, campaign):
         # This assumes DataCahe is periodically updated. 
         # If data is not updated, need to check, dataCacheUpdate log
+        filters = {}
+        for name, value in [("status", status), ("team", team), ("campaign", campaign)]:
+            if value is not None:
+                filters[name] = value
+        if filters:
+            return rows([DataCache.filterData(**filters)])
         return rows([DataCache.getlatestJobData()])
\ No newline at end of file
@@ -138,10 +138,7 @@ class DataLocationMapper(object):
             raise RuntimeError("shouldn't get here")
 
         # convert from PhEDEx name to cms site name
-        for name, nodes in result.items():
-            psns = set()
-            psns.update(self.sitedb.PNNstoPSNs(nodes))
-            result[name] = list(psns)
+        self.nodesToPSNs(result)
 
         return result, fullResync
 
@@ -160,12 +157,25 @@ class DataLocationMapper(object):
                 logging.error('Error getting block location from dbs for %s: %s' % (dataItem, str(ex)))
 
         # convert the sets to lists
+        self.nodesToPSNs(result)
+
+        return result, True  # partial dbs updates not supported
+
+    def nodesToPSNs(self, result):
+        """
+        Replace the PhEDEx nodes of each data item with the list of their
+        processing site names, converting every node once
+        """
+        allNodes = set()
+        for nodes in result.values():
+            allNodes.update(nodes)
+        nodeToPSNs = self.sitedb.PNNstoPSNsMap(allNodes)
         for name, nodes in result.items():
             psns = set()
-            psns.update(self.sitedb.PNNstoPSNs(nodes))
+            for node in nodes:
+                psns.update(nodeToPSNs[node])
             result[name] = list(psns)
-
-        return result, True  # partial dbs updates not supported
+        return
 
     def organiseByDbs(self, dataItems):
         """Sort items by dbs instances - return dict with DBSReader as key & data items as values"""
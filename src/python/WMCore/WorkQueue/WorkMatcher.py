@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+_WorkMatcher_
+
+Match available WorkQueue elements to sites with free job slots.
+
+Elements are taken by decreasing priority, then increasing creation time.
+An element goes to a random site among those passing its site restriction
+(see WorkQueueElement.passesSiteRestriction) where the jobs running at the
+element priority or higher are fewer than the site threshold; its jobs are
+then added to the site job counts at its priority.
+
+Since the priorities only go down as elements are matched, the jobs at or
+above the current priority of a site are the running ones down to that
+priority, summed with a pointer moving once over the site priorities, plus
+all the jobs assigned so far.  The sites allowed by the restrictions are
+computed once per distinct restriction, not once per element and site.
+"""
+
+import random
+
+
+def _restrictionKey(element):
+    """
+    _restrictionKey_
+
+    Everything the site restriction of an element depends on.
+    """
+    key = [tuple(element.get('SiteWhitelist', [])), tuple(element.get('SiteBlacklist', [])),
+           bool(element.get('NoLocationUpdate'))]
+    if element.get('NoInputUpdate', False) is False:
+        key.append(tuple([tuple(x) for x in element.get('Inputs', {}).values()]))
+        if element.get('ParentFlag', False):
+            key.append(tuple([tuple(x) for x in element.get('ParentData', {}).values()]))
+    if element.get('NoPileupUpdate', False) is False:
+        key.append(tuple([tuple(x) for x in element.get('PileupData', {}).values()]))
+    return tuple(key)
+
+
+def restrictedSites(element, sites):
+    """
+    _restrictedSites_
+
+    The sites, out of the given set, that pass the site restriction of an
+    element, like WorkQueueElement.passesSiteRestriction does for one site.
+    """
+    whitelist = element.get('SiteWhitelist', [])
+    if whitelist:
+        allowed = sites & set(whitelist)
+    else:
+        allowed = set(sites)
+    allowed.difference_update(element.get('SiteBlacklist', []))
+    if element.get('NoLocationUpdate'):
+        return allowed
+
+    if element.get('NoInputUpdate', False) is False:
+        for locations in element.get('Inputs', {}).values():
+            allowed.intersection_update(locations)
+        if element.get('ParentFlag', False):
+            for locations in element.get('ParentData', {}).values():
+                allowed.intersection_update(locations)
+
+    if element.get('NoPileupUpdate', False) is False:
+        for locations in element.get('PileupData', {}).values():
+            allowed.intersection_update(locations)
+    return allowed
+
+
+class SiteJobCount(object):
+    """
+    _SiteJobCount_
+
+    Jobs running at a site at or above a priority, for priorities that
+    never go up between calls.
+    """
+    def __init__(self, jobCounts):
+        self.counts = sorted(jobCounts.items(), reverse = True)
+        self.next = 0
+        self.running = 0
+        self.assigned = 0
+
+    def jobsAbove(self, priority):
+        """
+        _jobsAbove_
+
+        Jobs running at the priority or higher, including the ones assigned.
+        """
+        while self.next < len(self.counts) and self.counts[self.next][0] >= priority:
+            self.running += self.counts[self.next][1]
+            self.next += 1
+        return self.running + self.assigned
+
+
+def matchWork(elements, thresholds, siteJobCounts):
+    """
+    _matchWork_
+
+    Match elements, WorkQueueElements or their parameter dicts, to sites.
+    Returns the (index, site) of the matched elements in matching order and
+    the indexes of the elements without a site, and adds the matched jobs
+    to siteJobCounts.
+    """
+    sites = set(thresholds)
+    order = sorted(range(len(elements)), key = lambda i: elements[i].get('CreationTime', 0))
+    order.sort(key = lambda i: elements[i].get('Priority', 0), reverse = True)
+
+    jobCounts = {}
+    restrictions = {}
+    matched = []
+    unmatched = []
+    for i in order:
+        element = elements[i]
+        prio = element.get('Priority', 0)
+
+        key = _restrictionKey(element)
+        allowed = restrictions.get(key, None)
+        if allowed is None:
+            allowed = sorted(restrictedSites(element, sites))
+            restrictions[key] = allowed
+
+        possibleSites = []
+        for site in allowed:
+            if site not in jobCounts:
+                jobCounts[site] = SiteJobCount(siteJobCounts.get(site, {}))
+            if jobCounts[site].jobsAbove(prio) < thresholds[site]:
+                possibleSites.append(site)
+
+        if not possibleSites:
+            unmatched.append(i)
+            continue
+
+        site = random.choice(possibleSites)
+        jobs = element.get('Jobs') * element.get('blowupFactor', 1.0)
+        jobCounts[site].assigned += jobs
+        siteCounts = siteJobCounts.setdefault(site, {})
+        siteCounts[prio] = siteCounts.get(prio, 0) + jobs
+        matched.append((i, site))
+
+    return matched, unmatched
@@ -6,7 +6,6 @@ Interface to WorkQueue persistent storage
 """
 
 import json
-import random
 import time
 import urllib
 
@@ -15,6 +14,7 @@ from WMCore.Lexicon import sanitizeURL
 from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 from WMCore.WorkQueue.DataStructs.CouchWorkQueueElement import CouchWorkQueueElement, fixElementConflicts
 from WMCore.WorkQueue.WorkQueueExceptions import WorkQueueNoMatchingElements
+from WMCore.WorkQueue.WorkMatcher import matchWork
 
 
 def formatReply(answer, *items):
@@ -206,10 +206,9 @@ class WorkQueueBackend(object):
             if WorkflowName:
                 options['filter']['RequestName'] = WorkflowName
 
-            view = db.loadList('WorkQueue', 'filter', filter, options, key)
-            view = json.loads(view)
+            view = db.iterList('WorkQueue', 'filter', filter, options, key)
             if returnIdOnly:
-                return view
+                return list(view)
             elements = [CouchWorkQueueElement.fromDocument(db, row) for row in view]
 
         if loadSpec:
@@ -326,7 +325,6 @@ class WorkQueueBackend(object):
         self.logger.info("Getting available work from %s/%s" %
                          (sanitizeURL(self.server.url)['url'], self.db.name))
         elements = []
-        sortedElements = []
 
         # We used to pre-filter sites, looking to see if there are idle job slots
         # We don't do this anymore, as we may over-allocate
@@ -357,42 +355,22 @@ class WorkQueueBackend(object):
                 self.logger.info("""No available work in WQ or didn't pass workqueue restriction
                                     - check Pileup, site white list, etc""")
             self.logger.debug("Available Work:\n %s \n for resources\n %s" % (result, thresholds))
-        # Iterate through the results; apply whitelist / blacklist / data
-        # locality restrictions.  Only assign jobs if they are high enough
-        # priority.
-        for i in result:
-            element = CouchWorkQueueElement.fromDocument(self.db, i)
-            sortedElements.append(element)
-            
-        # sort elements to get them in priority first and timestamp order
-        sortedElements.sort(key=lambda element: element['CreationTime'])
-        sortedElements.sort(key = lambda x: x['Priority'], reverse = True)
-         
-        for element in sortedElements:
-            prio = element['Priority']
-
-            possibleSite = None
-            sites = thresholds.keys()
-            random.shuffle(sites)
-            for site in sites:
-                if element.passesSiteRestriction(site):
-                    # Count the number of jobs currently running of greater priority
-                    prio = element['Priority']
-                    curJobCount = sum(map(lambda x: x[1] if x[0] >= prio else 0, siteJobCounts.get(site, {}).items()))
-                    self.logger.debug("Job Count: %s, site: %s threshods: %s" % (curJobCount, site, thresholds[site]))
-                    if curJobCount < thresholds[site]:
-                        possibleSite = site
-                        break
-
-            if possibleSite:
-                self.logger.debug("Possible site exists %s" % str(possibleSite))
-                elements.append(element)
-                if possibleSite not in siteJobCounts:
-                    siteJobCounts[possibleSite] = {}
-                siteJobCounts[possibleSite][prio] = siteJobCounts[possibleSite].setdefault(prio, 0) + \
-                                                    element['Jobs'] * element.get('blowupFactor', 1.0)
-            else:
-                self.logger.info("No possible site for %s with doc id %s", element['RequestName'], element.id)
+        # Match the element parameters to sites, applying whitelist / blacklist /
+        # data locality restrictions.  Only assign jobs if they are high enough
+        # priority.  Elements are only made for the matched documents.
+        elementKey = 'WMCore.WorkQueue.DataStructs.WorkQueueElement.WorkQueueElement'
+        candidates = []
+        for doc in result:
+            params = doc[elementKey]
+            params['CreationTime'] = doc['timestamp']
+            candidates.append(params)
+        matched, unmatched = matchWork(candidates, thresholds, siteJobCounts)
+
+        for i, site in matched:
+            self.logger.debug("Possible site exists %s" % site)
+            elements.append(CouchWorkQueueElement.fromDocument(self.db, result[i]))
+        for i in unmatched:
+            self.logger.info("No possible site for %s with doc id %s", candidates[i].get('RequestName'), result[i]['_id'])
 
         return elements, thresholds, siteJobCounts
 
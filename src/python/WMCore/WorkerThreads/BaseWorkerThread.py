@@ -20,6 +20,7 @@ from WMCore.Database.Transaction import Transaction
 from WMCore.Database.CMSCouch import CouchError
 from WMCore.Database.CouchUtils import CouchConnectionError
 from WMCore.WMFactory import WMFactory
+from WMCore.JobStateMachine.JobDumpWriter import jobDumpWriterSummary
 
 from WMCore.Alerts import API as alertAPI
 
@@ -162,7 +163,7 @@ class BaseWorkerThread:
                                 if hasattr(self.component.config, "Agent"):
                                     if getattr(self.component.config.Agent, "useHeartbeat", True):
                                         self.heartbeatAPI.updateWorkerHeartbeat(
-                                            myThread.getName(), "Running")
+                                            myThread.getName(), self.heartbeatState())
                             except (CouchError, CouchConnectionError) as ex:
                                 msg  = " Failed to update heartbeat for worker %s" % str(self)
                                 msg += ":\n %s" % str(ex)
@@ -217,6 +218,19 @@ class BaseWorkerThread:
         msg = "Worker thread %s terminated" % str(self)
         logging.info(msg)
 
+    def heartbeatState(self):
+        """
+        _heartbeatState_
+
+        The state recorded in the worker heartbeat before each cycle,
+        including the jobdump writer counters if the process has writers.
+        Workers can override it to report their own counters.
+        """
+        summary = jobDumpWriterSummary()
+        if summary:
+            return "Running, %s" % summary
+        return "Running"
+
     def sleepThread(self):
         """
         _sleepThread_
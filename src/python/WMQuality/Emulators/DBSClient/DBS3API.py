@@ -10,6 +10,7 @@ Created on Mar 13, 2013
 
 import json
 import os
+import time
 
 from random import random
 
@@ -70,3 +71,59 @@ class DbsApi():
                 if block["block"]["block_name"] == block_name:
                     return [block["block"]]
         return []
+
+
+class FakeDbsWriter(object):
+    """
+    _FakeDbsWriter_
+
+    Local stand in for the DBS writer to benchmark the DBS3 uploader.
+    Every block is written to its own file in the directory given as url,
+    so several upload processes can insert at the same time.  The latency
+    and the fraction of insertions failing with a proxy error after the
+    block went in are set through the class attributes.
+    """
+    latency = 0
+    errorRate = 0
+
+    def __init__(self, url):
+        self.dbsPath = url
+
+    def blockFile(self, blockName):
+        """
+        _blockFile_
+
+        File holding a block
+        """
+        return os.path.join(self.dbsPath, "%s.json" % blockName.replace('/', '_').replace('#', '_'))
+
+    def insertBulkBlock(self, blockDump):
+        """
+        _insertBulkBlock_
+
+        Write the block, refusing blocks that already exist
+        """
+        time.sleep(self.latency)
+        blockName = blockDump["block"]["block_name"]
+        fileName = self.blockFile(blockName)
+        if os.path.exists(fileName):
+            raise Exception("Block %s already exists" % blockName)
+        with open(fileName + ".tmp", 'w') as outFileHandle:
+            json.dump(blockDump, outFileHandle)
+        os.rename(fileName + ".tmp", fileName)
+
+        if random() < self.errorRate:
+            raise Exception("Proxy Error, this is a mock proxy error.")
+        return
+
+    def listBlocks(self, block_name):
+        """
+        _listBlocks_
+
+        Return the requested block information if it exists.
+        """
+        fileName = self.blockFile(block_name)
+        if not os.path.exists(fileName):
+            return []
+        with open(fileName, 'r') as inFileHandle:
+            return [json.load(inFileHandle)["block"]]
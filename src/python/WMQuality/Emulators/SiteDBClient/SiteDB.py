@@ -302,6 +302,18 @@ class SiteDBJSON(object):
             pnns.update(pnn_list)
         return list(pnns)
 
+    def PNNstoPSNsMap(self, pnns):
+        """
+        Emulator to convert list of PhEDEx node names to a dict of their Processing Site Names
+        """
+        return dict((pnn, self.PNNstoPSNs([pnn])) for pnn in set(pnns))
+
+    def PSNstoPNNsMap(self, psns):
+        """
+        Emulator to convert list of Processing Site Names to a dict of their PhEDEx Node Names
+        """
+        return dict((psn, self.PSNstoPNNs([psn])) for psn in set(psns))
+
     def PSNtoPNNMap(self, psn_pattern=''):
         """
         PSN to PNN map
@@ -26,9 +26,10 @@ from WMComponent.DBS3Buffer.DBSBufferFile import DBSBufferFile
 from WMComponent.DBS3Buffer.DBSBufferUtil import DBSBufferUtil
 from WMComponent.DBS3Buffer.DBSBufferBlock import DBSBufferBlock
 
-from WMComponent.DBS3Buffer.DBSUploadPoller import DBSUploadPoller
+from WMComponent.DBS3Buffer.DBSUploadPoller import DBSUploadPoller, UploadWindow, uploadBlock
 
 from WMQuality.Emulators.DBSClient.DBS3API import DbsApi as MockDbsApi
+from WMQuality.Emulators.DBSClient.DBS3API import FakeDbsWriter
 from WMQuality.TestInit     import TestInit
 from WMQuality.Emulators import EmulatorSetup
 
@@ -611,5 +612,109 @@ class DBSUploadTest(unittest.TestCase):
             del os.environ["DONT_TRAP_EXIT"]
         return
 
+    def testOpenBlockIndex(self):
+        """
+        _testOpenBlockIndex_
+
+        Verify that the open block index follows the blocks being created,
+        closed and removed from the block cache.
+        """
+        from WMComponent.DBS3Buffer import DBSUploadPoller as MockDBSUploadPoller
+        MockDBSUploadPoller.DbsApi = MockDbsApi
+
+        (_, dbsFilePath) = mkstemp(dir = self.testDir)
+        self.dbsUrl = dbsFilePath
+        dbsUploader = MockDBSUploadPoller.DBSUploadPoller(config = self.getConfig())
+        try:
+            datasetPath = "/Cosmics/CRUZET09-PromptReco-v1/RECO"
+            newFile = {"datasetPath": datasetPath, "size": 1024, "events": 10}
+
+            block = dbsUploader.getBlock(newFile, "T1_US_FNAL_Disk")
+            self.assertEqual(dbsUploader.getBlock(newFile, "T1_US_FNAL_Disk"), block)
+            otherBlock = dbsUploader.getBlock(newFile, "T2_CH_CERN")
+            self.assertNotEqual(otherBlock, block)
+            self.assertEqual(len(dbsUploader.getOpenBlocks()), 2)
+
+            dbsUploader.closeBlock(block)
+            self.assertEqual(block.status, "Pending")
+            self.assertEqual(dbsUploader.getOpenBlocks(), [otherBlock])
+            newBlock = dbsUploader.getBlock(newFile, "T1_US_FNAL_Disk")
+            self.assertNotEqual(newBlock, block)
+            self.assertEqual(len(dbsUploader.blockCache), 3)
+
+            dbsUploader.removeFromBlockCache(newBlock.getName())
+            dbsUploader.removeFromBlockCache(block.getName())
+            self.assertEqual(dbsUploader.blockCache.keys(), [otherBlock.getName()])
+            self.assertEqual(dbsUploader.openBlocks.keys(), [(datasetPath, "T2_CH_CERN")])
+        finally:
+            dbsUploader.close()
+        return
+
+    def testUploadRetries(self):
+        """
+        _testUploadRetries_
+
+        Blocks that made it into DBS before the insertion failed are not
+        inserted again, and the upload window follows the DBS latency.
+        """
+        FakeDbsWriter.errorRate = 1
+        try:
+            dbsApi = FakeDbsWriter(self.testDir)
+            blockName = "/Cosmics/CRUZET09-PromptReco-v1/RECO#%s" % makeUUID()
+            block = {"block": {"block_name": blockName}}
+            result = uploadBlock(dbsApi, blockName, block, nRetries = 2)
+            self.assertEqual(result["success"], "uploaded")
+            result = uploadBlock(dbsApi, blockName, block, nRetries = 2)
+            self.assertEqual(result["success"], "uploaded")
+            self.assertEqual(dbsApi.listBlocks(blockName)[0]["block_name"], blockName)
+        finally:
+            FakeDbsWriter.errorRate = 0
+
+        window = UploadWindow(4, 10)
+        window.update(20)
+        self.assertEqual(window.size, 2)
+        window.update(1, success = False)
+        self.assertEqual(window.size, 1)
+        for _ in range(10):
+            window.update(1)
+        self.assertEqual(window.size, 4)
+        return
+
+    @attr("performance")
+    def testPipelinedUpload(self):
+        """
+        _testPipelinedUpload_
+
+        Time the upload of many small blocks to a local fake DBS writer
+        answering with a fixed latency.
+        """
+        from WMComponent.DBS3Buffer import DBSUploadPoller as MockDBSUploadPoller
+        MockDBSUploadPoller.DbsApi = FakeDbsWriter
+        FakeDbsWriter.latency = 0.2
+
+        self.dbsUrl = self.testDir
+        config = self.getConfig()
+        config.DBS3Upload.nProcesses = 8
+        dbsUploader = MockDBSUploadPoller.DBSUploadPoller(config = config)
+        try:
+            workflowName = 'TestWorkload%s' % (int(time.time()))
+            taskPath = '/%s/TestProcessing' % workflowName
+            self.injectWorkflow(workflowName, taskPath,
+                                MaxWaitTime = 3600, MaxFiles = 2,
+                                MaxEvents = 200000000)
+            self.createParentFiles("TropicalSeason%s" % (int(time.time())), nFiles = 200,
+                                   workflowName = workflowName,
+                                   taskPath = taskPath)
+
+            startTime = time.time()
+            dbsUploader.algorithm()
+            print("\nUploaded %i blocks in %.2f s, upload window %i" % (len(os.listdir(self.testDir)),
+                                                                        time.time() - startTime,
+                                                                        dbsUploader.uploadWindow.size))
+        finally:
+            FakeDbsWriter.latency = 0
+            dbsUploader.close()
+        return
+
 if __name__ == '__main__':
     unittest.main()
@@ -8,6 +8,7 @@ import os
 import os.path
 import threading
 import time
+import shutil
 import unittest
 import cProfile, pstats
 
@@ -31,6 +32,7 @@ from WMCore.DataStructs.Run             import Run
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.WMSpec.Makers.TaskMaker     import TaskMaker
 from WMCore.ACDC.DataCollectionService  import DataCollectionService
+from WMCore.FwkJobReport.Report         import Report
 
 from WMCore_t.WMSpec_t.TestSpec         import testWorkload
 from WMComponent.ErrorHandler.ErrorHandlerPoller import ErrorHandlerPoller
@@ -481,6 +483,72 @@ class ErrorHandlerTest(unittest.TestCase):
 
         return
 
+    def testF_ReportSummaries(self):
+        """
+        _ReportSummaries_
+
+        Fail jobs from the FWJR summaries, and from the full FWJRs loaded in
+        parallel for the jobs without one.
+        """
+        workloadName = 'TestWorkload'
+
+        self.createWorkload(workloadName = workloadName)
+        workloadPath = os.path.join(self.testDir, 'workloadTest', workloadName,
+                                    'WMSandbox', 'WMWorkload.pkl')
+
+        # The summary claims a different exit code than the report
+        fwjrPath = os.path.join(self.testDir, 'Report.0.pkl')
+        shutil.copy(os.path.join(WMCore.WMBase.getTestBase(),
+                                 "WMComponent_t/JobAccountant_t",
+                                 "fwjrs/badBackfillJobReport.pkl"), fwjrPath)
+        report = Report()
+        report.load(fwjrPath)
+        report.addError("cmsRun1", 60450, "TestError", "Test error")
+        report.saveSummary(fwjrPath)
+
+        testJobGroup = self.createTestJobGroup(nJobs = self.nJobs,
+                                               workloadPath = workloadPath,
+                                               fwjrPath = fwjrPath)
+
+        config = self.getConfig()
+        config.ErrorHandler.readFWJR         = True
+        config.ErrorHandler.failureExitCodes = [60450]
+        changer = ChangeState(config)
+        changer.propagate(testJobGroup.jobs, 'created', 'new')
+        changer.propagate(testJobGroup.jobs, 'executing', 'created')
+        changer.propagate(testJobGroup.jobs, 'complete', 'executing')
+        changer.propagate(testJobGroup.jobs, 'jobfailed', 'complete')
+
+        testErrorHandler = ErrorHandlerPoller(config)
+        testErrorHandler.algorithm(None)
+
+        idList = self.getJobs.execute(state = 'Exhausted')
+        self.assertEqual(len(idList), self.nJobs)
+
+        # Without summary, the reports are loaded in worker processes
+        os.remove(os.path.join(self.testDir, 'Report.0.summary.json'))
+        config.ErrorHandler.failureExitCodes   = [8020]
+        config.ErrorHandler.readFWJRProcesses  = 2
+        config.ErrorHandler.minParallelReports = 1
+        testErrorHandler = ErrorHandlerPoller(config)
+
+        changer.propagate(testJobGroup.jobs, 'created', 'new')
+        changer.propagate(testJobGroup.jobs, 'executing', 'created')
+        changer.propagate(testJobGroup.jobs, 'complete', 'executing')
+        changer.propagate(testJobGroup.jobs, 'jobfailed', 'complete')
+
+        try:
+            testErrorHandler.algorithm(None)
+        finally:
+            testErrorHandler.close()
+
+        idList = self.getJobs.execute(state = 'JobFailed')
+        self.assertEqual(len(idList), 0)
+        idList = self.getJobs.execute(state = 'Exhausted')
+        self.assertEqual(len(idList), self.nJobs)
+
+        return
+
 
     @attr('integration')
     def testZ_Profile(self):
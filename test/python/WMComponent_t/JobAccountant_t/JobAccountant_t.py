@@ -7,13 +7,14 @@ Unit tests for the WMAgent JobAccountant component.
 from __future__ import print_function
 
 import os.path
+import shutil
 import threading
 import unittest
 import time
 import copy
 
 import WMCore.WMBase
-from WMCore.FwkJobReport.Report import Report
+from WMCore.FwkJobReport.Report import Report, getSummaryPath, loadReportSummary, loadSummaryFromReport
 
 from WMQuality.TestInitCouchApp import TestInitCouchApp
 from WMCore.DAOFactory import DAOFactory
@@ -131,14 +132,14 @@ class JobAccountantTest(unittest.TestCase):
         
         return config
 
-    def setupDBForJobFailure(self, jobName, fwjrName):
+    def setupDBForJobFailure(self, jobName, fwjrName, fwjrDir = None):
         """
         _setupDBForJobFailure_
 
         Create the appropriate workflows, filesets, subscriptions, files,
         jobgroups and jobs in the database so that the accountant's handling of
         failed jobs can be tested.  Move the job to the complete state and set
-        the path to the job report.
+        the path to the job report, in fwjrDir if given.
         """
         testWorkflow = Workflow(spec = "wf001.xml", owner = "Steve",
                                 name = "TestWF", task = "None")
@@ -170,6 +171,9 @@ class JobAccountantTest(unittest.TestCase):
 
         fwjrPath = os.path.join(WMCore.WMBase.getTestBase(),
                                 "WMComponent_t/JobAccountant_t/fwjrs", fwjrName)
+        if fwjrDir:
+            shutil.copy(fwjrPath, fwjrDir)
+            fwjrPath = os.path.join(fwjrDir, fwjrName)
         self.setFWJRAction.execute(jobID = testJob["id"], fwjrPath = fwjrPath)
         return
 
@@ -202,10 +206,12 @@ class JobAccountantTest(unittest.TestCase):
         _testFailedJob_
 
         Run a failed job that has a vaid job report through the accountant.
-        Verify that it functions correctly.
+        Verify that it functions correctly, and that the summary of the report
+        is written next to it.
         """
         self.setupDBForJobFailure(jobName = "T0Skim-Run2-Skim2-Jet-631",
-                                  fwjrName = "badBackfillJobReport.pkl")
+                                  fwjrName = "badBackfillJobReport.pkl",
+                                  fwjrDir = self.testDir)
 
         config = self.createConfig()
         accountant = JobAccountantPoller(config)
@@ -218,6 +224,9 @@ class JobAccountantTest(unittest.TestCase):
         f.load()
         self.assertEqual(f['lfn'],
                          '/store/unmerged/logs/prod/2011/3/16/cmsdataops_Backfill_110311_01_T1_IT_CNAF_Mu_110311_171929/DataProcessing/DataProcessingMergeRECOoutput/MuSkim/0000/0/4c32fa40-4da3-11e0-b58a-00221959e72f-0-0-logArchive.tar.gz')
+
+        fwjrPath = os.path.join(self.testDir, "badBackfillJobReport.pkl")
+        self.assertEqual(loadReportSummary(fwjrPath)["exitCodes"], loadSummaryFromReport(fwjrPath)["exitCodes"])
         return
 
     def testEmptyFWJR(self):
@@ -256,6 +265,28 @@ class JobAccountantTest(unittest.TestCase):
         self.verifyJobFailure("T0Merge-Run1-Mu-AOD-722")
         return
 
+    def testCorruptFWJRSummary(self):
+        """
+        _testCorruptFWJRSummary_
+
+        No summary is written for a job report that can't be loaded, so the
+        ErrorHandler doesn't triage the job on the made up report.
+        """
+        self.setupDBForJobFailure(jobName = "T0Merge-Run1-Mu-AOD-722",
+                                  fwjrName = "MergeSuccessBadPKL.pkl",
+                                  fwjrDir = self.testDir)
+
+        config = self.createConfig()
+        accountant = JobAccountantPoller(config)
+        accountant.setup()
+        accountant.algorithm()
+
+        self.verifyJobFailure("T0Merge-Run1-Mu-AOD-722")
+        fwjrPath = os.path.join(self.testDir, "MergeSuccessBadPKL.pkl")
+        self.assertFalse(os.path.exists(getSummaryPath(fwjrPath)))
+        self.assertEqual(loadReportSummary(fwjrPath), None)
+        return
+
     def setupDBForSplitJobSuccess(self):
         """
         _setupDBForSplitJobSuccess_
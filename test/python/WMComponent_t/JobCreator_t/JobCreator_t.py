@@ -17,6 +17,8 @@ import os
 import cProfile
 import pstats
 import cPickle
+import gc
+import multiprocessing
 
 from WMQuality.TestInitCouchApp import TestInitCouchApp as TestInit
 from WMQuality.Emulators import EmulatorSetup
@@ -30,7 +32,8 @@ from WMCore.WMBS.Subscription import Subscription
 from WMCore.DataStructs.Run   import Run
 
 from WMCore.Agent.Configuration              import Configuration
-from WMComponent.JobCreator.JobCreatorPoller import JobCreatorPoller
+from WMComponent.JobCreator.JobCreatorPoller import JobCreatorPoller, connectSplittingProcess
+from WMComponent.JobCreator.SubmitIndex      import listJobDirs
 
 from WMCore.Services.UUID import makeUUID
 
@@ -303,7 +306,7 @@ class JobCreatorTest(unittest.TestCase):
         self.assertTrue('job_1' in listOfDirs)
         self.assertTrue('job_2' in listOfDirs)
         self.assertTrue('job_3' in listOfDirs)
-        jobDir = os.listdir(groupDirectory)[0]
+        jobDir = listJobDirs(groupDirectory)[0]
         jobFile = os.path.join(groupDirectory, jobDir, 'job.pkl')
         self.assertTrue(os.path.isfile(jobFile))
         f = open(jobFile, 'r')
@@ -590,6 +593,87 @@ class JobCreatorTest(unittest.TestCase):
 
         return
 
+    def testF_ParallelSplitting(self):
+        """
+        _ParallelSplitting_
+
+        Split the subscriptions of two workflows in two processes and check
+        the job numbering of each workflow is consistent.
+        """
+        config = self.getConfig()
+        config.JobCreator.splitProcesses = 2
+
+        nSubs        = 3
+        nFiles       = 10
+        workloadName = 'TestWorkload'
+
+        self.createWorkload(workloadName = workloadName)
+        workloadPath = os.path.join(self.testDir, 'workloadTest', 'TestWorkload', 'WMSandbox', 'WMWorkload.pkl')
+
+        names = [makeUUID(), makeUUID()]
+        for name in names:
+            self.createJobCollection(name = name, nSubs = nSubs, nFiles = nFiles, workflowURL = workloadPath)
+
+        testJobCreator = JobCreatorPoller(config = config)
+        try:
+            testJobCreator.algorithm()
+        finally:
+            testJobCreator.stopSplittingPool()
+
+        getJobsAction = self.daoFactory(classname = "Jobs.GetAllJobs")
+        result = getJobsAction.execute(state = 'Created', jobType = "Processing")
+        self.assertEqual(len(result), 2 * nSubs * nFiles)
+
+        counters = {}
+        testDirectory = os.path.join(self.testDir, 'jobCacheDir', 'TestWorkload', 'ReReco')
+        for groupDir in os.listdir(testDirectory):
+            for jobDir in listJobDirs(os.path.join(testDirectory, groupDir)):
+                with open(os.path.join(testDirectory, groupDir, jobDir, 'job.pkl'), 'r') as jobFile:
+                    job = cPickle.load(jobFile)
+                counters.setdefault(job['workflow'], []).append(job['counter'])
+
+        for name in names:
+            self.assertEqual(sorted(counters[name]), range(1, nSubs * nFiles + 1))
+
+        return
+
+    def testG_ForkWithOpenTransaction(self):
+        """
+        _ForkWithOpenTransaction_
+
+        A splitting process forked while the parent has a transaction open
+        connects on its own and leaves the parent connection working.
+        """
+        config = self.getConfig()
+        myThread = threading.currentThread()
+        locationAction = self.daoFactory(classname = "Locations.New")
+        listSites = self.daoFactory(classname = "Locations.ListSites")
+
+        myThread.transaction.begin()
+        locationAction.execute(siteName = "T2_CH_ForkA", pnn = "T2_CH_ForkA",
+                               conn = myThread.transaction.conn, transaction = True)
+
+        def splittingProcess():
+            connectSplittingProcess(config)
+            gc.collect()
+            DAOFactory(package = "WMCore.WMBS", logger = myThread.logger,
+                       dbinterface = myThread.dbi)(classname = "Locations.ListSites").execute()
+            myThread.transaction.commit()
+
+        process = multiprocessing.Process(target = splittingProcess)
+        process.start()
+        process.join(60)
+        self.assertEqual(process.exitcode, 0)
+
+        locationAction.execute(siteName = "T2_CH_ForkB", pnn = "T2_CH_ForkB",
+                               conn = myThread.transaction.conn, transaction = True)
+        myThread.transaction.commit()
+
+        sites = listSites.execute()
+        self.assertTrue("T2_CH_ForkA" in sites)
+        self.assertTrue("T2_CH_ForkB" in sites)
+        return
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+_SubmitIndex_t_
+
+Unit tests for the JobCreator submit index.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from WMCore.DataStructs.Job import Job
+from WMComponent.JobCreator.SubmitIndex import (SUBMIT_INDEX, jobSubmitInfo, listJobDirs,
+                                                saveSubmitIndex, loadSubmitIndex, pruneSubmitIndex,
+                                                pruneSubmitIndexRecords)
+
+
+class SubmitIndexTest(unittest.TestCase):
+    """
+    _SubmitIndexTest_
+
+    Write and read back submit index records.
+    """
+    def setUp(self):
+        self.testDir = tempfile.mkdtemp()
+        return
+
+    def tearDown(self):
+        shutil.rmtree(self.testDir)
+        return
+
+    def createJobs(self, collection, firstID, nJobs):
+        """
+        _createJobs_
+
+        Create jobs with their cache directories in a job collection.
+        """
+        jobs = []
+        for jobID in range(firstID, firstID + nJobs):
+            job = Job(name = "job-%i" % jobID)
+            job["id"] = jobID
+            job["cache_dir"] = os.path.join(self.testDir, collection, "job_%i" % jobID)
+            job["possiblePSN"] = set(["T1_US_FNAL"])
+            job["sandbox"] = "/some/sandbox.tar.bz2"
+            job["numberOfCores"] = 1
+            os.makedirs(job["cache_dir"])
+            jobs.append(job)
+        return jobs
+
+    def testSubmitInfo(self):
+        """
+        _testSubmitInfo_
+
+        Check the fields extracted from a job, including the baggage override.
+        """
+        job = self.createJobs("JobCollection_1_0", 1, 1)[0]
+        submitInfo = jobSubmitInfo(job)
+        self.assertEqual(submitInfo["name"], "job-1")
+        self.assertEqual(submitInfo["possiblePSN"], ["T1_US_FNAL"])
+        self.assertEqual(submitInfo["numberOfCores"], 1)
+        self.assertEqual(submitInfo["ownerGroup"], '')
+
+        job.addBaggageParameter("numberOfCores", 4)
+        self.assertEqual(jobSubmitInfo(job)["numberOfCores"], 4)
+        return
+
+    def testSaveAndLoad(self):
+        """
+        _testSaveAndLoad_
+
+        Records appended in several calls are all loaded back, per directory.
+        """
+        jobsA = self.createJobs("JobCollection_1_0", 1, 5)
+        jobsB = self.createJobs("JobCollection_2_0", 6, 3)
+        saveSubmitIndex(jobsA[:2] + jobsB)
+        saveSubmitIndex(jobsA[2:])
+
+        records = loadSubmitIndex(os.path.join(self.testDir, "JobCollection_1_0"))
+        self.assertEqual(sorted(records.keys()), [1, 2, 3, 4, 5])
+        self.assertEqual(records[3]["name"], "job-3")
+
+        records = loadSubmitIndex(os.path.join(self.testDir, "JobCollection_2_0"))
+        self.assertEqual(sorted(records.keys()), [6, 7, 8])
+
+        self.assertEqual(loadSubmitIndex(self.testDir), {})
+
+        # a truncated index returns what could be read
+        indexPath = os.path.join(self.testDir, "JobCollection_1_0", SUBMIT_INDEX)
+        with open(indexPath, 'rb') as indexFile:
+            content = indexFile.read()
+        with open(indexPath, 'wb') as indexFile:
+            indexFile.write(content[:-10])
+        records = loadSubmitIndex(os.path.join(self.testDir, "JobCollection_1_0"))
+        self.assertEqual(sorted(records.keys()), [1, 2])
+        return
+
+    def testPrune(self):
+        """
+        _testPrune_
+
+        Pruned records are gone from the index, which is removed once empty
+        and never listed as a job directory.
+        """
+        jobsA = self.createJobs("JobCollection_1_0", 1, 5)
+        jobsB = self.createJobs("JobCollection_2_0", 6, 3)
+        saveSubmitIndex(jobsA + jobsB)
+        collectionA = os.path.join(self.testDir, "JobCollection_1_0")
+        collectionB = os.path.join(self.testDir, "JobCollection_2_0")
+        self.assertEqual(sorted(listJobDirs(collectionA)), ["job_%i" % x for x in range(1, 6)])
+
+        pruneSubmitIndex(jobsA[:2] + jobsB)
+        self.assertEqual(sorted(loadSubmitIndex(collectionA).keys()), [3, 4, 5])
+        self.assertFalse(os.path.exists(os.path.join(collectionB, SUBMIT_INDEX)))
+
+        # records appended after a prune are kept
+        saveSubmitIndex(jobsA[:1])
+        pruneSubmitIndex(jobsA[2:4])
+        self.assertEqual(sorted(loadSubmitIndex(collectionA).keys()), [1, 5])
+
+        pruneSubmitIndex(jobsA + jobsB)
+        self.assertEqual(os.listdir(collectionA), listJobDirs(collectionA))
+        return
+
+    def testPruneRecords(self):
+        """
+        _testPruneRecords_
+
+        Records are pruned by job id, an index without any of them is left
+        untouched.
+        """
+        jobs = self.createJobs("JobCollection_1_0", 1, 5)
+        saveSubmitIndex(jobs)
+        collection = os.path.join(self.testDir, "JobCollection_1_0")
+        indexPath = os.path.join(collection, SUBMIT_INDEX)
+
+        pruneSubmitIndexRecords(collection, [2, 4, 10])
+        self.assertEqual(sorted(loadSubmitIndex(collection).keys()), [1, 3, 5])
+
+        inode = os.stat(indexPath).st_ino
+        pruneSubmitIndexRecords(collection, [2, 4])
+        self.assertEqual(os.stat(indexPath).st_ino, inode)
+
+        pruneSubmitIndexRecords(collection, [1, 3, 5])
+        self.assertFalse(os.path.exists(indexPath))
+        pruneSubmitIndexRecords(collection, [1])
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+_JobPriorityIndex_t_
+
+Unit tests for the JobSubmitter job priority index.
+"""
+
+import random
+import unittest
+
+from WMComponent.JobSubmitter.JobPriorityIndex import JobPriorityIndex
+
+
+class JobPriorityIndexTest(unittest.TestCase):
+    """
+    _JobPriorityIndexTest_
+
+    Check the job ordering and the slot handling of the index.
+    """
+    def testOrdering(self):
+        """
+        _testOrdering_
+
+        Jobs come out by highest priority and oldest timestamp first.
+        """
+        index = JobPriorityIndex()
+        index.addJob(1, 10, 300, "Processing", ["T1_US_FNAL"])
+        index.addJob(2, 20, 400, "Processing", ["T1_US_FNAL", "T2_CH_CERN"])
+        index.addJob(3, 20, 100, "Merge", ["T2_CH_CERN"])
+        index.addJob(4, 10, 200, "Processing", ["T2_CH_CERN"])
+        self.assertEqual(len(index), 4)
+
+        jobIDs = []
+        for jobID in index.iterJobs(lambda site, jobType: True):
+            jobIDs.append(jobID)
+            index.removeJob(jobID)
+        self.assertEqual(jobIDs, [3, 2, 4, 1])
+        self.assertEqual(len(index), 0)
+
+        index.compact(force=True)
+        self.assertEqual(index.queues, {})
+        self.assertEqual(index.nEntries, 0)
+        return
+
+    def testSkippedJobs(self):
+        """
+        _testSkippedJobs_
+
+        Jobs not taken by the caller and jobs at full sites stay indexed.
+        """
+        index = JobPriorityIndex()
+        index.addJob(1, 10, 100, "Processing", ["T1_US_FNAL"])
+        index.addJob(2, 10, 200, "Processing", ["T2_CH_CERN"])
+        index.addJob(3, 10, 300, "Processing", ["T2_CH_CERN"])
+
+        freeSites = set(["T2_CH_CERN"])
+        self.assertEqual(list(index.iterJobs(lambda site, jobType: site in freeSites)), [2, 3])
+
+        for jobID in index.iterJobs(lambda site, jobType: True):
+            index.removeJob(jobID)
+            break
+
+        self.assertEqual(sorted(index.jobs.keys()), [2, 3])
+        self.assertEqual(list(index.iterJobs(lambda site, jobType: True)), [2, 3])
+
+        index.removeJob(3)
+        index.addJob(2, 5, 200, "Processing", ["T1_US_FNAL"])
+        self.assertEqual(list(index.iterJobs(lambda site, jobType: site in freeSites)), [])
+        self.assertEqual(list(index.iterJobs(lambda site, jobType: True)), [2])
+        return
+
+    def testSlotAccounting(self):
+        """
+        _testSlotAccounting_
+
+        Assign random jobs to sites with limited slots and compare with a
+        full scan of the sorted jobs.
+        """
+        random.seed(42)
+        sites = ["T1_US_FNAL", "T2_CH_CERN", "T2_US_Nebraska", "T3_US_Colorado"]
+        jobTypes = ["Processing", "Merge", "Production"]
+        jobs = {}
+        index = JobPriorityIndex()
+        for jobID in range(2000):
+            jobs[jobID] = (random.randint(0, 3), random.randint(0, 100),
+                           random.choice(jobTypes), random.sample(sites, random.randint(1, 3)))
+            index.addJob(jobID, *jobs[jobID])
+
+        slots = {}
+        for site in sites:
+            for jobType in jobTypes:
+                slots[(site, jobType)] = random.randint(0, 50)
+
+        # reference: scan all the jobs in order
+        referenceSlots = dict(slots)
+        expected = []
+        for jobID in sorted(jobs, key=lambda x: (-jobs[x][0], jobs[x][1], x)):
+            jobType, possibleSites = jobs[jobID][2], jobs[jobID][3]
+            for site in possibleSites:
+                if referenceSlots[(site, jobType)] > 0:
+                    referenceSlots[(site, jobType)] -= 1
+                    expected.append((jobID, site))
+                    break
+
+        result = []
+        for jobID in index.iterJobs(lambda site, jobType: slots[(site, jobType)] > 0):
+            jobInfo = index.getJob(jobID)
+            for site in jobInfo['possibleSites']:
+                if slots[(site, jobInfo['type'])] > 0:
+                    slots[(site, jobInfo['type'])] -= 1
+                    result.append((jobID, site))
+                    index.removeJob(jobID)
+                    break
+
+        self.assertEqual(result, expected)
+        self.assertEqual(len(index), 2000 - len(expected))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@ Verify that the caching of jobs and white/black lists works correctly.
 import unittest
 import os
 import pickle
+import threading
 
 from WMQuality.TestInitCouchApp import TestInitCouchApp as TestInit
 
@@ -18,7 +19,8 @@ from WMCore.WMBS.Subscription import Subscription
 from WMCore.WMBS.JobGroup     import JobGroup
 from WMCore.WMBS.Job          import Job
 
-from WMComponent.JobSubmitter.JobSubmitterPoller import JobSubmitterPoller
+from WMComponent.JobSubmitter.JobSubmitterPoller import JobSubmitterPoller, JobSubmitterPollerException
+from WMComponent.JobCreator.SubmitIndex import SUBMIT_INDEX, saveSubmitIndex, loadSubmitIndex
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.ResourceControl.ResourceControl import ResourceControl
 from WMCore.WorkQueue.WMBSHelper import killWorkflow
@@ -135,6 +137,7 @@ class JobSubmitterCachingTest(unittest.TestCase):
             jobHandle = open(os.path.join(jobCacheDir, "job.pkl"), "w")
             pickle.dump(newJobA, jobHandle)
             jobHandle.close()
+            saveSubmitIndex([newJobA])
 
             stateChanger.propagate([newJobA], "created", "new")
 
@@ -153,6 +156,7 @@ class JobSubmitterCachingTest(unittest.TestCase):
             jobHandle = open(os.path.join(jobCacheDir, "job.pkl"), "w")
             pickle.dump(newJobB, jobHandle)
             jobHandle.close()
+            saveSubmitIndex([newJobB])
 
             stateChanger.propagate([newJobB], "created", "new")
 
@@ -182,9 +186,10 @@ class JobSubmitterCachingTest(unittest.TestCase):
         killWorkflow("wf001", jobCouchConfig = config)
         mySubmitterPoller.refreshCache()
 
-        # Verify that the workflow is gone from the cache
+        # Verify that the workflow is gone from the cache and the submit index
         self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 10,
                          "Error: The job cache should contain 10 jobs. Contains: %i" % len(mySubmitterPoller.cachedJobIDs))
+        self.assertEqual(set(loadSubmitIndex(self.testDir).keys()), mySubmitterPoller.cachedJobIDs)
 
         killWorkflow("wf002", jobCouchConfig = config)
         mySubmitterPoller.refreshCache()
@@ -192,6 +197,29 @@ class JobSubmitterCachingTest(unittest.TestCase):
         # Verify that the workflow is gone from the cache
         self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 0,
                          "Error: The job cache should be empty.  Contains: %i" % len(mySubmitterPoller.cachedJobIDs))
+        self.assertFalse(os.path.exists(os.path.join(self.testDir, SUBMIT_INDEX)))
+        return
+
+    def testCorruptJobRelease(self):
+        """
+        _testCorruptJobRelease_
+
+        Verify that the database connection used to list the jobs is given
+        back to the pool even if a job can't be loaded.
+        """
+        config            = self.createConfig()
+        mySubmitterPoller = JobSubmitterPoller(config)
+        mySubmitterPoller.getThresholds()
+        self.injectJobs()
+
+        os.remove(os.path.join(self.testDir, SUBMIT_INDEX))
+        with open(os.path.join(self.testDir, "jobA-0", "job.pkl"), "w") as jobHandle:
+            jobHandle.write("not a pickle")
+
+        myThread = threading.currentThread()
+        checkedOut = myThread.dbi.engine.pool.checkedout()
+        self.assertRaises(JobSubmitterPollerException, mySubmitterPoller.refreshCache)
+        self.assertEqual(myThread.dbi.engine.pool.checkedout(), checkedOut)
         return
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+"""
+_CondorClassAds_t_
+
+Tests for the condor_q output parsing and job tracking of the CondorPlugin
+that don't need a running condor.
+"""
+from __future__ import print_function
+
+import re
+import time
+import unittest
+from StringIO import StringIO
+
+from nose.plugins.attrib import attr
+
+from WMCore.BossAir.Plugins.CondorPlugin import CondorPlugin, parseClassAds
+
+
+def makeCondorQOutput(nJobs):
+    """
+    _makeCondorQOutput_
+
+    Build synthetic condor_q -format output as requested by getClassAds.
+    """
+    classAds = []
+    for jobID in range(1, nJobs + 1):
+        classAds.append("(JobStatus:%i)  (stateTime:1450000000)  (runningTime:1450000100)  "
+                        "(submitTime:1449999000)  (DESIRED_Sites:T1_US_FNAL, T2_CH_CERN)  "
+                        "(ExtDESIRED_Sites:T1_US_FNAL, T2_CH_CERN)  (runningCMSSite:T2_CH_CERN)  "
+                        "(WMAgentID:%i):::" % (jobID % 5 + 1, jobID))
+    return "".join(classAds)
+
+
+def legacyParse(stdout):
+    """
+    _legacyParse_
+
+    The parsing CondorPlugin.getClassAds used before parseClassAds,
+    kept as reference for the benchmark.
+    """
+    jobInfo = {}
+    for ad in stdout.split(':::'):
+        if not re.search("\(", ad):
+            continue
+        statements = ad.split('(')
+        tmpDict = {}
+        for statement in statements:
+            if not re.search(':', statement):
+                continue
+            key = str(statement.split(':')[0])
+            value = statement.split(':')[1].split(')')[0]
+            tmpDict[key] = value
+        if 'WMAgentID' in tmpDict:
+            jobInfo[int(tmpDict['WMAgentID'])] = tmpDict
+    return jobInfo
+
+
+class FakeCondorPlugin(CondorPlugin):
+    """
+    _FakeCondorPlugin_
+
+    CondorPlugin with canned classAds instead of condor_q.
+    """
+    def __init__(self, classAds, incrementalTracking = False):
+        self.classAds = classAds
+        self.removeTime = 60
+        self.incrementalTracking = incrementalTracking
+        self.fullTrackInterval = 3600
+        self.trackTimeMargin = 120
+        self.trackWatermark = None
+        self.lastFullTrack = 0
+        self.since = []
+
+    def getClassAds(self, since = None):
+        self.since.append(since)
+        return self.classAds
+
+    def close(self):
+        return
+
+
+class CondorClassAdsTest(unittest.TestCase):
+    """
+    _CondorClassAdsTest_
+
+    Parse condor_q output and reconcile it with RunJobs.
+    """
+    def testParseClassAds(self):
+        """
+        _testParseClassAds_
+
+        The streaming parser returns the same attributes as the old one,
+        whatever the chunk boundaries are.
+        """
+        stdout = makeCondorQOutput(50) + "garbage"
+        expected = legacyParse(stdout)
+
+        for chunkSize in (1, 7, 100, 1048576):
+            classAds = [x for x in parseClassAds(StringIO(stdout), chunkSize) if 'WMAgentID' in x]
+            self.assertEqual(len(classAds), 50)
+            self.assertEqual(dict([(int(x['WMAgentID']), x) for x in classAds]), expected)
+
+        self.assertEqual(expected[7]['DESIRED_Sites'], 'T1_US_FNAL, T2_CH_CERN')
+        self.assertEqual(list(parseClassAds(StringIO(""))), [])
+        self.assertEqual(list(parseClassAds(StringIO("garbage:::"))), [{}])
+        return
+
+    def testTrack(self):
+        """
+        _testTrack_
+
+        Check the state changes found by track.
+        """
+        classAds = {1: {'JobStatus': '1', 'submitTime': '100', 'WMAgentID': '1'},
+                    2: {'JobStatus': '2', 'runningTime': '200', 'runningCMSSite': 'T2_CH_CERN',
+                        'WMAgentID': '2'},
+                    3: {'JobStatus': 'undefined', 'WMAgentID': '3'}}
+        jobs = [{'jobid': 1, 'status': 'Idle', 'status_time': 100},
+                {'jobid': 2, 'status': 'Idle', 'status_time': 100},
+                {'jobid': 3, 'status': 'Idle', 'status_time': 100},
+                {'jobid': 4, 'status': 'Running', 'status_time': 100}]
+
+        plugin = FakeCondorPlugin(classAds)
+        runningList, changeList, completeList = plugin.track(jobs)
+        self.assertEqual([x['jobid'] for x in runningList], [1, 2, 3])
+        self.assertEqual([x['jobid'] for x in changeList], [2, 3])
+        self.assertEqual([x['jobid'] for x in completeList], [4])
+        self.assertEqual(jobs[1]['status'], 'Running')
+        self.assertEqual(jobs[1]['status_time'], 200)
+        self.assertEqual(jobs[1]['location'], 'T2_CH_CERN')
+        self.assertEqual(jobs[2]['status'], 'Unknown')
+
+        # no classAds at all moves the jobs to Removed first
+        plugin = FakeCondorPlugin({})
+        runningList, changeList, completeList = plugin.track([{'jobid': 5, 'status': 'Idle',
+                                                               'status_time': 100}])
+        self.assertEqual(changeList[0]['status'], 'Removed')
+        self.assertEqual(completeList, [])
+        return
+
+    def testIncrementalTrack(self):
+        """
+        _testIncrementalTrack_
+
+        Between full polls only the changed jobs are asked to condor, the
+        jobs missing from the answer keep their state.
+        """
+        jobs = [{'jobid': 1, 'status': 'Idle', 'status_time': 100},
+                {'jobid': 2, 'status': 'Running', 'status_time': 100}]
+        plugin = FakeCondorPlugin({1: {'JobStatus': '1', 'WMAgentID': '1'},
+                                   2: {'JobStatus': '2', 'WMAgentID': '2'}},
+                                  incrementalTracking = True)
+
+        # the first poll is always a full one
+        plugin.track(jobs)
+        self.assertEqual(plugin.since, [None])
+        watermark = plugin.trackWatermark
+        self.assertTrue(watermark <= time.time() - plugin.trackTimeMargin)
+
+        # job 2 finished and left the queue, but this is not a full poll
+        plugin.classAds = {1: {'JobStatus': '2', 'runningTime': '300', 'WMAgentID': '1'}}
+        runningList, changeList, completeList = plugin.track(jobs)
+        self.assertEqual(plugin.since, [None, watermark])
+        self.assertEqual([x['jobid'] for x in runningList], [1, 2])
+        self.assertEqual([x['jobid'] for x in changeList], [1])
+        self.assertEqual(completeList, [])
+        self.assertEqual(jobs[1]['globalState'], 'Running')
+
+        # nothing changed
+        plugin.classAds = {}
+        runningList, changeList, completeList = plugin.track(jobs)
+        self.assertEqual(len(runningList), 2)
+        self.assertEqual(changeList, [])
+        self.assertEqual(completeList, [])
+
+        # failed polls do not move the watermark
+        plugin.classAds = None
+        plugin.trackWatermark = 42
+        plugin.track(jobs)
+        self.assertEqual(plugin.trackWatermark, 42)
+
+        # the full poll finds the finished job
+        plugin.classAds = {1: {'JobStatus': '2', 'WMAgentID': '1'}}
+        plugin.lastFullTrack = time.time() - plugin.fullTrackInterval - 1
+        runningList, changeList, completeList = plugin.track(jobs)
+        self.assertEqual(plugin.since[-1], None)
+        self.assertEqual([x['jobid'] for x in completeList], [2])
+        return
+
+    @attr('performance')
+    def testTrackPerformance(self):
+        """
+        _testTrackPerformance_
+
+        Time parsing and tracking 200k jobs, compared to the old parsing.
+        """
+        nJobs = 200000
+        stdout = makeCondorQOutput(nJobs)
+
+        startTime = time.time()
+        legacyInfo = legacyParse(stdout)
+        legacyTime = time.time() - startTime
+
+        startTime = time.time()
+        classAds = {}
+        for classAd in parseClassAds(StringIO(stdout)):
+            classAds[int(classAd['WMAgentID'])] = classAd
+        parseTime = time.time() - startTime
+        self.assertEqual(classAds, legacyInfo)
+
+        jobs = [{'jobid': x, 'status': 'Idle', 'status_time': 0} for x in range(1, nJobs + 1)]
+        startTime = time.time()
+        runningList, _, _ = FakeCondorPlugin(classAds).track(jobs)
+        trackTime = time.time() - startTime
+        self.assertEqual(len(runningList), nJobs)
+
+        print("\nParsing %i classAds: old %.2f s, streaming %.2f s" % (nJobs, legacyTime, parseTime))
+        print("Tracking %i jobs: %.2f s" % (nJobs, trackTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
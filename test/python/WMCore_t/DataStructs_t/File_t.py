@@ -70,6 +70,28 @@ class FileTest(unittest.TestCase):
 
         return
 
+    def testAddRunMerge(self):
+        """
+        _testAddRunMerge_
+
+        Runs with the same run number are merged, also after the runs set
+        was changed directly.
+        """
+        testFile = File(lfn = "lfn")
+        testFile.addRun(Run(1, 1, 2))
+        testFile.addRun(Run(2, 1))
+        testFile.addRun(Run(1, 2, 3))
+        self.assertEqual(sorted([(run.run, run.lumis) for run in testFile['runs']]),
+                         [(1, [1, 2, 3]), (2, [1])])
+
+        testFile['runs'].add(Run(3, 1))
+        testFile.addRun(Run(3, 2))
+        testFile['runs'] = set([Run(4, 1)])
+        testFile.addRun(Run(4, 2))
+        self.assertEqual([(run.run, run.lumis) for run in testFile['runs']], [(4, [1, 2])])
+        self.assertFalse('_runIndex' in testFile.__getstate__())
+        return
+
 
     def testSaveAndLoad(self):
         """
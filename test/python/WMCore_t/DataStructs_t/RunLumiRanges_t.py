@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+_RunLumiRanges_t_
+
+Unit tests for the run/lumi range engine.
+"""
+
+import json
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.DataStructs.LumiList import LumiList
+from WMCore.DataStructs.Mask import Mask
+from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.RunLumiRanges import RunLumiRanges, mergeRanges
+from WMCore.JobSplitting.LumiBased import isGoodLumi, isGoodRun, buildGoodRunRanges
+
+
+def randomCompactList(nRuns, nRanges, maxLumi, firstRun = 1):
+    """
+    _randomCompactList_
+
+    Compact list with unsorted, overlapping and adjacent ranges.
+    """
+    compactList = {}
+    for run in range(firstRun, firstRun + nRuns):
+        ranges = []
+        for _ in range(nRanges):
+            first = random.randint(1, maxLumi)
+            ranges.append([first, first + random.randint(0, maxLumi / 10)])
+        compactList[str(run)] = ranges
+    return compactList
+
+
+def sortedCompactList(firstRun, nRuns, nRanges, maxGap, maxLength):
+    """
+    _sortedCompactList_
+
+    Compact list with sorted ranges, like a golden JSON.
+    """
+    compactList = {}
+    for run in range(firstRun, firstRun + nRuns):
+        ranges = []
+        lumi = 0
+        for _ in range(nRanges):
+            first = lumi + random.randint(2, maxGap + 1)
+            lumi = first + random.randint(0, maxLength)
+            ranges.append([first, lumi])
+        compactList[str(run)] = ranges
+    return compactList
+
+
+def expand(compactList):
+    """
+    _expand_
+
+    Set of (run, lumi) pairs in a compact list.
+    """
+    lumis = set()
+    for run, ranges in compactList.items():
+        for first, last in ranges:
+            lumis.update([(int(run), lumi) for lumi in range(first, last + 1)])
+    return lumis
+
+
+class RunLumiRangesTest(unittest.TestCase):
+    """
+    _RunLumiRangesTest_
+
+    Compare the range engine with plain sets of lumis.
+    """
+    def setUp(self):
+        random.seed(1234)
+        return
+
+    def testMerge(self):
+        """
+        _testMerge_
+
+        Overlapping and adjacent ranges are merged, empty ones dropped and a
+        last lumi of 0 is open ended on request.
+        """
+        starts, ends = mergeRanges([[10, 12], [1, 3], [4, 5], [2, 2], [20, 19]])
+        self.assertEqual(list(starts), [1, 10])
+        self.assertEqual(list(ends), [5, 12])
+
+        ranges = RunLumiRanges({'1': [[5, 0]]}, openEnded = True)
+        self.assertTrue(ranges.contains(1, 100000))
+        self.assertFalse(ranges.contains(1, 4))
+        self.assertEqual(len(RunLumiRanges({'1': [[5, 0]]})), 1)
+        self.assertFalse(RunLumiRanges({'1': [[5, 0]]}).contains(1, 5))
+
+        ranges = RunLumiRanges({'2': []})
+        self.assertTrue(ranges.hasRun('2'))
+        self.assertFalse(ranges.contains(2, 1))
+        self.assertEqual(ranges.getCompactList(), {})
+        return
+
+    def testSetAlgebra(self):
+        """
+        _testSetAlgebra_
+
+        Union, intersection, difference, membership and filtering agree with
+        sets of lumis.
+        """
+        for _ in range(20):
+            aList = randomCompactList(4, 30, 500)
+            bList = randomCompactList(5, 30, 500)
+            del bList['2']
+            aLumis = expand(aList)
+            bLumis = expand(bList)
+            aRanges = RunLumiRanges(aList)
+            bRanges = RunLumiRanges(bList)
+
+            self.assertEqual(expand((aRanges | bRanges).getCompactList()), aLumis | bLumis)
+            self.assertEqual(expand((aRanges & bRanges).getCompactList()), aLumis & bLumis)
+            self.assertEqual(expand((aRanges - bRanges).getCompactList()), aLumis - bLumis)
+            self.assertEqual(expand((bRanges - aRanges).getCompactList()), bLumis - aLumis)
+            self.assertEqual(aRanges.countLumis(), len(aLumis))
+
+            lumis = range(0, 600)
+            for run in range(0, 6):
+                self.assertEqual(aRanges.filterLumis(run, lumis),
+                                 [lumi for lumi in lumis if (run, lumi) in aLumis])
+                for lumi in (0, 1, 250, 555):
+                    self.assertEqual(aRanges.contains(run, lumi), (run, lumi) in aLumis)
+
+            # LumiList gives the same as the engine
+            aLumiList = LumiList(compactList = aList)
+            bLumiList = LumiList(compactList = bList)
+            self.assertEqual((aLumiList | bLumiList).getCompactList(), (aRanges | bRanges).getCompactList())
+            self.assertEqual((aLumiList & bLumiList).getCompactList(), (aRanges & bRanges).getCompactList())
+            self.assertEqual((aLumiList - bLumiList).getCompactList(), (aRanges - bRanges).getCompactList())
+        return
+
+    def testLumiListCache(self):
+        """
+        _testLumiListCache_
+
+        contains and filterLumis see runs removed from a LumiList.
+        """
+        lumiList = LumiList(compactList = {'1': [[1, 10]], '2': [[5, 0]]})
+        self.assertTrue(lumiList.contains(1, 5))
+        self.assertTrue(lumiList.contains(2, 50))
+        self.assertEqual(lumiList.filterLumis([(1, 5), (2, 50)]), [(1, 5)])
+        lumiList.removeRuns([1])
+        self.assertFalse(lumiList.contains(1, 5))
+        self.assertEqual(lumiList.filterLumis([(1, 5)]), [])
+        return
+
+    def testMask(self):
+        """
+        _testMask_
+
+        The mask lumi ranges follow the ranges added to it, and stay out of
+        copies of the mask.
+        """
+        mask = Mask()
+        mask.addRunAndLumis(run = 1, lumis = [1, 10])
+        self.assertTrue(mask.runLumiInMask(1, 10))
+        self.assertFalse(mask.runLumiInMask(1, 15))
+        mask.addRunAndLumis(run = 1, lumis = [12, 20])
+        self.assertTrue(mask.runLumiInMask(1, 15))
+        self.assertFalse(mask.runLumiInMask(1, 11))
+        mask.addRunWithLumiRanges(run = 1, lumiList = [[30, 40]])
+        self.assertFalse(mask.runLumiInMask(1, 15))
+        self.assertTrue(mask.runLumiInMask(1, 35))
+        self.assertFalse(mask.runLumiInMask(2, 35))
+        self.assertFalse('_lumiRanges' in mask.__getstate__())
+
+        newRuns = mask.filterRunLumisByMask([Run(1, 41, 30, 31, 30), Run(2, 30)])
+        self.assertEqual([(run.run, run.lumis) for run in newRuns], [(1, [30, 31])])
+        return
+
+    def testGoodRunList(self):
+        """
+        _testGoodRunList_
+
+        The indexed goodRunList answers like the dictionary.
+        """
+        goodRunList = {'1': [[1, 10], [20, 30]], '2': [], '3': [[5]]}
+        goodRunRanges = buildGoodRunRanges(goodRunList)
+        for run in range(0, 5):
+            self.assertEqual(isGoodRun(goodRunRanges, run), isGoodRun(goodRunList, run))
+            for lumi in range(0, 35):
+                self.assertEqual(isGoodLumi(goodRunRanges, run, lumi),
+                                 isGoodLumi(goodRunList, run, lumi))
+        return
+
+    @attr('performance')
+    def testPerformance(self):
+        """
+        _testPerformance_
+
+        Load a large golden JSON and time the set operations and lookups.
+        """
+        goldenList = sortedCompactList(190000, 2000, 100, 5, 40)
+
+        fd, jsonName = tempfile.mkstemp(suffix = '.json')
+        os.close(fd)
+        with open(jsonName, 'w') as jsonFile:
+            json.dump(goldenList, jsonFile)
+        try:
+            startTime = time.time()
+            golden = LumiList(filename = jsonName)
+            print("\nLoaded %i runs in %.2f s" % (len(golden), time.time() - startTime))
+        finally:
+            os.remove(jsonName)
+
+        other = LumiList(compactList = sortedCompactList(190000, 2000, 500, 3, 3))
+        for name, operation in (('or', lambda: golden | other), ('and', lambda: golden & other),
+                                ('sub', lambda: golden - other)):
+            startTime = time.time()
+            operation()
+            print("%s: %.2f s" % (name, time.time() - startTime))
+
+        lumis = [(random.randint(190000, 192000), random.randint(1, 2500)) for _ in range(200000)]
+        startTime = time.time()
+        golden.filterLumis(lumis)
+        print("filterLumis: %.2f us per lumi" % ((time.time() - startTime) * 1e6 / len(lumis)))
+
+        goodRunRanges = buildGoodRunRanges(goldenList)
+        startTime = time.time()
+        for run, lumi in lumis:
+            isGoodLumi(goodRunRanges, run, lumi)
+        print("isGoodLumi: %.2f us per lumi" % ((time.time() - startTime) * 1e6 / len(lumis)))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
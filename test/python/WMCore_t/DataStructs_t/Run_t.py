@@ -7,7 +7,12 @@ Unittest for the WMCore.DataStructs.Run class
 """
 
 
+import cPickle
+import time
 import unittest
+
+from nose.plugins.attrib import attr
+
 from WMCore.DataStructs.Run import Run
 
 
@@ -151,8 +156,60 @@ class RunTest(unittest.TestCase):
         s.add(run10)
         s.add(run11)
 
+    def testMergeLumis(self):
+        """
+        _testMergeLumis_
 
+        Merging keeps the lumi order and drops duplicates, also after the
+        lumi list was changed directly.
+        """
+        run = Run(1, 3, 1, 2)
+        run + Run(1, 2, 5, 5, 4)
+        self.assertEqual(run.lumis, [3, 1, 2, 5, 4])
+        self.assertTrue(5 in run)
+        self.assertFalse(6 in run)
+
+        run.lumis.append(6)
+        run + Run(1, 6, 7)
+        self.assertEqual(run.lumis, [3, 1, 2, 5, 4, 6, 7])
+
+        run.lumis = [10]
+        run + Run(1, 10, 11)
+        self.assertEqual(run.lumis, [10, 11])
+
+        run[0] = 12
+        run + Run(1, 10, 12)
+        self.assertEqual(run.lumis, [12, 11, 10])
+        return
+
+    def testPickle(self):
+        """
+        _testPickle_
 
+        The lumi set is not pickled.
+        """
+        run = Run(1, 1, 2, 3)
+        run + Run(1, 4)
+        newRun = cPickle.loads(cPickle.dumps(run, 2))
+        self.assertEqual(newRun, run)
+        self.assertFalse("_lumiSet" in newRun.__dict__)
+        newRun + Run(1, 4, 5)
+        self.assertEqual(newRun.lumis, [1, 2, 3, 4, 5])
+        return
+
+    @attr('performance')
+    def testMergePerformance(self):
+        """
+        _testMergePerformance_
+
+        Time merging runs with many lumis one block at a time.
+        """
+        run = Run(1)
+        startTime = time.time()
+        for first in range(0, 20000, 100):
+            run + Run(1, *range(first - 50, first + 100))
+        print("\nMerged %i lumis in %.3f s" % (len(run), time.time() - startTime))
+        return
 
 
 if __name__ == '__main__':
@@ -7,12 +7,15 @@ need to add Couch as an external, include it in start up scripts etc.
 """
 
 from WMCore.Database.CMSCouch import CouchServer, Document, Database, CouchInternalServerError, CouchNotFoundError
+from WMCore.Database.CMSCouch import iterJSONRows
 import random
 import unittest
 import os
 import hashlib
 import base64
+import json
 import sys
+from StringIO import StringIO
 
 class CMSCouchTest(unittest.TestCase):
     test_counter = 0
@@ -363,6 +366,73 @@ class CMSCouchTest(unittest.TestCase):
         self.assertEqual(1, len(self.db.allDocs({'limit':1}, ["1", "3"])['rows']))
         self.assertTrue('error' in self.db.allDocs(keys = ["1", "4"])['rows'][1])
 
+    def testIterView(self):
+        """
+        Test iterView and iterAllDocs give the rows loadView and allDocs give,
+        across pages and with options
+        """
+        update_ddoc = {
+            '_id':'_design/foo',
+            'language': 'javascript',
+            'views' : {
+                       'twice' : {
+                                'map' : 'function(doc) {emit(doc.foo, null); emit(doc.foo, null)}'
+                                },
+                       },
+        }
+        self.db.commit(update_ddoc)
+        for i in range(25):
+            self.db.queue(Document(id = "%02i" % i, inputDict = {'foo': i % 4}))
+        self.db.commit()
+
+        rows = self.db.loadView('foo', 'twice')['rows']
+        self.assertEqual(50, len(rows))
+        for batchSize in [1, 3, 7, 50, 100]:
+            self.assertEqual(rows, list(self.db.iterView('foo', 'twice', batchSize = batchSize)))
+        options = {'startkey': 1, 'endkey': 2, 'skip': 3, 'limit': 9}
+        self.assertEqual(self.db.loadView('foo', 'twice', options)['rows'],
+                         list(self.db.iterView('foo', 'twice', options, batchSize = 2)))
+        self.assertEqual(self.db.loadView('foo', 'twice', {'key': 3})['rows'],
+                         list(self.db.iterView('foo', 'twice', {'key': 3}, batchSize = 4)))
+        self.assertEqual(self.db.loadView('foo', 'twice', {}, [0, 2])['rows'],
+                         list(self.db.iterView('foo', 'twice', {}, [0, 2])))
+
+        self.assertEqual(self.db.allDocs({'include_docs': True})['rows'],
+                         list(self.db.iterAllDocs({'include_docs': True}, batchSize = 4)))
+        self.assertEqual(2, len(list(self.db.iterAllDocs(keys = ["01", "03"]))))
+        self.assertRaises(CouchNotFoundError, list, self.db.iterView('foo', 'view_doesnt_exist'))
+
+class IterJSONRowsTest(unittest.TestCase):
+    """
+    Test reading rows out of a JSON stream
+    """
+    def testRows(self):
+        """
+        Rows come out whatever chunks the stream is read in
+        """
+        rows = [{'id': 'doc%i' % i, 'key': [i, u'\u00e9t\u00e9 "%i"' % i], 'value': i * 1.5}
+                for i in range(50)]
+        view = '{"total_rows":50,"offset":0,"rows":[\r\n%s\r\n]}\n' % \
+               ',\r\n'.join([json.dumps(row) for row in rows])
+        for chunkSize in [1, 2, 7, 100, 100000]:
+            self.assertEqual(list(iterJSONRows(StringIO(view), chunkSize = chunkSize)), rows)
+
+        # list output: a bare array, with numbers split across chunks
+        for chunkSize in [1, 3, 100]:
+            self.assertEqual(list(iterJSONRows(StringIO(' [123456, "a", 7.5e3, null]'), None, chunkSize)),
+                             [123456, "a", 7500.0, None])
+        self.assertEqual(list(iterJSONRows(StringIO('{"rows":[]}'), chunkSize = 2)), [])
+        self.assertEqual(list(iterJSONRows(StringIO('[]'), None)), [])
+
+    def testBrokenStream(self):
+        """
+        Truncated or unexpected streams raise
+        """
+        self.assertRaises(ValueError, list, iterJSONRows(StringIO('{"rows":[{"a": 1}, {"a":'), chunkSize = 4))
+        self.assertRaises(ValueError, list, iterJSONRows(StringIO('{"rows":[{"a": 1}'), chunkSize = 4))
+        self.assertRaises(ValueError, list, iterJSONRows(StringIO('{"error":"not_found"}')))
+        self.assertRaises(ValueError, list, iterJSONRows(StringIO('"Filter parameters required"'), None))
+
 if __name__ == "__main__":
     if len(sys.argv) >1 :
         suite = unittest.TestSuite()
@@ -284,6 +284,63 @@ class DBCoreTest(unittest.TestCase):
 
         return
 
+    def testProcessBulkSelect(self):
+        """
+        _testProcessBulkSelect_
+
+        Verify that a select for many values of one bind is rewritten into
+        IN lists and returns the same rows as one select per bind.
+        """
+        binds = []
+        for i in range(1201):
+            binds.append({"one": i, "two": i % 3, "three": str(i * 3)})
+
+        insertSQL = "INSERT INTO test_tablea VALUES (:one, :two, :three)"
+        selectSQL = """SELECT column1, column2, column3 FROM test_tablea
+                         WHERE column1 = :one"""
+
+        myThread = threading.currentThread()
+        myThread.dbi.processData(insertSQL, binds = binds)
+
+        self.assertEqual(myThread.dbi.buildInList(selectSQL, "one", 2),
+                         """SELECT column1, column2, column3 FROM test_tablea
+                         WHERE column1 IN (:one_0, :one_1)""")
+        self.assertRaises(Exception, myThread.dbi.buildInList, selectSQL, "two", 2)
+
+        rangeSQL = """SELECT column1 FROM test_tablea
+                        WHERE column1 <= :one"""
+        self.assertRaises(Exception, myThread.dbi.buildInList, rangeSQL, "one", 2)
+        self.assertRaises(Exception, myThread.dbi.processBulkSelect, rangeSQL, "one", [1, 2])
+        rangeSQL = """SELECT column1 FROM test_tablea
+                        WHERE column1 >= :one AND column2 = :one"""
+        self.assertRaises(Exception, myThread.dbi.buildInList, rangeSQL, "one", 2)
+        rangeSQL = """SELECT column1 FROM test_tablea
+                        WHERE column2 != :two AND column1 = :one"""
+        self.assertRaises(Exception, myThread.dbi.buildInList, rangeSQL, "two", 2)
+        self.assertEqual(myThread.dbi.buildInList(rangeSQL, "one", 2),
+                         """SELECT column1 FROM test_tablea
+                        WHERE column2 != :two AND column1 IN (:one_0, :one_1)""")
+
+        values = range(0, 1201, 2) + range(0, 1201, 4) + [5000]
+        resultSets = myThread.dbi.processBulkSelect(selectSQL, "one", values)
+        self.assertEqual(len(resultSets), 2)
+        results = []
+        for resultSet in resultSets:
+            results.extend(resultSet.fetchall())
+        self.assertEqual(sorted([x[0] for x in results]), range(0, 1201, 2))
+
+        selectSQL = """SELECT column1, column2, column3 FROM test_tablea
+                         WHERE column1 = :one AND column2 = :two"""
+        resultSets = myThread.dbi.processBulkSelect(selectSQL, "one", range(10),
+                                                    binds = {"two": 1})
+        results = []
+        for resultSet in resultSets:
+            results.extend(resultSet.fetchall())
+        self.assertEqual(sorted([x[0] for x in results]), [1, 4, 7])
+
+        self.assertEqual(myThread.dbi.processBulkSelect(selectSQL, "one", []), [])
+        return
+
     def testInsertHugeNumber(self):
         """
         _testInsertHugeNumber_
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+_DBFormatterProfile_
+
+Compare the materialised ResultSet + formatDict path against the
+streaming formatIter path on a large, synthetic result proxy.
+"""
+from __future__ import print_function
+
+import time
+import unittest
+import logging
+
+from nose.plugins.attrib import attr
+
+from WMCore.Database.DBFormatter import DBFormatter
+from WMCore.Database.ResultSet import ResultSet
+
+
+KEYS = ['ID', 'NAME', 'CACHE_DIR', 'TYPE', 'RETRY_COUNT', 'WORKFLOW',
+        'TIMESTAMP', 'REQUEST_NAME', 'TASK_ID', 'WF_PRIORITY', 'TASK_NAME']
+
+
+class FakeRow(tuple):
+    """
+    _FakeRow_
+
+    Tuple with the keys() method of a sqlalchemy RowProxy.
+    """
+    def keys(self):
+        return KEYS
+
+
+class FakeResultProxy(object):
+    """
+    _FakeResultProxy_
+
+    Minimal stand-in for a sqlalchemy ResultProxy, yielding nRows rows
+    shaped like the Jobs.ListForSubmitter output.
+    """
+    def __init__(self, nRows):
+        self.keys = KEYS
+        self.nRows = nRows
+        self.position = 0
+        self.closed = False
+        self.returns_rows = True
+
+    def makeRow(self, index):
+        return FakeRow((index, u'job-%i' % index, u'/data/jobCache/job_%i' % index,
+                        u'Processing', 0, 1, 1450000000, u'some_request', 1, 100000,
+                        u'/some_request/DataProcessing'))
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
+    def fetchmany(self, size):
+        end = min(self.position + size, self.nRows)
+        rows = [self.makeRow(x) for x in xrange(self.position, end)]
+        self.position = end
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class DBFormatterProfileTest(unittest.TestCase):
+    """
+    _DBFormatterProfileTest_
+
+    Time both formatting paths; run it by hand with nose -a performance.
+    """
+    nRows = 300000
+
+    @attr('performance')
+    def testFormatDictVsFormatIter(self):
+        """
+        _testFormatDictVsFormatIter_
+
+        Time the full ResultSet + formatDict path and the streaming path.
+        """
+        formatter = DBFormatter(logging, None)
+
+        startTime = time.time()
+        result = ResultSet()
+        result.add(FakeResultProxy(self.nRows))
+        nDict = len(formatter.formatDict([result]))
+        dictTime = time.time() - startTime
+
+        timings = {}
+        for rowType in ("dict", "tuple", "namedtuple"):
+            startTime = time.time()
+            nIter = 0
+            for _ in formatter.formatIter([FakeResultProxy(self.nRows)], rowType=rowType):
+                nIter += 1
+            timings[rowType] = time.time() - startTime
+            self.assertEqual(nIter, nDict)
+
+        print("\nResultSet + formatDict: %.2f s for %i rows" % (dictTime, nDict))
+        for rowType, timing in timings.items():
+            print("formatIter (%s): %.2f s for %i rows" % (rowType, timing, nDict))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
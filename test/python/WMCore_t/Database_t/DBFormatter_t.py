@@ -101,6 +101,40 @@ insert into test (bind1, bind2) values (:bind1, :bind2) """
         output = dbformatter.formatOneDict(result)
         self.assertEqual( output,  {'bind2': 'value2a', 'bind1': 'value1a'} )
 
+    @attr("integration")
+    def testFormatIter(self):
+        """
+        _testFormatIter_
+
+        Verify that the streaming formatter returns the same rows as
+        formatDict, also as tuples and namedtuples.
+        """
+        myThread = threading.currentThread()
+        dbformatter = DBFormatter(myThread.logger, myThread.dbi)
+        myThread.transaction.begin()
+
+        result = myThread.transaction.processData(myThread.select)
+        expected = dbformatter.formatDict(result)
+
+        result = myThread.transaction.processData(myThread.select, returnCursor = True)
+        output = list(dbformatter.formatIter(result, size = 2))
+        self.assertEqual(output, expected)
+
+        result = myThread.transaction.processData(myThread.select, returnCursor = True)
+        output = list(dbformatter.formatIter(result, rowType = "tuple"))
+        self.assertEqual(output, [('value1a', 'value2a'), ('value1b', 'value2b'),
+                                  ('value1c', 'value2d')])
+
+        result = myThread.transaction.processData(myThread.select, returnCursor = True)
+        output = list(dbformatter.formatIter(result, size = 1, rowType = "namedtuple"))
+        self.assertEqual([x.bind1 for x in output], ['value1a', 'value1b', 'value1c'])
+        self.assertEqual(output[2].bind2, 'value2d')
+
+        dbformatter.sql = myThread.select
+        output = list(dbformatter.executeIter())
+        self.assertEqual(output, expected)
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
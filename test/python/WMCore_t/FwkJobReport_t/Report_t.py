@@ -11,7 +11,7 @@ import time
 
 from WMCore.Algorithms import BasicAlgos
 from WMCore.Configuration import ConfigSection
-from WMCore.FwkJobReport.Report import Report
+from WMCore.FwkJobReport.Report import Report, loadReportSummary, loadSummaryFromReport
 from WMCore.WMBase import getTestBase
 from WMQuality.TestInitCouchApp import TestInitCouchApp
 
@@ -522,6 +522,35 @@ cms::Exception caught in EventProcessor and rethrown
         self.assertEqual(report.getExitCode(), 12345)
         self.assertEqual(report.getStepExitCode(stepName="cmsRun1"), 12345)
 
+    def testSummary(self):
+        """
+        _testSummary_
+
+        Test the summary written next to a report and loading it back
+        """
+        report = Report("cmsRun1")
+        report.parse(self.xmlPath)
+        report.addError(stepName="cmsRun1", exitCode=8020, errorType="test", errorDetails="test")
+        report.setStepStartTime(stepName="cmsRun1")
+        report.setStepStopTime(stepName="cmsRun1")
+        reportPath = os.path.join(self.testDir, 'Report.0.pkl')
+        report.save(reportPath)
+        self.assertEqual(loadReportSummary(reportPath), None)
+
+        report.saveSummary(reportPath)
+        self.assertTrue(os.path.isfile(os.path.join(self.testDir, 'Report.0.summary.json')))
+        summary = loadReportSummary(reportPath)
+        self.assertEqual(summary, loadSummaryFromReport(reportPath))
+        self.assertEqual(summary['exitCodes'], sorted(report.getExitCodes()))
+        self.assertEqual(summary['startTime'], report.getFirstStartLastStop()['startTime'])
+        self.assertEqual(summary['stopTime'], report.getFirstStartLastStop()['stopTime'])
+        self.assertEqual(summary['steps'].keys(), ['cmsRun1'])
+
+        # A summary older than its report is ignored
+        os.utime(reportPath, (time.time() + 10, time.time() + 10))
+        self.assertEqual(loadReportSummary(reportPath), None)
+        return
+
     def testProperties(self):
         """
         _testProperties_
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+_XMLParser_t_
+
+Unit tests for the framework job report XML parsing.
+"""
+
+import os
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.FwkJobReport.Report import Report
+from WMCore.FwkJobReport.XMLParser import xmlToJobReport, parseReports
+from WMCore.WMBase import getTestBase
+
+reportFiles = ["CMSSWProcessingReport.xml", "CMSSWMergeReport.xml", "CMSSWFailReport.xml",
+               "CMSSWInputFallback.xml", "CMSSWMultipleInput.xml", "CMSSWPileup.xml",
+               "CMSSWSkippedAll.xml", "CMSSWSkippedNonExistentFile.xml",
+               "CMSSWTwoFileLocal.xml", "CMSSWTwoFileRemote.xml", "PerformanceReport.xml"]
+
+
+class XMLParserTest(unittest.TestCase):
+    """
+    _XMLParserTest_
+
+    Unit tests for the XMLParser functions.
+    """
+    def setUp(self):
+        """
+        _setUp_
+
+        Figure out the location of the XML reports produced by CMSSW.
+        """
+        self.testDir = os.path.join(getTestBase(), "WMCore_t/FwkJobReport_t")
+        self.xmlPaths = [os.path.join(self.testDir, x) for x in reportFiles]
+        self.badxmlPath = os.path.join(self.testDir, "CMSSWFailReport2.xml")
+        return
+
+    def testXMLToJobReport(self):
+        """
+        _testXMLToJobReport_
+
+        Verify the information parsed from a processing job report.
+        """
+        report = Report("cmsRun1")
+        xmlToJobReport(report, self.xmlPaths[0])
+
+        outputFiles = report.getAllFilesFromStep("cmsRun1")
+        self.assertEqual(len(outputFiles), 2)
+        self.assertEqual(outputFiles[0]["lfn"],
+                         "/store/backfill/2/unmerged/WMAgentCommissioining10/MinimumBias/RECO/rereco_GR09_R_34X_V5_All_v1/0000/outputRECORECO.root")
+        self.assertEqual(outputFiles[0]["events"], 2)
+        runs = list(outputFiles[0]["runs"])
+        self.assertEqual(runs[0].run, 122023)
+        self.assertEqual(runs[0].lumis, [215])
+        self.assertEqual(len(outputFiles[0]["input"]), 1)
+
+        inputFiles = report.getInputFilesFromStep("cmsRun1")
+        self.assertEqual(len(inputFiles), 1)
+        self.assertEqual(inputFiles[0]["events"], 2)
+        self.assertEqual(list(inputFiles[0]["runs"])[0].lumis, [215])
+
+        return
+
+    def testPerformanceReport(self):
+        """
+        _testPerformanceReport_
+
+        Verify the performance information parsed from a job report.
+        """
+        report = Report("cmsRun1")
+        xmlToJobReport(report, os.path.join(self.testDir, "PerformanceReport.xml"))
+
+        perfRep = report.data.cmsRun1.performance
+        self.assertEqual(perfRep.memory.dictionary_(),
+                         {'PeakValueRss': '492.293', 'PeakValueVsize': '643.281'})
+        self.assertTrue(hasattr(perfRep.cpu, "TotalJobCPU"))
+        self.assertTrue(hasattr(perfRep.storage, "readTotalMB"))
+        self.assertTrue(hasattr(perfRep.storage, "writeTotalMB"))
+        return
+
+    def testBadXML(self):
+        """
+        _testBadXML_
+
+        A corrupt report raises without filling in the report.
+        """
+        report = Report("cmsRun1")
+        self.assertRaises(Exception, xmlToJobReport, report, self.badxmlPath)
+        self.assertEqual(report.getStepErrors("cmsRun1"), {})
+        return
+
+    def testParseReports(self):
+        """
+        _testParseReports_
+
+        Parsing in a pool of processes gives the reports parsed one by one,
+        and the errors of the corrupt ones.
+        """
+        xmlPaths = self.xmlPaths + [self.badxmlPath]
+        for processes in [1, 3]:
+            results = parseReports(xmlPaths, "cmsRun1", processes = processes)
+            self.assertEqual(len(results), len(xmlPaths))
+            for xmlPath, (report, error) in zip(self.xmlPaths, results):
+                expected = Report("cmsRun1")
+                xmlToJobReport(expected, xmlPath)
+                self.assertEqual(error, None)
+                self.assertEqual(sorted(report.data.pythonise_()), sorted(expected.data.pythonise_()))
+
+            report, error = results[-1]
+            self.assertTrue("Error reading XML job report file" in error)
+            self.assertEqual(report.getStepErrors("cmsRun1")["error0"].type, "BadFWJRXML")
+        return
+
+    @attr('performance')
+    def testParsePerformance(self):
+        """
+        _testParsePerformance_
+
+        Time the parsing of many reports one by one and in a pool of
+        processes.
+        """
+        xmlPaths = self.xmlPaths * 200
+
+        startTime = time.time()
+        for xmlPath in xmlPaths:
+            Report("cmsRun1").parse(xmlPath)
+        serialTime = time.time() - startTime
+
+        startTime = time.time()
+        parseReports(xmlPaths)
+        poolTime = time.time() - startTime
+
+        print("\n%i reports, one by one: %.2f s, parseReports: %.2f s" %
+              (len(xmlPaths), serialTime, poolTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
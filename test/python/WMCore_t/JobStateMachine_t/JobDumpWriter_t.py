@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+_JobDumpWriter_t_
+
+Unit tests for the background jobdump writer.
+"""
+
+import time
+import unittest
+
+from WMCore.JobStateMachine.JobDumpWriter import (JobDumpWriter, addStateTransition, getJobDumpWriter,
+                                                  stopJobDumpWriters, jobDumpWriterSummary)
+
+
+class FakeDatabase(object):
+    """
+    _FakeDatabase_
+
+    In memory stand in for CMSCouch.Database, with optional conflicts.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.docs = {}
+        self._queue = []
+        self.commits = 0
+        self.updates = []
+        self.conflicts = set()
+
+    def queue(self, doc, timestamp = False, viewlist = [], callback = None):
+        self._queue.append(doc)
+
+    def commit(self, callback = None):
+        self.commits += 1
+        data = {'docs': self._queue}
+        self._queue = []
+        retval = []
+        for doc in data['docs']:
+            if doc['_id'] in self.conflicts:
+                self.conflicts.remove(doc['_id'])
+                result = {'id': doc['_id'], 'error': 'conflict'}
+                retval.append(callback(self, data, result) if callback else result)
+            else:
+                self.docs[doc['_id']] = doc
+                retval.append({'id': doc['_id'], 'rev': '1'})
+        return retval
+
+    def commitOne(self, doc):
+        self.docs[doc['_id']] = doc
+        return [{'id': doc['_id'], 'rev': '2'}]
+
+    def document(self, id):
+        doc = dict(self.docs[id])
+        doc['_rev'] = '1'
+        return doc
+
+    def allDocs(self, options = {}, keys = []):
+        rows = []
+        for key in keys:
+            if key in self.docs:
+                rows.append({'key': key, 'id': key, 'doc': dict(self.docs[key])})
+            else:
+                rows.append({'key': key, 'error': 'not_found'})
+        return {'rows': rows}
+
+    def makeRequest(self, uri = None, type = 'GET', decode = True):
+        self.updates.append(uri)
+        couchID, query = uri.split('/')[-1].split('?')
+        transition = dict([x.split('=') for x in query.split('&')])
+        transition['timestamp'] = int(transition['timestamp'])
+        addStateTransition(self.docs[couchID], transition)
+        return 'OK'
+
+
+class FakeJobDumpWriter(JobDumpWriter):
+    """
+    _FakeJobDumpWriter_
+
+    JobDumpWriter writing to the fake databases.
+    """
+    def connectDatabases(self):
+        if self.jobsdatabase is None:
+            self.jobsdatabase = FakeDatabase("jobdump/jobs")
+            self.fwjrdatabase = FakeDatabase("jobdump/fwjrs")
+
+
+def transition(oldstate, newstate, timestamp):
+    return {'oldstate': oldstate, 'newstate': newstate,
+            'location': 'Agent', 'timestamp': timestamp}
+
+
+class JobDumpWriterTest(unittest.TestCase):
+    """
+    _JobDumpWriterTest_
+
+    Write job documents, transitions and fwjrs through the writer thread.
+    """
+    def setUp(self):
+        self.writer = FakeJobDumpWriter("http://localhost:5984", "jobdump",
+                                        batchSize = 100, flushInterval = 60)
+        self.writer.connectDatabases()
+        self.writer.start()
+        return
+
+    def tearDown(self):
+        self.writer.stop(10)
+        return
+
+    def testWrite(self):
+        """
+        _testWrite_
+
+        Transitions are appended to the job documents in the queued order,
+        also when the document is created in the same batch.
+        """
+        self.writer.queueJob({'_id': '1', 'states': {'0': transition('none', 'new', 1)}})
+        self.writer.queueTransition('1', transition('new', 'created', 2))
+        self.writer.queueTransition('1', transition('created', 'executing', 3))
+        self.writer.queueFWJR({'_id': '1-0', 'jobid': 1})
+        self.assertTrue(self.writer.flush(10))
+
+        jobsdatabase = self.writer.jobsdatabase
+        states = jobsdatabase.docs['1']['states']
+        self.assertEqual(sorted(states.keys()), ['0', '1', '2'])
+        self.assertEqual(states['2']['newstate'], 'executing')
+        self.assertEqual(jobsdatabase.commits, 2)
+        self.assertEqual(jobsdatabase.updates, [])
+        self.assertEqual(self.writer.fwjrdatabase.docs.keys(), ['1-0'])
+
+        metrics = self.writer.getMetrics()
+        self.assertEqual(metrics['docsWritten'], 4)
+        self.assertEqual(metrics['flushes'], 1)
+        self.assertEqual(metrics['queueDepth'], 0)
+        self.assertEqual(metrics['pending'], 0)
+        return
+
+    def testConflict(self):
+        """
+        _testConflict_
+
+        Documents changed while their transitions were applied get them
+        through the update handler.
+        """
+        self.writer.queueJob({'_id': '1', 'states': {}})
+        self.writer.queueJob({'_id': '2', 'states': {}})
+        self.writer.flush(10)
+
+        jobsdatabase = self.writer.jobsdatabase
+        jobsdatabase.conflicts.add('2')
+        self.writer.queueTransition('1', transition('new', 'created', 2))
+        self.writer.queueTransition('2', transition('new', 'created', 2))
+        self.writer.queueTransition('2', transition('created', 'executing', 3))
+        self.writer.flush(10)
+
+        self.assertEqual(len(jobsdatabase.updates), 2)
+        self.assertEqual(jobsdatabase.docs['1']['states']['1']['newstate'], 'created')
+        self.assertEqual(jobsdatabase.docs['2']['states']['1']['newstate'], 'created')
+        self.assertEqual(jobsdatabase.docs['2']['states']['2']['newstate'], 'executing')
+        return
+
+    def testJobConflict(self):
+        """
+        _testJobConflict_
+
+        A new job document whose stub was already created by a transition
+        from another process keeps the states of both.
+        """
+        jobsdatabase = self.writer.jobsdatabase
+        jobsdatabase.docs['1'] = {'_id': '1', 'states': {'1': transition('created', 'executing', 3)}}
+        jobsdatabase.conflicts.add('1')
+        self.writer.queueJob({'_id': '1', 'jobid': 1,
+                              'states': {'0': transition('new', 'created', 2)}})
+        self.writer.flush(10)
+
+        doc = jobsdatabase.docs['1']
+        self.assertEqual(doc['jobid'], 1)
+        self.assertEqual(sorted(doc['states'].keys()), ['0', '1'])
+        self.assertEqual(doc['states']['0']['newstate'], 'created')
+        self.assertEqual(doc['states']['1']['newstate'], 'executing')
+        return
+
+    def testBatching(self):
+        """
+        _testBatching_
+
+        Full batches are written without waiting, the rest after
+        flushInterval.
+        """
+        for jobID in range(250):
+            self.writer.queueJob({'_id': str(jobID), 'states': {}})
+
+        jobsdatabase = self.writer.jobsdatabase
+        for i in range(100):
+            if len(jobsdatabase.docs) == 200 and self.writer.getMetrics()['pending'] == 50:
+                break
+            time.sleep(0.1)
+        self.assertEqual(len(jobsdatabase.docs), 200)
+        self.assertEqual(self.writer.getMetrics()['pending'], 50)
+
+        self.writer.flushInterval = 0
+        self.writer.queueJob({'_id': '250', 'states': {}})
+        for i in range(100):
+            if len(jobsdatabase.docs) == 251:
+                break
+            time.sleep(0.1)
+        self.assertEqual(len(jobsdatabase.docs), 251)
+        self.assertEqual(self.writer.getMetrics()['flushes'], 3)
+        return
+
+    def testSharedWriter(self):
+        """
+        _testSharedWriter_
+
+        There is one running writer per jobdump, until they're stopped.
+        """
+        self.assertEqual(jobDumpWriterSummary(), None)
+        try:
+            writer = getJobDumpWriter("http://localhost:5984", "jobdump", batchSize = 100)
+            self.assertTrue(writer.isAlive())
+            self.assertTrue(getJobDumpWriter("http://localhost:5984", "jobdump") is writer)
+            otherWriter = getJobDumpWriter("http://localhost:5984", "t0_jobdump")
+            self.assertFalse(otherWriter is writer)
+            self.assertEqual(writer.batchSize, 100)
+            self.assertTrue(writer.flush(10))
+            self.assertEqual(jobDumpWriterSummary(), "jobdump 0 queued, 0 written, 0 failed flushes")
+        finally:
+            stopJobDumpWriters(10)
+        self.assertEqual(jobDumpWriterSummary(), None)
+        self.assertFalse(writer.isAlive())
+        self.assertFalse(otherWriter.isAlive())
+        self.assertFalse(getJobDumpWriter("http://localhost:5984", "jobdump") is writer)
+        stopJobDumpWriters(10)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
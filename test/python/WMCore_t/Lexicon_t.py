@@ -6,9 +6,13 @@ General test of Lexicon
 
 """
 
+import re
+import time
 import logging
 import unittest
 
+from nose.plugins.attrib import attr
+
 from WMCore.Lexicon import *
 
 class LexiconTest(unittest.TestCase):
@@ -779,5 +783,63 @@ class LexiconTest(unittest.TestCase):
         self.assertTrue(primaryDatasetType("cosmic"), "data should be allowed")
         self.assertTrue(primaryDatasetType("test"), "test should be allowed")
 
+    def testCheckMany(self):
+        goodLFNs = ['/store/mc/Fall11/DYToMuMu/GEN-SIM/PU_S6_START44_V9B-v1/0000/1C8F4A6E.root',
+                    '/store/data/Run2012A/Cosmics/RAW/v1/000/190/456/0A2E1B3F.root',
+                    '/store/user/fred/Cosmics/AnalysisV1/v1/0000/output.root']
+        self.assertTrue(checkMany(lfn, goodLFNs))
+        self.assertTrue(checkMany(lfn, []))
+        self.assertRaises(AssertionError, checkMany, lfn, goodLFNs + ['/store/bad lfn.root'])
+
+        self.assertTrue(checkMany(dataset, ['/a/b/RECO', '/Cosmics/Run2012A-v1/RAW']))
+        self.assertRaises(AssertionError, checkMany, dataset, ['/a/b/RECO', '/a/b/c'])
+
+        # validators without a pattern table are called for each candidate
+        self.assertTrue(checkMany(cmsname, ['T2_UK_SGrid_Bristol', 'T1_US_FNAL_']))
+        self.assertRaises(AssertionError, checkMany, procdataset, ['Summer11-v1', 'None-v1'])
+        return
+
+    @attr('performance')
+    def testLFNPerformance(self):
+        """
+        Time validating LFNs the way check and lfn did before the patterns
+        were precompiled, one by one with lfn and with checkMany.
+        """
+        def legacyCheck(regexp, candidate):
+            assert re.compile(regexp).match(candidate) != None, \
+                "'%s' does not match regular expression %s" % (candidate, regexp)
+            return True
+
+        def legacyLFN(candidate):
+            for regexp in LFN_REGEXPS[:-1]:
+                try:
+                    return legacyCheck(regexp, candidate)
+                except AssertionError:
+                    pass
+            return legacyCheck(LFN_REGEXPS[-1], candidate)
+
+        lfns = []
+        for i in range(20000):
+            lfns.append('/store/mc/Fall11/DYToMuMu/GEN-SIM/PU_S6_START44_V9B-v1/%04i/file%i.root' % (i % 100, i))
+            lfns.append('/store/results/higgs/StoreResults/Run2012A/RECO/v1/%04i/file%i.root' % (i % 100, i))
+
+        startTime = time.time()
+        for candidate in lfns:
+            legacyLFN(candidate)
+        legacyTime = time.time() - startTime
+
+        startTime = time.time()
+        for candidate in lfns:
+            lfn(candidate)
+        lfnTime = time.time() - startTime
+
+        startTime = time.time()
+        checkMany(lfn, lfns)
+        checkManyTime = time.time() - startTime
+
+        print("\nPer LFN: before %.2f us, lfn %.2f us, checkMany %.2f us" % \
+              (1e6 * legacyTime / len(lfns), 1e6 * lfnTime / len(lfns), 1e6 * checkManyTime / len(lfns)))
+        return
+
 if __name__ == "__main__":
     unittest.main()
@@ -4,9 +4,12 @@ _ProcessPool_t
 Unit tests for the ProcessPool class.
 """
 
+import time
 import unittest
 import nose
 
+from nose.plugins.attrib import attr
+
 from WMCore.ProcessPool.ProcessPool import ProcessPool
 from WMQuality.TestInit import TestInit
 
@@ -122,8 +125,67 @@ class ProcessPoolTest(unittest.TestCase):
             self.assertEqual(len(result), len(input),
                              "Error: Wrong number of results returned.")
 
+    def testD_Serializers(self):
+        """
+        _testSerializers_
+
+        Send batches of work with the pickle serializer
+        """
+        raise nose.SkipTest
+        config = self.testInit.getConfiguration()
+        config.Agent.useHeartbeat = False
+        self.testInit.generateWorkDir(config)
 
+        processPool = ProcessPool("ProcessPool_t.ProcessPoolTestWorker",
+                                  totalSlaves = 2,
+                                  componentDir = config.General.workDir,
+                                  namespace = "WMCore_t",
+                                  config = config,
+                                  serializer = "pickle")
 
+        input = [{'id': i, 'files': set(['/store/file%i.root' % i])} for i in range(25)]
+        processPool.enqueue(input, batchSize = 10)
+        result = processPool.dequeue(len(input))
+
+        self.assertEqual(len(result), len(input))
+        self.assertEqual(sorted(result, key = lambda x: x['id']), input)
+        return
+
+    @attr('performance')
+    def testE_Throughput(self):
+        """
+        _testThroughput_
+
+        Measure the items per second going through the pool for each
+        serializer, one item or a batch of items per message.
+        """
+        config = self.testInit.getConfiguration()
+        config.Agent.useHeartbeat = False
+        self.testInit.generateWorkDir(config)
+
+        nItems = 5000
+        input = [{'jobgroup': i, 'workflow': 'TestWorkflow', 'task': '/TestWorkflow/Task',
+                  'files': [{'lfn': '/store/data/file%i.root' % j, 'size': 1024,
+                             'events': 100, 'locations': ['T2_CH_CERN']} for j in range(20)]}
+                 for i in range(nItems)]
+
+        for serializer, batchSize in [("json", 1), ("pickle", 1), ("pickle", 100)]:
+            processPool = ProcessPool("ProcessPool_t.ProcessPoolTestWorker",
+                                      totalSlaves = 2,
+                                      componentDir = config.General.workDir,
+                                      namespace = "WMCore_t",
+                                      config = config,
+                                      serializer = serializer)
+            startTime = time.time()
+            processPool.enqueue(input, batchSize = batchSize)
+            result = processPool.dequeue(nItems)
+            elapsed = time.time() - startTime
+            processPool.close()
+
+            self.assertEqual(len(result), nItems)
+            print("\n%s, %i items per message: %.0f items/s" % (serializer, batchSize,
+                                                                nItems / elapsed))
+        return
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+_Serializers_t_
+
+Unit tests for the ProcessPool serializers.
+"""
+
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.ProcessPool.Serializers import SERIALIZERS, JSONSerializer, PickleSerializer
+
+
+def makeWork(nItems):
+    """
+    _makeWork_
+
+    Work items looking like the job groups sent to the workers.
+    """
+    return [{'jobgroup': i, 'workflow': 'TestWorkflow', 'task': '/TestWorkflow/Task',
+             'files': [{'lfn': '/store/data/file%i.root' % j, 'size': 1024,
+                        'events': 100, 'locations': ['T2_CH_CERN']} for j in range(20)]}
+            for i in range(nItems)]
+
+
+class SerializersTest(unittest.TestCase):
+    """
+    _SerializersTest_
+
+    Round trip work through the serializers.
+    """
+    def testRoundTrip(self):
+        """
+        _testRoundTrip_
+
+        Both serializers give back the work, pickle keeps the python types.
+        """
+        work = makeWork(3)
+        for name in SERIALIZERS:
+            serializer = SERIALIZERS[name]()
+            self.assertEqual(serializer.decode(serializer.encode(work)), work)
+            self.assertEqual(serializer.decode(serializer.encode("STOP")), "STOP")
+
+        serializer = PickleSerializer()
+        work = {'locations': set(['T1_US_FNAL']), 'run': (1, [2, 3])}
+        self.assertEqual(serializer.decode(serializer.encode(work)), work)
+        return
+
+    @attr('performance')
+    def testThroughput(self):
+        """
+        _testThroughput_
+
+        Compare the items per second encoded and decoded by each serializer,
+        the part of the ProcessPool transport that does not depend on ZMQ.
+        """
+        nItems = 20000
+        work = makeWork(nItems)
+        for serializer in (JSONSerializer(), PickleSerializer()):
+            startTime = time.time()
+            for item in work:
+                serializer.decode(serializer.encode(item))
+            elapsed = time.time() - startTime
+            print("\n%s: %.0f items/s" % (serializer.name, nItems / elapsed))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 """
 """
 import unittest
+import json
 import os
 import logging
 import logging.config
@@ -13,7 +14,7 @@ from httplib import BadStatusLine, IncompleteRead
 
 from nose.plugins.attrib import attr
 
-from WMCore.Services.Service import Service
+from WMCore.Services.Service import Service, MemoryCache, getMemoryCache
 from WMCore.Services.Requests import Requests
 from WMCore.Algorithms import Permissions
 from WMQuality.TestInitCouchApp import TestInitCouchApp as TestInit
@@ -38,6 +39,20 @@ class CrappyRequest(Requests):
         # METAL \m/
         raise BadStatusLine(666)
 
+class CannedRequest(Requests):
+    """
+    Answer every request with the class response, counting the requests
+    and the instances they went through
+    """
+    response = '{"answer": 1}'
+    count = 0
+    instances = []
+    def makeRequest(self, uri=None, data={}, verb='GET', incoming_headers={},
+                     encoder=True, decoder=True, contentType=None):
+        CannedRequest.count += 1
+        CannedRequest.instances.append(self)
+        return CannedRequest.response, 200, 'OK', False
+
 class RegularServer(object):
     def regular(self):
         return "This is silly."
@@ -249,6 +264,65 @@ class ServiceTest(unittest.TestCase):
 
         service.cacheFileName(cache)
 
+    def testMemoryCache(self):
+        """Decoded results served from memory, decoded again only on changes"""
+        decoded = []
+        def decoder(text):
+            decoded.append(text)
+            return json.loads(text)
+
+        getMemoryCache().clear()
+        CannedRequest.count = 0
+        CannedRequest.instances = []
+        CannedRequest.response = '{"answer": 1}'
+        service = Service({'logger': self.logger, 'endpoint': 'http://cmssw.cvs.cern.ch',
+                           'requests': CannedRequest, 'cacheduration': 1, 'cachepath': None})
+        result = service.getCachedData('memcachetest', '/answer', decoder = decoder)
+        self.assertEqual(result, {'answer': 1})
+        self.assertTrue(service.getCachedData('memcachetest', '/answer', decoder = decoder) is result)
+        self.assertEqual((CannedRequest.count, len(decoded)), (1, 1))
+        service.getCachedData('memcachetest', '/answer', inputdata = {'q': 1}, decoder = decoder)
+        self.assertEqual((CannedRequest.count, len(decoded)), (2, 2))
+
+        # expired: revalidated, decoded again only if the answer changed
+        service['cacheduration'] = 0
+        service['backgroundrefresh'] = False
+        self.assertTrue(service.getCachedData('memcachetest', '/answer', decoder = decoder) is result)
+        self.assertEqual((CannedRequest.count, len(decoded)), (3, 2))
+        CannedRequest.response = '{"answer": 2}'
+        self.assertEqual(service.getCachedData('memcachetest', '/answer', decoder = decoder), {'answer': 2})
+        self.assertEqual((CannedRequest.count, len(decoded)), (4, 3))
+
+        # stale results are served while refreshed in the background
+        service['backgroundrefresh'] = True
+        CannedRequest.response = '{"answer": 3}'
+        self.assertEqual(service.getCachedData('memcachetest', '/answer', decoder = decoder), {'answer': 2})
+        service.refreshThread.join(10)
+        self.assertFalse(service.refreshThread.isAlive())
+        self.assertEqual((CannedRequest.count, len(decoded)), (5, 4))
+        # through a Requests instance of its own
+        self.assertFalse(CannedRequest.instances[-1] is service['requests'])
+        self.assertTrue(CannedRequest.instances[-2] is service['requests'])
+        service['cacheduration'] = 1
+        self.assertEqual(service.getCachedData('memcachetest', '/answer', decoder = decoder), {'answer': 3})
+
+        # clearing the cache drops the memory entry too
+        service.clearCache('memcachetest')
+        CannedRequest.response = '{"answer": 4}'
+        self.assertEqual(service.getCachedData('memcachetest', '/answer', decoder = decoder), {'answer': 4})
+
+        # least recently used entries go first
+        cache = MemoryCache(maxSize = 10, maxEntries = 2)
+        cache.put('a', 'd', 4, 'A')
+        cache.put('b', 'd', 4, 'B')
+        cache.get('a')
+        cache.put('c', 'd', 4, 'C')
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a')[3], 'A')
+        cache.put('d', 'd', 11, 'D')
+        self.assertEqual(cache.get('d'), None)
+        self.assertEqual(cache.getStats()['entries'], 2)
+
     def testCacheFileName(self):
         """Hash url + data to get cache file name"""
         hashes = {}
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+Test case for the SiteDB mappings cache
+"""
+
+import threading
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.Services.SiteDB.SiteDBMappings import SiteDBMappings, getSiteDBMappings, clearSiteDBMappings
+from WMQuality.Emulators.SiteDBClient.SiteDB import SiteDBJSON as SiteDBEmulator
+
+
+def makeMappings():
+    """
+    _makeMappings_
+
+    Mappings of the SiteDB emulator records
+    """
+    return SiteDBMappings(SiteDBEmulator._dataProcessing_data, SiteDBEmulator._sitenames_data,
+                          SiteDBEmulator._siteresources_data)
+
+
+class SiteDBMappingsTest(unittest.TestCase):
+    """
+    Unit tests for SiteDBMappings
+    """
+    def setUp(self):
+        clearSiteDBMappings()
+        return
+
+    def tearDown(self):
+        clearSiteDBMappings()
+        return
+
+    def testMappings(self):
+        """
+        _testMappings_
+
+        The indexed mappings give what filtering the SiteDB records gives
+        """
+        emulator = SiteDBEmulator()
+        mappings = makeMappings()
+        for item in SiteDBEmulator._dataProcessing_data:
+            self.assertEqual(mappings.pnnToPSNs[item['phedex_name']],
+                             emulator.PNNtoPSN(item['phedex_name']))
+            self.assertEqual(mappings.psnToPNNs[item['psn_name']],
+                             emulator.PSNtoPNN(item['psn_name']))
+        for item in SiteDBEmulator._siteresources_data:
+            self.assertEqual(mappings.hostToAliases(item['fqdn'], 'phedex'),
+                             emulator.seToPNNs(item['fqdn']))
+            self.assertEqual(mappings.hostToAliases(item['fqdn'], 'cms'),
+                             emulator.seToCMSName(item['fqdn']))
+        self.assertEqual(mappings.hostToAliases('srm-eoscms.cern.ch', 'cms'),
+                         ['T2_CH_CERN', 'T2_CH_CERN_T0', 'T2_CH_CERN_AI', 'T2_CH_CERN_HLT'])
+        self.assertEqual(mappings.hostToAliases('unknown.host', 'phedex'), [])
+        return
+
+    def testStaleWhileRefreshing(self):
+        """
+        _testStaleWhileRefreshing_
+
+        Expired mappings are returned while new ones load in the background,
+        and kept when the load fails
+        """
+        loaded = []
+        release = threading.Event()
+
+        def loader():
+            if loaded:
+                release.wait(10)
+            loaded.append(makeMappings())
+            return loaded[-1]
+
+        first = getSiteDBMappings('sitedb', loader, 3600)
+        self.assertTrue(getSiteDBMappings('sitedb', loader, 3600) is first)
+        self.assertEqual(len(loaded), 1)
+
+        # expired: the old mappings come back right away, a single load runs
+        self.assertTrue(getSiteDBMappings('sitedb', loader, 0) is first)
+        self.assertTrue(getSiteDBMappings('sitedb', loader, 0) is first)
+        release.set()
+        for _ in range(100):
+            if len(loaded) == 2 and getSiteDBMappings('sitedb', loader, 3600) is loaded[1]:
+                break
+            time.sleep(0.05)
+        self.assertEqual(len(loaded), 2)
+        self.assertTrue(getSiteDBMappings('sitedb', loader, 3600) is loaded[1])
+
+        def failingLoader():
+            raise RuntimeError("SiteDB is down")
+
+        self.assertTrue(getSiteDBMappings('sitedb', failingLoader, 0) is loaded[1])
+        time.sleep(0.2)
+        self.assertTrue(getSiteDBMappings('sitedb', failingLoader, 3600) is loaded[1])
+        return
+
+    def testFirstLoad(self):
+        """
+        _testFirstLoad_
+
+        A single caller loads the first mappings of a key, the others wait
+        for it without blocking the other keys, and load themselves if it
+        fails
+        """
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slowLoader():
+            calls.append('slow')
+            started.set()
+            release.wait(10)
+            return makeMappings()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(getSiteDBMappings('sitedb', slowLoader, 3600)))
+                   for _ in range(3)]
+        threads[0].start()
+        self.assertTrue(started.wait(10))
+        for thread in threads[1:]:
+            thread.start()
+
+        # another key loads while the first one is still loading
+        other = getSiteDBMappings('othersitedb', makeMappings, 3600)
+        self.assertFalse(release.isSet())
+        self.assertTrue(getSiteDBMappings('othersitedb', makeMappings, 3600) is other)
+
+        release.set()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(calls, ['slow'])
+        self.assertEqual(len(results), 3)
+        self.assertTrue(results[1] is results[0] and results[2] is results[0])
+
+        # a failed first load lets the next caller try
+        def failingLoader():
+            raise RuntimeError("SiteDB is down")
+
+        self.assertRaises(RuntimeError, getSiteDBMappings, 'failing', failingLoader, 3600)
+        self.assertTrue(getSiteDBMappings('failing', makeMappings, 3600) is not None)
+        return
+
+    @attr('performance')
+    def testConversionPerformance(self):
+        """
+        _testConversionPerformance_
+
+        Compare the PNN to PSN conversions filtering the records with the
+        indexed mappings, with a SiteDB sized list of records
+        """
+        dataProcessing = [{'phedex_name': 'T2_XX_Site%i' % i, 'psn_name': 'T2_XX_Site%i' % i}
+                          for i in range(2000)]
+        mappings = SiteDBMappings(dataProcessing, [], [])
+        pnns = ['T2_XX_Site%i' % (i % 2000) for i in range(0, 20000, 7)]
+
+        startTime = time.time()
+        for pnn in pnns:
+            [item['psn_name'] for item in dataProcessing if item['phedex_name'] == pnn]
+        filterTime = time.time() - startTime
+
+        startTime = time.time()
+        for pnn in pnns:
+            list(mappings.pnnToPSNs.get(pnn, []))
+        indexTime = time.time() - startTime
+
+        print("\nfiltered: %.4f s, indexed: %.4f s" % (filterTime, indexTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ from __future__ import print_function
 import unittest
 
 from WMCore.Services.SiteDB.SiteDB import SiteDBJSON
+from WMCore.Services.SiteDB.SiteDBMappings import clearSiteDBMappings
 from WMCore.Services.EmulatorSwitch import EmulatorHelper
 from WMQuality.Emulators.EmulatedUnitTestCase import EmulatedUnitTestCase
 
@@ -24,6 +25,7 @@ class SiteDBTest(EmulatedUnitTestCase):
         """
         super(SiteDBTest, self).setUp()
         EmulatorHelper.setEmulators(phedex=False, dbs=False, siteDB=False, requestMgr=True)
+        clearSiteDBMappings()
         self.mySiteDB = SiteDBJSON()
 
 
@@ -148,5 +150,20 @@ class SiteDBTest(EmulatedUnitTestCase):
         self.assertItemsEqual(result, ['T2_UK_London_IC', 'T2_US_Purdue'])
         return
 
+    def testBulkConversions(self):
+        """
+        _testBulkConversions_
+
+        Test converting PNNs and PSNs in bulk
+        """
+        result = self.mySiteDB.PNNstoPSNsMap(['T1_US_FNAL_Disk', 'T1_US_FNAL_MSS', 'T2_UK_London_IC',
+                                              'T1_US_FNAL_Tape', 'T2_UK_London_IC'])
+        self.assertEqual(result, {'T1_US_FNAL_Disk': ['T1_US_FNAL'], 'T1_US_FNAL_MSS': [],
+                                  'T2_UK_London_IC': ['T2_UK_London_IC'], 'T1_US_FNAL_Tape': []})
+        result = self.mySiteDB.PSNstoPNNsMap(['T2_UK_London_IC', 'T1_US_FNAL'])
+        self.assertEqual(result['T2_UK_London_IC'], ['T2_UK_London_IC'])
+        self.assertItemsEqual(result['T1_US_FNAL'], self.mySiteDB.PSNtoPNN('T1_US_FNAL'))
+        return
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+_pycurl_manager_t_
+
+Unit tests for the pycurl_manager RequestHandler, against a local HTTP
+server standing in for the data services.
+"""
+
+import json
+import threading
+import time
+import unittest
+import urlparse
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+import pycurl
+from nose.plugins.attrib import attr
+
+from WMCore.Services.pycurl_manager import RequestHandler
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """
+    _ThreadingHTTPServer_
+
+    HTTP server answering every request in its own thread
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    _StandInHandler_
+
+    Answer GET requests after the delay given in the server, with a JSON
+    list echoing the block parameter.  Blocks named 'bad' get a 500.
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StandIn/1.0'
+    sys_version = ''
+
+    def do_GET(self):
+        params = urlparse.parse_qs(urlparse.urlparse(self.path).query)
+        block = params.get('block', [''])[0]
+        time.sleep(self.server.delay)
+        if block == 'bad':
+            body = 'Internal error'
+            self.send_response(500)
+        else:
+            body = json.dumps([{'name': block, 'size': 1024}])
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        return
+
+
+class RecordingCurl(pycurl.Curl):
+    """
+    _RecordingCurl_
+
+    Curl handle recording its resets and the share set on it
+    """
+    handles = []
+
+    def __init__(self):
+        pycurl.Curl.__init__(self)
+        self.calls = []
+        RecordingCurl.handles.append(self)
+
+    def reset(self):
+        self.calls.append('reset')
+        pycurl.Curl.reset(self)
+
+    def setopt(self, option, value):
+        if option == pycurl.SHARE:
+            self.calls.append('share')
+        pycurl.Curl.setopt(self, option, value)
+
+
+class PycurlManagerTest(unittest.TestCase):
+    """
+    _PycurlManagerTest_
+
+    Test the single and concurrent requests
+    """
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.delay = 0
+        self.thread = threading.Thread(target = self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%i/blocks' % self.server.server_address[1]
+        return
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        return
+
+    def testRequest(self):
+        """
+        _testRequest_
+
+        Fetch one resource
+        """
+        handler = RequestHandler()
+        header, data = handler.request(self.url, {'block': 'b1'}, decode = True)
+        self.assertEqual(header.status, 200)
+        self.assertEqual(data, [{'name': 'b1', 'size': 1024}])
+        return
+
+    def testMultiRequest(self):
+        """
+        _testMultiRequest_
+
+        All the requests come back with their parameters, and a failed one
+        doesn't affect the others
+        """
+        handler = RequestHandler({'maxinflight': 3})
+        parray = [{'block': 'b%i' % i} for i in range(10)]
+        parray.insert(4, {'block': 'bad'})
+
+        results = list(handler.multirequest(self.url, parray))
+        self.assertEqual(len(results), 11)
+        errors = [item for item in results if 'error' in item]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]['block'], 'bad')
+        self.assertTrue('code=500' in errors[0]['error'])
+        goodResults = [item for item in results if 'error' not in item]
+        self.assertEqual(sorted([item['name'] for item in goodResults]),
+                         sorted(['b%i' % i for i in range(10)]))
+        for item in goodResults:
+            self.assertEqual(item['name'], item['block'])
+
+        # Stopping early leaves no request behind
+        generator = handler.multirequest(self.url, parray)
+        self.assertTrue('block' in next(generator))
+        generator.close()
+        return
+
+    def testMultiRequestShare(self):
+        """
+        _testMultiRequestShare_
+
+        The DNS and SSL session share is set again after every reset of a
+        reused handle
+        """
+        handler = RequestHandler({'maxinflight': 2})
+        parray = [{'block': 'b%i' % i} for i in range(6)]
+        RecordingCurl.handles = []
+        curlClass = pycurl.Curl
+        pycurl.Curl = RecordingCurl
+        try:
+            results = list(handler.multirequest(self.url, parray))
+        finally:
+            pycurl.Curl = curlClass
+        self.assertEqual(len(results), 6)
+        self.assertEqual(len(RecordingCurl.handles), 2)
+        self.assertEqual(sum([x.calls for x in RecordingCurl.handles], []),
+                         ['reset', 'share'] * 6)
+        return
+
+    @attr('performance')
+    def testMultiRequestPerformance(self):
+        """
+        _testMultiRequestPerformance_
+
+        Compare serial requests with concurrent ones, with a server taking
+        50 ms per request
+        """
+        self.server.delay = 0.05
+        parray = [{'block': 'b%i' % i} for i in range(100)]
+
+        handler = RequestHandler({'maxinflight': 20})
+        startTime = time.time()
+        for params in parray:
+            handler.request(self.url, params, decode = True)
+        serialTime = time.time() - startTime
+
+        startTime = time.time()
+        results = list(handler.multirequest(self.url, parray))
+        multiTime = time.time() - startTime
+        self.assertEqual(len(results), len(parray))
+
+        print("\nserial: %.2f s, multirequest: %.2f s" % (serialTime, multiTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,19 +6,80 @@ Test the parsing of the TFC.
 """
 
 import os
+import re
+import time
 import unittest
 import nose
 import tempfile
 
+from nose.plugins.attrib import attr
+
 from xml.dom.minidom import parseString
 from WMCore.WMBase import getTestBase
 
 from WMQuality.TestInit import TestInit
 
 from WMCore.Storage.TrivialFileCatalog import tfcFilename, tfcProtocol, readTFC, TrivialFileCatalog
+from WMCore.Storage.TrivialFileCatalog import literalPrefix
 
 from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
 
+SITE_TFCS = ["T1_US_FNAL_TrivialFileCatalog.xml", "T2_CH_CERNBOX_TrivialFileCatalog.xml",
+             "T2_ES_IFCA_TrivialFileCatalog.xml", "T2_PT_NCG_Lisbon_TrivialFileCatalog.xml",
+             "T2_US_Florida_TrivialFileCatalog.xml", "T2_US_Nebraska_TrivialFileCatalog.xml"]
+
+TEST_LFNS = ["/store/data/Run2012A/SingleMu/RAW/v1/000/190/456/%s.root",
+             "/store/mc/Summer12/QCD/AODSIM/PU_S7/0000/%s.root",
+             "/store/unmerged/logs/prod/2012/6/5/%s.tar.gz",
+             "//store/user/fred/data/%s.root",
+             "/store/temp/user/test/SAM-srmb/%s",
+             "/store/PhEDEx_LoadTest_SingleSource/%s.LTgenerated.T1_US_FNAL_MSS",
+             "/LoadTest07_FNAL_%s_01_02",
+             "/MTCC/%s", "/h2_testbeam/%s", "/cms/data/%s",
+             "store/relative/%s.root", "/other/%s.root"]
+
+
+def legacyMatch(tfc, protocol, path, style):
+    """
+    _legacyMatch_
+
+    The rule matching done before the rules were compiled.
+    """
+    for mapping in tfc[style]:
+        if mapping['protocol'] != protocol:
+            continue
+        if mapping['path-match-expr'].match(path) or mapping["chain"] != None:
+            if mapping["chain"] != None:
+                oldpath = path
+                path = legacyMatch(tfc, mapping["chain"], path, style)
+                if not path:
+                    path = oldpath
+                    continue
+            splitList = []
+            if len(mapping['path-match-expr'].split(path, 1)) > 1 :
+                for split in range(len(mapping['path-match-expr'].split(path, 1))):
+                    s = mapping['path-match-expr'].split(path, 1)[split]
+                    if s:
+                        splitList.append(s)
+            else:
+                path = oldpath
+                continue
+            result = mapping['result']
+            for split in range(len(splitList)):
+                result = result.replace("$" + str(split + 1), splitList[split])
+            return result
+
+    return None
+
+
+def siteTFCs():
+    """
+    _siteTFCs_
+
+    Load the site TFCs shipped with the tests.
+    """
+    return [readTFC(os.path.join(getTestBase(), "WMCore_t/Storage_t", x)) for x in SITE_TFCS]
+
 
 class TrivialFileCatalogTest(unittest.TestCase):
     def setUp(self):
@@ -214,6 +275,117 @@ class TrivialFileCatalogTest(unittest.TestCase):
         pfn = tfc.matchLFN('srmv2', in_lfn)
         self.assertEqual(out_pfn, pfn)
 
+    def testLiteralPrefix(self):
+        """
+        _testLiteralPrefix_
+
+        Check the text paths need to start with to match the patterns.
+        """
+        self.assertEqual(literalPrefix("/+store/(.*)"), (True, "store/"))
+        self.assertEqual(literalPrefix("^/+store(.*)"), (True, "store"))
+        self.assertEqual(literalPrefix("/+(.*)"), (True, ""))
+        self.assertEqual(literalPrefix("/+castor/cern\\.ch/cms/(.*)"), (True, "castor/cern.ch/cms/"))
+        self.assertEqual(literalPrefix("/store/tempx?/(.*)"), (False, "/store/temp"))
+        self.assertEqual(literalPrefix("/store/\\w+"), (False, "/store/"))
+        self.assertEqual(literalPrefix(".*\\?SFN=(.*)"), None)
+        self.assertEqual(literalPrefix("(.*)"), None)
+        self.assertEqual(literalPrefix("/+store/a|/+cms/b"), None)
+        return
+
+    def testCompiledRules(self):
+        """
+        _testCompiledRules_
+
+        The compiled rules give the same results as the plain scan of the
+        mappings for the site TFCs, LFN to PFN and back.
+        """
+        nMatched = 0
+        for tfc in siteTFCs():
+            for protocol in set([x['protocol'] for x in tfc['lfn-to-pfn']]):
+                for lfnPattern in TEST_LFNS:
+                    for name in ["file", "A.root", "0F"]:
+                        lfn = lfnPattern % name
+                        pfn = tfc.matchLFN(protocol, lfn)
+                        self.assertEqual(pfn, legacyMatch(tfc, protocol, lfn, 'lfn-to-pfn'))
+                        # twice, from the cache
+                        self.assertEqual(pfn, tfc.matchLFN(protocol, lfn))
+                        if pfn is None:
+                            continue
+                        nMatched += 1
+                        self.assertEqual(tfc.matchPFN(protocol, pfn),
+                                         legacyMatch(tfc, protocol, pfn, 'pfn-to-lfn'))
+        self.assertTrue(nMatched > 100)
+        return
+
+    def testMatchCache(self):
+        """
+        _testMatchCache_
+
+        Adding a mapping drops the cached results, the cache is bounded.
+        """
+        tfc = TrivialFileCatalog()
+        tfc.cacheSize = 10
+        tfc.addMapping("direct", "/+store/(.*)", "/data1/$1", mapping_type = 'lfn-to-pfn')
+        self.assertEqual(tfc.matchLFN("direct", "/store/a.root"), "/data1/a.root")
+        self.assertEqual(tfc.matchLFN("direct", "/other/a.root"), None)
+
+        tfc.addMapping("direct", "/+(.*)", "/data2/$1", mapping_type = 'lfn-to-pfn')
+        self.assertEqual(tfc.matchLFN("direct", "/store/a.root"), "/data1/a.root")
+        self.assertEqual(tfc.matchLFN("direct", "/other/a.root"), "/data2/other/a.root")
+
+        # mappings added without addMapping are found too
+        tfc['lfn-to-pfn'].insert(0, {'protocol': 'direct', 'path-match-expr': re.compile("/+other/(.*)"),
+                                     'path-match': "/+other/(.*)", 'result': "/data3/$1", 'chain': None})
+        self.assertEqual(tfc.matchLFN("direct", "/other/a.root"), "/data3/a.root")
+
+        for i in range(100):
+            tfc.matchLFN("direct", "/store/%i.root" % i)
+        self.assertTrue(len(tfc._matchCache) <= 10)
+        self.assertTrue(len(tfc._oldMatchCache) <= 10)
+        return
+
+    @attr('performance')
+    def testMatchPerformance(self):
+        """
+        _testMatchPerformance_
+
+        Time resolving LFNs with the site TFCs, with a plain scan of the
+        mappings, the compiled rules and the cached results.
+        """
+        tfcs = siteTFCs()
+        lfns = []
+        for i in range(2000):
+            lfns.extend([x % ("file%i" % i) for x in TEST_LFNS])
+
+        for tfc, name in zip(tfcs, SITE_TFCS):
+            protocols = set([x['protocol'] for x in tfc['lfn-to-pfn']])
+            startTime = time.time()
+            for protocol in protocols:
+                for lfn in lfns:
+                    legacyMatch(tfc, protocol, lfn, 'lfn-to-pfn')
+            legacyTime = time.time() - startTime
+
+            tfc.cacheSize = 0
+            startTime = time.time()
+            for protocol in protocols:
+                for lfn in lfns:
+                    tfc.matchLFN(protocol, lfn)
+            compiledTime = time.time() - startTime
+
+            tfc.cacheSize = len(lfns) * len(protocols)
+            for protocol in protocols:
+                for lfn in lfns:
+                    tfc.matchLFN(protocol, lfn)
+            startTime = time.time()
+            for protocol in protocols:
+                for lfn in lfns:
+                    tfc.matchLFN(protocol, lfn)
+            cachedTime = time.time() - startTime
+
+            print("\n%s, %i lookups: scan %.2f s, compiled %.2f s, cached %.2f s" % \
+                  (name, len(lfns) * len(protocols), legacyTime, compiledTime, cachedTime))
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
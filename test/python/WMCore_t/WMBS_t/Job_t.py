@@ -1123,6 +1123,92 @@ class JobTest(unittest.TestCase):
 
         return
 
+    def testLoadForAccountant(self):
+        """
+        _testLoadForAccountant_
+
+        Verify that the Jobs.LoadForAccountant DAO returns the same job
+        information, type, output fileset and mask as the single job calls.
+        """
+        jobA = self.createTestJob(subscriptionType = "Processing")
+        jobB = self.createTestJob()
+
+        mask = Mask()
+        mask.addRunAndLumis(1, [45, 47])
+        mask.save(jobA['id'])
+
+        accountantDAO = self.daoFactory(classname = "Jobs.LoadForAccountant")
+        jobTypeAction = self.daoFactory(classname = "Jobs.GetType")
+        jobs = accountantDAO.execute(jobID = [jobA['id'], jobB['id']])
+        self.assertEqual(sorted(jobs.keys()), sorted([jobA['id'], jobB['id']]))
+
+        for job in [jobA, jobB]:
+            loadJob = Job(id = job['id'])
+            loadJob.load()
+            loadJob.getMask()
+            context = jobs[job['id']]
+            for key in ["jobgroup", "name", "state", "state_time", "retry_count",
+                        "couch_record", "cache_dir", "location", "outcome", "fwjr_path"]:
+                self.assertEqual(context[key], loadJob[key])
+            self.assertEqual(context['type'], jobTypeAction.execute(jobID = job['id']))
+            self.assertEqual(context['output_fileset'], loadJob.loadOutputID())
+
+            contextMask = Mask()
+            contextMask.loadMaskEntries(context['masks'])
+            self.assertEqual(contextMask['runAndLumis'], loadJob['mask']['runAndLumis'])
+
+        self.assertEqual(jobs[jobA['id']]['type'], "Processing")
+        self.assertNotEqual(jobs[jobA['id']]['workflow'], jobs[jobB['id']]['workflow'])
+        self.assertEqual(jobs[jobA['id']]['masks'][0]['FirstLumi'], 45)
+        self.assertEqual(jobs[jobB['id']]['masks'], [])
+        self.assertEqual(accountantDAO.execute(jobID = []), {})
+        return
+
+    def testLoadForAccountantQueries(self):
+        """
+        _testLoadForAccountantQueries_
+
+        Verify that Jobs.LoadForAccountant runs one select for the jobs and
+        one for the masks, whatever the number of jobs.
+        """
+        jobIDs = []
+        for i in range(20):
+            job = self.createTestJob()
+            mask = Mask()
+            mask.addRunAndLumis(1, [i, i + 1])
+            mask.save(job['id'])
+            jobIDs.append(job['id'])
+
+        myThread = threading.currentThread()
+        dbi = myThread.dbi
+        dbExecutebinds = dbi.executebinds
+        dbExecutemanybinds = dbi.executemanybinds
+        statements = []
+
+        # a select with a list of binds runs once per bind
+        def executebinds(s = None, b = None, connection = None, returnCursor = False):
+            statements.append(s)
+            return dbExecutebinds(s, b, connection = connection, returnCursor = returnCursor)
+
+        def executemanybinds(s = None, b = None, connection = None, returnCursor = False):
+            statements.extend([s] * len(b))
+            return dbExecutemanybinds(s, b, connection = connection, returnCursor = returnCursor)
+
+        accountantDAO = self.daoFactory(classname = "Jobs.LoadForAccountant")
+        dbi.executebinds = executebinds
+        dbi.executemanybinds = executemanybinds
+        try:
+            jobs = accountantDAO.execute(jobID = jobIDs)
+        finally:
+            del dbi.executebinds
+            del dbi.executemanybinds
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(sorted(jobs.keys()), sorted(jobIDs))
+        for job in jobs.values():
+            self.assertEqual(len(job['masks']), 1)
+        return
+
     def testLoadForTaskArchiver(self):
         """
         _testLoadForTaskArchiver_
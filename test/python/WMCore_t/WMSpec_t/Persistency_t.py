@@ -1,6 +1,10 @@
-from WMCore.WMSpec.Persistency import PersistencyHelper
+from WMCore.WMSpec.Persistency import PersistencyHelper, SpecCache
+import os
+import shutil
+import tempfile
 import unittest
 from WMCore.WMSpec.WMStep import WMStep, makeWMStep
+from WMCore.WMSpec.WMWorkload import newWorkload
 
 
 class PersistencyTest(unittest.TestCase):
@@ -19,6 +23,52 @@ class PersistencyTest(unittest.TestCase):
         self.assertEqual(dbname, 'mydb')
         self.assertEqual(doc, 'doc/spec')
 
+    def testSpecCache(self):
+        """
+        _testSpecCache_
+
+        Specs are cached until their file changes and evicted in LRU order.
+        """
+        testDir = tempfile.mkdtemp()
+        try:
+            specs = []
+            for name in ("WorkloadA", "WorkloadB", "WorkloadC"):
+                specPath = os.path.join(testDir, "%s.pkl" % name)
+                newWorkload(name).save(specPath)
+                specs.append(specPath)
+
+            cache = SpecCache(maxEntries = 2)
+            workload = cache.load(specs[0])
+            self.assertEqual(workload.name(), "WorkloadA")
+            self.assertTrue(cache.load(specs[0]) is workload)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+            # A changed spec file is loaded again
+            newWorkload("WorkloadD").save(specs[0])
+            os.utime(specs[0], (0, 0))
+            self.assertEqual(cache.load(specs[0]).name(), "WorkloadD")
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+            # specs[1] is the least recently used when specs[2] comes in
+            cache.load(specs[1])
+            cache.load(specs[0])
+            cache.load(specs[2])
+            stats = cache.getStats()
+            self.assertEqual(stats["entries"], 2)
+            self.assertEqual(stats["evictions"], 1)
+            cache.load(specs[0])
+            self.assertEqual(cache.hits, 3)
+            cache.load(specs[1])
+            self.assertEqual(cache.misses, 5)
+
+            # Nothing bigger than maxSize is kept
+            cache = SpecCache(maxSize = os.path.getsize(specs[1]) - 1)
+            cache.load(specs[1])
+            self.assertEqual(cache.getStats()["entries"], 0)
+            self.assertEqual(cache.getStats()["size"], 0)
+        finally:
+            shutil.rmtree(testDir)
+
 
 if __name__ == '__main__':
     unittest.main()
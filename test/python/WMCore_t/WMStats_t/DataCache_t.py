@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+    DataCache unit tests
+"""
+
+import random
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.WMStats.DataStructs.DataCache import DataCache
+
+
+def makeRequest(i, status = "running-open", teams = None, campaign = None):
+    """
+    A request document like the ones in the request database
+    """
+    return {"RequestName": "request_%i" % i, "RequestStatus": status,
+            "Teams": teams or ["production"], "Campaign": campaign or "Campaign%i" % (i % 3)}
+
+
+class DataCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        DataCache._lastedActiveDataFromAgent.clear()
+        DataCache._index = {}
+
+    def tearDown(self):
+        DataCache._lastedActiveDataFromAgent.clear()
+        DataCache._index = {}
+
+    def testUpdates(self):
+        """
+        Request and agent deltas give what a full resync would, and leave the
+        data handed out before untouched
+        """
+        self.assertEqual(DataCache.filterData(status = "running-open"), {})
+        DataCache.updateRequests({"request_0": makeRequest(0)})
+        self.assertEqual(DataCache.getlatestJobData(), None)
+
+        jobData = dict(("request_%i" % i, makeRequest(i)) for i in range(10))
+        jobData["request_1"]["AgentJobInfo"] = {"agent1": {"workflow": "request_1", "agent_url": "agent1",
+                                                           "timestamp": 100}}
+        DataCache.setlatestJobData(jobData)
+        self.assertTrue(DataCache.getlatestJobData() is jobData)
+        self.assertFalse(DataCache.islatestJobDataExpired())
+
+        DataCache.updateRequests({"request_1": makeRequest(1, "completed"),
+                                  "request_2": makeRequest(2, teams = ["relval", "production"]),
+                                  "request_10": makeRequest(10, "assigned", campaign = "Campaign0")},
+                                 ["request_3", "request_11"])
+        DataCache.updateAgentJobInfo([{"workflow": "request_1", "agent_url": "agent1", "timestamp": 90},
+                                      {"workflow": "request_2", "agent_url": "agent1", "timestamp": 100},
+                                      {"workflow": "request_2", "agent_url": "agent2", "timestamp": 100},
+                                      {"workflow": "request_2", "agent_url": "agent2", "timestamp": 200},
+                                      {"workflow": "request_3", "agent_url": "agent1", "timestamp": 100}])
+
+        data = DataCache.getlatestJobData()
+        self.assertEqual(sorted(data), sorted(["request_%i" % i for i in range(11) if i != 3]))
+        self.assertEqual(data["request_1"]["RequestStatus"], "completed")
+        self.assertEqual(data["request_1"]["AgentJobInfo"]["agent1"]["timestamp"], 100)
+        self.assertEqual(data["request_2"]["AgentJobInfo"]["agent2"]["timestamp"], 200)
+        self.assertEqual(sorted(data["request_2"]["AgentJobInfo"]), ["agent1", "agent2"])
+        self.assertEqual(len(jobData), 10)
+        self.assertEqual(jobData["request_1"]["RequestStatus"], "running-open")
+        self.assertFalse("AgentJobInfo" in jobData["request_2"])
+
+        # the indexes match a full scan of the updated data
+        for filters in [{"status": "completed"}, {"status": ["assigned", "completed"]},
+                        {"team": "relval"}, {"team": "production", "campaign": "Campaign0"},
+                        {"campaign": "Campaign1", "status": "running-open"}, {"status": "rejected"}]:
+            expected = {}
+            for requestName, requestInfo in data.items():
+                matched = True
+                for name, values in filters.items():
+                    field = DataCache._indexedFields[name]
+                    if not isinstance(values, list):
+                        values = [values]
+                    fieldValues = requestInfo[field] if isinstance(requestInfo[field], list) else [requestInfo[field]]
+                    if not set(values) & set(fieldValues):
+                        matched = False
+                if matched:
+                    expected[requestName] = requestInfo
+            self.assertEqual(DataCache.filterData(**filters), expected)
+        self.assertEqual(DataCache.filterData(), data)
+        self.assertRaises(ValueError, DataCache.filterData, group = "DATAOPS")
+
+        DataCache.setlatestJobData({})
+        self.assertEqual(DataCache.filterData(status = "completed"), {})
+        return
+
+    @attr('performance')
+    def testFilterPerformance(self):
+        """
+        Compare looking up the requests of a status and team scanning all the
+        requests with the indexes, and time applying a delta
+        """
+        random.seed(1234)
+        statuses = ["assigned", "acquired", "running-open", "running-closed", "completed"]
+        teams = ["production", "relval", "highprio", "t0"]
+        jobData = dict(("request_%i" % i, makeRequest(i, random.choice(statuses), [random.choice(teams)],
+                                                       "Campaign%i" % random.randint(0, 200)))
+                       for i in range(20000))
+        DataCache.setlatestJobData(jobData)
+
+        startTime = time.time()
+        for status in statuses:
+            for team in teams:
+                dict((k, v) for k, v in jobData.items() if v["RequestStatus"] == status and team in v["Teams"])
+        scanTime = time.time() - startTime
+
+        startTime = time.time()
+        for status in statuses:
+            for team in teams:
+                DataCache.filterData(status = status, team = team)
+        indexTime = time.time() - startTime
+
+        startTime = time.time()
+        DataCache.updateRequests(dict(("request_%i" % i, makeRequest(i, "completed")) for i in range(100)))
+        deltaTime = time.time() - startTime
+
+        print("\nscan: %.3f s, indexed: %.3f s, 100 request delta: %.3f s" % (scanTime, indexTime, deltaTime))
+
+
+if __name__ == "__main__":
+    unittest.main()
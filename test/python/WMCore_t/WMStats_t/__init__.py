@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+"""
+_WMStats_t_
+
+"""
+
+__all__ = []
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+    WorkMatcher unit tests
+"""
+
+import copy
+import random
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.WorkQueue.DataStructs.WorkQueueElement import WorkQueueElement
+from WMCore.WorkQueue.WorkMatcher import matchWork, restrictedSites
+
+
+def matchWorkBySite(elements, thresholds, siteJobCounts):
+    """
+    The element by element and site by site matching matchWork replaces
+    """
+    elements = sorted(elements, key = lambda x: x['CreationTime'])
+    elements.sort(key = lambda x: x['Priority'], reverse = True)
+    matched = []
+    for element in elements:
+        prio = element['Priority']
+        sites = thresholds.keys()
+        random.shuffle(sites)
+        for site in sites:
+            if element.passesSiteRestriction(site):
+                curJobCount = sum(map(lambda x: x[1] if x[0] >= prio else 0, siteJobCounts.get(site, {}).items()))
+                if curJobCount < thresholds[site]:
+                    matched.append((element, site))
+                    siteJobCounts.setdefault(site, {})
+                    siteJobCounts[site][prio] = siteJobCounts[site].setdefault(prio, 0) + \
+                                                element['Jobs'] * element.get('blowupFactor', 1.0)
+                    break
+    return matched
+
+
+def makeSnapshot(nElements, nSites, maxSites = 5):
+    """
+    Available elements, thresholds and running jobs like the ones of a
+    global queue, with the sites allowed by each element drawn at random
+    """
+    sites = ['T2_XX_Site%i' % i for i in range(nSites)]
+    thresholds = dict((site, random.randint(100, 5000)) for site in sites)
+    siteJobCounts = {}
+    for site in sites:
+        siteJobCounts[site] = dict((random.choice(range(0, 300000, 1000)), random.randint(0, 500))
+                                   for _ in range(random.randint(0, 10)))
+    elements = []
+    for i in range(nElements):
+        blockSites = random.sample(sites, random.randint(1, maxSites))
+        params = {'RequestName': 'Request%i' % (i % 50), 'Jobs': random.randint(1, 200),
+                  'Priority': random.choice(range(0, 300000, 1000)), 'CreationTime': random.randint(0, 10000),
+                  'Inputs': {'/A/B/RAW#%i' % i: blockSites}}
+        choice = random.random()
+        if choice < 0.1:
+            params['SiteWhitelist'] = random.sample(sites, nSites // 5)
+        elif choice < 0.2:
+            params['SiteBlacklist'] = blockSites[:1]
+        elif choice < 0.3:
+            params['NoInputUpdate'] = True
+        elif choice < 0.4:
+            params['PileupData'] = {'/MinBias/GEN-SIM': random.sample(sites, nSites // 2)}
+        elements.append(WorkQueueElement(**params))
+    return elements, thresholds, siteJobCounts
+
+
+class WorkMatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(4321)
+
+    def testRestrictedSites(self):
+        """The allowed sites are the ones passing the site restriction"""
+        elements, thresholds, _ = makeSnapshot(500, 100)
+        elements.append(WorkQueueElement(SiteWhitelist = ['T2_XX_Site1'], NoLocationUpdate = True,
+                                         Inputs = {'/A/B/RAW#1': []}))
+        elements.append(WorkQueueElement(ParentFlag = True, ParentData = {'/A/B/GEN#1': ['T2_XX_Site2']}))
+        sites = set(thresholds)
+        for element in elements:
+            self.assertEqual(restrictedSites(element, sites),
+                             set([site for site in sites if element.passesSiteRestriction(site)]))
+
+    def testMatchWork(self):
+        """
+        Same matches and job counts as site by site matching, when every
+        element has a single site to go to
+        """
+        for _ in range(10):
+            elements, thresholds, siteJobCounts = makeSnapshot(2000, 30, maxSites = 1)
+            for element in elements:
+                element['SiteBlacklist'] = []
+                element['NoInputUpdate'] = False
+            expectedCounts = copy.deepcopy(siteJobCounts)
+            expected = [(elements.index(x), site) for x, site in
+                        matchWorkBySite(elements, thresholds, expectedCounts)]
+            matched, unmatched = matchWork(elements, thresholds, siteJobCounts)
+            self.assertEqual(matched, expected)
+            self.assertEqual(siteJobCounts, expectedCounts)
+            self.assertEqual(sorted([i for i, _ in matched] + unmatched), range(len(elements)))
+            self.assertTrue(0 < len(matched) < len(elements))
+
+        # the element goes to one of its sites with free slots
+        thresholds = {'SiteA': 10, 'SiteB': 10, 'SiteC': 10}
+        siteJobCounts = {'SiteA': {5: 10}, 'SiteB': {1: 10}}
+        elements = [WorkQueueElement(Jobs = 4, Priority = 3, Inputs = {'/A/B/RAW#1': ['SiteA', 'SiteB']},
+                                     blowupFactor = 2.0),
+                    WorkQueueElement(Jobs = 4, Priority = 2, SiteWhitelist = ['SiteB'])]
+        matched, unmatched = matchWork(elements, thresholds, siteJobCounts)
+        self.assertEqual(matched, [(0, 'SiteB'), (1, 'SiteB')])
+        self.assertEqual(unmatched, [])
+        self.assertEqual(siteJobCounts['SiteB'], {1: 10, 2: 4, 3: 8.0})
+        siteSeen = set()
+        for _ in range(50):
+            siteSeen.add(matchWork(elements[1:], thresholds, {})[0][0][1])
+        self.assertEqual(siteSeen, set(['SiteB']))
+        for _ in range(50):
+            siteSeen.add(matchWork([WorkQueueElement(Jobs = 1)], thresholds, {})[0][0][1])
+        self.assertEqual(siteSeen, set(thresholds))
+
+    @attr('performance')
+    def testMatchWorkPerformance(self):
+        """Time the matching of a global queue sized snapshot"""
+        elements, thresholds, siteJobCounts = makeSnapshot(5000, 100)
+
+        startTime = time.time()
+        matchWorkBySite(elements, thresholds, copy.deepcopy(siteJobCounts))
+        bySiteTime = time.time() - startTime
+
+        startTime = time.time()
+        matchWork(elements, thresholds, copy.deepcopy(siteJobCounts))
+        matchTime = time.time() - startTime
+
+        print("\nsite by site: %.2f s, matchWork: %.2f s" % (bySiteTime, matchTime))
+
+
+if __name__ == "__main__":
+    unittest.main()